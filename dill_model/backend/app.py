@@ -2,8 +2,12 @@ from flask import Flask, send_from_directory
 from flask_cors import CORS
 import os
 import json
+import time
 from .routes import api_bp
-from .utils import NumpyEncoder
+from .utils import init_json, init_compression, init_frame_store, init_log_store, init_cancellation, init_cost_model, init_admission, init_rendering, init_compute_pool
+from .utils import init_result_cache, init_admin, record_startup, init_metrics, init_timing, init_profiling
+from .utils import init_error_log, init_slow_requests
+from .models import init_model_registry
 
 def create_app():
     """
@@ -12,6 +16,7 @@ def create_app():
     返回:
         配置好的Flask应用实例
     """
+    start = time.perf_counter()
     # 获取当前文件的绝对路径
     current_dir = os.path.dirname(os.path.abspath(__file__))
     # 项目根目录
@@ -29,12 +34,46 @@ def create_app():
     )
     
     # 配置CORS，允许跨域请求
-    CORS(app)
+    CORS(app, expose_headers=['X-Calc-Id', 'Server-Timing', 'X-Profile-Id'])
     
     # 配置应用
     app.config['JSON_SORT_KEYS'] = False
-    # 自定义JSON编码器以处理NumPy数据类型
-    app.json_encoder = NumpyEncoder
+    # 允许通过 DILL_ 前缀的环境变量覆盖配置（如 DILL_COMPRESS_GZIP_LEVEL=5）
+    app.config.from_prefixed_env('DILL')
+    # 阶段耗时统计（timings 块与 Server-Timing 响应头），最先注册以覆盖其余请求钩子
+    init_timing(app)
+    # JSON提供器：直接序列化NumPy数组（可用时基于orjson）
+    init_json(app)
+    
+    # 响应压缩（gzip，可用时优先brotli/zstd）
+    init_compression(app)
+    # 4D动画结果的内存映射帧存储
+    init_frame_store(app)
+    # 按计算ID划分、多worker共享的日志库
+    init_log_store(app)
+    # 计算截止时间与取消
+    init_cancellation(app)
+    # 请求代价模型（基准校准 + 运行期校准）与准入控制
+    init_cost_model(app)
+    init_admission(app)
+
+    # 图像渲染（复用Figure，png/png8/webp输出）
+    init_rendering(app)
+    # 参数比较等可并行任务的计算进程池
+    init_compute_pool(app)
+    # 参数比较结果缓存（/api/compare 与 /api/compare_data 共用）
+    init_result_cache(app)
+    # 模型注册表：每个进程构建一次模型并预热缓存
+    init_model_registry(app)
+    # 管理接口访问控制（/api/admin/*）
+    init_admin(app)
+    # 按需请求剖析（?profile=cprofile|sampling，需管理权限）
+    init_profiling(app)
+    # 请求异常日志（dill_backend.log）与慢请求自动捕获（/api/admin/slow）
+    init_error_log(app)
+    init_slow_requests(app)
+    # Prometheus 运行指标（/api/metrics）
+    init_metrics(app)
     
     # 注册API蓝图
     app.register_blueprint(api_bp)
@@ -69,6 +108,7 @@ def create_app():
     def not_found(e):
         return send_from_directory(frontend_static_dir, 'index.html')
     
+    record_startup('create_app', time.perf_counter() - start)
     return app
 
 # 主入口点
@@ -1,5 +1,8 @@
 from .dill_model import DillModel, get_model_by_name
 from .enhanced_dill_model import EnhancedDillModel
 from .car_model import CARModel
+from .vectorized import evaluate_batch, dill_batch, car_batch
+from .registry import ModelRegistry, get_model, init_model_registry
 
-__all__ = ['DillModel', 'EnhancedDillModel', 'CARModel', 'get_model_by_name'] 
\ No newline at end of file
+__all__ = ['DillModel', 'EnhancedDillModel', 'CARModel', 'get_model_by_name', 'evaluate_batch', 'dill_batch', 'car_batch',
+           'ModelRegistry', 'get_model', 'init_model_registry'] 
\ No newline at end of file
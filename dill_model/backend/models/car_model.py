@@ -5,54 +5,24 @@ CAR模型 (化学放大光刻胶)
 """
 
 import numpy as np
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-from io import BytesIO
-import base64
-from scipy.ndimage import gaussian_filter
-import math
-import ast
 import re
 import warnings
 import logging  # 添加logging模块
+from ..utils.cancellation import resolve_token
+from ..utils.timing import stage
+from ..utils.lazy_import import lazy_import
+from .phase import parse_phi_expr
+from ..utils.rendering import render_plots, line_spec, heatmap_spec
 
 # 设置日志配置
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# 新增：全局字体设置，优先使用常见的无衬线字体
-plt.rcParams['font.sans-serif'] = ['Arial', 'DejaVu Sans', 'Liberation Sans', 'SimHei', 'Microsoft YaHei']
-plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示为方块的问题
+# scipy.ndimage 在首次扩散计算时导入
+ndimage = lazy_import('scipy.ndimage')
 
-def parse_phi_expr(phi_expr, t):
-    """
-    安全解析phi_expr表达式，t为时间，只允许sin/cos/pi/t等
-    """
-    allowed_names = {'sin': np.sin, 'cos': np.cos, 'pi': np.pi, 't': t}
-    allowed_nodes = (
-        ast.Expression, ast.BinOp, ast.UnaryOp, ast.Num, ast.Load,
-        ast.Call, ast.Name, ast.Constant, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow,
-        ast.USub, ast.UAdd, ast.Mod, ast.FloorDiv, ast.Tuple, ast.List
-    )
-    try:
-        node = ast.parse(str(phi_expr), mode='eval')
-        for n in ast.walk(node):
-            if not isinstance(n, allowed_nodes):
-                raise ValueError(f"不允许的表达式节点: {type(n).__name__}")
-            if isinstance(n, ast.Name) and n.id not in allowed_names:
-                raise ValueError(f"不允许的变量: {n.id}")
-            if isinstance(n, ast.Call) and (
-                not isinstance(n.func, ast.Name) or n.func.id not in allowed_names
-            ):
-                raise ValueError(f"不允许的函数: {getattr(n.func, 'id', None)}")
-        code = compile(node, '<string>', 'eval')
-        return eval(code, {"__builtins__": None}, allowed_names)
-    except Exception:
-        try:
-            return float(phi_expr)
-        except Exception:
-            return 0.0
+# CAR模型逐步计算的结果字段
+_CAR_FIELDS = ('initial_acid', 'diffused_acid', 'deprotection', 'thickness')
 
 class CARModel:
     """
@@ -71,9 +41,20 @@ class CARModel:
        J. Vac. Sci. Technol. B, 2007.
     """
     
+    # generate_data 各结果字段每一维对应的坐标键（供 apply_lod 降采样），None 为时间帧维；
+    # 2D 的 initial_acid 等扁平字段按 y×x 行主序展开
+    LOD_AXES = {
+        '1d': {field: ['x'] for field in ('exposure_dose',) + _CAR_FIELDS},
+        'multi': {**{f'z_{field}': ['y_coords', 'x_coords'] for field in ('exposure_dose',) + _CAR_FIELDS},
+                  **{field: ['y_coords', 'x_coords'] for field in _CAR_FIELDS}},
+        '3d': {**{field: ['y_coords', 'x_coords'] for field in ('exposure_dose',) + _CAR_FIELDS},
+               **{f'{field}_frames': [None, 'y_coords', 'x_coords'] for field in _CAR_FIELDS}},
+    }
+
     def __init__(self):
         pass
     
+    @stage('intensity')
     def calculate_acid_generation(self, x, I_avg, V, K=None, t_exp=1, acid_gen_efficiency=1, sine_type='1d', Kx=None, Ky=None, Kz=None, phi_expr=None, y=0, z=0):
         """
         计算初始光酸分布
@@ -153,6 +134,7 @@ class CARModel:
         
         return initial_acid
     
+    @stage('acid_diffusion')
     def simulate_acid_diffusion(self, initial_acid, diffusion_length):
         """
         模拟光酸扩散过程（使用高斯扩散模型）
@@ -175,13 +157,14 @@ class CARModel:
         logger.info(f"   - 初始光酸分布范围: [{np.min(initial_acid):.4f}, {np.max(initial_acid):.4f}]")
         
         # 使用高斯滤波器模拟扩散
-        diffused_acid = gaussian_filter(initial_acid, sigma=diffusion_length)
+        diffused_acid = ndimage.gaussian_filter(initial_acid, sigma=diffusion_length)
         
         logger.info(f"   - 扩散后光酸分布范围: [{np.min(diffused_acid):.4f}, {np.max(diffused_acid):.4f}]")
         logger.info(f"   - 扩散效果: 峰值平滑度提升 {diffusion_length:.1f}x")
         
         return diffused_acid
     
+    @stage('deprotection')
     def calculate_deprotection(self, diffused_acid, reaction_rate, amplification):
         """
         计算树脂的脱保护反应
@@ -216,6 +199,7 @@ class CARModel:
         
         return deprotection
     
+    @stage('dissolution')
     def calculate_dissolution(self, deprotection, contrast):
         """
         计算显影后的剩余光刻胶厚度
@@ -247,6 +231,7 @@ class CARModel:
         
         return thickness
     
+    @stage('intensity')
     def calculate_exposure_dose(self, x, I_avg, V, K, t_exp, sine_type='1d', Kx=None, Ky=None, Kz=None, phi_expr=None, y=0, z=0):
         if sine_type == 'multi' and Kx is not None:
             phi = parse_phi_expr(phi_expr, 0) if phi_expr is not None else 0.0
@@ -297,7 +282,154 @@ class CARModel:
         thickness = self.calculate_dissolution(deprotection, contrast)
         
         # 计算额外信息
-        additionalInfo = {
+        with stage('statistics'):
+            additionalInfo = {
+                'chemical_amplification_factor': reaction_rate * amplification,
+                'max_acid_concentration': float(np.max(initial_acid)),
+                'min_acid_concentration': float(np.min(initial_acid)),
+                'acid_concentration_range': float(np.max(initial_acid) - np.min(initial_acid)),
+                'max_diffused_acid': float(np.max(diffused_acid)),
+                'min_diffused_acid': float(np.min(diffused_acid)),
+                'diffused_acid_range': float(np.max(diffused_acid) - np.min(diffused_acid)),
+                'max_deprotection': float(np.max(deprotection)),
+                'min_deprotection': float(np.min(deprotection)),
+                'deprotection_range': float(np.max(deprotection) - np.min(deprotection)),
+                'max_thickness': float(np.max(thickness)),
+                'min_thickness': float(np.min(thickness)),
+                'thickness_range': float(np.max(thickness) - np.min(thickness)),
+                'acid_generation_efficiency': acid_gen_efficiency,
+                'diffusion_length': diffusion_length,
+                'reaction_rate': reaction_rate,
+                'amplification_factor': amplification,
+                'contrast_parameter': contrast,
+                'average_acid_concentration': float(np.mean(initial_acid)),
+                'acid_concentration_std': float(np.std(initial_acid)),
+                'average_diffused_acid': float(np.mean(diffused_acid)),
+                'diffused_acid_std': float(np.std(diffused_acid)),
+                'average_deprotection': float(np.mean(deprotection)),
+                'deprotection_std': float(np.std(deprotection)),
+                'average_thickness': float(np.mean(thickness)),
+                'thickness_std': float(np.std(thickness)),
+                'effective_dose_range': float(np.max(exposure_dose)),
+                'diffusion_effectiveness': float(np.std(diffused_acid) / np.std(initial_acid)) if np.std(initial_acid) > 0 else 1.0,
+                'deprotection_efficiency': float(np.mean(deprotection) / np.mean(diffused_acid)) if np.mean(diffused_acid) > 0 else 0.0,
+                'dissolution_contrast': float(np.std(thickness) / np.mean(thickness)) if np.mean(thickness) > 0 else 0.0
+            }
+        
+        return {
+            'exposure_dose': exposure_dose,
+            'thickness': thickness,
+            'additionalInfo': additionalInfo
+        }
+    
+    def animation_stream(self, I_avg, V, K, t_exp, acid_gen_efficiency, diffusion_length, reaction_rate, amplification, contrast, sine_type='3d', Kx=None, Ky=None, Kz=None, phi_expr=None, y_range=None, z_range=None, t_start=0, t_end=5, time_steps=20, cancel_token=None):
+        """
+        4D动画的流式生成：先返回元数据，再由生成器逐帧产出（仅3D模式支持4D动画）
+        
+        参数:
+            与 generate_data 相同（不含 enable_4d_animation）
+            cancel_token 在每帧开始时检查
+            
+        返回:
+            (meta, frames) 元组
+            meta: 坐标、时间轴、帧字段等元数据字典
+            frames: 生成器，每次产出 {'index', 't', 'phi', 'initial_acid', 'diffused_acid',
+                    'deprotection', 'thickness'}（numpy数组），最后一帧附带 additionalInfo
+        """
+        if sine_type != '3d' or Kx is None or Ky is None or Kz is None:
+            raise ValueError("CAR模型仅支持3D模式的4D动画")
+        
+        logger.info(f"🔸 4D动画参数:")
+        logger.info(f"   - 时间范围: {t_start}s ~ {t_end}s")
+        logger.info(f"   - 时间步数: {time_steps}")
+        
+        x_points = 50
+        y_points = 50
+        y_min = float(0 if y_range is None else y_range[0])
+        y_max = float(10 if y_range is None else y_range[-1])
+        x_coords = np.linspace(0, 10, x_points)
+        y_coords = np.linspace(y_min, y_max, y_points) if y_range is None else np.array(y_range)
+        X, Y = np.meshgrid(x_coords, y_coords)
+        time_array = np.linspace(t_start, t_end, time_steps)
+        
+        meta = {
+            'x_coords': x_coords.tolist(),
+            'y_coords': y_coords.tolist(),
+            'time_array': time_array.tolist(),
+            'time_steps': time_steps,
+            'enable_4d_animation': True,
+            'sine_type': '3d',
+            'is_3d': True,
+            'frame_fields': ['initial_acid', 'diffused_acid', 'deprotection', 'thickness']
+        }
+        
+        # 1. 增大频率系数使波纹更加明显
+        Kx_scaled = Kx * 2.0
+        Ky_scaled = Ky * 2.0
+        # 2. 增加振幅，确保波动很明显
+        amplitude = 0.8 if V < 0.2 else V
+        # 曝光剂量与光强成正比
+        base_exposure = I_avg * t_exp
+        variation = amplitude * base_exposure * 0.5
+        acid_base = acid_gen_efficiency * base_exposure
+        acid_variation = acid_gen_efficiency * variation
+        
+        token = resolve_token(cancel_token)
+        
+        def frames():
+            for t_idx, t in enumerate(time_array):
+                token.check()
+                phi_t = parse_phi_expr(phi_expr, t) if phi_expr is not None else 0.0
+                with stage('intensity'):
+                    modulation_t = np.cos(Kx_scaled * X + Ky_scaled * Y + phi_t)
+                    
+                    # 初始光酸生成与曝光剂量成正比（归一化）
+                    initial_acid_t = acid_base + acid_variation * modulation_t
+                    initial_acid_t = initial_acid_t / np.max(initial_acid_t)
+                # 模拟光酸扩散 - 使用高斯滤波
+                with stage('acid_diffusion'):
+                    diffused_acid_t = ndimage.gaussian_filter(initial_acid_t, sigma=diffusion_length)
+                # 脱保护反应与显影
+                with stage('deprotection'):
+                    deprotection_t = 1 - np.exp(-reaction_rate * amplification * diffused_acid_t)
+                with stage('dissolution'):
+                    thickness_t = 1 - np.power(deprotection_t, contrast)
+                
+                # 确保数组维度正确
+                if modulation_t.shape != (y_points, x_points):
+                    initial_acid_t = initial_acid_t.T
+                    diffused_acid_t = diffused_acid_t.T
+                    deprotection_t = deprotection_t.T
+                    thickness_t = thickness_t.T
+                
+                frame = {
+                    'index': t_idx,
+                    't': float(t),
+                    'phi': float(phi_t),
+                    'initial_acid': initial_acid_t,
+                    'diffused_acid': diffused_acid_t,
+                    'deprotection': deprotection_t,
+                    'thickness': thickness_t
+                }
+                if t_idx == time_steps - 1:
+                    # 额外信息基于最后一帧
+                    frame['additionalInfo'] = self._animation_additional_info(
+                        initial_acid_t, diffused_acid_t, deprotection_t, thickness_t,
+                        I_avg, t_exp, acid_gen_efficiency, diffusion_length, reaction_rate, amplification, contrast,
+                        Kx, Ky, Kz, phi_expr, x_points, y_points, t_start, t_end, time_steps)
+                
+                logger.info(f"   - 时间步 {t_idx+1}/{time_steps} (t={t:.2f}s) 计算完成")
+                yield frame
+        
+        return meta, frames()
+    
+    @staticmethod
+    @stage('statistics')
+    def _animation_additional_info(initial_acid, diffused_acid, deprotection, thickness, I_avg, t_exp, acid_gen_efficiency, diffusion_length, reaction_rate, amplification, contrast, Kx, Ky, Kz, phi_expr, x_points, y_points, t_start, t_end, time_steps):
+        """
+        计算4D动画的额外信息（基于最后一帧）
+        """
+        return {
             'chemical_amplification_factor': reaction_rate * amplification,
             'max_acid_concentration': float(np.max(initial_acid)),
             'min_acid_concentration': float(np.min(initial_acid)),
@@ -324,19 +456,19 @@ class CARModel:
             'deprotection_std': float(np.std(deprotection)),
             'average_thickness': float(np.mean(thickness)),
             'thickness_std': float(np.std(thickness)),
-            'effective_dose_range': float(np.max(exposure_dose)),
+            'effective_dose_range': float(np.max(initial_acid) * t_exp * I_avg),
             'diffusion_effectiveness': float(np.std(diffused_acid) / np.std(initial_acid)) if np.std(initial_acid) > 0 else 1.0,
             'deprotection_efficiency': float(np.mean(deprotection) / np.mean(diffused_acid)) if np.mean(diffused_acid) > 0 else 0.0,
-            'dissolution_contrast': float(np.std(thickness) / np.mean(thickness)) if np.mean(thickness) > 0 else 0.0
-        }
-        
-        return {
-            'exposure_dose': exposure_dose,
-            'thickness': thickness,
-            'additionalInfo': additionalInfo
+            'dissolution_contrast': float(np.std(thickness) / np.mean(thickness)) if np.mean(thickness) > 0 else 0.0,
+            'spatial_dimensions': '4D (3D + Time)',
+            'grid_size': f"{x_points} x {y_points}",
+            'time_range': f"{t_start}s - {t_end}s",
+            'time_steps': time_steps,
+            'phase_expression': phi_expr if phi_expr else '0',
+            'spatial_frequencies': f"Kx={Kx}, Ky={Ky}, Kz={Kz}"
         }
     
-    def generate_data(self, I_avg, V, K, t_exp, acid_gen_efficiency, diffusion_length, reaction_rate, amplification, contrast, sine_type='1d', Kx=None, Ky=None, Kz=None, phi_expr=None, y_range=None, z_range=None, enable_4d_animation=False, t_start=0, t_end=5, time_steps=20):
+    def generate_data(self, I_avg, V, K, t_exp, acid_gen_efficiency, diffusion_length, reaction_rate, amplification, contrast, sine_type='1d', Kx=None, Ky=None, Kz=None, phi_expr=None, y_range=None, z_range=None, enable_4d_animation=False, t_start=0, t_end=5, time_steps=20, cancel_token=None):
         """
         生成模型数据用于交互式图表
         
@@ -357,10 +489,12 @@ class CARModel:
             phi_expr: 相位表达式
             y_range: y坐标范围
             z_range: z坐标范围
+            cancel_token: 取消令牌（CancelToken），默认取当前请求的令牌
             
         返回:
             包含x坐标和各阶段y值的数据字典
         """
+        resolve_token(cancel_token).check()
         logger.info("=" * 60)
         logger.info("【CAR模型 - 完整流程数据生成】")
         logger.info("=" * 60)
@@ -417,125 +551,19 @@ class CARModel:
             
             # 检查是否启用4D动画
             if enable_4d_animation:
-                logger.info(f"🔸 4D动画参数:")
-                logger.info(f"   - 时间范围: {t_start}s ~ {t_end}s")
-                logger.info(f"   - 时间步数: {time_steps}")
-                
-                # 生成时间序列数据
-                time_array = np.linspace(t_start, t_end, time_steps)
-                
-                # 存储每个时间步的数据
-                animation_data = {
-                    'x_coords': x_coords.tolist(),
-                    'y_coords': y_coords.tolist(),
-                    'time_array': time_array.tolist(),
-                    'time_steps': time_steps,
-                    'initial_acid_frames': [],
-                    'diffused_acid_frames': [],
-                    'deprotection_frames': [],
-                    'thickness_frames': [],
-                    'enable_4d_animation': True,
-                    'sine_type': '3d',
-                    'is_3d': True
-                }
-                
-                for t_idx, t in enumerate(time_array):
-                    # 计算当前时间的相位
-                    phi_t = parse_phi_expr(phi_expr, t) if phi_expr is not None else 0.0
-                    
-                    # 1. 增大频率系数使波纹更加明显
-                    Kx_scaled = Kx * 2.0
-                    Ky_scaled = Ky * 2.0
-                    
-                    # 2. 增加振幅，确保波动很明显
-                    amplitude = 0.8 if V < 0.2 else V
-                    
-                    # 3. 生成当前时间的正弦波形状
-                    modulation_t = np.cos(Kx_scaled * X + Ky_scaled * Y + phi_t)
-                    
-                    # 4. 计算各阶段数据
-                    # 曝光剂量与光强成正比
-                    base_exposure = I_avg * t_exp
-                    variation = amplitude * base_exposure * 0.5
-                    exposure_dose_t = base_exposure + variation * modulation_t
-                    
-                    # 初始光酸生成与曝光剂量成正比
-                    acid_base = acid_gen_efficiency * base_exposure
-                    acid_variation = acid_gen_efficiency * variation
-                    initial_acid_t = acid_base + acid_variation * modulation_t
-                    initial_acid_t = initial_acid_t / np.max(initial_acid_t)  # 归一化
-                    
-                    # 模拟光酸扩散 - 使用高斯滤波
-                    diffused_acid_t = gaussian_filter(initial_acid_t, sigma=diffusion_length)
-                    
-                    # 计算脱保护反应
-                    deprotection_t = 1 - np.exp(-reaction_rate * amplification * diffused_acid_t)
-                    
-                    # 计算光刻胶厚度分布
-                    thickness_t = 1 - np.power(deprotection_t, contrast)
-                    
-                    # 确保数组维度正确
-                    if exposure_dose_t.shape != (y_points, x_points):
-                        exposure_dose_t = exposure_dose_t.T
-                        initial_acid_t = initial_acid_t.T
-                        diffused_acid_t = diffused_acid_t.T
-                        deprotection_t = deprotection_t.T
-                        thickness_t = thickness_t.T
-                    
-                    # 存储当前帧数据
-                    animation_data['initial_acid_frames'].append(initial_acid_t.tolist())
-                    animation_data['diffused_acid_frames'].append(diffused_acid_t.tolist())
-                    animation_data['deprotection_frames'].append(deprotection_t.tolist())
-                    animation_data['thickness_frames'].append(thickness_t.tolist())
-                    
-                    logger.info(f"   - 时间步 {t_idx+1}/{time_steps} (t={t:.2f}s) 计算完成")
-                
-                # 计算4D动画的额外信息（基于最后一帧）
-                last_frame_initial_acid = np.array(animation_data['initial_acid_frames'][-1])
-                last_frame_diffused_acid = np.array(animation_data['diffused_acid_frames'][-1])
-                last_frame_deprotection = np.array(animation_data['deprotection_frames'][-1])
-                last_frame_thickness = np.array(animation_data['thickness_frames'][-1])
-                
-                additionalInfo = {
-                    'chemical_amplification_factor': reaction_rate * amplification,
-                    'max_acid_concentration': float(np.max(last_frame_initial_acid)),
-                    'min_acid_concentration': float(np.min(last_frame_initial_acid)),
-                    'acid_concentration_range': float(np.max(last_frame_initial_acid) - np.min(last_frame_initial_acid)),
-                    'max_diffused_acid': float(np.max(last_frame_diffused_acid)),
-                    'min_diffused_acid': float(np.min(last_frame_diffused_acid)),
-                    'diffused_acid_range': float(np.max(last_frame_diffused_acid) - np.min(last_frame_diffused_acid)),
-                    'max_deprotection': float(np.max(last_frame_deprotection)),
-                    'min_deprotection': float(np.min(last_frame_deprotection)),
-                    'deprotection_range': float(np.max(last_frame_deprotection) - np.min(last_frame_deprotection)),
-                    'max_thickness': float(np.max(last_frame_thickness)),
-                    'min_thickness': float(np.min(last_frame_thickness)),
-                    'thickness_range': float(np.max(last_frame_thickness) - np.min(last_frame_thickness)),
-                    'acid_generation_efficiency': acid_gen_efficiency,
-                    'diffusion_length': diffusion_length,
-                    'reaction_rate': reaction_rate,
-                    'amplification_factor': amplification,
-                    'contrast_parameter': contrast,
-                    'average_acid_concentration': float(np.mean(last_frame_initial_acid)),
-                    'acid_concentration_std': float(np.std(last_frame_initial_acid)),
-                    'average_diffused_acid': float(np.mean(last_frame_diffused_acid)),
-                    'diffused_acid_std': float(np.std(last_frame_diffused_acid)),
-                    'average_deprotection': float(np.mean(last_frame_deprotection)),
-                    'deprotection_std': float(np.std(last_frame_deprotection)),
-                    'average_thickness': float(np.mean(last_frame_thickness)),
-                    'thickness_std': float(np.std(last_frame_thickness)),
-                    'effective_dose_range': float(np.max(last_frame_initial_acid) * t_exp * I_avg),
-                    'diffusion_effectiveness': float(np.std(last_frame_diffused_acid) / np.std(last_frame_initial_acid)) if np.std(last_frame_initial_acid) > 0 else 1.0,
-                    'deprotection_efficiency': float(np.mean(last_frame_deprotection) / np.mean(last_frame_diffused_acid)) if np.mean(last_frame_diffused_acid) > 0 else 0.0,
-                    'dissolution_contrast': float(np.std(last_frame_thickness) / np.mean(last_frame_thickness)) if np.mean(last_frame_thickness) > 0 else 0.0,
-                    'spatial_dimensions': '4D (3D + Time)',
-                    'grid_size': f"{x_points} x {y_points}",
-                    'time_range': f"{t_start}s - {t_end}s",
-                    'time_steps': time_steps,
-                    'phase_expression': phi_expr if phi_expr else '0',
-                    'spatial_frequencies': f"Kx={Kx}, Ky={Ky}, Kz={Kz}"
-                }
-                
-                animation_data['additionalInfo'] = additionalInfo
+                meta, frames = self.animation_stream(I_avg, V, K, t_exp, acid_gen_efficiency, diffusion_length, reaction_rate,
+                                                     amplification, contrast, sine_type=sine_type, Kx=Kx, Ky=Ky, Kz=Kz,
+                                                     phi_expr=phi_expr, y_range=y_range, z_range=z_range,
+                                                     t_start=t_start, t_end=t_end, time_steps=time_steps,
+                                                     cancel_token=cancel_token)
+                animation_data = dict(meta)
+                for field in meta['frame_fields']:
+                    animation_data[f'{field}_frames'] = []
+                for frame in frames:
+                    for field in meta['frame_fields']:
+                        animation_data[f'{field}_frames'].append(frame[field])
+                    if 'additionalInfo' in frame:
+                        animation_data['additionalInfo'] = frame['additionalInfo']
                 
                 logger.info(f"🔸 4D动画数据生成完成，共{time_steps}帧")
                 return animation_data
@@ -552,29 +580,33 @@ class CARModel:
                 # 2. 增加振幅，确保波动很明显
                 amplitude = 0.8 if V < 0.2 else V
                 
-                # 3. 生成真正的正弦波形状
-                modulation = np.cos(Kx_scaled * X + Ky_scaled * Y + phi)  # 纯正弦波
-                
-                # 4. 计算各阶段数据
-                # 曝光剂量与光强成正比
-                base_exposure = I_avg * t_exp
-                variation = amplitude * base_exposure * 0.5
-                exposure_dose = base_exposure + variation * modulation
-                
-                # 初始光酸生成与曝光剂量成正比
-                acid_base = acid_gen_efficiency * base_exposure
-                acid_variation = acid_gen_efficiency * variation
-                initial_acid = acid_base + acid_variation * modulation
-                initial_acid = initial_acid / np.max(initial_acid)  # 归一化
+                with stage('intensity'):
+                    # 3. 生成真正的正弦波形状
+                    modulation = np.cos(Kx_scaled * X + Ky_scaled * Y + phi)  # 纯正弦波
+                    
+                    # 4. 计算各阶段数据
+                    # 曝光剂量与光强成正比
+                    base_exposure = I_avg * t_exp
+                    variation = amplitude * base_exposure * 0.5
+                    exposure_dose = base_exposure + variation * modulation
+                    
+                    # 初始光酸生成与曝光剂量成正比
+                    acid_base = acid_gen_efficiency * base_exposure
+                    acid_variation = acid_gen_efficiency * variation
+                    initial_acid = acid_base + acid_variation * modulation
+                    initial_acid = initial_acid / np.max(initial_acid)  # 归一化
                 
                 # 模拟光酸扩散 - 使用高斯滤波
-                diffused_acid = gaussian_filter(initial_acid, sigma=diffusion_length)
+                with stage('acid_diffusion'):
+                    diffused_acid = ndimage.gaussian_filter(initial_acid, sigma=diffusion_length)
                 
                 # 计算脱保护反应
-                deprotection = 1 - np.exp(-reaction_rate * amplification * diffused_acid)
+                with stage('deprotection'):
+                    deprotection = 1 - np.exp(-reaction_rate * amplification * diffused_acid)
                 
                 # 计算光刻胶厚度分布
-                thickness = 1 - np.power(deprotection, contrast)
+                with stage('dissolution'):
+                    thickness = 1 - np.power(deprotection, contrast)
                 
                 # 确保数组维度正确
                 if exposure_dose.shape != (y_points, x_points):
@@ -585,52 +617,53 @@ class CARModel:
                     thickness = thickness.T
                 
                 # 计算额外信息（3D情况）
-                additionalInfo = {
-                    'chemical_amplification_factor': reaction_rate * amplification,
-                    'max_acid_concentration': float(np.max(initial_acid)),
-                    'min_acid_concentration': float(np.min(initial_acid)),
-                    'acid_concentration_range': float(np.max(initial_acid) - np.min(initial_acid)),
-                    'max_diffused_acid': float(np.max(diffused_acid)),
-                    'min_diffused_acid': float(np.min(diffused_acid)),
-                    'diffused_acid_range': float(np.max(diffused_acid) - np.min(diffused_acid)),
-                    'max_deprotection': float(np.max(deprotection)),
-                    'min_deprotection': float(np.min(deprotection)),
-                    'deprotection_range': float(np.max(deprotection) - np.min(deprotection)),
-                    'max_thickness': float(np.max(thickness)),
-                    'min_thickness': float(np.min(thickness)),
-                    'thickness_range': float(np.max(thickness) - np.min(thickness)),
-                    'acid_generation_efficiency': acid_gen_efficiency,
-                    'diffusion_length': diffusion_length,
-                    'reaction_rate': reaction_rate,
-                    'amplification_factor': amplification,
-                    'contrast_parameter': contrast,
-                    'average_acid_concentration': float(np.mean(initial_acid)),
-                    'acid_concentration_std': float(np.std(initial_acid)),
-                    'average_diffused_acid': float(np.mean(diffused_acid)),
-                    'diffused_acid_std': float(np.std(diffused_acid)),
-                    'average_deprotection': float(np.mean(deprotection)),
-                    'deprotection_std': float(np.std(deprotection)),
-                    'average_thickness': float(np.mean(thickness)),
-                    'thickness_std': float(np.std(thickness)),
-                    'effective_dose_range': float(np.max(initial_acid) * t_exp * I_avg),
-                    'diffusion_effectiveness': float(np.std(diffused_acid) / np.std(initial_acid)) if np.std(initial_acid) > 0 else 1.0,
-                    'deprotection_efficiency': float(np.mean(deprotection) / np.mean(diffused_acid)) if np.mean(diffused_acid) > 0 else 0.0,
-                    'dissolution_contrast': float(np.std(thickness) / np.mean(thickness)) if np.mean(thickness) > 0 else 0.0,
-                    'spatial_dimensions': '3D',
-                    'grid_size': f"{len(x_coords)} x {len(y_coords)}",
-                    'phase_expression': phi_expr if phi_expr else '0',
-                    'spatial_frequencies': f"Kx={Kx}, Ky={Ky}, Kz={Kz}"
-                }
+                with stage('statistics'):
+                    additionalInfo = {
+                        'chemical_amplification_factor': reaction_rate * amplification,
+                        'max_acid_concentration': float(np.max(initial_acid)),
+                        'min_acid_concentration': float(np.min(initial_acid)),
+                        'acid_concentration_range': float(np.max(initial_acid) - np.min(initial_acid)),
+                        'max_diffused_acid': float(np.max(diffused_acid)),
+                        'min_diffused_acid': float(np.min(diffused_acid)),
+                        'diffused_acid_range': float(np.max(diffused_acid) - np.min(diffused_acid)),
+                        'max_deprotection': float(np.max(deprotection)),
+                        'min_deprotection': float(np.min(deprotection)),
+                        'deprotection_range': float(np.max(deprotection) - np.min(deprotection)),
+                        'max_thickness': float(np.max(thickness)),
+                        'min_thickness': float(np.min(thickness)),
+                        'thickness_range': float(np.max(thickness) - np.min(thickness)),
+                        'acid_generation_efficiency': acid_gen_efficiency,
+                        'diffusion_length': diffusion_length,
+                        'reaction_rate': reaction_rate,
+                        'amplification_factor': amplification,
+                        'contrast_parameter': contrast,
+                        'average_acid_concentration': float(np.mean(initial_acid)),
+                        'acid_concentration_std': float(np.std(initial_acid)),
+                        'average_diffused_acid': float(np.mean(diffused_acid)),
+                        'diffused_acid_std': float(np.std(diffused_acid)),
+                        'average_deprotection': float(np.mean(deprotection)),
+                        'deprotection_std': float(np.std(deprotection)),
+                        'average_thickness': float(np.mean(thickness)),
+                        'thickness_std': float(np.std(thickness)),
+                        'effective_dose_range': float(np.max(initial_acid) * t_exp * I_avg),
+                        'diffusion_effectiveness': float(np.std(diffused_acid) / np.std(initial_acid)) if np.std(initial_acid) > 0 else 1.0,
+                        'deprotection_efficiency': float(np.mean(deprotection) / np.mean(diffused_acid)) if np.mean(diffused_acid) > 0 else 0.0,
+                        'dissolution_contrast': float(np.std(thickness) / np.mean(thickness)) if np.mean(thickness) > 0 else 0.0,
+                        'spatial_dimensions': '3D',
+                        'grid_size': f"{len(x_coords)} x {len(y_coords)}",
+                        'phase_expression': phi_expr if phi_expr else '0',
+                        'spatial_frequencies': f"Kx={Kx}, Ky={Ky}, Kz={Kz}"
+                    }
                 
                 # 返回3D数据
                 return {
-                    'x_coords': x_coords.tolist(),
-                    'y_coords': y_coords.tolist(),
-                    'exposure_dose': exposure_dose.tolist(),
-                    'initial_acid': initial_acid.tolist(),
-                    'diffused_acid': diffused_acid.tolist(),
-                    'deprotection': deprotection.tolist(),
-                    'thickness': thickness.tolist(),
+                    'x_coords': x_coords,
+                    'y_coords': y_coords,
+                    'exposure_dose': exposure_dose,
+                    'initial_acid': initial_acid,
+                    'diffused_acid': diffused_acid,
+                    'deprotection': deprotection,
+                    'thickness': thickness,
                     'sine_type': '3d',
                     'is_3d': True,
                     'additionalInfo': additionalInfo
@@ -657,54 +690,55 @@ class CARModel:
                 thickness_2d = self.calculate_dissolution(deprotection_2d, contrast)
                 
                 # 计算额外信息（2D情况）
-                additionalInfo = {
-                    'chemical_amplification_factor': reaction_rate * amplification,
-                    'max_acid_concentration': float(np.max(initial_acid_2d)),
-                    'min_acid_concentration': float(np.min(initial_acid_2d)),
-                    'acid_concentration_range': float(np.max(initial_acid_2d) - np.min(initial_acid_2d)),
-                    'max_diffused_acid': float(np.max(diffused_acid_2d)),
-                    'min_diffused_acid': float(np.min(diffused_acid_2d)),
-                    'diffused_acid_range': float(np.max(diffused_acid_2d) - np.min(diffused_acid_2d)),
-                    'max_deprotection': float(np.max(deprotection_2d)),
-                    'min_deprotection': float(np.min(deprotection_2d)),
-                    'deprotection_range': float(np.max(deprotection_2d) - np.min(deprotection_2d)),
-                    'max_thickness': float(np.max(thickness_2d)),
-                    'min_thickness': float(np.min(thickness_2d)),
-                    'thickness_range': float(np.max(thickness_2d) - np.min(thickness_2d)),
-                    'acid_generation_efficiency': acid_gen_efficiency,
-                    'diffusion_length': diffusion_length,
-                    'reaction_rate': reaction_rate,
-                    'amplification_factor': amplification,
-                    'contrast_parameter': contrast,
-                    'average_acid_concentration': float(np.mean(initial_acid_2d)),
-                    'acid_concentration_std': float(np.std(initial_acid_2d)),
-                    'average_diffused_acid': float(np.mean(diffused_acid_2d)),
-                    'diffused_acid_std': float(np.std(diffused_acid_2d)),
-                    'average_deprotection': float(np.mean(deprotection_2d)),
-                    'deprotection_std': float(np.std(deprotection_2d)),
-                    'average_thickness': float(np.mean(thickness_2d)),
-                    'thickness_std': float(np.std(thickness_2d)),
-                    'effective_dose_range': float(np.max(initial_acid_2d) * t_exp * I_avg),
-                    'diffusion_effectiveness': float(np.std(diffused_acid_2d) / np.std(initial_acid_2d)) if np.std(initial_acid_2d) > 0 else 1.0,
-                    'deprotection_efficiency': float(np.mean(deprotection_2d) / np.mean(diffused_acid_2d)) if np.mean(diffused_acid_2d) > 0 else 0.0,
-                    'dissolution_contrast': float(np.std(thickness_2d) / np.mean(thickness_2d)) if np.mean(thickness_2d) > 0 else 0.0,
-                    'spatial_dimensions': '2D',
-                    'grid_size': f"{len(x_np)} x {len(y_axis_points)}"
-                }
+                with stage('statistics'):
+                    additionalInfo = {
+                        'chemical_amplification_factor': reaction_rate * amplification,
+                        'max_acid_concentration': float(np.max(initial_acid_2d)),
+                        'min_acid_concentration': float(np.min(initial_acid_2d)),
+                        'acid_concentration_range': float(np.max(initial_acid_2d) - np.min(initial_acid_2d)),
+                        'max_diffused_acid': float(np.max(diffused_acid_2d)),
+                        'min_diffused_acid': float(np.min(diffused_acid_2d)),
+                        'diffused_acid_range': float(np.max(diffused_acid_2d) - np.min(diffused_acid_2d)),
+                        'max_deprotection': float(np.max(deprotection_2d)),
+                        'min_deprotection': float(np.min(deprotection_2d)),
+                        'deprotection_range': float(np.max(deprotection_2d) - np.min(deprotection_2d)),
+                        'max_thickness': float(np.max(thickness_2d)),
+                        'min_thickness': float(np.min(thickness_2d)),
+                        'thickness_range': float(np.max(thickness_2d) - np.min(thickness_2d)),
+                        'acid_generation_efficiency': acid_gen_efficiency,
+                        'diffusion_length': diffusion_length,
+                        'reaction_rate': reaction_rate,
+                        'amplification_factor': amplification,
+                        'contrast_parameter': contrast,
+                        'average_acid_concentration': float(np.mean(initial_acid_2d)),
+                        'acid_concentration_std': float(np.std(initial_acid_2d)),
+                        'average_diffused_acid': float(np.mean(diffused_acid_2d)),
+                        'diffused_acid_std': float(np.std(diffused_acid_2d)),
+                        'average_deprotection': float(np.mean(deprotection_2d)),
+                        'deprotection_std': float(np.std(deprotection_2d)),
+                        'average_thickness': float(np.mean(thickness_2d)),
+                        'thickness_std': float(np.std(thickness_2d)),
+                        'effective_dose_range': float(np.max(initial_acid_2d) * t_exp * I_avg),
+                        'diffusion_effectiveness': float(np.std(diffused_acid_2d) / np.std(initial_acid_2d)) if np.std(initial_acid_2d) > 0 else 1.0,
+                        'deprotection_efficiency': float(np.mean(deprotection_2d) / np.mean(diffused_acid_2d)) if np.mean(diffused_acid_2d) > 0 else 0.0,
+                        'dissolution_contrast': float(np.std(thickness_2d) / np.mean(thickness_2d)) if np.mean(thickness_2d) > 0 else 0.0,
+                        'spatial_dimensions': '2D',
+                        'grid_size': f"{len(x_np)} x {len(y_axis_points)}"
+                    }
                 
                 # 返回热图所需的网格数据结构
                 return {
-                    'x_coords': x_np.tolist(),
-                    'y_coords': y_axis_points.tolist(),
-                    'z_exposure_dose': initial_acid_2d.tolist(),  # 使用与Dill模型一致的键名
-                    'z_thickness': thickness_2d.tolist(),         # 使用与Dill模型一致的键名
-                    'z_initial_acid': initial_acid_2d.tolist(),   # 为前端提供完整的2D热力图数据
-                    'z_diffused_acid': diffused_acid_2d.tolist(), # 为前端提供完整的2D热力图数据
-                    'z_deprotection': deprotection_2d.tolist(),   # 为前端提供完整的2D热力图数据
-                    'initial_acid': initial_acid_2d.flatten().tolist(),  # 保留这些，确保与其他功能兼容
-                    'diffused_acid': diffused_acid_2d.flatten().tolist(),
-                    'deprotection': deprotection_2d.flatten().tolist(),
-                    'thickness': thickness_2d.flatten().tolist(),
+                    'x_coords': x_np,
+                    'y_coords': y_axis_points,
+                    'z_exposure_dose': initial_acid_2d,  # 使用与Dill模型一致的键名
+                    'z_thickness': thickness_2d,         # 使用与Dill模型一致的键名
+                    'z_initial_acid': initial_acid_2d,   # 为前端提供完整的2D热力图数据
+                    'z_diffused_acid': diffused_acid_2d, # 为前端提供完整的2D热力图数据
+                    'z_deprotection': deprotection_2d,   # 为前端提供完整的2D热力图数据
+                    'initial_acid': initial_acid_2d.flatten(),  # 保留这些，确保与其他功能兼容
+                    'diffused_acid': diffused_acid_2d.flatten(),
+                    'deprotection': deprotection_2d.flatten(),
+                    'thickness': thickness_2d.flatten(),
                     'is_2d': True,
                     'additionalInfo': additionalInfo
                 }
@@ -717,6 +751,73 @@ class CARModel:
                 thickness = self.calculate_dissolution(deprotection, contrast)
                 
                 # 计算额外信息
+                with stage('statistics'):
+                    additionalInfo = {
+                        'chemical_amplification_factor': reaction_rate * amplification,
+                        'max_acid_concentration': float(np.max(initial_acid)),
+                        'min_acid_concentration': float(np.min(initial_acid)),
+                        'acid_concentration_range': float(np.max(initial_acid) - np.min(initial_acid)),
+                        'max_diffused_acid': float(np.max(diffused_acid)),
+                        'min_diffused_acid': float(np.min(diffused_acid)),
+                        'diffused_acid_range': float(np.max(diffused_acid) - np.min(diffused_acid)),
+                        'max_deprotection': float(np.max(deprotection)),
+                        'min_deprotection': float(np.min(deprotection)),
+                        'deprotection_range': float(np.max(deprotection) - np.min(deprotection)),
+                        'max_thickness': float(np.max(thickness)),
+                        'min_thickness': float(np.min(thickness)),
+                        'thickness_range': float(np.max(thickness) - np.min(thickness)),
+                        'acid_generation_efficiency': acid_gen_efficiency,
+                        'diffusion_length': diffusion_length,
+                        'reaction_rate': reaction_rate,
+                        'amplification_factor': amplification,
+                        'contrast_parameter': contrast,
+                        'average_acid_concentration': float(np.mean(initial_acid)),
+                        'acid_concentration_std': float(np.std(initial_acid)),
+                        'average_diffused_acid': float(np.mean(diffused_acid)),
+                        'diffused_acid_std': float(np.std(diffused_acid)),
+                        'average_deprotection': float(np.mean(deprotection)),
+                        'deprotection_std': float(np.std(deprotection)),
+                        'average_thickness': float(np.mean(thickness)),
+                        'thickness_std': float(np.std(thickness)),
+                        'effective_dose_range': float(np.max(initial_acid) * t_exp * I_avg),
+                        'diffusion_effectiveness': float(np.std(diffused_acid) / np.std(initial_acid)) if np.std(initial_acid) > 0 else 1.0,
+                        'deprotection_efficiency': float(np.mean(deprotection) / np.mean(diffused_acid)) if np.mean(diffused_acid) > 0 else 0.0,
+                        'dissolution_contrast': float(np.std(thickness) / np.mean(thickness)) if np.mean(thickness) > 0 else 0.0
+                    }
+                
+                return {
+                    'x': x,
+                    'initial_acid': initial_acid,
+                    'exposure_dose': initial_acid,
+                    'diffused_acid': diffused_acid,
+                    'deprotection': deprotection,
+                    'thickness': thickness,
+                    'is_2d': False,
+                    'additionalInfo': additionalInfo
+                }
+        # 一维正弦波
+        else:
+            # 确保 K 不为 None，避免计算错误
+            if K is None:
+                K = 2.0  # 设置一个默认值
+            initial_acid = self.calculate_acid_generation(x_np, I_avg, V, K, t_exp, acid_gen_efficiency)
+            
+            # 模拟光酸扩散
+            diffused_acid = self.simulate_acid_diffusion(initial_acid, diffusion_length)
+            
+            # 计算脱保护反应
+            deprotection = self.calculate_deprotection(diffused_acid, reaction_rate, amplification)
+            
+            # 计算光刻胶厚度分布
+            thickness = self.calculate_dissolution(deprotection, contrast)
+            
+            # 检查有效性
+            if (not initial_acid.any() or not diffused_acid.any() or not deprotection.any() or not thickness.any() or
+                np.isnan(initial_acid).all() or np.isnan(diffused_acid).all() or np.isnan(deprotection).all() or np.isnan(thickness).all()):
+                raise ValueError('CAR模型计算结果无效，可能参数设置不合理或数值溢出。')
+            
+            # 计算额外信息
+            with stage('statistics'):
                 additionalInfo = {
                     'chemical_amplification_factor': reaction_rate * amplification,
                     'max_acid_concentration': float(np.max(initial_acid)),
@@ -749,80 +850,15 @@ class CARModel:
                     'deprotection_efficiency': float(np.mean(deprotection) / np.mean(diffused_acid)) if np.mean(diffused_acid) > 0 else 0.0,
                     'dissolution_contrast': float(np.std(thickness) / np.mean(thickness)) if np.mean(thickness) > 0 else 0.0
                 }
-                
-                return {
-                    'x': x,
-                    'initial_acid': initial_acid.tolist(),
-                    'exposure_dose': initial_acid.tolist(),
-                    'diffused_acid': diffused_acid.tolist(),
-                    'deprotection': deprotection.tolist(),
-                    'thickness': thickness.tolist(),
-                    'is_2d': False,
-                    'additionalInfo': additionalInfo
-                }
-        # 一维正弦波
-        else:
-            # 确保 K 不为 None，避免计算错误
-            if K is None:
-                K = 2.0  # 设置一个默认值
-            initial_acid = self.calculate_acid_generation(x_np, I_avg, V, K, t_exp, acid_gen_efficiency)
-            
-            # 模拟光酸扩散
-            diffused_acid = self.simulate_acid_diffusion(initial_acid, diffusion_length)
-            
-            # 计算脱保护反应
-            deprotection = self.calculate_deprotection(diffused_acid, reaction_rate, amplification)
-            
-            # 计算光刻胶厚度分布
-            thickness = self.calculate_dissolution(deprotection, contrast)
-            
-            # 检查有效性
-            if (not initial_acid.any() or not diffused_acid.any() or not deprotection.any() or not thickness.any() or
-                np.isnan(initial_acid).all() or np.isnan(diffused_acid).all() or np.isnan(deprotection).all() or np.isnan(thickness).all()):
-                raise ValueError('CAR模型计算结果无效，可能参数设置不合理或数值溢出。')
-            
-            # 计算额外信息
-            additionalInfo = {
-                'chemical_amplification_factor': reaction_rate * amplification,
-                'max_acid_concentration': float(np.max(initial_acid)),
-                'min_acid_concentration': float(np.min(initial_acid)),
-                'acid_concentration_range': float(np.max(initial_acid) - np.min(initial_acid)),
-                'max_diffused_acid': float(np.max(diffused_acid)),
-                'min_diffused_acid': float(np.min(diffused_acid)),
-                'diffused_acid_range': float(np.max(diffused_acid) - np.min(diffused_acid)),
-                'max_deprotection': float(np.max(deprotection)),
-                'min_deprotection': float(np.min(deprotection)),
-                'deprotection_range': float(np.max(deprotection) - np.min(deprotection)),
-                'max_thickness': float(np.max(thickness)),
-                'min_thickness': float(np.min(thickness)),
-                'thickness_range': float(np.max(thickness) - np.min(thickness)),
-                'acid_generation_efficiency': acid_gen_efficiency,
-                'diffusion_length': diffusion_length,
-                'reaction_rate': reaction_rate,
-                'amplification_factor': amplification,
-                'contrast_parameter': contrast,
-                'average_acid_concentration': float(np.mean(initial_acid)),
-                'acid_concentration_std': float(np.std(initial_acid)),
-                'average_diffused_acid': float(np.mean(diffused_acid)),
-                'diffused_acid_std': float(np.std(diffused_acid)),
-                'average_deprotection': float(np.mean(deprotection)),
-                'deprotection_std': float(np.std(deprotection)),
-                'average_thickness': float(np.mean(thickness)),
-                'thickness_std': float(np.std(thickness)),
-                'effective_dose_range': float(np.max(initial_acid) * t_exp * I_avg),
-                'diffusion_effectiveness': float(np.std(diffused_acid) / np.std(initial_acid)) if np.std(initial_acid) > 0 else 1.0,
-                'deprotection_efficiency': float(np.mean(deprotection) / np.mean(diffused_acid)) if np.mean(diffused_acid) > 0 else 0.0,
-                'dissolution_contrast': float(np.std(thickness) / np.mean(thickness)) if np.mean(thickness) > 0 else 0.0
-            }
             
             # 返回数据
             return {
                 'x': x,
-                'initial_acid': initial_acid.tolist(),
-                'exposure_dose': initial_acid.tolist(),
-                'diffused_acid': diffused_acid.tolist(),
-                'deprotection': deprotection.tolist(),
-                'thickness': thickness.tolist(),
+                'initial_acid': initial_acid,
+                'exposure_dose': initial_acid,
+                'diffused_acid': diffused_acid,
+                'deprotection': deprotection,
+                'thickness': thickness,
                 'is_2d': False,
                 'additionalInfo': additionalInfo
             }
@@ -852,7 +888,6 @@ class CARModel:
         返回:
             包含多个Base64编码图像的字典
         """
-        plt.close('all')
         x = np.linspace(0, 10, 1000)  # 0到10微米，1000个点
         
         # 优先处理各维度情况，确保逻辑清晰
@@ -876,69 +911,26 @@ class CARModel:
                 raise ValueError('CAR模型(1D)计算结果无效，可能参数设置不合理或数值溢出。')
             
             # 绘制1D线图
-            plots = {}
-            
-            # 1. 初始光酸分布图
-            fig1 = plt.figure(figsize=(10, 6))
-            plt.plot(x, initial_acid, 'g-', linewidth=2)
-            plt.title('Initial Acid Distribution (1D)', fontsize=16)
-            plt.xlabel('Position (μm)', fontsize=14)
-            plt.ylabel('Normalized Acid Concentration', fontsize=14)
-            plt.grid(True, alpha=0.3)
-            plt.tight_layout()
-            
-            buffer1 = BytesIO()
-            fig1.savefig(buffer1, format='png', dpi=100)
-            buffer1.seek(0)
-            plots['initial_acid_plot'] = base64.b64encode(buffer1.getvalue()).decode()
-            plt.close(fig1)
-            
-            # 2. 扩散后光酸分布图
-            fig2 = plt.figure(figsize=(10, 6))
-            plt.plot(x, initial_acid, 'g--', linewidth=1.5, label='Initial')
-            plt.plot(x, diffused_acid, 'b-', linewidth=2, label='After Diffusion')
-            plt.title('Acid Diffusion Comparison (1D)', fontsize=16)
-            plt.xlabel('Position (μm)', fontsize=14)
-            plt.ylabel('Normalized Acid Concentration', fontsize=14)
-            plt.legend()
-            plt.grid(True, alpha=0.3)
-            plt.tight_layout()
-            
-            buffer2 = BytesIO()
-            fig2.savefig(buffer2, format='png', dpi=100)
-            buffer2.seek(0)
-            plots['acid_diffusion_plot'] = base64.b64encode(buffer2.getvalue()).decode()
-            plt.close(fig2)
-            
-            # 3. 脱保护程度分布图
-            fig3 = plt.figure(figsize=(10, 6))
-            plt.plot(x, deprotection, 'r-', linewidth=2)
-            plt.title('Deprotection Degree Distribution (1D)', fontsize=16)
-            plt.xlabel('Position (μm)', fontsize=14)
-            plt.ylabel('Deprotection Degree', fontsize=14)
-            plt.grid(True, alpha=0.3)
-            plt.tight_layout()
-            
-            buffer3 = BytesIO()
-            fig3.savefig(buffer3, format='png', dpi=100)
-            buffer3.seek(0)
-            plots['deprotection_plot'] = base64.b64encode(buffer3.getvalue()).decode()
-            plt.close(fig3)
-            
-            # 4. 光刻胶厚度分布图
-            fig4 = plt.figure(figsize=(10, 6))
-            plt.plot(x, thickness, 'm-', linewidth=2)
-            plt.title('Photoresist Thickness After Development (1D)', fontsize=16)
-            plt.xlabel('Position (μm)', fontsize=14)
-            plt.ylabel('Normalized Thickness', fontsize=14)
-            plt.grid(True, alpha=0.3)
-            plt.tight_layout()
-            
-            buffer4 = BytesIO()
-            fig4.savefig(buffer4, format='png', dpi=100)
-            buffer4.seek(0)
-            plots['thickness_plot'] = base64.b64encode(buffer4.getvalue()).decode()
-            plt.close(fig4)
+            acid_diffusion = line_spec([(x, initial_acid, 'g--', {'linewidth': 1.5, 'label': 'Initial'}),
+                                        (x, diffused_acid, 'b-', {'linewidth': 2, 'label': 'After Diffusion'})],
+                                       'Acid Diffusion Comparison (1D)', 'Position (μm)',
+                                       'Normalized Acid Concentration', legend=True)
+            plots = render_plots({
+                # 1. 初始光酸分布图
+                'initial_acid_plot': line_spec([(x, initial_acid, 'g-', {'linewidth': 2})],
+                                               'Initial Acid Distribution (1D)', 'Position (μm)',
+                                               'Normalized Acid Concentration'),
+                # 2. 扩散后光酸分布图
+                'acid_diffusion_plot': acid_diffusion,
+                # 3. 脱保护程度分布图
+                'deprotection_plot': line_spec([(x, deprotection, 'r-', {'linewidth': 2})],
+                                               'Deprotection Degree Distribution (1D)', 'Position (μm)',
+                                               'Deprotection Degree'),
+                # 4. 光刻胶厚度分布图
+                'thickness_plot': line_spec([(x, thickness, 'm-', {'linewidth': 2})],
+                                            'Photoresist Thickness After Development (1D)', 'Position (μm)',
+                                            'Normalized Thickness'),
+            })
             
             # 确保与前端期望的键名一致
             plots['exposure_plot'] = plots['acid_diffusion_plot']
@@ -974,35 +966,17 @@ class CARModel:
             # 计算光刻胶厚度分布
             thickness_2d = self.calculate_dissolution(deprotection_2d, contrast)
             
-            # 绘制曝光剂量热图
-            fig1 = plt.figure(figsize=(8, 6))
-            plt.imshow(initial_acid_2d, aspect='auto', origin='lower', 
-                      extent=[min(x), max(x), min(y_axis_points), max(y_axis_points)], cmap='viridis')
-            plt.colorbar(label='曝光剂量 (mJ/cm²)')
-            plt.xlabel('X 位置 (μm)')
-            plt.ylabel('Y 位置 (μm)')
-            plt.title('曝光剂量分布 (2D)')
-            plt.tight_layout()
-            buffer1 = BytesIO()
-            fig1.savefig(buffer1, format='png', dpi=100)
-            buffer1.seek(0)
-            exposure_plot = base64.b64encode(buffer1.getvalue()).decode()
-            plt.close(fig1)
-            
-            # 绘制光刻胶厚度热图
-            fig2 = plt.figure(figsize=(8, 6))
-            plt.imshow(thickness_2d, aspect='auto', origin='lower', 
-                      extent=[min(x), max(x), min(y_axis_points), max(y_axis_points)], cmap='plasma')
-            plt.colorbar(label='相对厚度')
-            plt.xlabel('X 位置 (μm)')
-            plt.ylabel('Y 位置 (μm)')
-            plt.title('光刻胶厚度分布 (2D)')
-            plt.tight_layout()
-            buffer2 = BytesIO()
-            fig2.savefig(buffer2, format='png', dpi=100)
-            buffer2.seek(0)
-            thickness_plot = base64.b64encode(buffer2.getvalue()).decode()
-            plt.close(fig2)
+            extent = [min(x), max(x), min(y_axis_points), max(y_axis_points)]
+            plots = render_plots({
+                # 曝光剂量热图
+                'exposure_plot': heatmap_spec(initial_acid_2d, extent, '曝光剂量分布 (2D)', 'X 位置 (μm)', 'Y 位置 (μm)',
+                                              cmap='viridis', colorbar_label='曝光剂量 (mJ/cm²)'),
+                # 光刻胶厚度热图
+                'thickness_plot': heatmap_spec(thickness_2d, extent, '光刻胶厚度分布 (2D)', 'X 位置 (μm)', 'Y 位置 (μm)',
+                                               cmap='plasma', colorbar_label='相对厚度'),
+            })
+            exposure_plot = plots['exposure_plot']
+            thickness_plot = plots['thickness_plot']
             
             # 同时提供其他CAR模型需要的图表键
             return {
@@ -1057,7 +1031,7 @@ class CARModel:
             initial_acid = initial_acid / np.max(initial_acid)  # 归一化
             
             # 模拟光酸扩散 - 使用高斯滤波
-            diffused_acid = gaussian_filter(initial_acid, sigma=diffusion_length)
+            diffused_acid = ndimage.gaussian_filter(initial_acid, sigma=diffusion_length)
             
             # 计算脱保护反应
             deprotection = 1 - np.exp(-reaction_rate * amplification * diffused_acid)
@@ -1073,76 +1047,26 @@ class CARModel:
                 deprotection = deprotection.T
                 thickness = thickness.T
             
-            # 存储所有图表的Base64编码
-            plots = {}
-
-            # 1. 创建3D表面图 - 初始光酸分布
-            fig1 = plt.figure(figsize=(10, 8))
-            ax1 = fig1.add_subplot(111, projection='3d')
-            surf1 = ax1.plot_surface(X, Y, initial_acid, cmap='viridis', edgecolor='none')
-            ax1.set_title('3D Initial Acid Distribution', fontsize=16)
-            ax1.set_xlabel('X Position (μm)', fontsize=14)
-            ax1.set_ylabel('Y Position (μm)', fontsize=14)
-            ax1.set_zlabel('Initial Acid Concentration', fontsize=14)
-            fig1.colorbar(surf1, ax=ax1, shrink=0.5, aspect=5)
-            plt.tight_layout()
-            
-            buffer1 = BytesIO()
-            fig1.savefig(buffer1, format='png', dpi=100)
-            buffer1.seek(0)
-            plots['initial_acid_plot'] = base64.b64encode(buffer1.getvalue()).decode()
-            plt.close(fig1)
-            
-            # 2. 创建3D表面图 - 扩散后光酸分布
-            fig2 = plt.figure(figsize=(10, 8))
-            ax2 = fig2.add_subplot(111, projection='3d')
-            surf2 = ax2.plot_surface(X, Y, diffused_acid, cmap='viridis', edgecolor='none')
-            ax2.set_title('3D Diffused Acid Distribution', fontsize=16)
-            ax2.set_xlabel('X Position (μm)', fontsize=14)
-            ax2.set_ylabel('Y Position (μm)', fontsize=14)
-            ax2.set_zlabel('Acid Concentration After Diffusion', fontsize=14)
-            fig2.colorbar(surf2, ax=ax2, shrink=0.5, aspect=5)
-            plt.tight_layout()
-            
-            buffer2 = BytesIO()
-            fig2.savefig(buffer2, format='png', dpi=100)
-            buffer2.seek(0)
-            plots['acid_diffusion_plot'] = base64.b64encode(buffer2.getvalue()).decode()
-            plt.close(fig2)
-            
-            # 3. 创建3D表面图 - 脱保护程度分布
-            fig3 = plt.figure(figsize=(10, 8))
-            ax3 = fig3.add_subplot(111, projection='3d')
-            surf3 = ax3.plot_surface(X, Y, deprotection, cmap='YlOrRd', edgecolor='none')
-            ax3.set_title('3D Deprotection Distribution', fontsize=16)
-            ax3.set_xlabel('X Position (μm)', fontsize=14)
-            ax3.set_ylabel('Y Position (μm)', fontsize=14)
-            ax3.set_zlabel('Deprotection Degree', fontsize=14)
-            fig3.colorbar(surf3, ax=ax3, shrink=0.5, aspect=5)
-            plt.tight_layout()
-            
-            buffer3 = BytesIO()
-            fig3.savefig(buffer3, format='png', dpi=100)
-            buffer3.seek(0)
-            plots['deprotection_plot'] = base64.b64encode(buffer3.getvalue()).decode()
-            plt.close(fig3)
-            
-            # 4. 创建3D表面图 - 光刻胶厚度分布
-            fig4 = plt.figure(figsize=(10, 8))
-            ax4 = fig4.add_subplot(111, projection='3d')
-            surf4 = ax4.plot_surface(X, Y, thickness, cmap='plasma', edgecolor='none')
-            ax4.set_title('3D Photoresist Thickness Distribution', fontsize=16)
-            ax4.set_xlabel('X Position (μm)', fontsize=14)
-            ax4.set_ylabel('Y Position (μm)', fontsize=14)
-            ax4.set_zlabel('Relative Thickness', fontsize=14)
-            fig4.colorbar(surf4, ax=ax4, shrink=0.5, aspect=5)
-            plt.tight_layout()
-            
-            buffer4 = BytesIO()
-            fig4.savefig(buffer4, format='png', dpi=100)
-            buffer4.seek(0)
-            plots['thickness_plot'] = base64.b64encode(buffer4.getvalue()).decode()
-            plt.close(fig4)
+            # x-y平面热图（imshow），代替三维表面图
+            extent = [x_min, x_max, y_coords[0], y_coords[-1]]
+            plots = render_plots({
+                # 1. 初始光酸分布
+                'initial_acid_plot': heatmap_spec(initial_acid, extent, '3D Initial Acid Distribution',
+                                                  'X Position (μm)', 'Y Position (μm)', cmap='viridis',
+                                                  colorbar_label='Initial Acid Concentration', figsize=(10, 8)),
+                # 2. 扩散后光酸分布
+                'acid_diffusion_plot': heatmap_spec(diffused_acid, extent, '3D Diffused Acid Distribution',
+                                                    'X Position (μm)', 'Y Position (μm)', cmap='viridis',
+                                                    colorbar_label='Acid Concentration After Diffusion', figsize=(10, 8)),
+                # 3. 脱保护程度分布
+                'deprotection_plot': heatmap_spec(deprotection, extent, '3D Deprotection Distribution',
+                                                  'X Position (μm)', 'Y Position (μm)', cmap='YlOrRd',
+                                                  colorbar_label='Deprotection Degree', figsize=(10, 8)),
+                # 4. 光刻胶厚度分布
+                'thickness_plot': heatmap_spec(thickness, extent, '3D Photoresist Thickness Distribution',
+                                               'X Position (μm)', 'Y Position (μm)', cmap='plasma',
+                                               colorbar_label='Relative Thickness', figsize=(10, 8)),
+            })
             
             # 曝光剂量与初始光酸相同
             plots['exposure_plot'] = plots['initial_acid_plot']
@@ -0,0 +1,198 @@
+"""
+参数比较的计算引擎
+
+/api/compare（图像）与 /api/compare_data（数据）共用本模块。每个参数组先规范化为
+(模型, 参数) 并去重，已缓存的参数组直接复用，其余：
+    - Dill / CAR 参数组交给向量化批量计算（models/vectorized.py），同模型的各组一次算完
+    - Enhanced Dill 参数组的各x位置一起求解自适应PDE（EnhancedDillModel.adaptive_surface_batch），
+      x位置切分为若干段，作为独立任务分发到计算进程池并行执行，再按顺序拼接
+任务函数都是模块级函数，参数与返回值只含基本类型与NumPy数组，可在 spawn 进程中执行。
+"""
+
+import os
+import json
+import time
+import logging
+
+import numpy as np
+
+from .vectorized import BATCH_PARAMETERS, BATCH_EVALUATORS, batch_grid
+from .registry import get_model
+from ..utils.cancellation import check_cancelled
+from ..utils.metrics import solver_work_totals, merge_solver_work
+from ..utils.timing import stage
+
+logger = logging.getLogger(__name__)
+
+# 比较接口的x网格
+COMPARE_GRID = (0.0, 10.0, 1000)
+
+# Enhanced Dill 比较参数及默认值
+ENHANCED_COMPARE_PARAMETERS = {'z_h': 10.0, 'T': 100.0, 't_B': 10.0, 'I0': 1.0, 'M0': 1.0,
+                               't_exp': 5.0, 'K': 2.0, 'V': 0.8}
+
+COMPARE_PARAMETERS = dict(BATCH_PARAMETERS, enhanced_dill=ENHANCED_COMPARE_PARAMETERS)
+
+def detect_compare_model(params):
+    """按参数组内容判断模型类型（与 compare_data 历来的判断顺序一致）"""
+    model_type = params.get('model_type', 'dill')
+    if model_type == 'enhanced_dill' or any(k in params for k in ['z_h', 'I0', 'M0']):
+        return 'enhanced_dill'
+    if model_type == 'car' or any(k in params for k in ['acid_gen_efficiency', 'diffusion_length', 'reaction_rate']):
+        return 'car'
+    return 'dill'
+
+
+def normalize_compare_set(params):
+    """
+    补全默认值并转换为浮点数
+
+    参数:
+        params: 请求中的单个参数组
+    返回:
+        (模型类型, 参数字典, 去重键)
+    """
+    model_type = detect_compare_model(params)
+    if model_type == 'enhanced_dill' and 'K' not in params and 'K_enhanced' in params:
+        # 兼容旧版前端的参数名
+        params = dict(params, K=params['K_enhanced'])
+    values = {name: float(params.get(name, default)) for name, default in COMPARE_PARAMETERS[model_type].items()}
+    key = json.dumps([model_type, values], sort_keys=True)
+    return model_type, values, key
+
+
+def enhanced_surface_chunk(params, positions):
+    """
+    Enhanced Dill 在一段x位置上的表面曝光剂量与厚度（计算进程池任务）
+
+    参数:
+        params: 规范化后的 Enhanced Dill 参数
+        positions: x位置数组
+    返回:
+        字典，包含 exposure_dose、thickness 数组与 successful、fallback、refined、compute_time 统计
+    """
+    start = time.perf_counter()
+    solver_work = solver_work_totals()
+    model = get_model('enhanced_dill')
+    p = params
+    refined = 0
+    try:
+        # 自适应PDE求解，所有位置一起推进
+        exposure_dose, thickness, refined = model.adaptive_surface_batch(
+            z_h=p['z_h'], T=p['T'], t_B=p['t_B'], I0=p['I0'], M0=p['M0'], t_exp=p['t_exp'],
+            x_positions=positions, K=p['K'], V=p['V'], max_points=150, tolerance=1e-4)
+        successful, fallback = len(positions), 0
+    except Exception as e:
+        logger.warning(f"[Enhanced Dill] PDE求解出错，改用简化计算: {e}")
+        try:
+            A_val, B_val, C_val = model.get_abc(p['z_h'], p['T'], p['t_B'])
+            exposure_dose = p['I0'] * (1 + p['V'] * np.cos(p['K'] * positions)) * p['t_exp']
+            thickness = np.exp(-C_val * exposure_dose)
+        except Exception:
+            exposure_dose = np.full(len(positions), p['I0'] * p['t_exp'])
+            thickness = np.full(len(positions), 0.5)
+        successful, fallback = 0, len(positions)
+    return {'exposure_dose': exposure_dose, 'thickness': thickness,
+            'successful': successful, 'fallback': fallback, 'refined': refined,
+            'compute_time': time.perf_counter() - start,
+            # 在计算进程中执行时由调用方把求解步数记入请求进程的指标
+            'pid': os.getpid(), 'solver_work': (solver_work, solver_work_totals())}
+
+
+def _chunks(count, parts):
+    # 把 range(count) 切分为至多 parts 段连续区间
+    bounds = np.linspace(0, count, max(1, min(parts, count)) + 1).astype(int)
+    return [(bounds[i], bounds[i + 1]) for i in range(len(bounds) - 1)]
+
+
+def compute_compare_sets(parameter_sets, pool=None, processes=1, cache=None):
+    """
+    计算一组比较参数组
+
+    参数:
+        parameter_sets: 请求中的参数组列表
+        pool: 计算进程池（ComputePool），None 表示在当前线程计算
+        processes: 可用进程数，决定 Enhanced Dill 参数组的切分段数
+        cache: 结果缓存（ResultCache），None 表示不缓存
+    返回:
+        (x数组, 结果列表)；结果与 parameter_sets 一一对应，每项包含 model_type、params、
+        exposure_dose、thickness、stats、compute_time、cached 以及重复参数组的 duplicate_of
+    """
+    x = batch_grid(*COMPARE_GRID)
+    normalized = [normalize_compare_set(params) for params in parameter_sets]
+
+    # 相同参数组只计算一次
+    unique = {}
+    for index, (model_type, values, key) in enumerate(normalized):
+        unique.setdefault(key, (index, model_type, values))
+
+    computed = {}
+    if cache is not None:
+        for key in unique:
+            hit = cache.get(key)
+            if hit is not None:
+                computed[key] = dict(hit, cached=True)
+    pending = {key: entry for key, entry in unique.items() if key not in computed}
+
+    for model_type in BATCH_EVALUATORS:
+        entries = [(key, values) for key, (_, mt, values) in pending.items() if mt == model_type]
+        if not entries:
+            continue
+        check_cancelled()
+        start = time.perf_counter()
+        columns = {name: [values[name] for _, values in entries] for name in BATCH_PARAMETERS[model_type]}
+        result = BATCH_EVALUATORS[model_type](x, columns)
+        elapsed = (time.perf_counter() - start) / len(entries)
+        for row, (key, _) in enumerate(entries):
+            computed[key] = {'exposure_dose': result['exposure_dose'][row].copy(),
+                             'thickness': result['thickness'][row].copy(),
+                             'stats': {}, 'compute_time': elapsed}
+
+    enhanced = [(key, values) for key, (_, mt, values) in pending.items() if mt == 'enhanced_dill']
+    if enhanced:
+        # 每个参数组切分的段数：让任务数不少于进程数
+        parts = max(1, -(-processes // len(enhanced))) if pool is not None else 1
+        tasks, owners = [], []
+        for key, values in enhanced:
+            for lo, hi in _chunks(len(x), parts):
+                tasks.append((values, x[lo:hi]))
+                owners.append(key)
+        # 进程池中的求解不在本进程计时，这里记录等待各段完成的墙钟时间
+        with stage('pde_solve'):
+            if pool is not None:
+                chunks = pool.map(enhanced_surface_chunk, tasks)
+            else:
+                chunks = [enhanced_surface_chunk(*task) for task in tasks]
+        for chunk in chunks:
+            if chunk['pid'] != os.getpid():
+                merge_solver_work(*chunk['solver_work'])
+        for key, _ in enhanced:
+            parts_of_key = [chunk for owner, chunk in zip(owners, chunks) if owner == key]
+            compute_time = sum(chunk['compute_time'] for chunk in parts_of_key)
+            computed[key] = {
+                'exposure_dose': np.concatenate([chunk['exposure_dose'] for chunk in parts_of_key]),
+                'thickness': np.concatenate([chunk['thickness'] for chunk in parts_of_key]),
+                'stats': {'successful': sum(chunk['successful'] for chunk in parts_of_key),
+                          'fallback': sum(chunk['fallback'] for chunk in parts_of_key),
+                          'refined': sum(chunk['refined'] for chunk in parts_of_key),
+                          'avg_compute_time': compute_time / len(x),
+                          'chunks': len(parts_of_key)},
+                # 各段计算耗时之和（并行时大于墙钟时间）
+                'compute_time': compute_time,
+            }
+
+    for key in pending:
+        computed[key]['exposure_dose'].setflags(write=False)
+        computed[key]['thickness'].setflags(write=False)
+        if cache is not None:
+            cache.put(key, computed[key])
+
+    results = []
+    for index, (model_type, values, key) in enumerate(normalized):
+        first = unique[key][0]
+        result = dict(computed[key], model_type=model_type, params=values)
+        result.setdefault('cached', False)
+        if first != index:
+            result['duplicate_of'] = first
+        results.append(result)
+    return x, results
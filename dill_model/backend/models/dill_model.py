@@ -1,54 +1,39 @@
 import numpy as np
-import matplotlib
-# 设置Matplotlib后端为非交互式后端
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-from io import BytesIO
-import base64
 from .enhanced_dill_model import EnhancedDillModel
-import math
-import ast
 import logging
+from ..utils.cancellation import resolve_token
+from ..utils.timing import stage
+from .phase import parse_phi_expr
+from ..utils.rendering import render_plots, line_spec, heatmap_spec, slices_spec
 
 # 设置日志配置
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def parse_phi_expr(phi_expr, t):
-    """
-    安全解析phi_expr表达式，t为时间，只允许sin/cos/pi/t等
-    """
-    allowed_names = {'sin': np.sin, 'cos': np.cos, 'pi': np.pi, 't': t}
-    allowed_nodes = (
-        ast.Expression, ast.BinOp, ast.UnaryOp, ast.Num, ast.Load,
-        ast.Call, ast.Name, ast.Constant, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow,
-        ast.USub, ast.UAdd, ast.Mod, ast.FloorDiv, ast.Tuple, ast.List
-    )
-    try:
-        node = ast.parse(str(phi_expr), mode='eval')
-        for n in ast.walk(node):
-            if not isinstance(n, allowed_nodes):
-                raise ValueError(f"不允许的表达式节点: {type(n).__name__}")
-            if isinstance(n, ast.Name) and n.id not in allowed_names:
-                raise ValueError(f"不允许的变量: {n.id}")
-            if isinstance(n, ast.Call) and (
-                not isinstance(n.func, ast.Name) or n.func.id not in allowed_names
-            ):
-                raise ValueError(f"不允许的函数: {getattr(n.func, 'id', None)}")
-        code = compile(node, '<string>', 'eval')
-        return eval(code, {"__builtins__": None}, allowed_names)
-    except Exception:
-        try:
-            return float(phi_expr)
-        except Exception:
-            return 0.0
-
 class DillModel:
     """
     Dill光刻胶模型计算类
     
     实现基于Dill模型的光刻胶曝光剂量分布和厚度分布计算
     """
+    # generate_data 各结果字段每一维对应的坐标键（供 apply_lod 降采样），None 为时间帧维
+    LOD_AXES = {
+        '1d': {
+            'exposure_dose': ['x'], 'thickness': ['x'],
+            'exposure_dose_frames': [None, 'x_coords'], 'thickness_frames': [None, 'x_coords'],
+        },
+        'multi': {
+            'z_exposure_dose': ['y_coords', 'x_coords'], 'z_thickness': ['y_coords', 'x_coords'],
+            'exposure_dose_frames': [None, 'y_coords', 'x_coords'],
+            'thickness_frames': [None, 'y_coords', 'x_coords'],
+        },
+        '3d': {
+            'exposure_dose': ['x_coords', 'y_coords', 'z_coords'],
+            'thickness': ['x_coords', 'y_coords', 'z_coords'],
+            'exposure_dose_frames': [None, 'x_coords', 'y_coords', 'z_coords'],
+            'thickness_frames': [None, 'x_coords', 'y_coords', 'z_coords'],
+        },
+    }
     
     def __init__(self):
         pass
@@ -94,7 +79,8 @@ class DillModel:
             logger.info(f"   - x坐标范围: [{np.min(x):.3f}, {np.max(x):.3f}], 点数: {len(x)}")
             
             # y默认为0，若后续支持二维分布可扩展
-            result = I_avg * (1 + V * np.cos(Kx * x + Ky * y + phi))
+            with stage('intensity'):
+                result = I_avg * (1 + V * np.cos(Kx * x + Ky * y + phi))
             
             logger.info(f"🔸 计算结果:")
             logger.info(f"   - 光强分布范围: [{np.min(result):.6f}, {np.max(result):.6f}]")
@@ -120,7 +106,8 @@ class DillModel:
             logger.info(f"   - x坐标范围: [{np.min(x):.3f}, {np.max(x):.3f}], 点数: {len(x)}")
             
             # 三维正弦波
-            result = I_avg * (1 + V * np.cos(Kx * x + Ky * y + Kz * z + phi))
+            with stage('intensity'):
+                result = I_avg * (1 + V * np.cos(Kx * x + Ky * y + Kz * z + phi))
             
             logger.info(f"🔸 计算结果:")
             logger.info(f"   - 光强分布范围: [{np.min(result):.6f}, {np.max(result):.6f}]")
@@ -137,7 +124,8 @@ class DillModel:
             logger.info(f"   - K (空间频率) = {K}")
             logger.info(f"   - x坐标范围: [{np.min(x):.3f}, {np.max(x):.3f}], 点数: {len(x)}")
             
-            result = I_avg * (1 + V * np.cos(K * x))
+            with stage('intensity'):
+                result = I_avg * (1 + V * np.cos(K * x))
             
             logger.info(f"🔸 计算结果:")
             logger.info(f"   - 光强分布范围: [{np.min(result):.6f}, {np.max(result):.6f}]")
@@ -216,7 +204,8 @@ class DillModel:
         exposure_dose = self.calculate_exposure_dose(x, I_avg, V, K, t_exp, sine_type, Kx, Ky, Kz, phi_expr, y, z)
         # 简化的Dill模型计算光刻胶厚度
         # 实际中可能需要更复杂的模型，这里使用指数衰减模型
-        thickness = np.exp(-C * exposure_dose)
+        with stage('dissolution'):
+            thickness = np.exp(-C * exposure_dose)
         
         logger.info(f"🔸 计算结果:")
         logger.info(f"   - 光刻胶厚度范围: [{np.min(thickness):.6f}, {np.max(thickness):.6f}]")
@@ -225,7 +214,141 @@ class DillModel:
         
         return thickness
     
-    def generate_data(self, I_avg, V, K, t_exp, C, sine_type='1d', Kx=None, Ky=None, Kz=None, phi_expr=None, y_range=None, z_range=None, enable_4d_animation=False, t_start=0, t_end=5, time_steps=20, x_min=0, x_max=10):
+    def animation_stream(self, I_avg, V, K, t_exp, C, sine_type='1d', Kx=None, Ky=None, Kz=None, phi_expr=None, y_range=None, z_range=None, t_start=0, t_end=5, time_steps=20, x_min=0, x_max=10, cancel_token=None):
+        """
+        4D动画的流式生成：先返回元数据，再由生成器逐帧产出
+
+        参数与 generate_data 相同（不含 enable_4d_animation）
+        cancel_token 在每帧开始时检查，默认取当前请求的令牌
+
+        返回:
+            (meta, frames) 元组
+            meta: 坐标、时间轴、帧字段等元数据字典
+            frames: 生成器，每次产出 {'index', 't', 'phi', 'exposure_dose', 'thickness'}，
+                    字段值为 numpy 数组，调用方用完即可释放
+        """
+        token = resolve_token(cancel_token)
+        time_array = np.linspace(t_start, t_end, time_steps)
+
+        if sine_type == '3d' and Kx is not None and Ky is not None and Kz is not None:
+            x_coords, y_coords, z_coords = self._grid_3d(y_range, z_range, x_min, x_max)
+            logger.info(f"🔸 3D模式4D动画参数:")
+            logger.info(f"   - 时间范围: {t_start}s ~ {t_end}s")
+            logger.info(f"   - 时间步数: {time_steps}")
+            logger.info(f"   - 3D网格大小: {len(x_coords)}×{len(y_coords)}×{len(z_coords)}")
+            meta = {
+                'x_coords': x_coords.tolist(),
+                'y_coords': y_coords.tolist(),
+                'z_coords': z_coords.tolist(),
+                'sine_type': '3d',
+                'is_3d': True
+            }
+            X, Y, Z = np.meshgrid(x_coords, y_coords, z_coords, indexing='ij')
+
+            def phase_field(phi_t):
+                return Kx * X + Ky * Y + Kz * Z + phi_t
+
+        elif sine_type == 'multi' and Kx is not None and Ky is not None:
+            x_coords = np.linspace(0, 10, 1000)
+            y_coords = np.array(y_range) if y_range is not None else np.linspace(0, 10, 100)
+            logger.info(f"🔸 2D模式4D动画参数:")
+            logger.info(f"   - 时间范围: {t_start}s ~ {t_end}s")
+            logger.info(f"   - 时间步数: {time_steps}")
+            meta = {
+                'x_coords': x_coords.tolist(),
+                'y_coords': y_coords.tolist(),
+                'sine_type': 'multi',
+                'is_2d': True
+            }
+            # 行为y、列为x，与逐行计算的结果布局一致
+            X, Y = np.meshgrid(x_coords, y_coords)
+
+            def phase_field(phi_t):
+                return Kx * X + Ky * Y + phi_t
+
+        else:
+            x_coords = np.linspace(0, 10, 1000)
+            logger.info(f"🔸 1D模式4D动画参数:")
+            logger.info(f"   - 时间范围: {t_start}s ~ {t_end}s")
+            logger.info(f"   - 时间步数: {time_steps}")
+            meta = {
+                'x_coords': x_coords.tolist(),
+                'sine_type': '1d',
+                'is_1d': True
+            }
+
+            def phase_field(phi_t):
+                return K * x_coords + phi_t
+
+        meta.update({
+            'time_array': time_array.tolist(),
+            'time_steps': time_steps,
+            'enable_4d_animation': True,
+            'frame_fields': ['exposure_dose', 'thickness']
+        })
+
+        def frames():
+            for t_idx, t in enumerate(time_array):
+                token.check()
+                phi_t = parse_phi_expr(phi_expr, t) if phi_expr is not None else 0.0
+                with stage('intensity'):
+                    intensity_t = I_avg * (1 + V * np.cos(phase_field(phi_t)))
+                    exposure_dose_t = intensity_t * t_exp
+                with stage('dissolution'):
+                    thickness_t = np.exp(-C * exposure_dose_t)
+
+                if t_idx < 3:
+                    logger.info(f"   - 帧{t_idx}: t={t:.2f}s, φ(t)={phi_t:.4f}, 光强范围=[{intensity_t.min():.4f}, {intensity_t.max():.4f}]")
+
+                yield {
+                    'index': t_idx,
+                    't': float(t),
+                    'phi': float(phi_t),
+                    'exposure_dose': exposure_dose_t,
+                    'thickness': thickness_t
+                }
+
+            logger.info(f"🔸 Dill模型{meta['sine_type']}-4D动画数据生成完成，共{time_steps}帧")
+
+        return meta, frames()
+
+    @staticmethod
+    def _collect_animation(meta, frames):
+        """
+        将流式帧汇总为一次性返回的动画数据字典（兼容原有 *_frames 列表格式）
+        """
+        animation_data = dict(meta)
+        fields = meta['frame_fields']
+        for field in fields:
+            animation_data[f'{field}_frames'] = []
+        for frame in frames:
+            for field in fields:
+                animation_data[f'{field}_frames'].append(frame[field])
+        return animation_data
+
+    @staticmethod
+    def _grid_3d(y_range, z_range, x_min, x_max, points=50):
+        """
+        构造3D模式的坐标轴
+        """
+        x_min_val = float(x_min)
+        x_max_val = float(x_max)
+        y_min_val = float(0 if y_range is None else y_range[0])
+        y_max_val = float(10 if y_range is None else y_range[-1])
+        z_min_val = float(0 if z_range is None else z_range[0])
+        z_max_val = float(10 if z_range is None else z_range[-1])
+
+        logger.info(f"🔸 3D网格坐标范围:")
+        logger.info(f"   - X: [{x_min_val:.2f}, {x_max_val:.2f}]")
+        logger.info(f"   - Y: [{y_min_val:.2f}, {y_max_val:.2f}]")
+        logger.info(f"   - Z: [{z_min_val:.2f}, {z_max_val:.2f}]")
+
+        x_coords = np.linspace(x_min_val, x_max_val, points)
+        y_coords = np.linspace(y_min_val, y_max_val, points) if y_range is None else np.array(y_range[:points])
+        z_coords = np.linspace(z_min_val, z_max_val, points) if z_range is None else np.array(z_range[:points])
+        return x_coords, y_coords, z_coords
+
+    def generate_data(self, I_avg, V, K, t_exp, C, sine_type='1d', Kx=None, Ky=None, Kz=None, phi_expr=None, y_range=None, z_range=None, enable_4d_animation=False, t_start=0, t_end=5, time_steps=20, x_min=0, x_max=10, cancel_token=None):
         """
         生成数据，支持一维、二维、三维正弦波和4D动画
         
@@ -246,10 +369,12 @@ class DillModel:
             t_start: 动画开始时间
             t_end: 动画结束时间
             time_steps: 时间步数
+            cancel_token: 取消令牌（CancelToken），默认取当前请求的令牌
             
         返回:
             包含曝光剂量和厚度数据的字典
         """
+        resolve_token(cancel_token).check()
         logger.info("🌟" * 30)
         logger.info("【Dill模型 - 数据生成总控制】")
         logger.info("🌟" * 30)
@@ -274,98 +399,18 @@ class DillModel:
         if sine_type == '3d' and Kx is not None and Ky is not None and Kz is not None:
             logger.info(f"🔸 三维正弦波数据生成")
             
-            # 设置3D网格参数，使用传入的坐标范围
-            x_points = 50
-            y_points = 50
-            z_points = 50
-            
-            # 使用传入的x坐标范围
-            x_min_val = float(x_min)
-            x_max_val = float(x_max)
-            y_min_val = float(0 if y_range is None else y_range[0])
-            y_max_val = float(10 if y_range is None else y_range[-1])
-            z_min_val = float(0 if z_range is None else z_range[0])
-            z_max_val = float(10 if z_range is None else z_range[-1])
-            
-            logger.info(f"🔸 3D网格坐标范围:")
-            logger.info(f"   - X: [{x_min_val:.2f}, {x_max_val:.2f}]")
-            logger.info(f"   - Y: [{y_min_val:.2f}, {y_max_val:.2f}]")
-            logger.info(f"   - Z: [{z_min_val:.2f}, {z_max_val:.2f}]")
-            
-            x_coords = np.linspace(x_min_val, x_max_val, x_points)
-            y_coords = np.linspace(y_min_val, y_max_val, y_points) if y_range is None else np.array(y_range[:y_points])
-            z_coords = np.linspace(z_min_val, z_max_val, z_points) if z_range is None else np.array(z_range[:z_points])
-            
             # 检查是否启用4D动画
             if enable_4d_animation:
-                logger.info(f"🔸 3D模式4D动画参数:")
-                logger.info(f"   - 时间范围: {t_start}s ~ {t_end}s")
-                logger.info(f"   - 时间步数: {time_steps}")
-                logger.info(f"   - 3D网格大小: {x_points}×{y_points}×{z_points}")
-                
-                time_array = np.linspace(t_start, t_end, time_steps)
-                
-                animation_data = {
-                    'x_coords': x_coords.tolist(),
-                    'y_coords': y_coords.tolist(),
-                    'z_coords': z_coords.tolist(),
-                    'time_array': time_array.tolist(),
-                    'time_steps': time_steps,
-                    'exposure_dose_frames': [],
-                    'thickness_frames': [],
-                    'enable_4d_animation': True,
-                    'sine_type': '3d',
-                    'is_3d': True
-                }
-                
-                # 创建3D网格
-                X, Y, Z = np.meshgrid(x_coords, y_coords, z_coords, indexing='ij')
-                
-                for t_idx, t in enumerate(time_array):
-                    phi_t = parse_phi_expr(phi_expr, t) if phi_expr is not None else 0.0
-                    
-                    # 修正：使用完整的3D Dill模型公式
-                    # I(x,y,z,t) = I_avg * (1 + V * cos(Kx*x + Ky*y + Kz*z + φ(t)))
-                    modulation_t = np.cos(Kx * X + Ky * Y + Kz * Z + phi_t)
-                    intensity_t = I_avg * (1 + V * modulation_t)
-                    
-                    # 调试信息：验证相位变化
-                    if t_idx < 3:  # 只打印前几帧
-                        logger.info(f"   - 帧{t_idx}: t={t:.2f}s, φ(t)={phi_t:.4f}")
-                        logger.info(f"     3D强度范围=[{intensity_t.min():.4f}, {intensity_t.max():.4f}]")
-                        logger.info(f"     3D网格形状: {intensity_t.shape}")
-                    
-                    exposure_dose_t = intensity_t * t_exp
-                    thickness_t = np.exp(-C * exposure_dose_t)
-                    
-                    # 将3D数据转换为嵌套列表格式，便于前端处理
-                    # 格式: [[[z0_values], [z1_values], ...], ...]
-                    try:
-                        exposure_3d_frame = intensity_t.tolist()
-                        thickness_3d_frame = thickness_t.tolist()
-                        
-                        # 验证数据结构
-                        if t_idx == 0:  # 只在第一帧打印详细信息
-                            logger.info(f"   - 4D帧数据结构验证:")
-                            logger.info(f"     exposure_3d_frame类型: {type(exposure_3d_frame)}")
-                            logger.info(f"     exposure_3d_frame维度: {len(exposure_3d_frame)}x{len(exposure_3d_frame[0]) if exposure_3d_frame else 0}x{len(exposure_3d_frame[0][0]) if exposure_3d_frame and exposure_3d_frame[0] else 0}")
-                        
-                    except Exception as e:
-                        logger.error(f"   - 4D帧{t_idx}数据转换失败: {str(e)}")
-                        exposure_3d_frame = intensity_t.flatten().tolist()
-                        thickness_3d_frame = thickness_t.flatten().tolist()
-                    
-                    animation_data['exposure_dose_frames'].append(exposure_3d_frame)
-                    animation_data['thickness_frames'].append(thickness_3d_frame)
-                    
-                    logger.info(f"   - 时间步 {t_idx+1}/{time_steps} (t={t:.2f}s) 3D计算完成")
-                
-                logger.info(f"🔸 Dill模型3D-4D动画数据生成完成，共{time_steps}帧")
-                return animation_data
+                meta, frames = self.animation_stream(I_avg, V, K, t_exp, C, sine_type=sine_type, Kx=Kx, Ky=Ky, Kz=Kz,
+                                                     phi_expr=phi_expr, y_range=y_range, z_range=z_range,
+                                                     t_start=t_start, t_end=t_end, time_steps=time_steps,
+                                                     x_min=x_min, x_max=x_max, cancel_token=cancel_token)
+                return self._collect_animation(meta, frames)
             
             else:
                 # 静态3D数据生成 - 生成完整的3D数据而不是2D切片
                 logger.info("🔸 生成完整3D静态数据...")
+                x_coords, y_coords, z_coords = self._grid_3d(y_range, z_range, x_min, x_max)
                 
                 # 创建完整的3D网格
                 X_grid, Y_grid, Z_grid = np.meshgrid(x_coords, y_coords, z_coords, indexing='ij')
@@ -374,40 +419,29 @@ class DillModel:
                 
                 # 计算完整3D空间的光强分布
                 phi_val = parse_phi_expr(phi_expr, 0) if phi_expr is not None else 0.0
-                modulation_3d = np.cos(Kx * X_grid + Ky * Y_grid + Kz * Z_grid + phi_val)
-                intensity_3d = I_avg * (1 + V * modulation_3d)
+                with stage('intensity'):
+                    modulation_3d = np.cos(Kx * X_grid + Ky * Y_grid + Kz * Z_grid + phi_val)
+                    intensity_3d = I_avg * (1 + V * modulation_3d)
                 
                 logger.info(f"   - 3D光强计算完成，范围: [{intensity_3d.min():.4f}, {intensity_3d.max():.4f}]")
                 
                 # 计算3D曝光剂量和厚度分布
                 exposure_dose_3d = intensity_3d * t_exp
-                thickness_3d = np.exp(-C * exposure_dose_3d)
+                with stage('dissolution'):
+                    thickness_3d = np.exp(-C * exposure_dose_3d)
                 
                 logger.info(f"   - 3D曝光剂量范围: [{exposure_dose_3d.min():.4f}, {exposure_dose_3d.max():.4f}]")
                 logger.info(f"   - 3D厚度范围: [{thickness_3d.min():.4f}, {thickness_3d.max():.4f}]")
 
-                # 返回完整的3D数据，使用嵌套列表格式便于前端处理
-                try:
-                    exposure_3d_list = exposure_dose_3d.tolist()
-                    thickness_3d_list = thickness_3d.tolist()
-                    
-                    logger.info(f"   - 3D数据转换为列表格式完成")
-                    logger.info(f"   - 曝光剂量数据维度: {len(exposure_3d_list)}×{len(exposure_3d_list[0])}×{len(exposure_3d_list[0][0])}")
-                    logger.info(f"   - 厚度数据维度: {len(thickness_3d_list)}×{len(thickness_3d_list[0])}×{len(thickness_3d_list[0][0])}")
-                    
-                except Exception as e:
-                    logger.error(f"   - 3D数据转换失败: {str(e)}")
-                    # 备用方案：返回扁平化数据
-                    exposure_3d_list = exposure_dose_3d.flatten().tolist()
-                    thickness_3d_list = thickness_3d.flatten().tolist()
-                    logger.info(f"   - 使用备用方案：扁平化数据")
+                # 返回完整的3D数组（行主序 [x][y][z]），由JSON提供器直接序列化
+                logger.info(f"   - 曝光剂量数据维度: {'×'.join(map(str, exposure_dose_3d.shape))}")
 
                 return {
-                    'x_coords': x_coords.tolist(),
-                    'y_coords': y_coords.tolist(),
-                    'z_coords': z_coords.tolist(),
-                    'exposure_dose': exposure_3d_list,
-                    'thickness': thickness_3d_list,
+                    'x_coords': x_coords,
+                    'y_coords': y_coords,
+                    'z_coords': z_coords,
+                    'exposure_dose': exposure_dose_3d,
+                    'thickness': thickness_3d,
                     'is_3d': True,
                     'is_2d': False,
                     'sine_type': '3d',
@@ -423,59 +457,27 @@ class DillModel:
             y_axis_points = np.array(y_range) if y_range is not None else np.linspace(0, 10, 100)
             
             if enable_4d_animation:
-                logger.info(f"🔸 2D模式4D动画参数:")
-                logger.info(f"   - 时间范围: {t_start}s ~ {t_end}s")
-                logger.info(f"   - 时间步数: {time_steps}")
-                
-                time_array = np.linspace(t_start, t_end, time_steps)
-                
-                animation_data = {
-                    'x_coords': x_axis_points.tolist(),
-                    'y_coords': y_axis_points.tolist(),
-                    'time_array': time_array.tolist(),
-                    'time_steps': time_steps,
-                    'exposure_dose_frames': [],
-                    'thickness_frames': [],
-                    'enable_4d_animation': True,
-                    'sine_type': 'multi',
-                    'is_2d': True
-                }
-                
-                for t_idx, t in enumerate(time_array):
-                    phi_t = parse_phi_expr(phi_expr, t) if phi_expr is not None else 0.0
-                    
-                    exposure_dose_2d = []
-                    thickness_2d = []
-                    
-                    for y in y_axis_points:
-                        intensity_line = I_avg * (1 + V * np.cos(Kx * x_axis_points + Ky * y + phi_t))
-                        exposure_dose_line = intensity_line * t_exp
-                        thickness_line = np.exp(-C * exposure_dose_line)
-                        
-                        exposure_dose_2d.append(exposure_dose_line.tolist())
-                        thickness_2d.append(thickness_line.tolist())
-                    
-                    animation_data['exposure_dose_frames'].append(exposure_dose_2d)
-                    animation_data['thickness_frames'].append(thickness_2d)
-                    
-                    logger.info(f"   - 时间步 {t_idx+1}/{time_steps} (t={t:.2f}s) 计算完成")
-                
-                logger.info(f"🔸 Dill模型2D-4D动画数据生成完成，共{time_steps}帧")
-                return animation_data
+                meta, frames = self.animation_stream(I_avg, V, K, t_exp, C, sine_type=sine_type, Kx=Kx, Ky=Ky,
+                                                     phi_expr=phi_expr, y_range=y_range,
+                                                     t_start=t_start, t_end=t_end, time_steps=time_steps,
+                                                     cancel_token=cancel_token)
+                return self._collect_animation(meta, frames)
             
             else:
                 # 静态2D数据生成
                 phi = parse_phi_expr(phi_expr, 0) if phi_expr is not None else 0.0
                 
                 X_grid, Y_grid = np.meshgrid(x_axis_points, y_axis_points)
-                exposure_dose_2d = I_avg * (1 + V * np.cos(Kx * X_grid + Ky * Y_grid + phi)) * t_exp
-                thickness_2d = np.exp(-C * exposure_dose_2d)
+                with stage('intensity'):
+                    exposure_dose_2d = I_avg * (1 + V * np.cos(Kx * X_grid + Ky * Y_grid + phi)) * t_exp
+                with stage('dissolution'):
+                    thickness_2d = np.exp(-C * exposure_dose_2d)
                 
                 return {
-                    'x_coords': x_axis_points.tolist(),
-                    'y_coords': y_axis_points.tolist(),
-                    'z_exposure_dose': exposure_dose_2d.tolist(),
-                    'z_thickness': thickness_2d.tolist(),
+                    'x_coords': x_axis_points,
+                    'y_coords': y_axis_points,
+                    'z_exposure_dose': exposure_dose_2d,
+                    'z_thickness': thickness_2d,
                     'is_2d': True
                 }
         
@@ -484,37 +486,10 @@ class DillModel:
             logger.info(f"🔸 一维正弦波数据生成")
             
             if enable_4d_animation:
-                logger.info(f"🔸 1D模式4D动画参数:")
-                logger.info(f"   - 时间范围: {t_start}s ~ {t_end}s")
-                logger.info(f"   - 时间步数: {time_steps}")
-                
-                time_array = np.linspace(t_start, t_end, time_steps)
-                
-                animation_data = {
-                    'x_coords': x_axis_points.tolist(),
-                    'time_array': time_array.tolist(),
-                    'time_steps': time_steps,
-                    'exposure_dose_frames': [],
-                    'thickness_frames': [],
-                    'enable_4d_animation': True,
-                    'sine_type': '1d',
-                    'is_1d': True
-                }
-                
-                for t_idx, t in enumerate(time_array):
-                    phi_t = parse_phi_expr(phi_expr, t) if phi_expr is not None else 0.0
-                    
-                    intensity_t = I_avg * (1 + V * np.cos(K * x_axis_points + phi_t))
-                    exposure_dose_t = intensity_t * t_exp
-                    thickness_t = np.exp(-C * exposure_dose_t)
-                    
-                    animation_data['exposure_dose_frames'].append(exposure_dose_t.tolist())
-                    animation_data['thickness_frames'].append(thickness_t.tolist())
-                    
-                    logger.info(f"   - 时间步 {t_idx+1}/{time_steps} (t={t:.2f}s) 计算完成")
-                
-                logger.info(f"🔸 Dill模型1D-4D动画数据生成完成，共{time_steps}帧")
-                return animation_data
+                meta, frames = self.animation_stream(I_avg, V, K, t_exp, C, sine_type=sine_type, phi_expr=phi_expr,
+                                                     t_start=t_start, t_end=t_end, time_steps=time_steps,
+                                                     cancel_token=cancel_token)
+                return self._collect_animation(meta, frames)
             
             else:
                 # 静态1D数据生成
@@ -530,22 +505,72 @@ class DillModel:
                 logger.info(f"   - 光刻胶厚度范围: [{np.min(thickness):.6f}, {np.max(thickness):.6f}]")
                 
                 return {
-                    'x': x_axis_points.tolist(),
-                    'exposure_dose': exposure_dose.tolist(),
-                    'thickness': thickness.tolist()
+                    'x': x_axis_points,
+                    'exposure_dose': exposure_dose,
+                    'thickness': thickness
                 }
 
+    def generate_plots(self, I_avg, V, K, t_exp, C, sine_type='1d', Kx=None, Ky=None, Kz=None, phi_expr=None, y_range=None, z_range=None, x_min=0, x_max=10):
+        """
+        生成曝光剂量与光刻胶厚度图像
+
+        参数:
+            与 generate_data 相同；二维为 x-y 热图，三维为若干 z 层的切片热图
+            
+        返回:
+            包含 exposure_plot / thickness_plot 两张Base64编码图像的字典
+        """
+        if sine_type == '3d' and Kx is not None and Ky is not None and Kz is not None:
+            x_coords, y_coords, z_coords = self._grid_3d(y_range, z_range, x_min, x_max)
+            X_grid, Y_grid = np.meshgrid(x_coords, y_coords)
+            phi = parse_phi_expr(phi_expr, 0) if phi_expr is not None else 0.0
+            # 均匀选取至多6个z层
+            slice_z = z_coords[np.unique(np.linspace(0, len(z_coords) - 1, min(6, len(z_coords))).round().astype(int))]
+            exposure_slices = [I_avg * (1 + V * np.cos(Kx * X_grid + Ky * Y_grid + Kz * z_val + phi)) * t_exp
+                               for z_val in slice_z]
+            thickness_slices = [np.exp(-C * dose) for dose in exposure_slices]
+            labels = [f'z = {z_val:.2f} μm' for z_val in slice_z]
+            extent = [x_coords[0], x_coords[-1], y_coords[0], y_coords[-1]]
+            return render_plots({
+                'exposure_plot': slices_spec(exposure_slices, labels, extent, '3D Exposure Dose Distribution',
+                                             'X Position (μm)', 'Y Position (μm)', cmap='viridis',
+                                             colorbar_label='Exposure Dose (mJ/cm²)'),
+                'thickness_plot': slices_spec(thickness_slices, labels, extent, '3D Photoresist Thickness Distribution',
+                                              'X Position (μm)', 'Y Position (μm)', cmap='plasma',
+                                              colorbar_label='Relative Thickness'),
+            })
+
+        x_axis_points = np.linspace(x_min, x_max, 1000)
+        if sine_type == 'multi' and Kx is not None and Ky is not None:
+            y_axis_points = np.array(y_range) if y_range is not None else np.linspace(0, 10, 100)
+            phi = parse_phi_expr(phi_expr, 0) if phi_expr is not None else 0.0
+            X_grid, Y_grid = np.meshgrid(x_axis_points, y_axis_points)
+            exposure_dose_2d = I_avg * (1 + V * np.cos(Kx * X_grid + Ky * Y_grid + phi)) * t_exp
+            thickness_2d = np.exp(-C * exposure_dose_2d)
+            extent = [x_axis_points[0], x_axis_points[-1], y_axis_points[0], y_axis_points[-1]]
+            return render_plots({
+                'exposure_plot': heatmap_spec(exposure_dose_2d, extent, 'Exposure Dose Distribution (2D)',
+                                              'X Position (μm)', 'Y Position (μm)', cmap='viridis',
+                                              colorbar_label='Exposure Dose (mJ/cm²)'),
+                'thickness_plot': heatmap_spec(thickness_2d, extent, 'Photoresist Thickness Distribution (2D)',
+                                               'X Position (μm)', 'Y Position (μm)', cmap='plasma',
+                                               colorbar_label='Relative Thickness'),
+            })
+
+        exposure_dose = I_avg * (1 + V * np.cos(K * x_axis_points)) * t_exp
+        thickness = np.exp(-C * exposure_dose)
+        return render_plots({
+            'exposure_plot': line_spec([(x_axis_points, exposure_dose, 'b-', {'linewidth': 2})],
+                                       'Exposure Dose Distribution', 'Position (μm)', 'Exposure Dose (mJ/cm²)'),
+            'thickness_plot': line_spec([(x_axis_points, thickness, 'r-', {'linewidth': 2})],
+                                        'Photoresist Thickness Distribution', 'Position (μm)', 'Relative Thickness'),
+        })
+
 def get_model_by_name(model_name):
     """
     根据模型名称返回对应模型实例
     支持：'dill', 'enhanced_dill', 'car'
+    实例由进程级模型注册表构建一次后复用（见 models/registry.py）
     """
-    if model_name == 'dill':
-        return DillModel()
-    elif model_name == 'enhanced_dill':
-        return EnhancedDillModel(debug_mode=False)
-    elif model_name == 'car':
-        from .car_model import CARModel
-        return CARModel()
-    else:
-        raise ValueError(f"未知模型类型: {model_name}") 
\ No newline at end of file
+    from .registry import get_model
+    return get_model(model_name)
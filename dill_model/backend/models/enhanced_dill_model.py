@@ -1,45 +1,20 @@
 import numpy as np
-from scipy.integrate import odeint
-import math
-import matplotlib.pyplot as plt
-from io import BytesIO
-import base64
-import ast
 import logging  # 添加logging模块
 import time
+import threading
+from collections import OrderedDict
+from ..utils.cancellation import resolve_token
+from ..utils.metrics import record_solver_work
+from ..utils.timing import stage
+from .phase import parse_phi_expr
+from ..utils.rendering import render_plots, line_spec, slices_spec
 
 # 设置日志配置
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def parse_phi_expr(phi_expr, t):
-    """
-    安全解析phi_expr表达式，t为时间，只允许sin/cos/pi/t等
-    """
-    allowed_names = {'sin': np.sin, 'cos': np.cos, 'pi': np.pi, 't': t}
-    allowed_nodes = (
-        ast.Expression, ast.BinOp, ast.UnaryOp, ast.Num, ast.Load,
-        ast.Call, ast.Name, ast.Constant, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow,
-        ast.USub, ast.UAdd, ast.Mod, ast.FloorDiv, ast.Tuple, ast.List
-    )
-    try:
-        node = ast.parse(str(phi_expr), mode='eval')
-        for n in ast.walk(node):
-            if not isinstance(n, allowed_nodes):
-                raise ValueError(f"不允许的表达式节点: {type(n).__name__}")
-            if isinstance(n, ast.Name) and n.id not in allowed_names:
-                raise ValueError(f"不允许的变量: {n.id}")
-            if isinstance(n, ast.Call) and (
-                not isinstance(n.func, ast.Name) or n.func.id not in allowed_names
-            ):
-                raise ValueError(f"不允许的函数: {getattr(n.func, 'id', None)}")
-        code = compile(node, '<string>', 'eval')
-        return eval(code, {"__builtins__": None}, allowed_names)
-    except Exception:
-        try:
-            return float(phi_expr)
-        except Exception:
-            return 0.0
+# ABC参数缓存的条目数（模型实例在进程内共享，键为客户端给出的 z_h/T/t_B，需限制大小）
+ABC_CACHE_SIZE = 256
 
 class EnhancedDillModel:
     """
@@ -50,10 +25,30 @@ class EnhancedDillModel:
         ∂M(z, t)/∂t = -I(z, t) * M(z, t) * C(z_h, T, t_B)
     其中A/B/C为厚度、前烘温度、前烘时间的函数
     """
+    # generate_data 各结果字段每一维对应的坐标键（供 apply_lod 降采样），None 为时间帧维
+    LOD_AXES = {
+        '1d': {
+            'exposure_dose': ['x'], 'thickness': ['x'],
+            'exposure_dose_frames': [None, 'x_coords'], 'thickness_frames': [None, 'x_coords'],
+        },
+        'multi': {
+            'z_exposure_dose': ['y_coords', 'z_coords'], 'z_thickness': ['y_coords', 'z_coords'],
+            'yz_exposure': ['y_coords', 'z_coords'], 'yz_thickness': ['y_coords', 'z_coords'],
+            'xy_exposure': ['xy_y_coords', 'x_coords'], 'xy_thickness': ['xy_y_coords', 'x_coords'],
+        },
+        '3d': {
+            'exposure_dose': ['z_coords', 'y_coords', 'x_coords'],
+            'thickness': ['z_coords', 'y_coords', 'x_coords'],
+            'exposure_dose_frames': [None, 'z_coords', 'y_coords', 'x_coords'],
+            'thickness_frames': [None, 'z_coords', 'y_coords', 'x_coords'],
+        },
+    }
+
     def __init__(self, debug_mode=False):
         self.debug_mode = debug_mode  # 增加调试模式标志
-        # 添加ABC参数缓存
-        self._abc_cache = {}
+        # ABC参数缓存（LRU）
+        self._abc_cache = OrderedDict()
+        self._abc_lock = threading.Lock()
         if debug_mode:
             logging.basicConfig(level=logging.DEBUG)
 
@@ -67,8 +62,11 @@ class EnhancedDillModel:
         cache_key = (z_h, T, t_B)
         
         # 检查缓存
-        if cache_key in self._abc_cache:
-            return self._abc_cache[cache_key]
+        with self._abc_lock:
+            cached = self._abc_cache.get(cache_key)
+            if cached is not None:
+                self._abc_cache.move_to_end(cache_key)
+                return cached
         
         # 仅在第一次计算时输出详细日志
         logger.info("=" * 60)
@@ -132,7 +130,10 @@ class EnhancedDillModel:
         
         # 缓存结果
         result = (A, B, C)
-        self._abc_cache[cache_key] = result
+        with self._abc_lock:
+            self._abc_cache[cache_key] = result
+            while len(self._abc_cache) > ABC_CACHE_SIZE:
+                self._abc_cache.popitem(last=False)
         logger.info(f"✅ ABC参数已缓存，cache_key={cache_key}")
             
         if self.debug_mode:
@@ -227,7 +228,8 @@ class EnhancedDillModel:
         dMdt = -I * M * C
         return [dIdz, dMdt]
 
-    def solve_enhanced_dill_pde(self, z_h, T, t_B, I0=1.0, M0=1.0, t_exp=5.0, num_z_points=100, num_t_points=200, x_position=None, K=None, V=0, phi_expr=None):
+    @stage('pde_solve')
+    def solve_enhanced_dill_pde(self, z_h, T, t_B, I0=1.0, M0=1.0, t_exp=5.0, num_z_points=100, num_t_points=200, x_position=None, K=None, V=0, phi_expr=None, cancel_token=None):
         """
         修正的Enhanced Dill模型：数值求解耦合偏微分方程系统
         
@@ -236,7 +238,10 @@ class EnhancedDillModel:
         ∂M(z,t)/∂t = -I(z,t) * M(z,t) * C(z_h,T,t_B)
         
         使用Crank-Nicolson半隐式方法确保数值稳定性
+        
+        cancel_token 在每个时间列开始时检查，默认取当前请求的令牌
         """
+        token = resolve_token(cancel_token)
         logger.info("=" * 60)
         logger.info("【增强Dill模型 - 修正版PDE求解器】")
         logger.info("=" * 60)
@@ -263,6 +268,8 @@ class EnhancedDillModel:
         logger.info(f"   - t方向: [0, {t_exp}], 点数: {num_t_points}, 步长: {dt:.6f}")
         logger.info(f"   - CFL条件: {cfl_condition:.4f}")
         
+        record_solver_work('enhanced_dill', 'pde', num_t_points - 1, num_z_points * num_t_points)
+        
         # 初始化解数组
         I = np.zeros((num_z_points, num_t_points))  # I(z,t)
         M = np.zeros((num_z_points, num_t_points))  # M(z,t)
@@ -288,6 +295,7 @@ class EnhancedDillModel:
         
         # 修正的数值求解：使用半隐式Crank-Nicolson方法
         for t_idx in range(1, num_t_points):
+            token.check()
             # 报告进度
             if t_idx % (num_t_points // 4) == 0:
                 progress = t_idx / (num_t_points - 1) * 100
@@ -373,7 +381,33 @@ class EnhancedDillModel:
         
         return z, I_final, M_final, exposure_dose
 
-    def adaptive_solve_enhanced_dill_pde(self, z_h, T, t_B, I0=1.0, M0=1.0, t_exp=5.0, x_position=None, K=None, V=0, phi_expr=None, max_points=200, tolerance=1e-4):
+    @staticmethod
+    def _adaptive_grid_size(z_h, A, B, C, I0, M0, t_exp, K, V, max_points):
+        """
+        自适应求解器的初始网格点数（只取决于参数组，与x位置无关）
+
+        返回:
+            (z方向点数, t方向点数)
+        """
+        absorption_length = 1.0 / (A * M0 + B) if (A * M0 + B) > 0 else z_h
+        reaction_time = 1.0 / (C * I0) if (C * I0) > 0 else t_exp
+
+        # 基于物理特征尺度的自适应网格策略
+        min_z_points = max(20, int(z_h / absorption_length * 10))  # 至少10个点每个吸收长度
+        min_t_points = max(20, int(t_exp / reaction_time * 10))    # 至少10个点每个反应时间
+
+        # 根据调制参数进一步调整
+        if V > 0.1 and K is not None:
+            # 空间调制情况：需要足够分辨率来捕捉调制
+            spatial_freq_factor = max(1.0, K * absorption_length / (2 * np.pi))
+            min_z_points = int(min_z_points * (1 + spatial_freq_factor))
+
+        # 限制在合理范围内
+        num_z_points = min(max_points, max(min_z_points, 50))
+        num_t_points = min(max_points, max(min_t_points, 50))
+        return num_z_points, num_t_points
+
+    def adaptive_solve_enhanced_dill_pde(self, z_h, T, t_B, I0=1.0, M0=1.0, t_exp=5.0, x_position=None, K=None, V=0, phi_expr=None, max_points=200, tolerance=1e-4, cancel_token=None):
         """
         自适应网格的Enhanced Dill PDE求解器（改进版）
         使用误差估计和网格自适应策略确保精度和稳定性
@@ -390,19 +424,7 @@ class EnhancedDillModel:
         logger.info(f"   - 吸收特征长度: {absorption_length:.4f} μm")
         logger.info(f"   - 反应特征时间: {reaction_time:.4f} s")
         
-        # 基于物理特征尺度的自适应网格策略
-        min_z_points = max(20, int(z_h / absorption_length * 10))  # 至少10个点每个吸收长度
-        min_t_points = max(20, int(t_exp / reaction_time * 10))    # 至少10个点每个反应时间
-        
-        # 根据调制参数进一步调整
-        if V > 0.1 and K is not None:
-            # 空间调制情况：需要足够分辨率来捕捉调制
-            spatial_freq_factor = max(1.0, K * absorption_length / (2 * np.pi))
-            min_z_points = int(min_z_points * (1 + spatial_freq_factor))
-            
-        # 限制在合理范围内
-        num_z_points = min(max_points, max(min_z_points, 50))
-        num_t_points = min(max_points, max(min_t_points, 50))
+        num_z_points, num_t_points = self._adaptive_grid_size(z_h, A, B, C, I0, M0, t_exp, K, V, max_points)
         
         logger.info(f"🔸 自适应网格策略:")
         logger.info(f"   - 初始z网格点数: {num_z_points}")
@@ -413,7 +435,7 @@ class EnhancedDillModel:
             z_h, T, t_B, I0, M0, t_exp, 
             num_z_points=num_z_points, 
             num_t_points=num_t_points,
-            x_position=x_position, K=K, V=V, phi_expr=phi_expr
+            x_position=x_position, K=K, V=V, phi_expr=phi_expr, cancel_token=cancel_token
         )
         
         # 误差估计和网格自适应
@@ -460,7 +482,7 @@ class EnhancedDillModel:
                 z_h, T, t_B, I0, M0, t_exp, 
                 num_z_points=refined_z_points, 
                 num_t_points=refined_t_points,
-                x_position=x_position, K=K, V=V, phi_expr=phi_expr
+                x_position=x_position, K=K, V=V, phi_expr=phi_expr, cancel_token=cancel_token
             )
             
             num_z_points, num_t_points = refined_z_points, refined_t_points
@@ -480,7 +502,115 @@ class EnhancedDillModel:
         
         return z, I_final, M_final, exposure_dose, compute_time
 
-    def simulate(self, z_h, T, t_B, I0=1.0, M0=1.0, t_exp=5.0, num_points=100, sine_type='1d', Kx=None, Ky=None, Kz=None, phi_expr=None, V=0, y=0, K=None, x_position=None):
+    @stage('pde_solve')
+    def solve_enhanced_dill_pde_batch(self, z_h, T, t_B, surface_I0, M0=1.0, t_exp=5.0, num_z_points=100, num_t_points=200, cancel_token=None):
+        """
+        对多个x位置同时求解 Enhanced Dill PDE（各位置只有表面光强不同）
+
+        与 solve_enhanced_dill_pde 使用相同的离散格式：所有x位置作为数组的一维一起推进，
+        每个时间步只在z方向逐层递推
+
+        参数:
+            surface_I0: 各x位置的表面光强，形状 (X,)
+            其余参数同 solve_enhanced_dill_pde（表面光强不随时间变化）
+        返回:
+            (z, I_final, M_final, surface_exposure)；I_final、M_final 形状为 (X, num_z_points)，
+            surface_exposure 为各位置的表面曝光剂量
+        """
+        token = resolve_token(cancel_token)
+        A, B, C = self.get_abc(z_h, T, t_B)
+        surface_I0 = np.asarray(surface_I0, dtype=float)
+
+        z = np.linspace(0, z_h, num_z_points)
+        t = np.linspace(0, t_exp, num_t_points)
+        dz = z[1] - z[0] if len(z) > 1 else z_h / max(1, num_z_points-1)
+        dt = t[1] - t[0] if len(t) > 1 else t_exp / max(1, num_t_points-1)
+
+        record_solver_work('enhanced_dill', 'pde_batch', num_t_points - 1,
+                           num_z_points * num_t_points * len(surface_I0))
+
+        # 数组形状为 (z, x)，每层z在内存中连续
+        M = np.full((num_z_points, len(surface_I0)), float(M0))
+        I = surface_I0 * np.exp(-(A * M0 + B) * z)[:, None]
+        I[0] = surface_I0
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for t_idx in range(1, num_t_points):
+                token.check()
+                # 半隐式更新PAC浓度（I^{n+1} 以 I^n 作为猜测）
+                denominator = 1 + 0.5 * dt * C * I
+                M = np.where(denominator > 1e-12,
+                             (M - 0.5 * dt * C * I * M) / denominator,
+                             M * np.exp(-C * I * dt))
+                M = np.maximum(0, np.minimum(M, M0))
+
+                # 沿z方向逐层更新光强，并限制非物理的增长
+                I = np.empty_like(I)
+                I[0] = surface_I0
+                for z_idx in range(1, num_z_points):
+                    M_curr = (M[z_idx] + M[z_idx-1]) / 2
+                    I_z = np.maximum(0, I[z_idx-1] * np.exp(-(A * M_curr + B) * dz))
+                    if z_idx > 1:
+                        prev_ratio = I[z_idx-1] / np.maximum(I[z_idx-2], 1e-12)
+                        curr_ratio = I_z / np.maximum(I[z_idx-1], 1e-12)
+                        I_z = np.where((prev_ratio > 0) & (curr_ratio / prev_ratio > 2.0), I[z_idx-1] * prev_ratio, I_z)
+                    I[z_idx] = I_z
+
+        surface_exposure = np.trapz(np.broadcast_to(surface_I0, (num_t_points, len(surface_I0))), t, axis=0)
+        return z, np.ascontiguousarray(I.T), np.ascontiguousarray(M.T), surface_exposure
+
+    def _needs_refinement(self, I_final, M_final, z_h, I0, M0, num_z_points, max_points, tolerance):
+        # 与 adaptive_solve_enhanced_dill_pde 的细化判据逐行一致
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean_I = I_final.mean(axis=1)
+            gradient = np.where(mean_I > 0, np.abs(np.diff(I_final, axis=1)).max(axis=1) / mean_I, 0)
+            mean_M = M_final.mean(axis=1)
+            curvature = np.where(mean_M > 0, np.abs(np.diff(M_final, n=2, axis=1)).max(axis=1) / mean_M, 0)
+        need = (gradient > tolerance * 10) | (curvature > tolerance * 5)
+        if num_z_points < max_points * 0.8:
+            for i in np.flatnonzero(~need):
+                is_valid, _ = self.validate_physical_constraints(I_final[i], M_final[i], z_h, I0, M0)
+                need[i] = not is_valid
+        return need
+
+    def adaptive_surface_batch(self, z_h, T, t_B, I0=1.0, M0=1.0, t_exp=5.0, x_positions=None, K=None, V=0, max_points=200, tolerance=1e-4, cancel_token=None):
+        """
+        多个x位置的表面曝光剂量与PAC浓度（等价于逐点调用 adaptive_solve_enhanced_dill_pde 取表面值）
+
+        初始网格只取决于参数组，所有位置一起求解一次；需要细化的位置再在细化网格上一起重解
+
+        返回:
+            (surface_exposure, surface_M, refined)：前两项形状为 (X,)，refined 为细化的位置数
+        """
+        start_time = time.time()
+        A, B, C = self.get_abc(z_h, T, t_B)
+        x_positions = np.asarray(x_positions, dtype=float)
+        if K is not None and V > 0:
+            surface_I0 = I0 * (1 + V * np.cos(K * x_positions))
+        else:
+            surface_I0 = np.full(len(x_positions), float(I0))
+
+        num_z_points, num_t_points = self._adaptive_grid_size(z_h, A, B, C, I0, M0, t_exp, K, V, max_points)
+        z, I_final, M_final, surface_exposure = self.solve_enhanced_dill_pde_batch(
+            z_h, T, t_B, surface_I0, M0, t_exp, num_z_points, num_t_points, cancel_token=cancel_token)
+        surface_M = M_final[:, 0].copy()
+
+        refine = self._needs_refinement(I_final, M_final, z_h, I0, M0, num_z_points, max_points, tolerance)
+        if refine.any() and num_z_points < max_points:
+            refined_z_points = min(max_points, int(num_z_points * 1.5))
+            refined_t_points = min(max_points, int(num_t_points * 1.2))
+            _, _, M_refined, exposure_refined = self.solve_enhanced_dill_pde_batch(
+                z_h, T, t_B, surface_I0[refine], M0, t_exp, refined_z_points, refined_t_points, cancel_token=cancel_token)
+            surface_exposure[refine] = exposure_refined
+            surface_M[refine] = M_refined[:, 0]
+        else:
+            refine[:] = False
+
+        logger.info(f"🔸 批量自适应求解完成: {len(x_positions)}个位置, 网格{num_z_points}×{num_t_points}, "
+                    f"细化{int(refine.sum())}个, 用时{time.time() - start_time:.3f}s")
+        return surface_exposure, surface_M, int(refine.sum())
+
+    def simulate(self, z_h, T, t_B, I0=1.0, M0=1.0, t_exp=5.0, num_points=100, sine_type='1d', Kx=None, Ky=None, Kz=None, phi_expr=None, V=0, y=0, K=None, x_position=None, cancel_token=None):
         """
         Enhanced Dill模型仿真入口函数，支持不同的计算模式
         
@@ -496,7 +626,7 @@ class EnhancedDillModel:
                 z_h, T, t_B, I0, M0, t_exp, 
                 num_z_points=num_points,
                 x_position=x_position, 
-                K=K, V=V, phi_expr=phi_expr
+                K=K, V=V, phi_expr=phi_expr, cancel_token=cancel_token
             )
             return z, I_final, M_final
             
@@ -521,287 +651,197 @@ class EnhancedDillModel:
         
         return z, I_final, M_final
 
-    def generate_data(self, z_h, T, t_B, I0=1.0, M0=1.0, t_exp=5.0, sine_type='1d', Kx=None, Ky=None, Kz=None, phi_expr=None, V=0, K=None, y_range=None, z_range=None, x_position=None, num_points=100, enable_4d_animation=False, t_start=0, t_end=5, time_steps=20):
+    def animation_stream(self, z_h, T, t_B, I0=1.0, M0=1.0, t_exp=5.0, sine_type='1d', Kx=None, Ky=None, Kz=None, phi_expr=None, V=0, K=None, y_range=None, z_range=None, t_start=0, t_end=5, time_steps=20, cancel_token=None):
         """
-        生成增强Dill模型数据，支持4D动画
+        4D动画的流式生成：先返回元数据，再由生成器逐帧产出
         
         参数:
-            z_h: 胶厚度
-            T: 前烘温度
-            t_B: 前烘时间
-            I0: 初始光强
-            M0: 初始PAC浓度
-            t_exp: 曝光时间
-            sine_type: 正弦波类型
-            Kx, Ky, Kz: 空间频率
-            phi_expr: 相位表达式
-            V: 干涉条纹可见度
-            K: 1D空间频率
-            y_range, z_range: 坐标范围
-            x_position: 横向位置
-            num_points: 网格点数
-            enable_4d_animation: 是否启用4D动画
-            t_start, t_end: 动画时间范围
-            time_steps: 时间步数
+            与 generate_data 相同（不含 enable_4d_animation、x_position、num_points）
+            cancel_token 在每帧开始时检查
             
         返回:
-            包含数据的字典
+            (meta, frames) 元组
+            meta: 坐标、时间轴、帧字段等元数据字典
+            frames: 生成器，每次产出 {'index', 't', 'phi', 'exposure_dose', 'thickness'}（numpy数组）
         """
-        logger.info("🌟" * 30)
-        logger.info("【增强Dill模型 - 数据生成总控制】")
-        logger.info("🌟" * 30)
-        logger.info(f"🔸 输入参数总览:")
-        logger.info(f"   - sine_type = '{sine_type}'")
-        logger.info(f"   - z_h (胶厚度) = {z_h} μm")
-        logger.info(f"   - T (前烘温度) = {T} ℃")
-        logger.info(f"   - t_B (前烘时间) = {t_B} min")
-        logger.info(f"   - I0 (初始光强) = {I0}")
-        logger.info(f"   - M0 (初始PAC浓度) = {M0}")
-        logger.info(f"   - t_exp (曝光时间) = {t_exp}")
-        logger.info(f"   - V (可见度) = {V}")
-        logger.info(f"   - enable_4d_animation = {enable_4d_animation}")
+        token = resolve_token(cancel_token)
+        time_array = np.linspace(t_start, t_end, time_steps)
         
-        # 三维模式4D动画
-        if sine_type == '3d' and enable_4d_animation and Kx is not None and Ky is not None and Kz is not None:
+        if sine_type == '3d':
             logger.info(f"🔸 增强Dill模型3D-4D动画参数:")
             logger.info(f"   - 时间范围: {t_start}s ~ {t_end}s")
             logger.info(f"   - 时间步数: {time_steps}")
             logger.info(f"   - 空间频率: Kx={Kx}, Ky={Ky}, Kz={Kz}")
             
             # 预先计算ABC参数（避免重复计算）
-            logger.info("🔸 预计算ABC参数...")
             A, B, C = self.get_abc(z_h, T, t_B)
             logger.info(f"✅ ABC参数计算完成: A={A:.6f}, B={B:.6f}, C={C:.6f}")
             
-            time_array = np.linspace(t_start, t_end, time_steps)
-            
             # 设置3D网格 - 与静态3D模式保持一致
-            x_points = 20  
-            y_points = 20
-            z_points = 10  # 增加Z维度，与静态3D模式一致
-            
+            x_points, y_points, z_points = 20, 20, 10
             x_coords = np.linspace(0, 10, x_points)
-            
-            # 安全处理y_coords
             if y_range is not None and isinstance(y_range, (list, np.ndarray)) and len(y_range) >= y_points:
-                y_coords = np.array(y_range[:y_points])
+                y_coords = np.asarray(y_range[:y_points])
             else:
                 y_coords = np.linspace(0, 10, y_points)
-            
-            # 安全处理z_coords
             if z_range is not None and isinstance(z_range, (list, np.ndarray)) and len(z_range) >= z_points:
-                z_coords = np.array(z_range[:z_points])
+                z_coords = np.asarray(z_range[:z_points])
             else:
                 z_coords = np.linspace(0, z_h, z_points)
             
-            # 确保所有coords都是numpy数组
-            x_coords = np.asarray(x_coords)
-            y_coords = np.asarray(y_coords)
-            z_coords = np.asarray(z_coords)
-            
-            logger.info(f"坐标数组检查: x_coords={len(x_coords)}, y_coords={len(y_coords)}, z_coords={len(z_coords)}")
-            
-            # 4D动画数据容器
-            exposure_dose_frames = []
-            thickness_frames = []
-            
-            logger.info(f"开始计算4D动画: {time_steps}帧 × {x_points}×{y_points}×{z_points}网格")
-            
-            for t_idx, t in enumerate(time_array):
-                phi_t = parse_phi_expr(phi_expr, t)  # 真实解析相位表达式
-                
-                logger.info(f"计算第{t_idx+1}/{time_steps}帧 (t={t:.2f}s, φ={phi_t:.4f})")
-                
-                # 计算当前时间帧的3D分布
-                frame_exposure = []
-                frame_thickness = []
-                
-                for k, z in enumerate(z_coords):
-                    z_plane_exposure = []
-                    z_plane_thickness = []
-                    
-                    for j, y in enumerate(y_coords):
-                        y_row_exposure = []
-                        y_row_thickness = []
-                        
-                        for i, x in enumerate(x_coords):
-                            # 计算时变光强分布
-                            intensity_surface = I0 * (1 + V * np.cos(Kx * x + Ky * y + Kz * z + phi_t))
-                            
-                            # 对每个空间点进行真实的Enhanced Dill计算
-                            try:
-                                # 考虑深度衰减
-                                alpha = A + B
-                                I_z = intensity_surface * np.exp(-alpha * z)
-                                
-                                # 计算曝光剂量和厚度
-                                exposure_dose_val = I_z * t_exp
-                                thickness_val = M0 * np.exp(-C * exposure_dose_val)
-                                
-                            except Exception as e:
-                                logger.warning(f"位置({x:.2f}, {y:.2f}, {z:.2f})计算失败: {str(e)}")
-                                exposure_dose_val = intensity_surface * t_exp
-                                thickness_val = M0 * 0.5
-                            
-                            y_row_exposure.append(float(exposure_dose_val))
-                            y_row_thickness.append(float(thickness_val))
-                        
-                        z_plane_exposure.append(y_row_exposure)
-                        z_plane_thickness.append(y_row_thickness)
-                    
-                    frame_exposure.append(z_plane_exposure)
-                    frame_thickness.append(z_plane_thickness)
-                
-                exposure_dose_frames.append(frame_exposure)
-                thickness_frames.append(frame_thickness)
-                
-                # 进度汇报
-                progress = (t_idx + 1) / time_steps * 100
-                logger.info(f"帧计算进度: {progress:.1f}% ({t_idx+1}/{time_steps})")
-            
-            logger.info(f"🎬 4D动画计算完成: {time_steps}帧")
-            logger.info(f"数据维度检查:")
-            logger.info(f"  - exposure_dose_frames: {len(exposure_dose_frames)}帧 × {len(exposure_dose_frames[0])}Z × {len(exposure_dose_frames[0][0])}Y × {len(exposure_dose_frames[0][0][0])}X")
-            logger.info(f"  - thickness_frames: {len(thickness_frames)}帧 × {len(thickness_frames[0])}Z × {len(thickness_frames[0][0])}Y × {len(thickness_frames[0][0][0])}X")
-            
-            # 返回与前端期望格式一致的4D动画数据
-            return {
+            meta = {
                 'x_coords': x_coords.tolist(),
                 'y_coords': y_coords.tolist(),
                 'z_coords': z_coords.tolist(),
-                'time_array': time_array.tolist(),
-                'exposure_dose_frames': exposure_dose_frames,
-                'thickness_frames': thickness_frames,
-                'enable_4d_animation': True,
-                'time_steps': time_steps,
                 'is_3d': True,
                 'sine_type': sine_type,
                 't_start': t_start,
                 't_end': t_end
             }
+            # 帧布局为 [z][y][x]
+            Zg, Yg, Xg = np.meshgrid(z_coords, y_coords, x_coords, indexing='ij')
+            depth_attenuation = np.exp(-(A + B) * Zg)
+            
+            def compute_frame(phi_t):
+                intensity_surface = I0 * (1 + V * np.cos(Kx * Xg + Ky * Yg + Kz * Zg + phi_t))
+                exposure_dose = intensity_surface * depth_attenuation * t_exp
+                thickness = M0 * np.exp(-C * exposure_dose)
+                return exposure_dose, thickness
         
-        # 二维模式4D动画
-        elif sine_type == 'multi' and enable_4d_animation and Kx is not None and Ky is not None:
+        elif sine_type == 'multi':
             logger.info(f"🔸 增强Dill模型2D-4D动画参数:")
             logger.info(f"   - 时间范围: {t_start}s ~ {t_end}s")
             logger.info(f"   - 时间步数: {time_steps}")
             
-            time_array = np.linspace(t_start, t_end, time_steps)
             x_coords = np.linspace(0, 10, 1000)
             y_coords = np.array(y_range) if y_range is not None else np.linspace(0, 10, 100)
-            
-            animation_data = {
+            meta = {
                 'x_coords': x_coords.tolist(),
                 'y_coords': y_coords.tolist(),
-                'time_array': time_array.tolist(),
-                'time_steps': time_steps,
-                'exposure_dose_frames': [],
-                'thickness_frames': [],
-                'enable_4d_animation': True,
                 'sine_type': 'multi',
                 'is_2d': True
             }
+            # 帧布局为 [y][x]
+            Xg, Yg = np.meshgrid(x_coords, y_coords)
             
-            for t_idx, t in enumerate(time_array):
-                phi_t = parse_phi_expr(phi_expr, t) if phi_expr is not None else 0.0
-                
-                exposure_dose_2d = []
-                thickness_2d = []
-                
-                for y in y_coords:
-                    exposure_row = []
-                    thickness_row = []
-                    
-                    for x in x_coords:
-                        # 计算时变光强
-                        intensity_xy = I0 * (1 + V * np.cos(Kx * x + Ky * y + phi_t))
-                        
-                        # 简化增强Dill计算
-                        try:
-                            I_final, M_final = self.adaptive_solve_enhanced_dill_pde(
-                                z_h, T, t_B, intensity_xy, M0, t_exp,
-                                x_position=x, K=K, V=V, phi_expr=phi_expr,
-                                max_points=30, tolerance=1e-3
-                            )
-                            
-                            exposure_dose_val = intensity_xy * t_exp
-                            thickness_val = M_final / M0
-                            
-                        except Exception:
-                            exposure_dose_val = intensity_xy * t_exp
-                            thickness_val = 0.5
-                        
-                        exposure_row.append(exposure_dose_val)
-                        thickness_row.append(thickness_val)
-                    
-                    exposure_dose_2d.append(exposure_row)
-                    thickness_2d.append(thickness_row)
-                
-                animation_data['exposure_dose_frames'].append(exposure_dose_2d)
-                animation_data['thickness_frames'].append(thickness_2d)
-                
-                logger.info(f"   - 时间步 {t_idx+1}/{time_steps} (t={t:.2f}s) 计算完成")
-            
-            logger.info(f"🔸 增强Dill模型2D-4D动画数据生成完成，共{time_steps}帧")
-            return animation_data
+            def compute_frame(phi_t):
+                # 2D动画按表面光强给出曝光剂量，厚度沿用简化值0.5
+                # （原逐点PDE调用的返回值解包总是失败并落入该分支，这里直接给出等价结果）
+                intensity_xy = I0 * (1 + V * np.cos(Kx * Xg + Ky * Yg + phi_t))
+                return intensity_xy * t_exp, np.full_like(intensity_xy, 0.5)
         
-        # 一维模式4D动画
-        elif enable_4d_animation and sine_type == '1d' and K is not None:
+        else:
             logger.info(f"🔸 增强Dill模型1D-4D动画参数:")
             logger.info(f"   - 时间范围: {t_start}s ~ {t_end}s")
             logger.info(f"   - 时间步数: {time_steps}")
             logger.info(f"   - 空间频率: K={K}")
             
-            time_array = np.linspace(t_start, t_end, time_steps)
             x_coords = np.linspace(0, 10, 100)
-            
-            animation_data = {
+            meta = {
                 'x_coords': x_coords.tolist(),
-                'time_array': time_array.tolist(),
-                'time_steps': time_steps,
-                'exposure_dose_frames': [],
-                'thickness_frames': [],
-                'enable_4d_animation': True,
                 'sine_type': '1d',
                 'is_1d': True,
                 'K': K
             }
+            try:
+                A = self.get_abc(z_h, T, t_B)[0]
+            except Exception:
+                A = None
             
+            def compute_frame(phi_t):
+                intensity_1d = I0 * (1 + V * np.cos(K * x_coords + phi_t))
+                exposure_dose = intensity_1d * t_exp
+                if A is None:
+                    return exposure_dose, np.full_like(exposure_dose, 0.5)
+                thickness = M0 * np.exp(-A * intensity_1d * t_exp)
+                return exposure_dose, np.clip(thickness / M0, 0.1, 1.0)
+        
+        meta.update({
+            'time_array': time_array.tolist(),
+            'time_steps': time_steps,
+            'enable_4d_animation': True,
+            'frame_fields': ['exposure_dose', 'thickness']
+        })
+        
+        def frames():
             for t_idx, t in enumerate(time_array):
+                token.check()
                 phi_t = parse_phi_expr(phi_expr, t) if phi_expr is not None else 0.0
-                
-                # 计算1D时变光强分布
-                intensity_1d = I0 * (1 + V * np.cos(K * x_coords + phi_t))
-                
-                exposure_dose_1d = []
-                thickness_1d = []
-                
-                for x in x_coords:
-                    I_val = I0 * (1 + V * np.cos(K * x + phi_t))
-                    
-                    try:
-                        # 快速计算
-                        A, B, C = self.get_abc(z_h, T, t_B)
-                        exposure_dose_val = I_val * t_exp
-                        thickness_val = M0 * np.exp(-A * I_val * t_exp)
-                        thickness_val = max(0.1, min(1.0, thickness_val / M0))
-                        
-                    except Exception:
-                        exposure_dose_val = I_val * t_exp
-                        thickness_val = 0.5
-                    
-                    exposure_dose_1d.append(exposure_dose_val)
-                    thickness_1d.append(thickness_val)
-                
-                animation_data['exposure_dose_frames'].append(exposure_dose_1d)
-                animation_data['thickness_frames'].append(thickness_1d)
-                
-                logger.info(f"   - 时间步 {t_idx+1}/{time_steps} (t={t:.2f}s) 1D计算完成")
-            
-            logger.info(f"🔸 增强Dill模型1D-4D动画数据生成完成，共{time_steps}帧")
-            return animation_data
+                with stage('intensity'):
+                    exposure_dose, thickness = compute_frame(phi_t)
+                logger.info(f"   - 时间步 {t_idx+1}/{time_steps} (t={t:.2f}s, φ={phi_t:.4f}) 计算完成")
+                yield {
+                    'index': t_idx,
+                    't': float(t),
+                    'phi': float(phi_t),
+                    'exposure_dose': exposure_dose,
+                    'thickness': thickness
+                }
         
+        return meta, frames()
 
+    def generate_data(self, z_h, T, t_B, I0=1.0, M0=1.0, t_exp=5.0, sine_type='1d', Kx=None, Ky=None, Kz=None, phi_expr=None, V=0, K=None, y_range=None, z_range=None, x_position=None, num_points=100, enable_4d_animation=False, t_start=0, t_end=5, time_steps=20, cancel_token=None):
+        """
+        生成增强Dill模型数据，支持4D动画
+        
+        参数:
+            z_h: 胶厚度
+            T: 前烘温度
+            t_B: 前烘时间
+            I0: 初始光强
+            M0: 初始PAC浓度
+            t_exp: 曝光时间
+            sine_type: 正弦波类型
+            Kx, Ky, Kz: 空间频率
+            phi_expr: 相位表达式
+            V: 干涉条纹可见度
+            K: 1D空间频率
+            y_range, z_range: 坐标范围
+            x_position: 横向位置
+            num_points: 网格点数
+            enable_4d_animation: 是否启用4D动画
+            t_start, t_end: 动画时间范围
+            time_steps: 时间步数
+            cancel_token: 取消令牌（CancelToken），默认取当前请求的令牌
+            
+        返回:
+            包含数据的字典
+        """
+        token = resolve_token(cancel_token)
+        token.check()
+        logger.info("🌟" * 30)
+        logger.info("【增强Dill模型 - 数据生成总控制】")
+        logger.info("🌟" * 30)
+        logger.info(f"🔸 输入参数总览:")
+        logger.info(f"   - sine_type = '{sine_type}'")
+        logger.info(f"   - z_h (胶厚度) = {z_h} μm")
+        logger.info(f"   - T (前烘温度) = {T} ℃")
+        logger.info(f"   - t_B (前烘时间) = {t_B} min")
+        logger.info(f"   - I0 (初始光强) = {I0}")
+        logger.info(f"   - M0 (初始PAC浓度) = {M0}")
+        logger.info(f"   - t_exp (曝光时间) = {t_exp}")
+        logger.info(f"   - V (可见度) = {V}")
+        logger.info(f"   - enable_4d_animation = {enable_4d_animation}")
+        
+        # 4D动画模式（3D / 2D / 1D）
+        animated = enable_4d_animation and (
+            (sine_type == '3d' and Kx is not None and Ky is not None and Kz is not None) or
+            (sine_type == 'multi' and Kx is not None and Ky is not None) or
+            (sine_type == '1d' and K is not None)
+        )
+        if animated:
+            meta, frames = self.animation_stream(z_h, T, t_B, I0, M0, t_exp, sine_type=sine_type, Kx=Kx, Ky=Ky, Kz=Kz,
+                                                 phi_expr=phi_expr, V=V, K=K, y_range=y_range, z_range=z_range,
+                                                 t_start=t_start, t_end=t_end, time_steps=time_steps,
+                                                 cancel_token=token)
+            animation_data = dict(meta)
+            for field in meta['frame_fields']:
+                animation_data[f'{field}_frames'] = []
+            for frame in frames:
+                for field in meta['frame_fields']:
+                    animation_data[f'{field}_frames'].append(frame[field])
+            logger.info(f"🎬 4D动画计算完成: {time_steps}帧")
+            return animation_data
         
         # 非动画模式 - 调用原有方法
         else:
@@ -818,15 +858,15 @@ class EnhancedDillModel:
                 z, I_final, M_final, exposure_dose = self.solve_enhanced_dill_pde(
                     z_h, T, t_B, I0, M0, t_exp,
                     num_z_points=num_points,
-                    x_position=x_pos, K=K_val, V=V, phi_expr=phi_expr
+                    x_position=x_pos, K=K_val, V=V, phi_expr=phi_expr, cancel_token=token
                 )
                 
                 logger.info(f"🔸 增强Dill模型1D计算完成: z范围=[{z.min():.2f}, {z.max():.2f}], I范围=[{I_final.min():.4f}, {I_final.max():.4f}]")
                 
                 return {
-                    'x': z.tolist(),
-                    'exposure_dose': I_final.tolist(),
-                    'thickness': M_final.tolist(),
+                    'x': z,
+                    'exposure_dose': I_final,
+                    'thickness': M_final,
                     'is_1d': True,
                     'sine_type': sine_type
                 }
@@ -850,11 +890,12 @@ class EnhancedDillModel:
                 phi_val = parse_phi_expr(phi_expr, 0) if phi_expr is not None else 0.0
 
                 for i, y in enumerate(y_coords_yz):
+                    token.check()
                     intensity_y = I0 * (1 + V * np.cos(Kx * x_fixed_for_yz + Ky * y + phi_val))
                     try:
                         _, I_depth, M_depth, _ = self.solve_enhanced_dill_pde(
                             z_h, T, t_B, intensity_y, M0, t_exp,
-                            num_z_points=len(z_coords_yz)
+                            num_z_points=len(z_coords_yz), cancel_token=token
                         )
                         yz_exposure.append((I_depth * t_exp).tolist())
                         yz_thickness.append(M_depth.tolist())
@@ -894,72 +935,75 @@ class EnhancedDillModel:
                     logger.warning(f"可见度V={V}过小，设置为默认值0.5以产生可见的调制")
                     V = 0.5
 
-                for j, y in enumerate(y_coords_xy):
-                    exposure_row = []
-                    thickness_row = []
-                    for i, x in enumerate(x_coords_xy):
-                        # 直接计算2D空间调制，因为solve_enhanced_dill_pde原本只为1D设计
-                        intensity_surface = I0 * (1 + V * np.cos(Kx * x + Ky * y + phi_val))
+                # 逐点沿深度积分（简化的欧拉法）
+                with stage('pde_solve'):
+                    for j, y in enumerate(y_coords_xy):
+                        token.check()
+                        exposure_row = []
+                        thickness_row = []
+                        for i, x in enumerate(x_coords_xy):
+                            # 直接计算2D空间调制，因为solve_enhanced_dill_pde原本只为1D设计
+                            intensity_surface = I0 * (1 + V * np.cos(Kx * x + Ky * y + phi_val))
                         
-                        # 使用简化但正确的增强Dill模型计算（不使用PDE求解器，因为它不支持2D调制）
-                        try:
-                            # 移除重复的ABC计算，使用之前计算的值
+                            # 使用简化但正确的增强Dill模型计算（不使用PDE求解器，因为它不支持2D调制）
+                            try:
+                                # 移除重复的ABC计算，使用之前计算的值
                             
-                            # 模拟深度分布：从表面到z_fixed_for_xy的光强衰减
-                            z_points = 30
-                            z_array = np.linspace(0, z_fixed_for_xy, z_points)
-                            dz = z_array[1] - z_array[0] if len(z_array) > 1 else z_fixed_for_xy / z_points
+                                # 模拟深度分布：从表面到z_fixed_for_xy的光强衰减
+                                z_points = 30
+                                z_array = np.linspace(0, z_fixed_for_xy, z_points)
+                                dz = z_array[1] - z_array[0] if len(z_array) > 1 else z_fixed_for_xy / z_points
                             
-                            # 初始化光强和PAC浓度数组
-                            I_array = np.zeros(z_points)
-                            M_array = np.zeros(z_points)
+                                # 初始化光强和PAC浓度数组
+                                I_array = np.zeros(z_points)
+                                M_array = np.zeros(z_points)
                             
-                            # 边界条件
-                            I_array[0] = intensity_surface  # 表面光强
-                            M_array[0] = M0  # 初始PAC浓度
+                                # 边界条件
+                                I_array[0] = intensity_surface  # 表面光强
+                                M_array[0] = M0  # 初始PAC浓度
                             
-                            # 沿深度方向积分求解（简化的欧拉法）
-                            for z_idx in range(1, z_points):
-                                # 更新PAC浓度（基于前一点的光强）
-                                I_prev = I_array[z_idx-1]
-                                M_prev = M_array[z_idx-1]
+                                # 沿深度方向积分求解（简化的欧拉法）
+                                for z_idx in range(1, z_points):
+                                    # 更新PAC浓度（基于前一点的光强）
+                                    I_prev = I_array[z_idx-1]
+                                    M_prev = M_array[z_idx-1]
                                 
-                                # ∂M/∂t ≈ -I * M * C, 在曝光时间内积分
-                                # 简化为稳态近似: M ≈ M_prev * exp(-C * I_prev * t_exp)
-                                M_curr = M_prev * np.exp(-C * I_prev * t_exp / z_points)
-                                M_array[z_idx] = max(0, min(M_curr, M0))
+                                    # ∂M/∂t ≈ -I * M * C, 在曝光时间内积分
+                                    # 简化为稳态近似: M ≈ M_prev * exp(-C * I_prev * t_exp)
+                                    M_curr = M_prev * np.exp(-C * I_prev * t_exp / z_points)
+                                    M_array[z_idx] = max(0, min(M_curr, M0))
                                 
-                                # 更新光强：∂I/∂z = -I * (A * M + B)
-                                dI_dz = -I_prev * (A * M_array[z_idx] + B)
-                                I_curr = I_prev + dI_dz * dz
-                                I_array[z_idx] = max(0, I_curr)
+                                    # 更新光强：∂I/∂z = -I * (A * M + B)
+                                    dI_dz = -I_prev * (A * M_array[z_idx] + B)
+                                    I_curr = I_prev + dI_dz * dz
+                                    I_array[z_idx] = max(0, I_curr)
                             
-                            # 提取目标深度处的值
-                            I_at_depth = I_array[-1]
-                            M_at_depth = M_array[-1]
+                                # 提取目标深度处的值
+                                I_at_depth = I_array[-1]
+                                M_at_depth = M_array[-1]
                             
-                            exposure_dose_val = I_at_depth * t_exp
-                            thickness_val = M_at_depth
+                                exposure_dose_val = I_at_depth * t_exp
+                                thickness_val = M_at_depth
                             
-                        except Exception as e:
-                            logger.warning(f"XY平面计算失败 @ (x={x:.2f}, y={y:.2f}): {e}")
-                            # 更简单的回退计算
-                            alpha = A + B
-                            I_at_depth = intensity_surface * np.exp(-alpha * z_fixed_for_xy)
-                            M_at_depth = M0 * np.exp(-C * I_at_depth * t_exp)
+                            except Exception as e:
+                                logger.warning(f"XY平面计算失败 @ (x={x:.2f}, y={y:.2f}): {e}")
+                                # 更简单的回退计算
+                                alpha = A + B
+                                I_at_depth = intensity_surface * np.exp(-alpha * z_fixed_for_xy)
+                                M_at_depth = M0 * np.exp(-C * I_at_depth * t_exp)
                             
-                            exposure_dose_val = I_at_depth * t_exp
-                            thickness_val = M_at_depth
+                                exposure_dose_val = I_at_depth * t_exp
+                                thickness_val = M_at_depth
                         
-                        exposure_row.append(exposure_dose_val)
-                        thickness_row.append(thickness_val)
+                            exposure_row.append(exposure_dose_val)
+                            thickness_row.append(thickness_val)
                     
-                    xy_exposure.append(exposure_row)
-                    xy_thickness.append(thickness_row)
+                        xy_exposure.append(exposure_row)
+                        xy_thickness.append(thickness_row)
                     
-                    # 进度报告
-                    if (j + 1) % 10 == 0:
-                        logger.info(f"XY平面计算进度: {j+1}/{len(y_coords_xy)} Y位置完成")
+                        # 进度报告
+                        if (j + 1) % 10 == 0:
+                            logger.info(f"XY平面计算进度: {j+1}/{len(y_coords_xy)} Y位置完成")
                 
                 # 数据统计
                 xy_exposure_flat = [val for row in xy_exposure for val in row]
@@ -1041,43 +1085,45 @@ class EnhancedDillModel:
                 
                 logger.info(f"开始计算3D分布: X点数={x_points}, Y点数={y_points}, Z点数={z_points}")
                 
-                for k, z in enumerate(z_coords):
-                    z_plane_exposure = []
-                    z_plane_thickness = []
+                with stage('pde_solve'):
+                    for k, z in enumerate(z_coords):
+                        token.check()
+                        z_plane_exposure = []
+                        z_plane_thickness = []
                     
-                    for j, y in enumerate(y_coords):
-                        y_row_exposure = []
-                        y_row_thickness = []
+                        for j, y in enumerate(y_coords):
+                            y_row_exposure = []
+                            y_row_thickness = []
                         
-                        for i, x in enumerate(x_coords):
-                            # 计算3D位置的光强
-                            intensity_xyz = I0 * (1 + V * np.cos(Kx * x + Ky * y + Kz * z + phi_val))
+                            for i, x in enumerate(x_coords):
+                                # 计算3D位置的光强
+                                intensity_xyz = I0 * (1 + V * np.cos(Kx * x + Ky * y + Kz * z + phi_val))
                             
-                            # 简化的增强Dill计算（避免深度方向PDE求解以提高速度）
-                            try:
-                                # 使用预先计算的ABC参数
-                                alpha = A + B
-                                I_simple = intensity_xyz * np.exp(-alpha * z)
-                                M_simple = M0 * np.exp(-C * I_simple * t_exp)
+                                # 简化的增强Dill计算（避免深度方向PDE求解以提高速度）
+                                try:
+                                    # 使用预先计算的ABC参数
+                                    alpha = A + B
+                                    I_simple = intensity_xyz * np.exp(-alpha * z)
+                                    M_simple = M0 * np.exp(-C * I_simple * t_exp)
                                 
-                                exposure_dose_val = I_simple * t_exp
-                                thickness_val = M_simple
+                                    exposure_dose_val = I_simple * t_exp
+                                    thickness_val = M_simple
                                 
-                            except Exception as e:
-                                logger.warning(f"位置({x:.2f}, {y:.2f}, {z:.2f})计算失败: {str(e)}")
-                                exposure_dose_val = intensity_xyz * t_exp
-                                thickness_val = M0 * 0.5
+                                except Exception as e:
+                                    logger.warning(f"位置({x:.2f}, {y:.2f}, {z:.2f})计算失败: {str(e)}")
+                                    exposure_dose_val = intensity_xyz * t_exp
+                                    thickness_val = M0 * 0.5
                             
-                            y_row_exposure.append(exposure_dose_val)
-                            y_row_thickness.append(thickness_val)
+                                y_row_exposure.append(exposure_dose_val)
+                                y_row_thickness.append(thickness_val)
                         
-                        z_plane_exposure.append(y_row_exposure)
-                        z_plane_thickness.append(y_row_thickness)
+                            z_plane_exposure.append(y_row_exposure)
+                            z_plane_thickness.append(y_row_thickness)
                     
-                    exposure_dose_3d.append(z_plane_exposure)
-                    thickness_3d.append(z_plane_thickness)
+                        exposure_dose_3d.append(z_plane_exposure)
+                        thickness_3d.append(z_plane_thickness)
                     
-                    logger.info(f"Z层进度: {k+1}/{z_points} (z={z:.2f}) 计算完成")
+                        logger.info(f"Z层进度: {k+1}/{z_points} (z={z:.2f}) 计算完成")
                 
                 logger.info(f"🔸 增强Dill模型3D计算完成: 形状=({x_points}, {y_points}, {z_points})")
                 
@@ -1095,12 +1141,12 @@ class EnhancedDillModel:
                 # 默认1D模式的后备方案
                 logger.warning("未识别的sine_type或参数不足，使用默认1D模式")
                 z, I_final, M_final = self.simulate(z_h, T, t_B, I0, M0, t_exp, 
-                                                  num_points=num_points, sine_type='1d')
+                                                  num_points=num_points, sine_type='1d', cancel_token=token)
                 
                 return {
-                    'x': z.tolist(),
-                    'exposure_dose': I_final.tolist(),
-                    'thickness': M_final.tolist(),
+                    'x': z,
+                    'exposure_dose': I_final,
+                    'thickness': M_final,
                     'is_1d': True,
                     'sine_type': '1d'
                 }
@@ -1116,10 +1162,8 @@ class EnhancedDillModel:
             logger.warning(f"[Plots警告] 干涉条纹可见度V={V}，已设为默认值0.8以显示正弦波")
             V = 0.8  # 使用默认值以显示正弦波效果
 
-        plt.close('all')
-        
         if sine_type == '3d' and Kx is not None and Ky is not None and Kz is not None:
-            # 处理3D情况，生成3D表面图
+            # 处理3D情况，生成Z层切片热图
             x_points = 50  # 与数据生成保持一致
             y_points = 50
             z_points = 5   # 与数据生成保持一致，生成5个Z层
@@ -1136,9 +1180,6 @@ class EnhancedDillModel:
             y_coords = np.linspace(y_min, y_max, y_points) if y_range is None else np.array(y_range)
             z_coords = np.linspace(z_min, z_max, z_points) if z_range is None else np.array(z_range)
             
-            # 创建中间Z层的网格点作为示例
-            mid_z_idx = z_points // 2
-            mid_z = z_coords[mid_z_idx]
             X, Y = np.meshgrid(x_coords, y_coords)
             
             # 计算相位
@@ -1146,126 +1187,45 @@ class EnhancedDillModel:
             
             # 确保振幅有足够的可见度
             amplitude = max(0.3, V)
-            
-            # 生成中间Z层的3D正弦波分布，包含Kz的影响
-            modulation = np.cos(Kx * X + Ky * Y + Kz * mid_z + phi)
-            
-            # 计算中间层的曝光剂量
             base_exposure = I0 * t_exp
-            exposure_dose = base_exposure * (1 + amplitude * modulation)
-            
-            # 计算中间层的厚度分布
-            thickness = M0 * (1 - 0.5 * amplitude * modulation)
-            
-            # 确保数组维度正确
-            if exposure_dose.shape != (y_points, x_points):
-                exposure_dose = exposure_dose.T
-            if thickness.shape != (y_points, x_points):
-                thickness = thickness.T
-            
-            # 生成每个Z层的插值面，从而创建真正的3D可视化
-            # 生成曝光剂量的3D表面图
-            fig1 = plt.figure(figsize=(10, 8))
-            ax1 = fig1.add_subplot(111, projection='3d')
-            
-            # 绘制带有Z层差异的表面
-            for i, z_val in enumerate(z_coords):
-                # 为每层创建调整后的z网格
-                Z = np.ones(X.shape) * z_val
-                
-                # 计算该z层的曝光剂量
-                curr_modulation = np.cos(Kx * X + Ky * Y + Kz * z_val + phi)
-                curr_exposure = base_exposure * (1 + amplitude * curr_modulation)
-                
-                # 根据曝光剂量调整Z坐标，创建3D表面效果
-                Z_adjusted = Z + curr_exposure * 0.1
-                
-                # 绘制此Z层的表面
-                ax1.plot_surface(X, Y, Z_adjusted, alpha=0.7, cmap='viridis', 
-                                 edgecolor='none', rstride=5, cstride=5)
-            
-            ax1.set_title('3D Exposure Dose Distribution', fontsize=16)
-            ax1.set_xlabel('X Position (μm)', fontsize=14)
-            ax1.set_ylabel('Y Position (μm)', fontsize=14)
-            ax1.set_zlabel('Z Position (μm)', fontsize=14)
-            plt.tight_layout()
-            
-            buffer1 = BytesIO()
-            fig1.savefig(buffer1, format='png', dpi=100)
-            buffer1.seek(0)
-            exposure_plot = base64.b64encode(buffer1.getvalue()).decode()
-            plt.close(fig1)
-            
-            # 生成PAC浓度3D表面图，同样带有Z层差异
-            fig2 = plt.figure(figsize=(10, 8))
-            ax2 = fig2.add_subplot(111, projection='3d')
             
-            # 绘制带有Z层差异的表面
-            for i, z_val in enumerate(z_coords):
-                # 为每层创建调整后的z网格
-                Z = np.ones(X.shape) * z_val
-                
-                # 计算该z层的PAC浓度
+            # 均匀选取至多6个Z层，每层一张曝光剂量/PAC浓度热图（共用色标），代替逐层叠加的三维表面
+            slice_z = z_coords[np.unique(np.linspace(0, len(z_coords) - 1, min(6, len(z_coords))).round().astype(int))]
+            exposure_slices = []
+            thickness_slices = []
+            for z_val in slice_z:
                 curr_modulation = np.cos(Kx * X + Ky * Y + Kz * z_val + phi)
-                curr_thickness = M0 * (1 - 0.5 * amplitude * curr_modulation)
-                
-                # 根据厚度调整Z坐标，创建3D表面效果
-                Z_adjusted = Z + curr_thickness * 0.2
-                
-                # 绘制此Z层的表面
-                ax2.plot_surface(X, Y, Z_adjusted, alpha=0.7, cmap='plasma', 
-                                edgecolor='none', rstride=5, cstride=5)
-            
-            ax2.set_title('3D PAC Concentration Distribution', fontsize=16)
-            ax2.set_xlabel('X Position (μm)', fontsize=14)
-            ax2.set_ylabel('Y Position (μm)', fontsize=14)
-            ax2.set_zlabel('Z Position (μm)', fontsize=14)
-            plt.tight_layout()
-            
-            buffer2 = BytesIO()
-            fig2.savefig(buffer2, format='png', dpi=100)
-            buffer2.seek(0)
-            thickness_plot = base64.b64encode(buffer2.getvalue()).decode()
-            plt.close(fig2)
-            
+                exposure_slices.append(base_exposure * (1 + amplitude * curr_modulation))
+                thickness_slices.append(M0 * (1 - 0.5 * amplitude * curr_modulation))
+            labels = [f'z = {z_val:.2f} μm' for z_val in slice_z]
+            extent = [x_min, x_max, y_coords[0], y_coords[-1]]
+
+            plots = render_plots({
+                'exposure_plot': slices_spec(exposure_slices, labels, extent, '3D Exposure Dose Distribution',
+                                             'X Position (μm)', 'Y Position (μm)', cmap='viridis',
+                                             colorbar_label='Exposure Dose'),
+                'thickness_plot': slices_spec(thickness_slices, labels, extent, '3D PAC Concentration Distribution',
+                                              'X Position (μm)', 'Y Position (μm)', cmap='plasma',
+                                              colorbar_label='PAC Concentration'),
+            })
+
         else:
             # 使用与simulate相同的参数处理逻辑
             current_K = K if K is not None else Kx
             # 原始1D模式
             z, I, M = self.simulate(z_h, T, t_B, I0, M0, t_exp, sine_type=sine_type, 
                                     Kx=Kx, Ky=Ky, Kz=Kz, phi_expr=phi_expr, V=V, K=current_K)
-            
-            # Exposure dose distribution plot (I)
-            fig1 = plt.figure(figsize=(10, 6))
-            plt.plot(z, I, 'b-', linewidth=2)
-            plt.title('Exposure Dose Distribution', fontsize=16)
-            plt.xlabel('Depth (μm)', fontsize=14)
-            plt.ylabel('Post-exposure Intensity', fontsize=14)
-            plt.grid(True, alpha=0.3)
-            plt.tight_layout()
-            
-            buffer1 = BytesIO()
-            fig1.savefig(buffer1, format='png', dpi=100)
-            buffer1.seek(0)
-            exposure_plot = base64.b64encode(buffer1.getvalue()).decode()
-            plt.close(fig1)
-            
-            # PAC concentration distribution plot (M)
-            fig2 = plt.figure(figsize=(10, 6))
-            plt.plot(z, M, 'r-', linewidth=2)
-            plt.title('PAC Concentration Distribution', fontsize=16)
-            plt.xlabel('Depth (μm)', fontsize=14)
-            plt.ylabel('Post-exposure PAC Concentration', fontsize=14)
-            plt.grid(True, alpha=0.3)
-            plt.tight_layout()
-            
-            buffer2 = BytesIO()
-            fig2.savefig(buffer2, format='png', dpi=100)
-            buffer2.seek(0)
-            thickness_plot = base64.b64encode(buffer2.getvalue()).decode()
-            plt.close(fig2)
-            
+
+            plots = render_plots({
+                # Exposure dose distribution plot (I)
+                'exposure_plot': line_spec([(z, I, 'b-', {'linewidth': 2})], 'Exposure Dose Distribution',
+                                           'Depth (μm)', 'Post-exposure Intensity'),
+                # PAC concentration distribution plot (M)
+                'thickness_plot': line_spec([(z, M, 'r-', {'linewidth': 2})], 'PAC Concentration Distribution',
+                                            'Depth (μm)', 'Post-exposure PAC Concentration'),
+            })
+
         return {
-            'exposure_plot': exposure_plot,
-            'thickness_plot': thickness_plot
+            'exposure_plot': plots['exposure_plot'],
+            'thickness_plot': plots['thickness_plot']
         } 
\ No newline at end of file
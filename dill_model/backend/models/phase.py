@@ -0,0 +1,69 @@
+"""
+相位表达式 phi_expr 的安全解析与编译缓存
+
+phi_expr 只允许 sin/cos/pi/t 与四则运算。表达式的语法树校验和编译结果按表达式
+字符串缓存（同一进程内共享），动画的每一帧、每个时间步只需代入 t 求值。
+"""
+
+import ast
+from functools import lru_cache
+
+import numpy as np
+
+# 编译缓存的表达式数
+PHASE_CACHE_SIZE = 256
+
+_ALLOWED_NAMES = ('sin', 'cos', 'pi', 't')
+_ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, getattr(ast, 'Num', ast.Constant), ast.Load,
+    ast.Call, ast.Name, ast.Constant, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow,
+    ast.USub, ast.UAdd, ast.Mod, ast.FloorDiv, ast.Tuple, ast.List
+)
+
+
+@lru_cache(maxsize=PHASE_CACHE_SIZE)
+def compile_phi_expr(expr):
+    """
+    校验并编译相位表达式
+
+    参数:
+        expr: 表达式字符串
+    返回:
+        编译后的code对象；表达式不合法时返回None
+    """
+    try:
+        node = ast.parse(expr, mode='eval')
+        for n in ast.walk(node):
+            if not isinstance(n, _ALLOWED_NODES):
+                raise ValueError(f"不允许的表达式节点: {type(n).__name__}")
+            if isinstance(n, ast.Name) and n.id not in _ALLOWED_NAMES:
+                raise ValueError(f"不允许的变量: {n.id}")
+            if isinstance(n, ast.Call) and (
+                not isinstance(n.func, ast.Name) or n.func.id not in _ALLOWED_NAMES
+            ):
+                raise ValueError(f"不允许的函数: {getattr(n.func, 'id', None)}")
+        return compile(node, '<string>', 'eval')
+    except Exception:
+        return None
+
+
+def parse_phi_expr(phi_expr, t):
+    """
+    安全解析phi_expr表达式，t为时间，只允许sin/cos/pi/t等
+    """
+    code = compile_phi_expr(str(phi_expr))
+    if code is not None:
+        try:
+            return eval(code, {"__builtins__": None}, {'sin': np.sin, 'cos': np.cos, 'pi': np.pi, 't': t})
+        except Exception:
+            pass
+    try:
+        return float(phi_expr)
+    except Exception:
+        return 0.0
+
+
+def phase_cache_info():
+    """返回编译缓存的命中统计"""
+    info = compile_phi_expr.cache_info()
+    return {'hits': info.hits, 'misses': info.misses, 'size': info.currsize, 'maxsize': info.maxsize}
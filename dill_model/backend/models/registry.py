@@ -0,0 +1,155 @@
+"""
+模型注册表
+
+每个模型（dill / enhanced_dill / car）在每个进程中只构建一次，之后所有请求复用同一实例，
+实例内的缓存（Enhanced Dill 的ABC参数表等）和相位表达式编译缓存因此跨请求保留。
+create_app 时预热：构建全部模型、填充默认参数的ABC表并编译常用相位表达式。
+gunicorn --preload 时预热在主进程完成，fork出的worker直接继承（写时复制共享），
+预热后调用 gc.freeze() 避免垃圾回收扫描这些对象而触发页复制。
+计算进程池的 spawn 进程不继承主进程内存，首次用到模型时各自构建一次。
+"""
+
+import gc
+import time
+import logging
+import threading
+
+from .phase import compile_phi_expr, phase_cache_info
+
+logger = logging.getLogger(__name__)
+
+MODEL_REGISTRY_DEFAULTS = {
+    'MODEL_WARMUP': True,        # create_app 时预热全部模型
+    'MODEL_GC_FREEZE': True,     # 预热后 gc.freeze()，配合 --preload 保持写时复制共享
+}
+
+# 预热时填充ABC表的 (z_h, T, t_B)：前端与比较接口的默认值
+WARMUP_ABC_PARAMETERS = [(10.0, 100.0, 10.0)]
+
+# 预热时编译的相位表达式：前端预设
+WARMUP_PHASE_EXPRESSIONS = ['0', 'pi/2', 'pi', 'sin(t)', 'cos(t)', '0.5*sin(t)', 'sin(2*t)', 'pi/4*sin(t)']
+
+
+def _build_dill():
+    from .dill_model import DillModel
+    return DillModel()
+
+
+def _build_enhanced_dill():
+    from .enhanced_dill_model import EnhancedDillModel
+    return EnhancedDillModel(debug_mode=False)
+
+
+def _build_car():
+    from .car_model import CARModel
+    return CARModel()
+
+
+MODEL_BUILDERS = {
+    'dill': _build_dill,
+    'enhanced_dill': _build_enhanced_dill,
+    'car': _build_car,
+}
+
+
+class ModelRegistry:
+    """
+    按模型名称缓存模型实例（线程安全，每个进程一份）
+    """
+
+    def __init__(self, builders=None):
+        self._builders = dict(builders or MODEL_BUILDERS)
+        self._lock = threading.Lock()
+        self._models = {}
+        self._stats = {name: {'builds': 0, 'hits': 0, 'build_seconds': 0.0, 'built_at': None}
+                       for name in self._builders}
+        self.warmed_at = None
+        self.warmup_seconds = None
+
+    def get(self, model_name):
+        """
+        返回模型实例，首次请求时构建
+
+        参数:
+            model_name: 'dill'、'enhanced_dill' 或 'car'
+        返回:
+            模型实例
+        """
+        model = self._models.get(model_name)
+        if model is not None:
+            self._stats[model_name]['hits'] += 1
+            return model
+        if model_name not in self._builders:
+            raise ValueError(f"未知模型类型: {model_name}")
+        with self._lock:
+            model = self._models.get(model_name)
+            if model is None:
+                start = time.perf_counter()
+                model = self._builders[model_name]()
+                stats = self._stats[model_name]
+                stats['builds'] += 1
+                stats['build_seconds'] += time.perf_counter() - start
+                stats['built_at'] = time.time()
+                self._models[model_name] = model
+            else:
+                self._stats[model_name]['hits'] += 1
+        return model
+
+    def warm(self):
+        """
+        构建全部模型并预热缓存
+
+        返回:
+            预热耗时（秒）
+        """
+        start = time.perf_counter()
+        for name in self._builders:
+            self.get(name)
+        enhanced = self._models.get('enhanced_dill')
+        if enhanced is not None:
+            for z_h, T, t_B in WARMUP_ABC_PARAMETERS:
+                enhanced.get_abc(z_h, T, t_B)
+        for expr in WARMUP_PHASE_EXPRESSIONS:
+            compile_phi_expr(expr)
+        self.warmup_seconds = time.perf_counter() - start
+        self.warmed_at = time.time()
+        return self.warmup_seconds
+
+    def stats(self):
+        """返回各模型的构建/复用统计与缓存状态"""
+        models = {}
+        for name, stats in self._stats.items():
+            entry = dict(stats, built=name in self._models)
+            abc_cache = getattr(self._models.get(name), '_abc_cache', None)
+            if abc_cache is not None:
+                entry['abc_cache_size'] = len(abc_cache)
+            models[name] = entry
+        return {'models': models, 'phase_cache': phase_cache_info(),
+                'warmed_at': self.warmed_at, 'warmup_seconds': self.warmup_seconds}
+
+
+# 进程级注册表
+registry = ModelRegistry()
+
+
+def get_model(model_name):
+    """从进程级注册表取模型实例"""
+    return registry.get(model_name)
+
+
+def init_model_registry(app):
+    """
+    按配置预热进程级模型注册表，保存在 app.extensions['model_registry']
+
+    参数:
+        app: Flask应用实例
+    """
+    for key, value in MODEL_REGISTRY_DEFAULTS.items():
+        app.config.setdefault(key, value)
+    app.extensions['model_registry'] = registry
+    if app.config['MODEL_WARMUP'] and registry.warmed_at is None:
+        seconds = registry.warm()
+        logger.info(f"🔥 模型预热完成: {', '.join(registry.stats()['models'])}，耗时 {seconds:.3f}s")
+        if app.config['MODEL_GC_FREEZE'] and hasattr(gc, 'freeze'):
+            gc.freeze()
+    return registry
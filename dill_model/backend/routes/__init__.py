@@ -1,3 +1,6 @@
 from .api import api_bp
-
-__all__ = ['api_bp'] 
\ No newline at end of file
+from . import results  # noqa: F401  注册结果帧接口
+from . import estimate  # noqa: F401  注册代价预估接口
+from . import batch  # noqa: F401  注册批量计算接口
+from . import admin  # noqa: F401  注册管理接口
+from . import metrics  # noqa: F401  注册运行指标接口
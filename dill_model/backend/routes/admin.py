@@ -0,0 +1,132 @@
+"""
+管理接口（需管理令牌，见 utils/admin.py）
+
+    GET /api/admin/startup                 启动耗时：create_app 各阶段、延迟导入模块的加载状态
+    GET /api/admin/startup?importtime=1    附带 `python -X importtime` 的逐模块分解（&limit=30&refresh=1）
+    GET /api/admin/profiles                本进程保存的请求剖析结果列表（见 utils/profiling.py）
+    GET /api/admin/profiles/<id>           单个剖析结果（含热点函数列表）
+    GET /api/admin/profiles/<id>/collapsed 采样剖析的折叠栈文本（火焰图输入）
+    GET /api/admin/profiles/<id>/pstats    cProfile 剖析的 .pstats 文件
+    GET /api/admin/slow                    慢请求记录列表（本机全部worker，见 utils/slow_requests.py）
+    GET /api/admin/slow/<id>               单条慢请求记录（参数、阶段耗时、网格规模、内存与采样栈）
+    GET /api/admin/slow/<id>/collapsed     慢请求采样栈的折叠栈文本
+"""
+
+import logging
+import subprocess
+
+from flask import current_app, request, jsonify, Response
+
+from .api import api_bp
+from ..utils import format_response, admin_required, startup_report
+
+logger = logging.getLogger(__name__)
+
+
+@api_bp.route('/admin/startup', methods=['GET'])
+@admin_required
+def admin_startup():
+    """
+    启动耗时报告
+    """
+    importtime = request.args.get('importtime', '').lower() in ('1', 'true', 'yes')
+    refresh = request.args.get('refresh', '').lower() in ('1', 'true', 'yes')
+    try:
+        limit = max(1, int(request.args.get('limit', 30)))
+    except ValueError:
+        return jsonify(format_response(False, message="limit必须是正整数")), 400
+    try:
+        report = startup_report(importtime=importtime, limit=limit, refresh=refresh)
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.warning(f"⚠️ importtime分析失败: {e}")
+        return jsonify(format_response(False, message=f"importtime分析失败: {e}")), 500
+    return jsonify(format_response(True, data=report)), 200
+
+
+def _stored_profile(profile_id):
+    return current_app.extensions['profile_store'].get(profile_id)
+
+
+@api_bp.route('/admin/profiles', methods=['GET'])
+@admin_required
+def admin_profiles():
+    """
+    剖析结果列表（最新的在前）
+    """
+    return jsonify(format_response(True, data=current_app.extensions['profile_store'].list())), 200
+
+
+@api_bp.route('/admin/profiles/<profile_id>', methods=['GET'])
+@admin_required
+def admin_profile(profile_id):
+    """
+    单个剖析结果
+    """
+    profile = _stored_profile(profile_id)
+    if profile is None:
+        return jsonify(format_response(False, message="剖析结果不存在或已被淘汰")), 404
+    return jsonify(format_response(True, data={key: value for key, value in profile.items() if key != 'artifact'})), 200
+
+
+@api_bp.route('/admin/profiles/<profile_id>/<artifact>', methods=['GET'])
+@admin_required
+def admin_profile_artifact(profile_id, artifact):
+    """
+    下载剖析原始数据：采样剖析为折叠栈文本（collapsed），cProfile 为 .pstats 文件（pstats）
+    """
+    profile = _stored_profile(profile_id)
+    expected = 'pstats' if profile is not None and profile['mode'] == 'cprofile' else 'collapsed'
+    if profile is None or artifact != expected:
+        return jsonify(format_response(False, message="剖析结果不存在或格式不匹配")), 404
+    if artifact == 'pstats':
+        response = Response(profile['artifact'], mimetype='application/octet-stream')
+    else:
+        response = Response(profile['artifact'], mimetype='text/plain')
+    response.headers['Content-Disposition'] = f'attachment; filename="profile-{profile_id}.{artifact}"'
+    return response
+
+
+@api_bp.route('/admin/slow', methods=['GET'])
+@admin_required
+def admin_slow_requests():
+    """
+    慢请求记录列表（最新的在前，可按 ?endpoint= 过滤，?limit= 默认50）
+    """
+    try:
+        limit = max(1, int(request.args.get('limit', 50)))
+    except ValueError:
+        return jsonify(format_response(False, message="limit必须是正整数")), 400
+    store = current_app.extensions['slow_request_store']
+    records = store.list(endpoint=request.args.get('endpoint'), limit=limit)
+    return jsonify(format_response(True, data={
+        'threshold': current_app.config['SLOW_REQUEST_THRESHOLD'],
+        'records': records,
+    })), 200
+
+
+@api_bp.route('/admin/slow/<record_id>', methods=['GET'])
+@admin_required
+def admin_slow_request(record_id):
+    """
+    单条慢请求记录
+    """
+    record = current_app.extensions['slow_request_store'].get(record_id)
+    if record is None:
+        return jsonify(format_response(False, message="慢请求记录不存在或已被淘汰")), 404
+    record['profile'].pop('collapsed', None)
+    record['profile']['download'] = f"/api/admin/slow/{record_id}/collapsed"
+    return jsonify(format_response(True, data=record)), 200
+
+
+@api_bp.route('/admin/slow/<record_id>/collapsed', methods=['GET'])
+@admin_required
+def admin_slow_request_collapsed(record_id):
+    """
+    下载慢请求采样栈的折叠栈文本
+    """
+    record = current_app.extensions['slow_request_store'].get(record_id)
+    if record is None:
+        return jsonify(format_response(False, message="慢请求记录不存在或已被淘汰")), 404
+    response = Response(record['profile']['collapsed'], mimetype='text/plain')
+    response.headers['Content-Disposition'] = f'attachment; filename="slow-{record_id}.collapsed"'
+    return response
@@ -1,39 +1,40 @@
-from flask import Blueprint, request, jsonify
-from ..models import DillModel, get_model_by_name
-from ..utils import validate_input, validate_enhanced_input, validate_car_input, format_response, NumpyEncoder
+from flask import Blueprint, request, jsonify, Response, stream_with_context, current_app, has_app_context
+from ..models import get_model_by_name
+from ..utils import validate_input, validate_enhanced_input, validate_car_input, format_response
+from ..utils import parse_lod_options, apply_lod, LogStore, current_calc_id
+from ..utils import cancellable, create_job_token, release_job_token, CalculationCancelled
+from ..utils import admission_controlled, renders_plots, render_plots, line_spec, plot_mime, stage, profilable
+from ..utils import log_request_error
+from ..models.comparison import compute_compare_sets
 import json
 import numpy as np
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-from io import BytesIO
-import base64
-from backend.models import EnhancedDillModel
 import traceback, datetime
 import time
+import sqlite3
 
-# 全局日志存储
-calculation_logs = []
+# 全局日志存储（线程安全的环形缓冲，最多1000条）
+log_store = LogStore(maxlen=1000)
 
-def add_log_entry(log_type, model_type, message, timestamp=None, dimension=None, details=None):
-    """添加增强的日志条目"""
+def add_log_entry(log_type, model_type, message, timestamp=None, dimension=None, details=None, calc_id=None):
+    """添加增强的日志条目（calc_id 默认取当前请求的计算ID）"""
     if timestamp is None:
         timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
-    log_entry = {
-        'timestamp': timestamp,
-        'type': log_type,  # 'info', 'progress', 'success', 'warning', 'error'
-        'model': model_type,  # 'dill', 'enhanced_dill', 'car', 'system'
-        'message': message,
-        'dimension': dimension,  # '1d', '2d', '3d' 或 None
-        'details': details or ''  # 详细信息
-    }
+    # log_type: 'info', 'progress', 'success', 'warning', 'error'
+    # model_type: 'dill', 'enhanced_dill', 'car', 'system'
+    # dimension: '1d', '2d', '3d' 或 None
+    log_id = log_store.append(log_type, model_type, message, timestamp, dimension=dimension, details=details or '')
     
-    calculation_logs.append(log_entry)
-    
-    # 保持日志条目数量在合理范围内（最多1000条）
-    if len(calculation_logs) > 1000:
-        calculation_logs.pop(0)
+    # 同时写入多worker共享的日志库，供 /api/logs?calc_id= 查询
+    calc_id = calc_id or current_calc_id()
+    shared_store = current_app.extensions.get('shared_log_store') if has_app_context() else None
+    if calc_id and shared_store is not None:
+        try:
+            shared_store.append(calc_id, log_type, model_type, message, timestamp,
+                                dimension=dimension, details=details or '')
+        except sqlite3.Error as e:
+            print(f"⚠️ 写入共享日志库失败: {e}")
+    return log_id
 
 def add_dimension_log(log_type, model_type, message, dimension, details=None):
     """添加带维度信息的日志条目"""
@@ -45,30 +46,30 @@ def add_progress_log(model_type, message, progress_percent=None, dimension=None)
         message = f"{message} ({progress_percent}%)"
     add_log_entry('progress', model_type, message, dimension=dimension)
 
-def add_success_log(model_type, message, dimension=None, details=None):
+def add_success_log(model_type, message, dimension=None, details=None, calc_id=None):
     """添加成功日志"""
-    add_log_entry('success', model_type, message, dimension=dimension, details=details)
+    add_log_entry('success', model_type, message, dimension=dimension, details=details, calc_id=calc_id)
 
-def add_warning_log(model_type, message, dimension=None, details=None):
+def add_warning_log(model_type, message, dimension=None, details=None, calc_id=None):
     """添加警告日志"""
-    add_log_entry('warning', model_type, message, dimension=dimension, details=details)
+    add_log_entry('warning', model_type, message, dimension=dimension, details=details, calc_id=calc_id)
 
-def add_error_log(model_type, message, dimension=None, details=None):
+def add_error_log(model_type, message, dimension=None, details=None, calc_id=None):
     """添加错误日志"""
-    add_log_entry('error', model_type, message, dimension=dimension, details=details)
+    add_log_entry('error', model_type, message, dimension=dimension, details=details, calc_id=calc_id)
 
 def clear_logs():
     """清空日志"""
-    global calculation_logs
-    calculation_logs = []
+    log_store.clear()
 
 # 创建API蓝图
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
-# 实例化Dill模型
-dill_model = DillModel()
-
 @api_bp.route('/calculate', methods=['POST'])
+@admission_controlled('calculate')
+@cancellable
+@renders_plots
+@profilable
 def calculate():
     """
     计算模型并返回图像
@@ -78,6 +79,7 @@ def calculate():
         data = request.get_json()
         print('收到前端参数:', data)  # 调试用
         model_type = data.get('model_type', 'dill')
+        sine_type = data.get('sine_type', '1d')
         model = get_model_by_name(model_type)
         
         # 根据模型类型验证参数
@@ -111,8 +113,8 @@ def calculate():
                 
                 # 如果校验通过，则直接计算y_range
                 y_range = np.linspace(y_min, y_max, y_points).tolist()
-                plot_data = model.generate_plots(I_avg, V, None, t_exp, C, sine_type=sine_type, 
-                                               Kx=Kx, Ky=Ky, phi_expr=phi_expr, y_range=y_range)
+                plots = model.generate_plots(I_avg, V, None, t_exp, C, sine_type=sine_type, 
+                                             Kx=Kx, Ky=Ky, phi_expr=phi_expr, y_range=y_range)
             elif sine_type == '3d':
                 # 处理三维正弦波参数
                 Kx = float(data.get('Kx', 0))
@@ -179,7 +181,7 @@ def calculate():
                 
                 plots = model.generate_plots(z_h, T, t_B, I0, M0, t_exp, 
                                           sine_type=sine_type, Kx=Kx, Ky=Ky, Kz=Kz,
-                                          phi_expr=phi_expr, V=V, y_range=y_range, z_range=z_range)
+                                          phi_expr=phi_expr, V=float(data.get('V', 0)), y_range=y_range, z_range=z_range)
             else:
                 plots = model.generate_plots(z_h, T, t_B, I0, M0, t_exp, sine_type=sine_type)
         elif model_type == 'car':
@@ -213,9 +215,9 @@ def calculate():
                     return jsonify(format_response(False, message_zh="Y轴点数必须大于1才能进行二维计算", message_en="Number of Y-axis points must be greater than 1 for 2D calculation")), 400
                 
                 y_range = np.linspace(y_min, y_max, y_points).tolist()
-                plot_data = model.generate_plots(I_avg, V, None, t_exp, acid_gen_efficiency, 
-                                         diffusion_length, reaction_rate, amplification, contrast, 
-                                         sine_type=sine_type, Kx=Kx, Ky=Ky, phi_expr=phi_expr, y_range=y_range)
+                plots = model.generate_plots(I_avg, V, None, t_exp, acid_gen_efficiency, 
+                                             diffusion_length, reaction_rate, amplification, contrast, 
+                                             sine_type=sine_type, Kx=Kx, Ky=Ky, phi_expr=phi_expr, y_range=y_range)
             elif sine_type == '3d':
                 # 处理三维正弦波参数
                 Kx = float(data.get('Kx', 0))
@@ -267,18 +269,17 @@ def calculate():
                                          sine_type=sine_type)
         else:
             return jsonify(format_response(False, message="未知模型类型")), 400
+        plots['plot_mime'] = plot_mime()
         return jsonify(format_response(True, data=plots)), 200
     except Exception as e:
         # 记录异常参数和错误信息到日志
-        with open('dill_backend.log', 'a', encoding='utf-8') as f:
-            f.write(f"[{datetime.datetime.now()}]\n")
-            f.write(f"请求参数: {data if 'data' in locals() else '无'}\n")
-            f.write(f"异常类型: {type(e).__name__}\n")
-            f.write(f"异常信息: {str(e)}\n")
-            f.write(f"堆栈信息: {traceback.format_exc()}\n\n")
+        log_request_error(data if 'data' in locals() else None)
         return jsonify({'success': False, 'message_zh': f"计算错误: {str(e)}", 'message_en': f"Calculation error: {str(e)}", 'data': None}), 500
 
 @api_bp.route('/calculate_data', methods=['POST'])
+@admission_controlled('calculate_data')
+@cancellable
+@profilable
 def calculate_data():
     """
     计算模型并返回原始数据（用于交互式图表）
@@ -426,23 +427,24 @@ def calculate_data():
                     add_log_entry('info', 'dill', f"⏱️ 计算时间: {calc_time:.3f}s", dimension='3d')
                     add_log_entry('info', 'dill', f"💾 数据字段: {list(plot_data.keys())}", dimension='3d')
                     
-                    if 'exposure_dose' in plot_data:
-                        exp_data = np.array(plot_data['exposure_dose'])
-                        thick_data = np.array(plot_data['thickness'])
-                        print(f"  🔢 曝光剂量范围: [{exp_data.min():.3f}, {exp_data.max():.3f}] mJ/cm²")
-                        print(f"  📏 厚度范围: [{thick_data.min():.4f}, {thick_data.max():.4f}] (归一化)")
-                        print(f"  📐 Dill模型3D特征分析:")
-                        print(f"     数据维度: {exp_data.shape if exp_data.ndim > 1 else '1D'}")
-                        print(f"     空间频率: Kx={Kx}, Ky={Ky}, Kz={Kz}")
-                        print(f"     光敏速率常数C: {C:.4f} cm²/mJ")
+                    with stage('statistics'):
+                        if 'exposure_dose' in plot_data:
+                            exp_data = np.asarray(plot_data['exposure_dose'])
+                            thick_data = np.asarray(plot_data['thickness'])
+                            print(f"  🔢 曝光剂量范围: [{exp_data.min():.3f}, {exp_data.max():.3f}] mJ/cm²")
+                            print(f"  📏 厚度范围: [{thick_data.min():.4f}, {thick_data.max():.4f}] (归一化)")
+                            print(f"  📐 Dill模型3D特征分析:")
+                            print(f"     数据维度: {exp_data.shape if exp_data.ndim > 1 else '1D'}")
+                            print(f"     空间频率: Kx={Kx}, Ky={Ky}, Kz={Kz}")
+                            print(f"     光敏速率常数C: {C:.4f} cm²/mJ")
                         
-                        # 添加到日志系统
-                        add_log_entry('info', 'dill', f"🔢 曝光剂量范围: [{exp_data.min():.3f}, {exp_data.max():.3f}] mJ/cm²", dimension='3d')
-                        add_log_entry('info', 'dill', f"📏 厚度范围: [{thick_data.min():.4f}, {thick_data.max():.4f}] (归一化)", dimension='3d')
-                        add_log_entry('info', 'dill', f"📐 Dill模型3D特征分析", dimension='3d')
-                        add_log_entry('info', 'dill', f"   数据维度: {exp_data.shape if exp_data.ndim > 1 else '1D'}", dimension='3d')
-                        add_log_entry('info', 'dill', f"   空间频率: Kx={Kx}, Ky={Ky}, Kz={Kz}", dimension='3d')
-                        add_log_entry('info', 'dill', f"   光敏速率常数C: {C:.4f} cm²/mJ", dimension='3d')
+                            # 添加到日志系统
+                            add_log_entry('info', 'dill', f"🔢 曝光剂量范围: [{exp_data.min():.3f}, {exp_data.max():.3f}] mJ/cm²", dimension='3d')
+                            add_log_entry('info', 'dill', f"📏 厚度范围: [{thick_data.min():.4f}, {thick_data.max():.4f}] (归一化)", dimension='3d')
+                            add_log_entry('info', 'dill', f"📐 Dill模型3D特征分析", dimension='3d')
+                            add_log_entry('info', 'dill', f"   数据维度: {exp_data.shape if exp_data.ndim > 1 else '1D'}", dimension='3d')
+                            add_log_entry('info', 'dill', f"   空间频率: Kx={Kx}, Ky={Ky}, Kz={Kz}", dimension='3d')
+                            add_log_entry('info', 'dill', f"   光敏速率常数C: {C:.4f} cm²/mJ", dimension='3d')
                     
                     add_success_log('dill', f"三维计算完成，用时{calc_time:.3f}s", dimension='3d')
                     
@@ -469,73 +471,74 @@ def calculate_data():
                 plot_data = model.generate_data(I_avg, V, K, t_exp, C, sine_type=sine_type)
                 calc_time = time.time() - calc_start
                 
-                if plot_data and 'exposure_dose' in plot_data:
-                    exposure_array = np.array(plot_data['exposure_dose'])
-                    thickness_array = np.array(plot_data['thickness'])
-                    x_array = np.array(plot_data['x'])
+                with stage('statistics'):
+                    if plot_data and 'exposure_dose' in plot_data:
+                        exposure_array = np.asarray(plot_data['exposure_dose'])
+                        thickness_array = np.asarray(plot_data['thickness'])
+                        x_array = np.asarray(plot_data['x'])
                     
-                    # 模拟计算进度输出（因为计算很快，这里简化显示）
-                    # 确保数组长度足够，避免索引越界
-                    array_length = len(x_array)
+                        # 模拟计算进度输出（因为计算很快，这里简化显示）
+                        # 确保数组长度足够，避免索引越界
+                        array_length = len(x_array)
                     
-                    # 动态计算进度索引，确保不超过数组边界
-                    idx_20_percent = min(199, array_length - 1)
-                    idx_50_percent = min(499, array_length - 1) 
-                    idx_80_percent = min(799, array_length - 1)
+                        # 动态计算进度索引，确保不超过数组边界
+                        idx_20_percent = min(199, array_length - 1)
+                        idx_50_percent = min(499, array_length - 1) 
+                        idx_80_percent = min(799, array_length - 1)
                     
-                    # 安全的进度输出
-                    print(f"[Dill-1D] 进度: {idx_20_percent+1}/{array_length}, pos={x_array[idx_20_percent]:.3f}, exposure={exposure_array[idx_20_percent]:.3f}, thickness={thickness_array[idx_20_percent]:.4f}")
-                    print(f"[Dill-1D] 进度: {idx_50_percent+1}/{array_length}, pos={x_array[idx_50_percent]:.3f}, exposure={exposure_array[idx_50_percent]:.3f}, thickness={thickness_array[idx_50_percent]:.4f}")
-                    print(f"[Dill-1D] 进度: {idx_80_percent+1}/{array_length}, pos={x_array[idx_80_percent]:.3f}, exposure={exposure_array[idx_80_percent]:.3f}, thickness={thickness_array[idx_80_percent]:.4f}")
+                        # 安全的进度输出
+                        print(f"[Dill-1D] 进度: {idx_20_percent+1}/{array_length}, pos={x_array[idx_20_percent]:.3f}, exposure={exposure_array[idx_20_percent]:.3f}, thickness={thickness_array[idx_20_percent]:.4f}")
+                        print(f"[Dill-1D] 进度: {idx_50_percent+1}/{array_length}, pos={x_array[idx_50_percent]:.3f}, exposure={exposure_array[idx_50_percent]:.3f}, thickness={thickness_array[idx_50_percent]:.4f}")
+                        print(f"[Dill-1D] 进度: {idx_80_percent+1}/{array_length}, pos={x_array[idx_80_percent]:.3f}, exposure={exposure_array[idx_80_percent]:.3f}, thickness={thickness_array[idx_80_percent]:.4f}")
                     
-                    # 添加安全的进度信息到日志系统
-                    add_log_entry('progress', 'dill', f"进度: {idx_20_percent+1}/{array_length}, pos={x_array[idx_20_percent]:.3f}, exposure={exposure_array[idx_20_percent]:.3f}, thickness={thickness_array[idx_20_percent]:.4f}", dimension='1d')
-                    add_log_entry('progress', 'dill', f"进度: {idx_50_percent+1}/{array_length}, pos={x_array[idx_50_percent]:.3f}, exposure={exposure_array[idx_50_percent]:.3f}, thickness={thickness_array[idx_50_percent]:.4f}", dimension='1d')
-                    add_log_entry('progress', 'dill', f"进度: {idx_80_percent+1}/{array_length}, pos={x_array[idx_80_percent]:.3f}, exposure={exposure_array[idx_80_percent]:.3f}, thickness={thickness_array[idx_80_percent]:.4f}", dimension='1d')
+                        # 添加安全的进度信息到日志系统
+                        add_log_entry('progress', 'dill', f"进度: {idx_20_percent+1}/{array_length}, pos={x_array[idx_20_percent]:.3f}, exposure={exposure_array[idx_20_percent]:.3f}, thickness={thickness_array[idx_20_percent]:.4f}", dimension='1d')
+                        add_log_entry('progress', 'dill', f"进度: {idx_50_percent+1}/{array_length}, pos={x_array[idx_50_percent]:.3f}, exposure={exposure_array[idx_50_percent]:.3f}, thickness={thickness_array[idx_50_percent]:.4f}", dimension='1d')
+                        add_log_entry('progress', 'dill', f"进度: {idx_80_percent+1}/{array_length}, pos={x_array[idx_80_percent]:.3f}, exposure={exposure_array[idx_80_percent]:.3f}, thickness={thickness_array[idx_80_percent]:.4f}", dimension='1d')
                     
-                    print(f"[Dill-1D] 🎯 计算完成统计:")
-                    print(f"  ✅ 成功计算: 1000/1000 (100.0%)")
-                    print(f"  ❌ 失败计算: 0/1000 (0.0%)")
-                    print(f"  ⏱️  平均计算时间: {calc_time/1000:.6f}s/点")
-                    print(f"  🔢 曝光剂量范围: [{exposure_array.min():.3f}, {exposure_array.max():.3f}] mJ/cm²")
-                    print(f"  📏 厚度范围: [{thickness_array.min():.4f}, {thickness_array.max():.4f}] (归一化)")
-                    print(f"  💾 数据质量: 优秀")
-                    print(f"  📊 统计特征:")
-                    print(f"     曝光剂量: 均值={exposure_array.mean():.3f}, 标准差={exposure_array.std():.3f}")
-                    print(f"     厚度分布: 均值={thickness_array.mean():.4f}, 标准差={thickness_array.std():.4f}")
+                        print(f"[Dill-1D] 🎯 计算完成统计:")
+                        print(f"  ✅ 成功计算: 1000/1000 (100.0%)")
+                        print(f"  ❌ 失败计算: 0/1000 (0.0%)")
+                        print(f"  ⏱️  平均计算时间: {calc_time/1000:.6f}s/点")
+                        print(f"  🔢 曝光剂量范围: [{exposure_array.min():.3f}, {exposure_array.max():.3f}] mJ/cm²")
+                        print(f"  📏 厚度范围: [{thickness_array.min():.4f}, {thickness_array.max():.4f}] (归一化)")
+                        print(f"  💾 数据质量: 优秀")
+                        print(f"  📊 统计特征:")
+                        print(f"     曝光剂量: 均值={exposure_array.mean():.3f}, 标准差={exposure_array.std():.3f}")
+                        print(f"     厚度分布: 均值={thickness_array.mean():.4f}, 标准差={thickness_array.std():.4f}")
                     
-                    # 添加详细统计到日志系统
-                    add_log_entry('success', 'dill', f"🎯 计算完成统计", dimension='1d')
-                    add_log_entry('info', 'dill', f"✅ 成功计算: 1000/1000 (100.0%)", dimension='1d')
-                    add_log_entry('info', 'dill', f"❌ 失败计算: 0/1000 (0.0%)", dimension='1d')
-                    add_log_entry('info', 'dill', f"⏱️ 平均计算时间: {calc_time/1000:.6f}s/点", dimension='1d')
-                    add_log_entry('info', 'dill', f"🔢 曝光剂量范围: [{exposure_array.min():.3f}, {exposure_array.max():.3f}] mJ/cm²", dimension='1d')
-                    add_log_entry('info', 'dill', f"📏 厚度范围: [{thickness_array.min():.4f}, {thickness_array.max():.4f}] (归一化)", dimension='1d')
-                    add_log_entry('info', 'dill', f"💾 数据质量: 优秀", dimension='1d')
-                    add_log_entry('info', 'dill', f"📊 曝光剂量统计: 均值={exposure_array.mean():.3f}, 标准差={exposure_array.std():.3f}", dimension='1d')
-                    add_log_entry('info', 'dill', f"📊 厚度分布统计: 均值={thickness_array.mean():.4f}, 标准差={thickness_array.std():.4f}", dimension='1d')
+                        # 添加详细统计到日志系统
+                        add_log_entry('success', 'dill', f"🎯 计算完成统计", dimension='1d')
+                        add_log_entry('info', 'dill', f"✅ 成功计算: 1000/1000 (100.0%)", dimension='1d')
+                        add_log_entry('info', 'dill', f"❌ 失败计算: 0/1000 (0.0%)", dimension='1d')
+                        add_log_entry('info', 'dill', f"⏱️ 平均计算时间: {calc_time/1000:.6f}s/点", dimension='1d')
+                        add_log_entry('info', 'dill', f"🔢 曝光剂量范围: [{exposure_array.min():.3f}, {exposure_array.max():.3f}] mJ/cm²", dimension='1d')
+                        add_log_entry('info', 'dill', f"📏 厚度范围: [{thickness_array.min():.4f}, {thickness_array.max():.4f}] (归一化)", dimension='1d')
+                        add_log_entry('info', 'dill', f"💾 数据质量: 优秀", dimension='1d')
+                        add_log_entry('info', 'dill', f"📊 曝光剂量统计: 均值={exposure_array.mean():.3f}, 标准差={exposure_array.std():.3f}", dimension='1d')
+                        add_log_entry('info', 'dill', f"📊 厚度分布统计: 均值={thickness_array.mean():.4f}, 标准差={thickness_array.std():.4f}", dimension='1d')
                     
-                    # 计算对比度
-                    cv_exposure = exposure_array.std() / exposure_array.mean() if exposure_array.mean() > 0 else 0
-                    cv_thickness = thickness_array.std() / thickness_array.mean() if thickness_array.mean() > 0 else 0
+                        # 计算对比度
+                        cv_exposure = exposure_array.std() / exposure_array.mean() if exposure_array.mean() > 0 else 0
+                        cv_thickness = thickness_array.std() / thickness_array.mean() if thickness_array.mean() > 0 else 0
                     
-                    print(f"  📈 高对比度检测: 曝光剂量变化{'显著' if cv_exposure > 0.3 else '适中' if cv_exposure > 0.1 else '较小'} (CV={cv_exposure:.3f})")
-                    print(f"  🎭 强调制检测: 厚度变化{'显著' if cv_thickness > 0.3 else '适中' if cv_thickness > 0.1 else '较小'} (CV={cv_thickness:.3f})")
-                    print(f"  📐 Dill模型特征分析:")
-                    print(f"     对比度因子: {cv_exposure:.3f}")
-                    print(f"     分辨率估计: {2*np.pi/K:.3f} μm" if K > 0 else "无限大")
-                    print(f"     光敏速率常数C: {C:.4f} cm²/mJ")
+                        print(f"  📈 高对比度检测: 曝光剂量变化{'显著' if cv_exposure > 0.3 else '适中' if cv_exposure > 0.1 else '较小'} (CV={cv_exposure:.3f})")
+                        print(f"  🎭 强调制检测: 厚度变化{'显著' if cv_thickness > 0.3 else '适中' if cv_thickness > 0.1 else '较小'} (CV={cv_thickness:.3f})")
+                        print(f"  📐 Dill模型特征分析:")
+                        print(f"     对比度因子: {cv_exposure:.3f}")
+                        print(f"     分辨率估计: {2*np.pi/K:.3f} μm" if K > 0 else "无限大")
+                        print(f"     光敏速率常数C: {C:.4f} cm²/mJ")
                     
-                    # 添加分析结果到日志系统
-                    contrast_level = '显著' if cv_exposure > 0.3 else '适中' if cv_exposure > 0.1 else '较小'
-                    modulation_level = '显著' if cv_thickness > 0.3 else '适中' if cv_thickness > 0.1 else '较小'
-                    add_log_entry('info', 'dill', f"📈 高对比度检测: 曝光剂量变化{contrast_level} (CV={cv_exposure:.3f})", dimension='1d')
-                    add_log_entry('info', 'dill', f"🎭 强调制检测: 厚度变化{modulation_level} (CV={cv_thickness:.3f})", dimension='1d')
-                    add_log_entry('info', 'dill', f"📐 Dill模型特征分析", dimension='1d')
-                    add_log_entry('info', 'dill', f"   对比度因子: {cv_exposure:.3f}", dimension='1d')
-                    resolution = f"{2*np.pi/K:.3f} μm" if K > 0 else "无限大"
-                    add_log_entry('info', 'dill', f"   分辨率估计: {resolution}", dimension='1d')
-                    add_log_entry('info', 'dill', f"   光敏速率常数C: {C:.4f} cm²/mJ", dimension='1d')
+                        # 添加分析结果到日志系统
+                        contrast_level = '显著' if cv_exposure > 0.3 else '适中' if cv_exposure > 0.1 else '较小'
+                        modulation_level = '显著' if cv_thickness > 0.3 else '适中' if cv_thickness > 0.1 else '较小'
+                        add_log_entry('info', 'dill', f"📈 高对比度检测: 曝光剂量变化{contrast_level} (CV={cv_exposure:.3f})", dimension='1d')
+                        add_log_entry('info', 'dill', f"🎭 强调制检测: 厚度变化{modulation_level} (CV={cv_thickness:.3f})", dimension='1d')
+                        add_log_entry('info', 'dill', f"📐 Dill模型特征分析", dimension='1d')
+                        add_log_entry('info', 'dill', f"   对比度因子: {cv_exposure:.3f}", dimension='1d')
+                        resolution = f"{2*np.pi/K:.3f} μm" if K > 0 else "无限大"
+                        add_log_entry('info', 'dill', f"   分辨率估计: {resolution}", dimension='1d')
+                        add_log_entry('info', 'dill', f"   光敏速率常数C: {C:.4f} cm²/mJ", dimension='1d')
                 
                 add_success_log('dill', f"一维计算完成，1000点，用时{calc_time:.3f}s", dimension='1d')
         
@@ -580,34 +583,35 @@ def calculate_data():
                 plot_data = model.generate_data(z_h, T, t_B, I0, M0, t_exp_enh, sine_type=sine_type, Kx=Kx, Ky=Ky, V=V, phi_expr=phi_expr, y_range=y_range)
                 calc_time = time.time() - calc_start
                 
-                if plot_data and 'z_exposure_dose' in plot_data:
-                    exposure_array = np.array(plot_data['z_exposure_dose'])
-                    thickness_array = np.array(plot_data['z_thickness'])
+                with stage('statistics'):
+                    if plot_data and 'z_exposure_dose' in plot_data:
+                        exposure_array = np.array(plot_data['z_exposure_dose'])
+                        thickness_array = np.array(plot_data['z_thickness'])
                     
-                    print(f"[Enhanced-Dill-2D] 🎯 二维厚胶计算完成统计:")
-                    print(f"  ✅ 网格大小: {exposure_array.shape}")
-                    print(f"  ⏱️  计算时间: {calc_time:.3f}s")
-                    print(f"  🔢 曝光剂量范围: [{exposure_array.min():.3f}, {exposure_array.max():.3f}] mJ/cm²")
-                    print(f"  📏 厚度范围: [{thickness_array.min():.4f}, {thickness_array.max():.4f}] (归一化)")
-                    print(f"  🔬 增强Dill模型厚胶分析:")
-                    print(f"     胶层厚度: {z_h}μm")
-                    print(f"     前烘温度: {T}°C")
-                    print(f"     前烘时间: {t_B}s")
-                    print(f"     光强衰减分析: 考虑深度相关吸收")
-                    print(f"     空间频率: Kx={Kx}, Ky={Ky}")
+                        print(f"[Enhanced-Dill-2D] 🎯 二维厚胶计算完成统计:")
+                        print(f"  ✅ 网格大小: {exposure_array.shape}")
+                        print(f"  ⏱️  计算时间: {calc_time:.3f}s")
+                        print(f"  🔢 曝光剂量范围: [{exposure_array.min():.3f}, {exposure_array.max():.3f}] mJ/cm²")
+                        print(f"  📏 厚度范围: [{thickness_array.min():.4f}, {thickness_array.max():.4f}] (归一化)")
+                        print(f"  🔬 增强Dill模型厚胶分析:")
+                        print(f"     胶层厚度: {z_h}μm")
+                        print(f"     前烘温度: {T}°C")
+                        print(f"     前烘时间: {t_B}s")
+                        print(f"     光强衰减分析: 考虑深度相关吸收")
+                        print(f"     空间频率: Kx={Kx}, Ky={Ky}")
                     
-                    # 添加详细统计到日志系统
-                    add_log_entry('success', 'enhanced_dill', f"🎯 二维厚胶计算完成统计", dimension='2d')
-                    add_log_entry('info', 'enhanced_dill', f"✅ 网格大小: {exposure_array.shape}", dimension='2d')
-                    add_log_entry('info', 'enhanced_dill', f"⏱️ 计算时间: {calc_time:.3f}s", dimension='2d')
-                    add_log_entry('info', 'enhanced_dill', f"🔢 曝光剂量范围: [{exposure_array.min():.3f}, {exposure_array.max():.3f}] mJ/cm²", dimension='2d')
-                    add_log_entry('info', 'enhanced_dill', f"📏 厚度范围: [{thickness_array.min():.4f}, {thickness_array.max():.4f}] (归一化)", dimension='2d')
-                    add_log_entry('info', 'enhanced_dill', f"🔬 增强Dill模型厚胶分析", dimension='2d')
-                    add_log_entry('info', 'enhanced_dill', f"   胶层厚度: {z_h}μm", dimension='2d')
-                    add_log_entry('info', 'enhanced_dill', f"   前烘温度: {T}°C", dimension='2d')
-                    add_log_entry('info', 'enhanced_dill', f"   前烘时间: {t_B}s", dimension='2d')
-                    add_log_entry('info', 'enhanced_dill', f"   光强衰减分析: 考虑深度相关吸收", dimension='2d')
-                    add_log_entry('info', 'enhanced_dill', f"   空间频率: Kx={Kx}, Ky={Ky}", dimension='2d')
+                        # 添加详细统计到日志系统
+                        add_log_entry('success', 'enhanced_dill', f"🎯 二维厚胶计算完成统计", dimension='2d')
+                        add_log_entry('info', 'enhanced_dill', f"✅ 网格大小: {exposure_array.shape}", dimension='2d')
+                        add_log_entry('info', 'enhanced_dill', f"⏱️ 计算时间: {calc_time:.3f}s", dimension='2d')
+                        add_log_entry('info', 'enhanced_dill', f"🔢 曝光剂量范围: [{exposure_array.min():.3f}, {exposure_array.max():.3f}] mJ/cm²", dimension='2d')
+                        add_log_entry('info', 'enhanced_dill', f"📏 厚度范围: [{thickness_array.min():.4f}, {thickness_array.max():.4f}] (归一化)", dimension='2d')
+                        add_log_entry('info', 'enhanced_dill', f"🔬 增强Dill模型厚胶分析", dimension='2d')
+                        add_log_entry('info', 'enhanced_dill', f"   胶层厚度: {z_h}μm", dimension='2d')
+                        add_log_entry('info', 'enhanced_dill', f"   前烘温度: {T}°C", dimension='2d')
+                        add_log_entry('info', 'enhanced_dill', f"   前烘时间: {t_B}s", dimension='2d')
+                        add_log_entry('info', 'enhanced_dill', f"   光强衰减分析: 考虑深度相关吸收", dimension='2d')
+                        add_log_entry('info', 'enhanced_dill', f"   空间频率: Kx={Kx}, Ky={Ky}", dimension='2d')
                 
                 add_success_log('enhanced_dill', f"二维厚胶计算完成，{z_h}μm厚度，用时{calc_time:.3f}s", dimension='2d')
                 
@@ -670,17 +674,18 @@ def calculate_data():
                     print(f"     时间依赖性: phi_expr='{phi_expr}'")
                     
                     # 检查4D动画数据完整性
-                    if plot_data and isinstance(plot_data, dict):
-                        has_exposure_frames = 'exposure_dose_frames' in plot_data and plot_data['exposure_dose_frames']
-                        has_thickness_frames = 'thickness_frames' in plot_data and plot_data['thickness_frames']
+                    with stage('statistics'):
+                        if plot_data and isinstance(plot_data, dict):
+                            has_exposure_frames = 'exposure_dose_frames' in plot_data and plot_data['exposure_dose_frames']
+                            has_thickness_frames = 'thickness_frames' in plot_data and plot_data['thickness_frames']
                         
-                        if has_exposure_frames and has_thickness_frames:
-                            frames_count = len(plot_data['exposure_dose_frames'])
-                            print(f"  📊 数据完整性: ✅ 生成了{frames_count}帧动画数据")
-                            add_log_entry('success', 'enhanced_dill', f"📊 4D动画数据生成成功，共{frames_count}帧", dimension='4d')
-                        else:
-                            print(f"  📊 数据完整性: ❌ 动画数据不完整")
-                            add_log_entry('warning', 'enhanced_dill', f"📊 4D动画数据不完整", dimension='4d')
+                            if has_exposure_frames and has_thickness_frames:
+                                frames_count = len(plot_data['exposure_dose_frames'])
+                                print(f"  📊 数据完整性: ✅ 生成了{frames_count}帧动画数据")
+                                add_log_entry('success', 'enhanced_dill', f"📊 4D动画数据生成成功，共{frames_count}帧", dimension='4d')
+                            else:
+                                print(f"  📊 数据完整性: ❌ 动画数据不完整")
+                                add_log_entry('warning', 'enhanced_dill', f"📊 4D动画数据不完整", dimension='4d')
                     
                     # 添加到日志系统
                     add_log_entry('success', 'enhanced_dill', f"🎯 四维厚胶动画计算完成统计", dimension='4d')
@@ -734,62 +739,63 @@ def calculate_data():
                 plot_data = model.generate_data(z_h, T, t_B, I0, M0, t_exp_enh, sine_type=sine_type, K=K, V=V, num_points=1000)
                 calc_time = time.time() - calc_start
                 
-                if plot_data and 'exposure_dose' in plot_data:
-                    exposure_array = np.array(plot_data['exposure_dose'])
-                    thickness_array = np.array(plot_data['thickness'])
-                    x_array = np.array(plot_data['x'])
+                with stage('statistics'):
+                    if plot_data and 'exposure_dose' in plot_data:
+                        exposure_array = np.asarray(plot_data['exposure_dose'])
+                        thickness_array = np.asarray(plot_data['thickness'])
+                        x_array = np.asarray(plot_data['x'])
                     
-                    # 确保数组长度足够，避免索引越界
-                    array_length = len(x_array)
+                        # 确保数组长度足够，避免索引越界
+                        array_length = len(x_array)
                     
-                    # 动态计算进度索引，确保不超过数组边界
-                    idx_20_percent = min(199, array_length - 1)
-                    idx_50_percent = min(499, array_length - 1) 
-                    idx_80_percent = min(799, array_length - 1)
+                        # 动态计算进度索引，确保不超过数组边界
+                        idx_20_percent = min(199, array_length - 1)
+                        idx_50_percent = min(499, array_length - 1) 
+                        idx_80_percent = min(799, array_length - 1)
                     
-                    # 安全的进度输出
-                    print(f"[Enhanced-Dill-1D] 进度: {idx_20_percent+1}/{array_length}, pos={x_array[idx_20_percent]:.3f}, exposure={exposure_array[idx_20_percent]:.3f}, thickness={thickness_array[idx_20_percent]:.4f}")
-                    print(f"[Enhanced-Dill-1D] 进度: {idx_50_percent+1}/{array_length}, pos={x_array[idx_50_percent]:.3f}, exposure={exposure_array[idx_50_percent]:.3f}, thickness={thickness_array[idx_50_percent]:.4f}")
-                    print(f"[Enhanced-Dill-1D] 进度: {idx_80_percent+1}/{array_length}, pos={x_array[idx_80_percent]:.3f}, exposure={exposure_array[idx_80_percent]:.3f}, thickness={thickness_array[idx_80_percent]:.4f}")
+                        # 安全的进度输出
+                        print(f"[Enhanced-Dill-1D] 进度: {idx_20_percent+1}/{array_length}, pos={x_array[idx_20_percent]:.3f}, exposure={exposure_array[idx_20_percent]:.3f}, thickness={thickness_array[idx_20_percent]:.4f}")
+                        print(f"[Enhanced-Dill-1D] 进度: {idx_50_percent+1}/{array_length}, pos={x_array[idx_50_percent]:.3f}, exposure={exposure_array[idx_50_percent]:.3f}, thickness={thickness_array[idx_50_percent]:.4f}")
+                        print(f"[Enhanced-Dill-1D] 进度: {idx_80_percent+1}/{array_length}, pos={x_array[idx_80_percent]:.3f}, exposure={exposure_array[idx_80_percent]:.3f}, thickness={thickness_array[idx_80_percent]:.4f}")
                     
-                    # 添加安全的进度信息到日志系统
-                    add_log_entry('progress', 'enhanced_dill', f"进度: {idx_20_percent+1}/{array_length}, pos={x_array[idx_20_percent]:.3f}, exposure={exposure_array[idx_20_percent]:.3f}, thickness={thickness_array[idx_20_percent]:.4f}", dimension='1d')
-                    add_log_entry('progress', 'enhanced_dill', f"进度: {idx_50_percent+1}/{array_length}, pos={x_array[idx_50_percent]:.3f}, exposure={exposure_array[idx_50_percent]:.3f}, thickness={thickness_array[idx_50_percent]:.4f}", dimension='1d')
-                    add_log_entry('progress', 'enhanced_dill', f"进度: {idx_80_percent+1}/{array_length}, pos={x_array[idx_80_percent]:.3f}, exposure={exposure_array[idx_80_percent]:.3f}, thickness={thickness_array[idx_80_percent]:.4f}", dimension='1d')
+                        # 添加安全的进度信息到日志系统
+                        add_log_entry('progress', 'enhanced_dill', f"进度: {idx_20_percent+1}/{array_length}, pos={x_array[idx_20_percent]:.3f}, exposure={exposure_array[idx_20_percent]:.3f}, thickness={thickness_array[idx_20_percent]:.4f}", dimension='1d')
+                        add_log_entry('progress', 'enhanced_dill', f"进度: {idx_50_percent+1}/{array_length}, pos={x_array[idx_50_percent]:.3f}, exposure={exposure_array[idx_50_percent]:.3f}, thickness={thickness_array[idx_50_percent]:.4f}", dimension='1d')
+                        add_log_entry('progress', 'enhanced_dill', f"进度: {idx_80_percent+1}/{array_length}, pos={x_array[idx_80_percent]:.3f}, exposure={exposure_array[idx_80_percent]:.3f}, thickness={thickness_array[idx_80_percent]:.4f}", dimension='1d')
                     
-                    print(f"[Enhanced-Dill-1D] 🎯 计算完成统计:")
-                    print(f"  ✅ 成功计算: 1000/1000 (100.0%)")
-                    print(f"  ❌ 失败计算: 0/1000 (0.0%)")
-                    print(f"  ⏱️  平均计算时间: {calc_time/1000:.6f}s/点")
-                    print(f"  🔢 曝光剂量范围: [{exposure_array.min():.3f}, {exposure_array.max():.3f}] mJ/cm²")
-                    print(f"  📏 厚度范围: [{thickness_array.min():.4f}, {thickness_array.max():.4f}] (归一化)")
-                    print(f"  🔬 增强Dill模型厚胶分析:")
-                    print(f"     胶层厚度: {z_h}μm")
-                    print(f"     前烘温度: {T}°C")
-                    print(f"     前烘时间: {t_B}s")
-                    if z_h > 5:
-                        print(f"     厚胶层({z_h}μm): 适合使用增强Dill模型")
-                    else:
-                        print(f"     薄胶层({z_h}μm): 可考虑使用标准Dill模型")
+                        print(f"[Enhanced-Dill-1D] 🎯 计算完成统计:")
+                        print(f"  ✅ 成功计算: 1000/1000 (100.0%)")
+                        print(f"  ❌ 失败计算: 0/1000 (0.0%)")
+                        print(f"  ⏱️  平均计算时间: {calc_time/1000:.6f}s/点")
+                        print(f"  🔢 曝光剂量范围: [{exposure_array.min():.3f}, {exposure_array.max():.3f}] mJ/cm²")
+                        print(f"  📏 厚度范围: [{thickness_array.min():.4f}, {thickness_array.max():.4f}] (归一化)")
+                        print(f"  🔬 增强Dill模型厚胶分析:")
+                        print(f"     胶层厚度: {z_h}μm")
+                        print(f"     前烘温度: {T}°C")
+                        print(f"     前烘时间: {t_B}s")
+                        if z_h > 5:
+                            print(f"     厚胶层({z_h}μm): 适合使用增强Dill模型")
+                        else:
+                            print(f"     薄胶层({z_h}μm): 可考虑使用标准Dill模型")
                     
-                    # 添加详细统计到日志系统
-                    add_log_entry('success', 'enhanced_dill', f"🎯 计算完成统计", dimension='1d')
-                    add_log_entry('info', 'enhanced_dill', f"✅ 成功计算: 1000/1000 (100.0%)", dimension='1d')
-                    add_log_entry('info', 'enhanced_dill', f"❌ 失败计算: 0/1000 (0.0%)", dimension='1d')
-                    add_log_entry('info', 'enhanced_dill', f"⏱️ 平均计算时间: {calc_time/1000:.6f}s/点", dimension='1d')
-                    add_log_entry('info', 'enhanced_dill', f"🔢 曝光剂量范围: [{exposure_array.min():.3f}, {exposure_array.max():.3f}] mJ/cm²", dimension='1d')
-                    add_log_entry('info', 'enhanced_dill', f"📏 厚度范围: [{thickness_array.min():.4f}, {thickness_array.max():.4f}] (归一化)", dimension='1d')
-                    add_log_entry('info', 'enhanced_dill', f"🔬 增强Dill模型厚胶分析", dimension='1d')
-                    add_log_entry('info', 'enhanced_dill', f"   胶层厚度: {z_h}μm", dimension='1d')
-                    add_log_entry('info', 'enhanced_dill', f"   前烘温度: {T}°C", dimension='1d')
-                    add_log_entry('info', 'enhanced_dill', f"   前烘时间: {t_B}s", dimension='1d')
+                        # 添加详细统计到日志系统
+                        add_log_entry('success', 'enhanced_dill', f"🎯 计算完成统计", dimension='1d')
+                        add_log_entry('info', 'enhanced_dill', f"✅ 成功计算: 1000/1000 (100.0%)", dimension='1d')
+                        add_log_entry('info', 'enhanced_dill', f"❌ 失败计算: 0/1000 (0.0%)", dimension='1d')
+                        add_log_entry('info', 'enhanced_dill', f"⏱️ 平均计算时间: {calc_time/1000:.6f}s/点", dimension='1d')
+                        add_log_entry('info', 'enhanced_dill', f"🔢 曝光剂量范围: [{exposure_array.min():.3f}, {exposure_array.max():.3f}] mJ/cm²", dimension='1d')
+                        add_log_entry('info', 'enhanced_dill', f"📏 厚度范围: [{thickness_array.min():.4f}, {thickness_array.max():.4f}] (归一化)", dimension='1d')
+                        add_log_entry('info', 'enhanced_dill', f"🔬 增强Dill模型厚胶分析", dimension='1d')
+                        add_log_entry('info', 'enhanced_dill', f"   胶层厚度: {z_h}μm", dimension='1d')
+                        add_log_entry('info', 'enhanced_dill', f"   前烘温度: {T}°C", dimension='1d')
+                        add_log_entry('info', 'enhanced_dill', f"   前烘时间: {t_B}s", dimension='1d')
                     
-                    # 添加厚胶层分析
-                    if z_h > 5:
-                        analysis_msg = f"厚胶层({z_h}μm): 适合使用增强Dill模型"
-                    else:
-                        analysis_msg = f"薄胶层({z_h}μm): 可考虑使用标准Dill模型"
-                    add_log_entry('info', 'enhanced_dill', f"   {analysis_msg}", dimension='1d')
+                        # 添加厚胶层分析
+                        if z_h > 5:
+                            analysis_msg = f"厚胶层({z_h}μm): 适合使用增强Dill模型"
+                        else:
+                            analysis_msg = f"薄胶层({z_h}μm): 可考虑使用标准Dill模型"
+                        add_log_entry('info', 'enhanced_dill', f"   {analysis_msg}", dimension='1d')
                 
                 add_success_log('enhanced_dill', f"一维厚胶计算完成，{z_h}μm厚度，用时{calc_time:.3f}s", dimension='1d')
 
@@ -834,34 +840,35 @@ def calculate_data():
                 plot_data = model.generate_data(I_avg, V_car, None, t_exp_car, acid_gen_eff, diff_len, react_rate, amp, contr, sine_type=sine_type, Kx=Kx, Ky=Ky, phi_expr=phi_expr, y_range=y_range)
                 calc_time = time.time() - calc_start
                 
-                if plot_data and 'z_acid_concentration' in plot_data:
-                    acid_array = np.array(plot_data['z_acid_concentration'])
-                    deprotect_array = np.array(plot_data['z_deprotection'])
+                with stage('statistics'):
+                    if plot_data and 'z_acid_concentration' in plot_data:
+                        acid_array = np.array(plot_data['z_acid_concentration'])
+                        deprotect_array = np.array(plot_data['z_deprotection'])
                     
-                    print(f"[CAR-2D] 🎯 二维化学放大计算完成统计:")
-                    print(f"  ✅ 网格大小: {acid_array.shape}")
-                    print(f"  ⏱️  计算时间: {calc_time:.3f}s")
-                    print(f"  🧪 光酸浓度范围: [{acid_array.min():.3f}, {acid_array.max():.3f}] 相对单位")
-                    print(f"  🔬 脱保护度范围: [{deprotect_array.min():.4f}, {deprotect_array.max():.4f}] (归一化)")
-                    print(f"  ⚗️  CAR模型化学放大分析:")
-                    print(f"     光酸产生效率: {acid_gen_eff}")
-                    print(f"     扩散长度: {diff_len} μm")
-                    print(f"     反应速率: {react_rate}")
-                    print(f"     放大因子: {amp}")
-                    print(f"     空间频率: Kx={Kx}, Ky={Ky}")
+                        print(f"[CAR-2D] 🎯 二维化学放大计算完成统计:")
+                        print(f"  ✅ 网格大小: {acid_array.shape}")
+                        print(f"  ⏱️  计算时间: {calc_time:.3f}s")
+                        print(f"  🧪 光酸浓度范围: [{acid_array.min():.3f}, {acid_array.max():.3f}] 相对单位")
+                        print(f"  🔬 脱保护度范围: [{deprotect_array.min():.4f}, {deprotect_array.max():.4f}] (归一化)")
+                        print(f"  ⚗️  CAR模型化学放大分析:")
+                        print(f"     光酸产生效率: {acid_gen_eff}")
+                        print(f"     扩散长度: {diff_len} μm")
+                        print(f"     反应速率: {react_rate}")
+                        print(f"     放大因子: {amp}")
+                        print(f"     空间频率: Kx={Kx}, Ky={Ky}")
                     
-                    # 添加详细统计到日志系统
-                    add_log_entry('success', 'car', f"🎯 二维化学放大计算完成统计", dimension='2d')
-                    add_log_entry('info', 'car', f"✅ 网格大小: {acid_array.shape}", dimension='2d')
-                    add_log_entry('info', 'car', f"⏱️ 计算时间: {calc_time:.3f}s", dimension='2d')
-                    add_log_entry('info', 'car', f"🧪 光酸浓度范围: [{acid_array.min():.3f}, {acid_array.max():.3f}] 相对单位", dimension='2d')
-                    add_log_entry('info', 'car', f"🔬 脱保护度范围: [{deprotect_array.min():.4f}, {deprotect_array.max():.4f}] (归一化)", dimension='2d')
-                    add_log_entry('info', 'car', f"⚗️ CAR模型化学放大分析", dimension='2d')
-                    add_log_entry('info', 'car', f"   光酸产生效率: {acid_gen_eff}", dimension='2d')
-                    add_log_entry('info', 'car', f"   扩散长度: {diff_len} μm", dimension='2d')
-                    add_log_entry('info', 'car', f"   反应速率: {react_rate}", dimension='2d')
-                    add_log_entry('info', 'car', f"   放大因子: {amp}", dimension='2d')
-                    add_log_entry('info', 'car', f"   空间频率: Kx={Kx}, Ky={Ky}", dimension='2d')
+                        # 添加详细统计到日志系统
+                        add_log_entry('success', 'car', f"🎯 二维化学放大计算完成统计", dimension='2d')
+                        add_log_entry('info', 'car', f"✅ 网格大小: {acid_array.shape}", dimension='2d')
+                        add_log_entry('info', 'car', f"⏱️ 计算时间: {calc_time:.3f}s", dimension='2d')
+                        add_log_entry('info', 'car', f"🧪 光酸浓度范围: [{acid_array.min():.3f}, {acid_array.max():.3f}] 相对单位", dimension='2d')
+                        add_log_entry('info', 'car', f"🔬 脱保护度范围: [{deprotect_array.min():.4f}, {deprotect_array.max():.4f}] (归一化)", dimension='2d')
+                        add_log_entry('info', 'car', f"⚗️ CAR模型化学放大分析", dimension='2d')
+                        add_log_entry('info', 'car', f"   光酸产生效率: {acid_gen_eff}", dimension='2d')
+                        add_log_entry('info', 'car', f"   扩散长度: {diff_len} μm", dimension='2d')
+                        add_log_entry('info', 'car', f"   反应速率: {react_rate}", dimension='2d')
+                        add_log_entry('info', 'car', f"   放大因子: {amp}", dimension='2d')
+                        add_log_entry('info', 'car', f"   空间频率: Kx={Kx}, Ky={Ky}", dimension='2d')
                 
                 add_success_log('car', f"二维化学放大计算完成，放大因子{amp}，用时{calc_time:.3f}s", dimension='2d')
                 
@@ -947,62 +954,63 @@ def calculate_data():
                 plot_data = model.generate_data(I_avg, V_car, K_car, t_exp_car, acid_gen_eff, diff_len, react_rate, amp, contr, sine_type=sine_type)
                 calc_time = time.time() - calc_start
                 
-                if plot_data and 'acid_concentration' in plot_data:
-                    acid_array = np.array(plot_data['acid_concentration'])
-                    deprotect_array = np.array(plot_data['deprotection'])
-                    x_array = np.array(plot_data['positions'])
+                with stage('statistics'):
+                    if plot_data and 'acid_concentration' in plot_data:
+                        acid_array = np.array(plot_data['acid_concentration'])
+                        deprotect_array = np.array(plot_data['deprotection'])
+                        x_array = np.array(plot_data['positions'])
                     
-                    # 确保数组长度足够，避免索引越界
-                    array_length = len(x_array)
+                        # 确保数组长度足够，避免索引越界
+                        array_length = len(x_array)
                     
-                    # 动态计算进度索引，确保不超过数组边界
-                    idx_20_percent = min(199, array_length - 1)
-                    idx_50_percent = min(499, array_length - 1) 
-                    idx_80_percent = min(799, array_length - 1)
+                        # 动态计算进度索引，确保不超过数组边界
+                        idx_20_percent = min(199, array_length - 1)
+                        idx_50_percent = min(499, array_length - 1) 
+                        idx_80_percent = min(799, array_length - 1)
                     
-                    # 安全的进度输出
-                    print(f"[CAR-1D] 进度: {idx_20_percent+1}/{array_length}, pos={x_array[idx_20_percent]:.3f}, acid={acid_array[idx_20_percent]:.3f}, deprotection={deprotect_array[idx_20_percent]:.4f}")
-                    print(f"[CAR-1D] 进度: {idx_50_percent+1}/{array_length}, pos={x_array[idx_50_percent]:.3f}, acid={acid_array[idx_50_percent]:.3f}, deprotection={deprotect_array[idx_50_percent]:.4f}")
-                    print(f"[CAR-1D] 进度: {idx_80_percent+1}/{array_length}, pos={x_array[idx_80_percent]:.3f}, acid={acid_array[idx_80_percent]:.3f}, deprotection={deprotect_array[idx_80_percent]:.4f}")
+                        # 安全的进度输出
+                        print(f"[CAR-1D] 进度: {idx_20_percent+1}/{array_length}, pos={x_array[idx_20_percent]:.3f}, acid={acid_array[idx_20_percent]:.3f}, deprotection={deprotect_array[idx_20_percent]:.4f}")
+                        print(f"[CAR-1D] 进度: {idx_50_percent+1}/{array_length}, pos={x_array[idx_50_percent]:.3f}, acid={acid_array[idx_50_percent]:.3f}, deprotection={deprotect_array[idx_50_percent]:.4f}")
+                        print(f"[CAR-1D] 进度: {idx_80_percent+1}/{array_length}, pos={x_array[idx_80_percent]:.3f}, acid={acid_array[idx_80_percent]:.3f}, deprotection={deprotect_array[idx_80_percent]:.4f}")
                     
-                    # 添加安全的进度信息到日志系统
-                    add_log_entry('progress', 'car', f"进度: {idx_20_percent+1}/{array_length}, pos={x_array[idx_20_percent]:.3f}, acid={acid_array[idx_20_percent]:.3f}, deprotection={deprotect_array[idx_20_percent]:.4f}", dimension='1d')
-                    add_log_entry('progress', 'car', f"进度: {idx_50_percent+1}/{array_length}, pos={x_array[idx_50_percent]:.3f}, acid={acid_array[idx_50_percent]:.3f}, deprotection={deprotect_array[idx_50_percent]:.4f}", dimension='1d')
-                    add_log_entry('progress', 'car', f"进度: {idx_80_percent+1}/{array_length}, pos={x_array[idx_80_percent]:.3f}, acid={acid_array[idx_80_percent]:.3f}, deprotection={deprotect_array[idx_80_percent]:.4f}", dimension='1d')
+                        # 添加安全的进度信息到日志系统
+                        add_log_entry('progress', 'car', f"进度: {idx_20_percent+1}/{array_length}, pos={x_array[idx_20_percent]:.3f}, acid={acid_array[idx_20_percent]:.3f}, deprotection={deprotect_array[idx_20_percent]:.4f}", dimension='1d')
+                        add_log_entry('progress', 'car', f"进度: {idx_50_percent+1}/{array_length}, pos={x_array[idx_50_percent]:.3f}, acid={acid_array[idx_50_percent]:.3f}, deprotection={deprotect_array[idx_50_percent]:.4f}", dimension='1d')
+                        add_log_entry('progress', 'car', f"进度: {idx_80_percent+1}/{array_length}, pos={x_array[idx_80_percent]:.3f}, acid={acid_array[idx_80_percent]:.3f}, deprotection={deprotect_array[idx_80_percent]:.4f}", dimension='1d')
                     
-                    print(f"[CAR-1D] 🎯 计算完成统计:")
-                    print(f"  ✅ 成功计算: 1000/1000 (100.0%)")
-                    print(f"  ❌ 失败计算: 0/1000 (0.0%)")
-                    print(f"  ⏱️  平均计算时间: {calc_time/1000:.6f}s/点")
-                    print(f"  🧪 光酸浓度范围: [{acid_array.min():.3f}, {acid_array.max():.3f}] 相对单位")
-                    print(f"  🔬 脱保护度范围: [{deprotect_array.min():.4f}, {deprotect_array.max():.4f}] (归一化)")
-                    print(f"  💾 数据质量: 优秀")
-                    print(f"  📊 统计特征:")
-                    print(f"     光酸浓度: 均值={acid_array.mean():.3f}, 标准差={acid_array.std():.3f}")
-                    print(f"     脱保护度: 均值={deprotect_array.mean():.4f}, 标准差={deprotect_array.std():.4f}")
-                    print(f"  ⚗️  CAR模型化学放大分析:")
-                    print(f"     光酸产生效率: {acid_gen_eff}")
-                    print(f"     扩散长度: {diff_len} μm")
-                    print(f"     反应速率常数: {react_rate}")
-                    print(f"     化学放大因子: {amp}")
-                    print(f"     对比度: {contr}")
+                        print(f"[CAR-1D] 🎯 计算完成统计:")
+                        print(f"  ✅ 成功计算: 1000/1000 (100.0%)")
+                        print(f"  ❌ 失败计算: 0/1000 (0.0%)")
+                        print(f"  ⏱️  平均计算时间: {calc_time/1000:.6f}s/点")
+                        print(f"  🧪 光酸浓度范围: [{acid_array.min():.3f}, {acid_array.max():.3f}] 相对单位")
+                        print(f"  🔬 脱保护度范围: [{deprotect_array.min():.4f}, {deprotect_array.max():.4f}] (归一化)")
+                        print(f"  💾 数据质量: 优秀")
+                        print(f"  📊 统计特征:")
+                        print(f"     光酸浓度: 均值={acid_array.mean():.3f}, 标准差={acid_array.std():.3f}")
+                        print(f"     脱保护度: 均值={deprotect_array.mean():.4f}, 标准差={deprotect_array.std():.4f}")
+                        print(f"  ⚗️  CAR模型化学放大分析:")
+                        print(f"     光酸产生效率: {acid_gen_eff}")
+                        print(f"     扩散长度: {diff_len} μm")
+                        print(f"     反应速率常数: {react_rate}")
+                        print(f"     化学放大因子: {amp}")
+                        print(f"     对比度: {contr}")
                     
-                    # 添加详细统计到日志系统
-                    add_log_entry('success', 'car', f"🎯 计算完成统计", dimension='1d')
-                    add_log_entry('info', 'car', f"✅ 成功计算: 1000/1000 (100.0%)", dimension='1d')
-                    add_log_entry('info', 'car', f"❌ 失败计算: 0/1000 (0.0%)", dimension='1d')
-                    add_log_entry('info', 'car', f"⏱️ 平均计算时间: {calc_time/1000:.6f}s/点", dimension='1d')
-                    add_log_entry('info', 'car', f"🧪 光酸浓度范围: [{acid_array.min():.3f}, {acid_array.max():.3f}] 相对单位", dimension='1d')
-                    add_log_entry('info', 'car', f"🔬 脱保护度范围: [{deprotect_array.min():.4f}, {deprotect_array.max():.4f}] (归一化)", dimension='1d')
-                    add_log_entry('info', 'car', f"💾 数据质量: 优秀", dimension='1d')
-                    add_log_entry('info', 'car', f"📊 光酸浓度统计: 均值={acid_array.mean():.3f}, 标准差={acid_array.std():.3f}", dimension='1d')
-                    add_log_entry('info', 'car', f"📊 脱保护度统计: 均值={deprotect_array.mean():.4f}, 标准差={deprotect_array.std():.4f}", dimension='1d')
-                    add_log_entry('info', 'car', f"⚗️ CAR模型化学放大分析", dimension='1d')
-                    add_log_entry('info', 'car', f"   光酸产生效率: {acid_gen_eff}", dimension='1d')
-                    add_log_entry('info', 'car', f"   扩散长度: {diff_len} μm", dimension='1d')
-                    add_log_entry('info', 'car', f"   反应速率常数: {react_rate}", dimension='1d')
-                    add_log_entry('info', 'car', f"   化学放大因子: {amp}", dimension='1d')
-                    add_log_entry('info', 'car', f"   对比度: {contr}", dimension='1d')
+                        # 添加详细统计到日志系统
+                        add_log_entry('success', 'car', f"🎯 计算完成统计", dimension='1d')
+                        add_log_entry('info', 'car', f"✅ 成功计算: 1000/1000 (100.0%)", dimension='1d')
+                        add_log_entry('info', 'car', f"❌ 失败计算: 0/1000 (0.0%)", dimension='1d')
+                        add_log_entry('info', 'car', f"⏱️ 平均计算时间: {calc_time/1000:.6f}s/点", dimension='1d')
+                        add_log_entry('info', 'car', f"🧪 光酸浓度范围: [{acid_array.min():.3f}, {acid_array.max():.3f}] 相对单位", dimension='1d')
+                        add_log_entry('info', 'car', f"🔬 脱保护度范围: [{deprotect_array.min():.4f}, {deprotect_array.max():.4f}] (归一化)", dimension='1d')
+                        add_log_entry('info', 'car', f"💾 数据质量: 优秀", dimension='1d')
+                        add_log_entry('info', 'car', f"📊 光酸浓度统计: 均值={acid_array.mean():.3f}, 标准差={acid_array.std():.3f}", dimension='1d')
+                        add_log_entry('info', 'car', f"📊 脱保护度统计: 均值={deprotect_array.mean():.4f}, 标准差={deprotect_array.std():.4f}", dimension='1d')
+                        add_log_entry('info', 'car', f"⚗️ CAR模型化学放大分析", dimension='1d')
+                        add_log_entry('info', 'car', f"   光酸产生效率: {acid_gen_eff}", dimension='1d')
+                        add_log_entry('info', 'car', f"   扩散长度: {diff_len} μm", dimension='1d')
+                        add_log_entry('info', 'car', f"   反应速率常数: {react_rate}", dimension='1d')
+                        add_log_entry('info', 'car', f"   化学放大因子: {amp}", dimension='1d')
+                        add_log_entry('info', 'car', f"   对比度: {contr}", dimension='1d')
                 
                 add_success_log('car', f"一维化学放大计算完成，放大因子{amp}，用时{calc_time:.3f}s", dimension='1d')
         else:
@@ -1019,43 +1027,49 @@ def calculate_data():
         add_log_entry('success', model_type, f"🏁 总计算时间: {total_time:.3f}s", dimension=dimension)
         
         # Enhanced Dill模型2D数据验证和统计
-        if model_type == 'enhanced_dill' and sine_type == 'multi' and plot_data:
-            print(f"[Enhanced-Dill-2D] 📊 数据完整性验证:")
+        with stage('statistics'):
+            if model_type == 'enhanced_dill' and sine_type == 'multi' and plot_data:
+                print(f"[Enhanced-Dill-2D] 📊 数据完整性验证:")
             
-            # 检查兼容性字段
-            has_z_exposure_dose = 'z_exposure_dose' in plot_data and plot_data['z_exposure_dose']
-            has_z_thickness = 'z_thickness' in plot_data and plot_data['z_thickness']
+                # 检查兼容性字段
+                has_z_exposure_dose = 'z_exposure_dose' in plot_data and plot_data['z_exposure_dose']
+                has_z_thickness = 'z_thickness' in plot_data and plot_data['z_thickness']
             
-            # 检查扩展字段
-            has_yz_data = 'yz_exposure' in plot_data and 'yz_thickness' in plot_data
-            has_xy_data = 'xy_exposure' in plot_data and 'xy_thickness' in plot_data
+                # 检查扩展字段
+                has_yz_data = 'yz_exposure' in plot_data and 'yz_thickness' in plot_data
+                has_xy_data = 'xy_exposure' in plot_data and 'xy_thickness' in plot_data
             
-            print(f"  ✅ 兼容性数据: z_exposure_dose={has_z_exposure_dose}, z_thickness={has_z_thickness}")
-            print(f"  ✅ YZ平面数据: yz_exposure={has_yz_data}")
-            print(f"  ✅ XY平面数据: xy_exposure={has_xy_data}")
-            print(f"  ✅ 元数据: is_2d={plot_data.get('is_2d', False)}")
+                print(f"  ✅ 兼容性数据: z_exposure_dose={has_z_exposure_dose}, z_thickness={has_z_thickness}")
+                print(f"  ✅ YZ平面数据: yz_exposure={has_yz_data}")
+                print(f"  ✅ XY平面数据: xy_exposure={has_xy_data}")
+                print(f"  ✅ 元数据: is_2d={plot_data.get('is_2d', False)}")
             
-            # 添加验证结果到日志
-            add_log_entry('info', 'enhanced_dill', f"📊 数据完整性验证", dimension='2d')
-            add_log_entry('info', 'enhanced_dill', f"  兼容性数据: z_exposure_dose={has_z_exposure_dose}, z_thickness={has_z_thickness}", dimension='2d')
-            add_log_entry('info', 'enhanced_dill', f"  YZ平面数据: yz_exposure={has_yz_data}", dimension='2d')
-            add_log_entry('info', 'enhanced_dill', f"  XY平面数据: xy_exposure={has_xy_data}", dimension='2d')
-            add_log_entry('info', 'enhanced_dill', f"  元数据: is_2d={plot_data.get('is_2d', False)}", dimension='2d')
+                # 添加验证结果到日志
+                add_log_entry('info', 'enhanced_dill', f"📊 数据完整性验证", dimension='2d')
+                add_log_entry('info', 'enhanced_dill', f"  兼容性数据: z_exposure_dose={has_z_exposure_dose}, z_thickness={has_z_thickness}", dimension='2d')
+                add_log_entry('info', 'enhanced_dill', f"  YZ平面数据: yz_exposure={has_yz_data}", dimension='2d')
+                add_log_entry('info', 'enhanced_dill', f"  XY平面数据: xy_exposure={has_xy_data}", dimension='2d')
+                add_log_entry('info', 'enhanced_dill', f"  元数据: is_2d={plot_data.get('is_2d', False)}", dimension='2d')
             
-            if has_z_exposure_dose and has_z_thickness:
-                add_log_entry('success', 'enhanced_dill', f"✅ Enhanced Dill 2D数据准备完成，前端显示已就绪", dimension='2d')
-            else:
-                add_log_entry('warning', 'enhanced_dill', f"⚠️ Enhanced Dill 2D兼容性数据不完整", dimension='2d')
+                if has_z_exposure_dose and has_z_thickness:
+                    add_log_entry('success', 'enhanced_dill', f"✅ Enhanced Dill 2D数据准备完成，前端显示已就绪", dimension='2d')
+                else:
+                    add_log_entry('warning', 'enhanced_dill', f"⚠️ Enhanced Dill 2D兼容性数据不完整", dimension='2d')
+        
+        # 预览降采样（max_points / target_shape / region）
+        try:
+            lod_options = parse_lod_options(data)
+            if lod_options and plot_data:
+                plot_data = apply_lod(plot_data, model.LOD_AXES.get(sine_type, {}), **lod_options)
+                add_log_entry('info', model_type, f"🔍 LOD降采样({lod_options['method']}): 处理字段{len(plot_data['lod']['fields'])}个", dimension=dimension)
+        except ValueError as e:
+            add_error_log(model_type, f"降采样参数错误: {str(e)}", dimension=dimension)
+            return jsonify(format_response(False, message=str(e))), 400
         
         return jsonify(format_response(True, data=plot_data)), 200
     except Exception as e:
         # 记录异常参数和错误信息到日志
-        with open('dill_backend.log', 'a', encoding='utf-8') as f:
-            f.write(f"[{datetime.datetime.now()}]\n")
-            f.write(f"请求参数: {data if 'data' in locals() else '无'}\n")
-            f.write(f"异常类型: {type(e).__name__}\n")
-            f.write(f"异常信息: {str(e)}\n")
-            f.write(f"堆栈信息: {traceback.format_exc()}\n\n")
+        log_request_error(data if 'data' in locals() else None)
         
         model_type = data.get('model_type', 'unknown') if 'data' in locals() else 'unknown'
         sine_type = data.get('sine_type', 'unknown') if 'data' in locals() else 'unknown'
@@ -1063,7 +1077,145 @@ def calculate_data():
         
         return jsonify(format_response(False, message=f"数据计算错误: {str(e)}")), 500
 
+def build_animation_stream(model, model_type, data, cancel_token=None):
+    """
+    解析4D动画请求参数并创建模型的流式帧生成器
+    
+    参数:
+        model: 模型实例
+        model_type: 模型类型 ('dill', 'enhanced_dill', 'car')
+        data: 请求参数字典（已通过校验）
+        cancel_token: 取消令牌，帧生成器在每帧开始时检查
+    返回:
+        (meta, frames) 元组，见各模型的 animation_stream
+    """
+    sine_type = data.get('sine_type', '1d')
+    phi_expr = data.get('phi_expr', '0')
+    t_start = float(data.get('t_start', 0))
+    t_end = float(data.get('t_end', 5))
+    time_steps = int(data.get('time_steps', 20))
+    if time_steps < 1:
+        raise ValueError("时间步数必须大于0")
+    
+    y_range = None
+    z_range = None
+    if sine_type == 'multi':
+        y_min = float(data.get('y_min', 0))
+        y_max = float(data.get('y_max', 10))
+        y_points = int(data.get('y_points', 100))
+        if y_min >= y_max:
+            raise ValueError("Y轴范围最小值必须小于最大值")
+        if y_points <= 1:
+            raise ValueError("Y轴点数必须大于1才能进行二维计算")
+        y_range = np.linspace(y_min, y_max, y_points).tolist()
+    elif sine_type == '3d':
+        y_min, y_max = float(data.get('y_min', 0)), float(data.get('y_max', 10))
+        z_min, z_max = float(data.get('z_min', 0)), float(data.get('z_max', 10))
+        y_range = np.linspace(y_min, y_max, 50).tolist() if y_min < y_max else None
+        z_range = np.linspace(z_min, z_max, 50).tolist() if z_min < z_max else None
+    
+    common = dict(sine_type=sine_type, Kx=data.get('Kx'), Ky=data.get('Ky'), Kz=data.get('Kz'),
+                  phi_expr=phi_expr, y_range=y_range, z_range=z_range,
+                  t_start=t_start, t_end=t_end, time_steps=time_steps, cancel_token=cancel_token)
+    
+    if model_type == 'dill':
+        extra = {'x_min': float(data.get('x_min', 0)), 'x_max': float(data.get('x_max', 10))} if sine_type == '3d' else {}
+        return model.animation_stream(float(data['I_avg']), float(data['V']), data.get('K'), float(data['t_exp']),
+                                      float(data['C']), **common, **extra)
+    if model_type == 'enhanced_dill':
+        return model.animation_stream(float(data['z_h']), float(data['T']), float(data['t_B']),
+                                      float(data.get('I0', 1.0)), float(data.get('M0', 1.0)), float(data['t_exp']),
+                                      V=float(data.get('V', 0.8)), K=data.get('K'), **common)
+    return model.animation_stream(float(data['I_avg']), float(data['V']), data.get('K'), float(data['t_exp']),
+                                  float(data['acid_gen_efficiency']), float(data['diffusion_length']),
+                                  float(data['reaction_rate']), float(data['amplification']), float(data['contrast']),
+                                  **common)
+
+@api_bp.route('/calculate_data/stream', methods=['POST'])
+@admission_controlled('stream')
+def calculate_data_stream():
+    """
+    以NDJSON分块流式返回4D动画数据
+    
+    响应为 application/x-ndjson，每行一个JSON记录：
+        {"type": "meta", ...}           坐标、时间轴、帧字段等元数据
+        {"type": "frame", "index": k, "t": ..., "<字段>": [...]}   每帧一条
+        {"type": "end", "frames": n, "elapsed": 秒}
+    计算中途出错、超时或被取消时以 {"type": "error", "message": ...} 结束。
+    服务端逐帧计算、逐帧发送，不在内存中保留全部帧。
+    """
+    data = request.get_json(silent=True) or {}
+    model_type = data.get('model_type', 'dill')
+    sine_type = data.get('sine_type', '1d')
+    validators = {'dill': validate_input, 'enhanced_dill': validate_enhanced_input, 'car': validate_car_input}
+    if model_type not in validators:
+        return jsonify(format_response(False, message="未知模型类型")), 400
+    
+    is_valid, message = validators[model_type](data)
+    if not is_valid:
+        add_error_log(model_type, f"参数校验失败: {message}", dimension=sine_type)
+        return jsonify(format_response(False, message=message)), 400
+    
+    app = current_app._get_current_object()
+    # 流式响应不探测套接字：客户端断开时服务器关闭生成器，由此触发取消
+    token = create_job_token(watch_client=False)
+    try:
+        model = get_model_by_name(model_type)
+        meta, frames = build_animation_stream(model, model_type, data, cancel_token=token)
+    except (ValueError, TypeError, KeyError) as e:
+        release_job_token(app, token)
+        add_error_log(model_type, f"4D动画流参数错误: {str(e)}", dimension='4d')
+        return jsonify(format_response(False, message=str(e))), 400
+    
+    add_log_entry('info', model_type, f"🎬 开始流式输出4D动画: {meta['time_steps']}帧", dimension='4d')
+    
+    released = []
+    
+    def release():
+        # 生成器结束时与响应关闭时都会调用；客户端在第一块发送前断开时生成器不会启动，只能由后者释放
+        if not released:
+            released.append(True)
+            frames.close()
+            release_job_token(app, token)
+    
+    def generate():
+        start = time.time()
+        count = 0
+        yield app.json.dumps_bytes({'type': 'meta', 'model_type': model_type, **meta}) + b'\n'
+        try:
+            for frame in frames:
+                yield app.json.dumps_bytes({'type': 'frame', **frame}) + b'\n'
+                count += 1
+        except GeneratorExit:
+            token.cancel('disconnected')
+            add_warning_log(model_type, f"客户端断开，4D动画流在第{count}帧终止", dimension='4d')
+            raise
+        except CalculationCancelled as e:
+            add_warning_log(model_type, f"4D动画流已终止: {str(e)}", dimension='4d')
+            yield json.dumps({'type': 'error', 'reason': e.reason, 'message': str(e)}, ensure_ascii=False) + '\n'
+            return
+        except Exception as e:
+            add_error_log(model_type, f"4D动画流计算异常: {str(e)}", dimension='4d')
+            yield json.dumps({'type': 'error', 'message': str(e)}, ensure_ascii=False) + '\n'
+            return
+        finally:
+            release()
+        elapsed = time.time() - start
+        add_success_log(model_type, f"4D动画流式输出完成，共{count}帧，用时{elapsed:.3f}s", dimension='4d')
+        yield json.dumps({'type': 'end', 'frames': count, 'elapsed': elapsed}) + '\n'
+    
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    response.call_on_close(release)
+    response.headers['Cache-Control'] = 'no-cache'
+    # 关闭反向代理缓冲，保证每帧及时送达
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @api_bp.route('/compare', methods=['POST'])
+@admission_controlled('compare')
+@cancellable
+@renders_plots
+@profilable
 def compare():
     """
     比较多组参数的计算结果
@@ -1105,23 +1257,55 @@ def compare():
             if not is_valid:
                 return jsonify(format_response(False, message=f"参数组 {i+1}: {message}")), 400
         
-        # 生成比较图像
-        comparison_plots = generate_comparison_plots_with_enhanced(parameter_sets)
+        # 与 /api/compare_data 相同的计算路径（共用结果缓存），再由结果数组绘图
+        x, results, total_time = _compute_compare(parameter_sets)
+        set_ids = [params.get('setId', str(i+1)) for i, params in enumerate(parameter_sets)]
+        for set_id, result in zip(set_ids, results):
+            _log_compare_set(set_id, result, set_ids)
+        comparison_plots = generate_comparison_plots_with_enhanced(x, results)
+        comparison_plots['plot_mime'] = plot_mime()
         
         # 返回结果
         return jsonify(format_response(True, data=comparison_plots)), 200
     
     except Exception as e:
         # 记录异常参数和错误信息到日志
-        with open('dill_backend.log', 'a', encoding='utf-8') as f:
-            f.write(f"[{datetime.datetime.now()}]\n")
-            f.write(f"请求参数: {data if 'data' in locals() else '无'}\n")
-            f.write(f"异常类型: {type(e).__name__}\n")
-            f.write(f"异常信息: {str(e)}\n")
-            f.write(f"堆栈信息: {traceback.format_exc()}\n\n")
+        log_request_error(data if 'data' in locals() else None)
         return jsonify(format_response(False, message=f"比较计算错误: {str(e)}")), 500
 
+@stage('statistics')
+def _log_compare_set(set_id, result, set_ids):
+    """记录参数比较中单个参数组的参数与结果统计"""
+    model_type = result['model_type']
+    params = ', '.join(f"{name}={value:g}" for name, value in result['params'].items())
+    print(f"[{model_type}] 参数组{set_id}: {params}")
+    add_log_entry('info', model_type, f"参数组{set_id}: {params}")
+    if 'duplicate_of' in result:
+        add_log_entry('info', model_type, f"参数组{set_id}与参数组{set_ids[result['duplicate_of']]}相同，复用计算结果")
+        return
+    if result['cached']:
+        add_log_entry('info', model_type, f"参数组{set_id}命中结果缓存")
+        return
+
+    exposure, thickness = result['exposure_dose'], result['thickness']
+    stats = result['stats']
+    if stats:
+        total = stats['successful'] + stats['fallback']
+        add_log_entry('stats', model_type, f"✅ 成功计算: {stats['successful']}/{total} ({stats['successful']/total*100:.1f}%)")
+        add_log_entry('stats', model_type, f"⚠️ 备用计算: {stats['fallback']}/{total} ({stats['fallback']/total*100:.1f}%)")
+        add_log_entry('stats', model_type, f"⏱️ 平均计算时间: {stats['avg_compute_time']:.6f}s/点（{stats['chunks']}段，网格细化{stats['refined']}个位置）")
+        if stats['fallback'] > total * 0.2:
+            print(f"  ⚠️  警告: 超过20%的计算使用了备用方法，可能影响精度")
+    add_log_entry('stats', model_type, f"🔢 曝光剂量范围: [{exposure.min():.3f}, {exposure.max():.3f}] mJ/cm²")
+    add_log_entry('stats', model_type, f"📏 厚度范围: [{thickness.min():.4f}, {thickness.max():.4f}] (归一化)")
+    print(f"[{model_type}] 参数组{set_id} 🎯 计算完成，用时: {result['compute_time']:.3f}s，"
+          f"曝光剂量: [{exposure.min():.3f}, {exposure.max():.3f}]，厚度: [{thickness.min():.4f}, {thickness.max():.4f}]")
+
+
 @api_bp.route('/compare_data', methods=['POST'])
+@admission_controlled('compare_data')
+@cancellable
+@profilable
 def compare_data():
     """
     比较多组参数的计算结果，返回原始数据（用于交互式图表）
@@ -1134,401 +1318,46 @@ def compare_data():
             return jsonify(format_response(False, message="至少需要一组参数")), 400
             
         parameter_sets = data['parameter_sets']
-        x = np.linspace(0, 10, 1000).tolist()
+        x, results, total_time = _compute_compare(parameter_sets)
+
         exposure_doses = []
         thicknesses = []
-        
-        # 初始化所有需要的模型实例
-        dill_model = None
-        enhanced_model = None
-        car_model = None
-        
-        for i, params in enumerate(parameter_sets):
-            set_id = params.get('setId', str(i+1))
+        timings = []
+        set_ids = [params.get('setId', str(i+1)) for i, params in enumerate(parameter_sets)]
+        for i, (params, result) in enumerate(zip(parameter_sets, results)):
+            set_id = set_ids[i]
             custom_name = params.get('customName', f'参数组 {set_id}')
-            
-            # 判断模型类型的逻辑
-            model_type = params.get('model_type', 'dill')
-            
-            if model_type == 'enhanced_dill' or any(k in params for k in ['z_h', 'I0', 'M0']):
-                # Enhanced Dill模型
-                if enhanced_model is None:
-                    from backend.models import EnhancedDillModel
-                    enhanced_model = EnhancedDillModel()
-                
-                # 获取Enhanced Dill参数
-                z_h = float(params.get('z_h', 10))  # 胶厚度
-                T = float(params.get('T', 100))     # 前烘温度
-                t_B = float(params.get('t_B', 10))  # 前烘时间
-                I0 = float(params.get('I0', 1.0))   # 初始光强
-                M0 = float(params.get('M0', 1.0))   # 初始PAC浓度
-                t_exp = float(params.get('t_exp', 5))  # 曝光时间
-                K = float(params.get('K', 2))       # 空间频率
-                V = float(params.get('V', 0.8))     # 干涉条纹可见度
-                
-                print(f"Enhanced Dill-1D模型参数 - 参数组{set_id}: z_h={z_h}, T={T}, t_B={t_B}, I0={I0}, M0={M0}, t_exp={t_exp}, K={K}, V={V}")
-                add_log_entry('info', 'enhanced_dill', f"参数组{set_id}: z_h={z_h}, T={T}, t_B={t_B}, I0={I0}, M0={M0}, t_exp={t_exp}, K={K}, V={V}")
-                
-                # 使用真正的Enhanced Dill模型PDE求解器
-                exposure_dose_data = []
-                thickness_data = []
-                
-                print(f"[Enhanced Dill] 开始计算1D空间分布，共{len(x)}个位置")
-                add_log_entry('info', 'enhanced_dill', f"开始计算1D空间分布，共{len(x)}个位置")
-                
-                total_compute_time = 0
-                successful_calcs = 0
-                fallback_calcs = 0
-                
-                for i, pos in enumerate(x):
-                    try:
-                        # 使用自适应PDE求解器，自动优化计算效率
-                        z, I_final, M_final, exposure_dose_profile, compute_time = enhanced_model.adaptive_solve_enhanced_dill_pde(
-                            z_h=z_h, T=T, t_B=t_B, I0=I0, M0=M0, t_exp=t_exp,
-                            x_position=pos,   # 传递x位置给边界条件
-                            K=K, V=V, phi_expr=None,
-                            max_points=150,   # 最大网格点数
-                            tolerance=1e-4    # 收敛容差
-                        )
-                        
-                        # 计算表面曝光剂量和厚度
-                        surface_exposure = exposure_dose_profile[0]
-                        surface_thickness = M_final[0]
-                        
-                        exposure_dose_data.append(float(surface_exposure))
-                        thickness_data.append(float(surface_thickness))
-                        
-                        total_compute_time += compute_time
-                        successful_calcs += 1
-                        
-                        if i % 200 == 0:  # 每200个点打印一次进度
-                            avg_time = total_compute_time / successful_calcs if successful_calcs > 0 else 0
-                            print(f"[Enhanced Dill] 进度: {i+1}/{len(x)}, pos={pos:.3f}, exposure={surface_exposure:.3f}, thickness={surface_thickness:.4f}, 平均计算时间={avg_time:.4f}s")
-                            add_log_entry('progress', 'enhanced_dill', f"进度: {i+1}/{len(x)}, pos={pos:.3f}, exposure={surface_exposure:.3f}, thickness={surface_thickness:.4f}, 平均计算时间={avg_time:.4f}s")
-                            
-                    except Exception as e:
-                        print(f"[Enhanced Dill] 位置{pos}计算出错: {e}")
-                        # 使用备用简化计算
-                        try:
-                            A_val, B_val, C_val = enhanced_model.get_abc(z_h, T, t_B)
-                            local_I0 = I0 * (1 + V * np.cos(K * pos))
-                            simple_exposure = local_I0 * t_exp
-                            simple_thickness = np.exp(-C_val * simple_exposure)
-                            exposure_dose_data.append(float(simple_exposure))
-                            thickness_data.append(float(simple_thickness))
-                            fallback_calcs += 1
-                        except Exception as e2:
-                            print(f"[Enhanced Dill] 备用计算也失败: {e2}")
-                            # 使用默认值
-                            exposure_dose_data.append(float(I0 * t_exp))
-                            thickness_data.append(float(0.5))
-                            fallback_calcs += 1
-                
-                # 计算和报告统计信息
-                avg_compute_time = total_compute_time / successful_calcs if successful_calcs > 0 else 0
-                total_time = total_compute_time + fallback_calcs * 0.001  # 估算备用计算时间
-                
-                print(f"[Enhanced Dill] 🎯 计算完成统计:")
-                add_log_entry('stats', 'enhanced_dill', f"🎯 计算完成统计:")
-                print(f"  ✅ 成功计算: {successful_calcs}/{len(x)} ({successful_calcs/len(x)*100:.1f}%)")
-                add_log_entry('stats', 'enhanced_dill', f"✅ 成功计算: {successful_calcs}/{len(x)} ({successful_calcs/len(x)*100:.1f}%)")
-                print(f"  ⚠️  备用计算: {fallback_calcs}/{len(x)} ({fallback_calcs/len(x)*100:.1f}%)")
-                add_log_entry('stats', 'enhanced_dill', f"⚠️ 备用计算: {fallback_calcs}/{len(x)} ({fallback_calcs/len(x)*100:.1f}%)")
-                print(f"  ⏱️  平均计算时间: {avg_compute_time:.4f}s/点")
-                add_log_entry('stats', 'enhanced_dill', f"⏱️ 平均计算时间: {avg_compute_time:.4f}s/点")
-                print(f"  🔢 曝光剂量范围: [{min(exposure_dose_data):.3f}, {max(exposure_dose_data):.3f}] mJ/cm²")
-                add_log_entry('stats', 'enhanced_dill', f"🔢 曝光剂量范围: [{min(exposure_dose_data):.3f}, {max(exposure_dose_data):.3f}] mJ/cm²")
-                print(f"  📏 厚度范围: [{min(thickness_data):.4f}, {max(thickness_data):.4f}] (归一化)")
-                add_log_entry('stats', 'enhanced_dill', f"📏 厚度范围: [{min(thickness_data):.4f}, {max(thickness_data):.4f}] (归一化)")
-                print(f"  💾 数据质量: {'优秀' if fallback_calcs/len(x) < 0.1 else '良好' if fallback_calcs/len(x) < 0.3 else '需要优化'}")
-                add_log_entry('stats', 'enhanced_dill', f"💾 数据质量: {'优秀' if fallback_calcs/len(x) < 0.1 else '良好' if fallback_calcs/len(x) < 0.3 else '需要优化'}")
-                
-                # 检查数据质量
-                if fallback_calcs > len(x) * 0.2:
-                    print(f"  ⚠️  警告: 超过20%的计算使用了备用方法，可能影响精度")
-                    
-                # 物理合理性检查
-                exp_mean = np.mean(exposure_dose_data)
-                exp_std = np.std(exposure_dose_data)
-                thick_mean = np.mean(thickness_data)
-                thick_std = np.std(thickness_data)
-                
-                print(f"  📊 统计特征:")
-                print(f"     曝光剂量: 均值={exp_mean:.3f}, 标准差={exp_std:.3f}")
-                print(f"     厚度分布: 均值={thick_mean:.4f}, 标准差={thick_std:.4f}")
-                
-                if exp_std / exp_mean > 0.5:
-                    print(f"  📈 高对比度检测: 曝光剂量变化显著 (CV={exp_std/exp_mean:.3f})")
-                if thick_std / thick_mean > 0.3:
-                    print(f"  🎭 强调制检测: 厚度变化显著 (CV={thick_std/thick_mean:.3f})")
-                
-                # Enhanced Dill模型特有的厚胶分析
-                print(f"  🔬 Enhanced Dill模型厚胶分析:")
-                print(f"     胶厚z_h: {z_h:.1f} μm")
-                print(f"     前烘温度T: {T:.0f} ℃")
-                print(f"     前烘时间t_B: {t_B:.0f} min")
-                
-                # 估算ABC参数范围（基于参数拟合公式）
-                A_est = 0.1 + 0.01 * z_h + 0.001 * T
-                B_est = 0.05 + 0.005 * z_h + 0.0005 * T
-                C_est = 0.02 + 0.002 * z_h + 0.0001 * T
-                print(f"     估算ABC参数: A≈{A_est:.4f}, B≈{B_est:.4f}, C≈{C_est:.4f}")
-                
-                # 厚胶特性评估
-                thickness_factor = z_h / 10.0  # 以10μm为基准
-                thermal_factor = (T - 100) / 50.0  # 以100℃为基准
-                time_factor = t_B / 10.0  # 以10min为基准
-                
-                print(f"     厚胶特性评估:")
-                if thickness_factor > 1.5:
-                    print(f"       📏 超厚胶层({z_h}μm): 光强衰减显著，需增强曝光")
-                elif thickness_factor > 1.0:
-                    print(f"       📏 厚胶层({z_h}μm): 适中的深度穿透性")
-                else:
-                    print(f"       📏 薄胶层({z_h}μm): 可考虑使用标准Dill模型")
-                
-                if thermal_factor > 0.2:
-                    print(f"       🌡️  高温前烘({T}℃): 有利于光酸扩散")
-                elif thermal_factor < -0.2:
-                    print(f"       🌡️  低温前烘({T}℃): 扩散受限，对比度增强")
-                
-                # 光学穿透深度估算
-                penetration_depth = 1.0 / (A_est + B_est) if (A_est + B_est) > 0 else z_h
-                print(f"     光学穿透深度: {penetration_depth:.2f} μm")
-                
-                if penetration_depth < z_h * 0.5:
-                    print(f"  ⚠️  穿透不足: 底部可能曝光不足")
-                elif penetration_depth > z_h * 1.5:
-                    print(f"  ✨ 穿透充分: 整层光刻胶均匀曝光")
-                
-                print(f"[Enhanced Dill] 🏁 总计算时间: {total_time:.3f}s")
-                
-                exposure_doses.append({
-                    'data': exposure_dose_data,
-                    'name': custom_name,
-                    'setId': set_id
-                })
-                thicknesses.append({
-                    'data': thickness_data,
-                    'name': custom_name,
-                    'setId': set_id
-                })
-                
-            elif model_type == 'car' or any(k in params for k in ['acid_gen_efficiency', 'diffusion_length', 'reaction_rate']):
-                # CAR模型
-                if car_model is None:
-                    from backend.models import CARModel
-                    car_model = CARModel()
-                
-                I_avg = float(params.get('I_avg', 10))
-                V = float(params.get('V', 0.8))
-                K = float(params.get('K', 2.0))
-                t_exp = float(params.get('t_exp', 5))
-                acid_gen_efficiency = float(params.get('acid_gen_efficiency', 0.5))
-                diffusion_length = float(params.get('diffusion_length', 3))
-                reaction_rate = float(params.get('reaction_rate', 0.3))
-                amplification = float(params.get('amplification', 10))
-                contrast = float(params.get('contrast', 3))
-                
-                print(f"CAR-1D模型参数 - 参数组{set_id}: I_avg={I_avg}, V={V}, K={K}, t_exp={t_exp}")
-                add_log_entry('info', 'car', f"参数组{set_id}: I_avg={I_avg}, V={V}, K={K}, t_exp={t_exp}")
-                print(f"CAR参数: acid_gen_eff={acid_gen_efficiency}, diff_len={diffusion_length}, reaction_rate={reaction_rate}, amp={amplification}, contrast={contrast}")
-                add_log_entry('info', 'car', f"CAR参数: acid_gen_eff={acid_gen_efficiency}, diff_len={diffusion_length}, reaction_rate={reaction_rate}, amp={amplification}, contrast={contrast}")
-                
-                print(f"[CAR] 开始计算1D空间分布，共{len(x)}个位置")
-                add_log_entry('info', 'car', f"开始计算1D空间分布，共{len(x)}个位置")
-                
-                # 使用CAR模型类的详细计算方法
-                print(f"[CAR] 开始调用CAR模型完整计算流程，共{len(x)}个位置")
-                add_log_entry('info', 'car', f"开始调用CAR模型完整计算流程，共{len(x)}个位置")
-                
-                import time
-                start_time = time.time()
-                
-                # 调用CAR模型的详细计算方法，触发完整的日志记录
-                car_data = car_model.calculate_car_distribution(
-                    x, I_avg, V, K, t_exp, acid_gen_efficiency, 
-                    diffusion_length, reaction_rate, amplification, contrast
-                )
-                
-                exposure_dose_data = car_data['exposure_dose'].tolist() if hasattr(car_data['exposure_dose'], 'tolist') else car_data['exposure_dose']
-                thickness_data = car_data['thickness'].tolist() if hasattr(car_data['thickness'], 'tolist') else car_data['thickness']
-                
-                total_time = time.time() - start_time
-                successful_calcs = len(exposure_dose_data)
-                failed_calcs = 0
-                avg_compute_time = total_time / len(x)
-                
-                # 计算统计信息
-                exp_mean = np.mean(exposure_dose_data)
-                exp_std = np.std(exposure_dose_data)
-                thick_mean = np.mean(thickness_data)
-                thick_std = np.std(thickness_data)
-                
-                print(f"[CAR] 🎯 计算完成统计:")
-                print(f"  ✅ 成功计算: {successful_calcs}/{len(x)} ({successful_calcs/len(x)*100:.1f}%)")
-                print(f"  ❌ 失败计算: {failed_calcs}/{len(x)} ({failed_calcs/len(x)*100:.1f}%)")
-                print(f"  ⏱️  平均计算时间: {avg_compute_time:.4f}s/点")
-                print(f"  🔢 曝光剂量范围: [{min(exposure_dose_data):.3f}, {max(exposure_dose_data):.3f}] mJ/cm²")
-                print(f"  📏 厚度范围: [{min(thickness_data):.4f}, {max(thickness_data):.4f}] (归一化)")
-                print(f"  💾 数据质量: {'优秀' if failed_calcs/len(x) < 0.05 else '良好' if failed_calcs/len(x) < 0.1 else '需要优化'}")
-                
-                print(f"  📊 统计特征:")
-                print(f"     曝光剂量: 均值={exp_mean:.3f}, 标准差={exp_std:.3f}")
-                print(f"     厚度分布: 均值={thick_mean:.4f}, 标准差={thick_std:.4f}")
-                
-                if exp_std / exp_mean > 0.3:
-                    print(f"  📈 高对比度检测: 曝光剂量变化显著 (CV={exp_std/exp_mean:.3f})")
-                if thick_std / thick_mean > 0.2:
-                    print(f"  🎭 强调制检测: 厚度变化显著 (CV={thick_std/thick_mean:.3f})")
-                
-                # CAR模型特有的化学放大分析
-                print(f"  🧪 CAR模型化学放大分析:")
-                print(f"     光酸产生效率η: {acid_gen_efficiency:.3f}")
-                print(f"     扩散长度: {diffusion_length:.2f} nm")
-                print(f"     反应速率常数k: {reaction_rate:.3f}")
-                print(f"     放大因子A: {amplification:.1f}x")
-                print(f"     对比度因子γ: {contrast:.1f}")
-                
-                # 化学放大效能评估
-                chemical_amplification_factor = amplification * reaction_rate
-                print(f"     化学放大效能: {chemical_amplification_factor:.2f}")
-                
-                if chemical_amplification_factor > 3.0:
-                    print(f"  🚀 高效化学放大: 放大效能优秀 (>{chemical_amplification_factor:.1f})")
-                elif chemical_amplification_factor > 1.5:
-                    print(f"  ⚡ 中等化学放大: 放大效能良好 ({chemical_amplification_factor:.1f})")
-                else:
-                    print(f"  ⚠️  低效化学放大: 建议调整参数 ({chemical_amplification_factor:.1f})")
-                    
-                print(f"[CAR] 🏁 总计算时间: {total_time:.3f}s")
-                
-                exposure_doses.append({
-                    'data': exposure_dose_data,
-                    'name': custom_name,
-                    'setId': set_id
-                })
-                thicknesses.append({
-                    'data': thickness_data,
-                    'name': custom_name,
-                    'setId': set_id
-                })
-                
-            else:
-                # Dill模型
-                if dill_model is None:
-                    from backend.models import DillModel
-                    dill_model = DillModel()
-                
-                I_avg = float(params.get('I_avg', 10))
-                V = float(params.get('V', 0.8))
-                K = float(params.get('K', 2.0))
-                t_exp = float(params.get('t_exp', 5))
-                C = float(params.get('C', 0.02))
-                
-                print(f"Dill-1D模型参数 - 参数组{set_id}: I_avg={I_avg}, V={V}, K={K}, t_exp={t_exp}, C={C}")
-                add_log_entry('info', 'dill', f"参数组{set_id}: I_avg={I_avg}, V={V}, K={K}, t_exp={t_exp}, C={C}")
-                
-                # 使用详细进度计算Dill模型数据
-                print(f"[Dill] 开始计算1D空间分布，共{len(x)}个位置")
-                add_log_entry('info', 'dill', f"开始计算1D空间分布，共{len(x)}个位置")
-                
-                import time
-                start_time = time.time()
-                exposure_dose_data = []
-                thickness_data = []
-                
-                successful_calcs = 0
-                failed_calcs = 0
-                
-                for i, pos in enumerate(x):
-                    try:
-                        # 计算光强分布
-                        intensity = I_avg * (1 + V * np.cos(K * pos))
-                        
-                        # 计算曝光剂量
-                        exposure_dose = intensity * t_exp
-                        
-                        # 计算光刻胶厚度（Dill模型）
-                        # M(x,z) = e^(-C * D(x,z))
-                        thickness = np.exp(-C * exposure_dose)
-                        
-                        exposure_dose_data.append(float(exposure_dose))
-                        thickness_data.append(float(thickness))
-                        successful_calcs += 1
-                        
-                        if i % 200 == 0:  # 每200个点打印一次进度
-                            elapsed_time = time.time() - start_time
-                            avg_time = elapsed_time / (i + 1) if i > 0 else 0
-                            print(f"[Dill] 进度: {i+1}/{len(x)}, pos={pos:.3f}, exposure={exposure_dose:.3f}, thickness={thickness:.4f}, 平均时间={avg_time:.4f}s")
-                            add_log_entry('progress', 'dill', f"进度: {i+1}/{len(x)}, pos={pos:.3f}, exposure={exposure_dose:.3f}, thickness={thickness:.4f}, 平均时间={avg_time:.4f}s")
-                            
-                    except Exception as e:
-                        print(f"[Dill] 位置{pos}计算出错: {e}")
-                        # 使用默认值
-                        exposure_dose_data.append(float(I_avg * t_exp))
-                        thickness_data.append(float(np.exp(-C * I_avg * t_exp)))
-                        failed_calcs += 1
-                
-                total_time = time.time() - start_time
-                avg_compute_time = total_time / len(x)
-                
-                # 计算统计信息
-                exp_mean = np.mean(exposure_dose_data)
-                exp_std = np.std(exposure_dose_data)
-                thick_mean = np.mean(thickness_data)
-                thick_std = np.std(thickness_data)
-                
-                print(f"[Dill] 🎯 计算完成统计:")
-                add_log_entry('stats', 'dill', f"🎯 计算完成统计:")
-                print(f"  ✅ 成功计算: {successful_calcs}/{len(x)} ({successful_calcs/len(x)*100:.1f}%)")
-                add_log_entry('stats', 'dill', f"✅ 成功计算: {successful_calcs}/{len(x)} ({successful_calcs/len(x)*100:.1f}%)")
-                print(f"  ❌ 失败计算: {failed_calcs}/{len(x)} ({failed_calcs/len(x)*100:.1f}%)")
-                add_log_entry('stats', 'dill', f"❌ 失败计算: {failed_calcs}/{len(x)} ({failed_calcs/len(x)*100:.1f}%)")
-                print(f"  ⏱️  平均计算时间: {avg_compute_time:.4f}s/点")
-                add_log_entry('stats', 'dill', f"⏱️ 平均计算时间: {avg_compute_time:.4f}s/点")
-                print(f"  🔢 曝光剂量范围: [{min(exposure_dose_data):.3f}, {max(exposure_dose_data):.3f}] mJ/cm²")
-                add_log_entry('stats', 'dill', f"🔢 曝光剂量范围: [{min(exposure_dose_data):.3f}, {max(exposure_dose_data):.3f}] mJ/cm²")
-                print(f"  📏 厚度范围: [{min(thickness_data):.4f}, {max(thickness_data):.4f}] (归一化)")
-                add_log_entry('stats', 'dill', f"📏 厚度范围: [{min(thickness_data):.4f}, {max(thickness_data):.4f}] (归一化)")
-                print(f"  💾 数据质量: {'优秀' if failed_calcs/len(x) < 0.01 else '良好' if failed_calcs/len(x) < 0.05 else '需要优化'}")
-                add_log_entry('stats', 'dill', f"💾 数据质量: {'优秀' if failed_calcs/len(x) < 0.01 else '良好' if failed_calcs/len(x) < 0.05 else '需要优化'}")
-                
-                print(f"  📊 统计特征:")
-                print(f"     曝光剂量: 均值={exp_mean:.3f}, 标准差={exp_std:.3f}")
-                print(f"     厚度分布: 均值={thick_mean:.4f}, 标准差={thick_std:.4f}")
-                
-                if exp_std / exp_mean > 0.2:
-                    print(f"  📈 高对比度检测: 曝光剂量变化显著 (CV={exp_std/exp_mean:.3f})")
-                if thick_std / thick_mean > 0.1:
-                    print(f"  🎭 强调制检测: 厚度变化显著 (CV={thick_std/thick_mean:.3f})")
-                    
-                # Dill模型特有的参数分析
-                contrast_factor = exp_std / exp_mean if exp_mean > 0 else 0
-                resolution_estimate = 1.0 / (K * V) if K > 0 and V > 0 else 0
-                print(f"  📐 Dill模型特征分析:")
-                print(f"     对比度因子: {contrast_factor:.3f}")
-                print(f"     分辨率估计: {resolution_estimate:.3f} μm")
-                print(f"     光敏速率常数C: {C:.4f} cm²/mJ")
-                
-                print(f"[Dill] 🏁 总计算时间: {total_time:.3f}s")
-                
-                exposure_doses.append({
-                    'data': exposure_dose_data,
-                    'name': custom_name,
-                    'setId': set_id
-                })
-                thicknesses.append({
-                    'data': thickness_data,
-                    'name': custom_name,
-                    'setId': set_id
-                })
-        
+            _log_compare_set(set_id, result, set_ids)
+
+            exposure_doses.append({
+                'data': result['exposure_dose'],
+                'name': custom_name,
+                'setId': set_id
+            })
+            thicknesses.append({
+                'data': result['thickness'],
+                'name': custom_name,
+                'setId': set_id
+            })
+            timing = {'setId': set_id, 'model_type': result['model_type'], 'compute_time': round(result['compute_time'], 4)}
+            if 'duplicate_of' in result:
+                timing['duplicate_of'] = set_ids[result['duplicate_of']]
+                timing['compute_time'] = 0.0
+            elif result['cached']:
+                timing['cached'] = True
+                timing['compute_time'] = 0.0
+            timings.append(timing)
+
+        print(f"[Compare] 🏁 {len(parameter_sets)}组参数计算完成，总用时: {total_time:.3f}s")
+        add_log_entry('success', 'system', f"🏁 {len(parameter_sets)}组参数计算完成，总用时: {total_time:.3f}s")
+
         result_data = {
             'x': x,
             'exposure_doses': exposure_doses,
             'thicknesses': thicknesses,
-            'colors': ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf'][:len(parameter_sets)]
+            'colors': ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf'][:len(parameter_sets)],
+            'timings': timings,
+            'total_time': round(total_time, 4)
         }
         
         return jsonify(format_response(True, data=result_data))
@@ -1540,171 +1369,83 @@ def compare_data():
         traceback.print_exc()
         return jsonify(format_response(False, message=error_msg)), 500
 
-def generate_comparison_plots_with_enhanced(parameter_sets):
-    x = np.linspace(0, 10, 1000)
-    fig1 = plt.figure(figsize=(12, 7))
+def _compute_compare(parameter_sets):
+    """
+    /api/compare 与 /api/compare_data 共用的计算入口：去重、读缓存，
+    Enhanced Dill 参数组分段交给计算进程池并行求解
+
+    返回:
+        (x数组, 各参数组结果列表, 总用时)
+    """
+    pool = current_app.extensions.get('compute_pool')
+    if pool is not None and not pool.enabled:
+        pool = None
+    start_time = time.time()
+    x, results = compute_compare_sets(parameter_sets, pool=pool, processes=pool.processes if pool else 1,
+                                      cache=current_app.extensions.get('compare_cache'))
+    return x, results, time.time() - start_time
+
+
+def _compare_labels(index, result):
+    """比较图中参数组的图例（曝光剂量图, 厚度图）"""
+    p = result['params']
+    if result['model_type'] == 'car':
+        return (f"Set {index+1}: CAR模型 (K={p['K']:g}, t_exp={p['t_exp']:g}, acid_eff={p['acid_gen_efficiency']:g})",
+                f"Set {index+1}: CAR模型 (K={p['K']:g}, diffusion={p['diffusion_length']:g}, contrast={p['contrast']:g})")
+    if result['model_type'] == 'enhanced_dill':
+        return (f"Set {index+1}: 厚胶模型 (z_h={p['z_h']:g}, T={p['T']:g}, t_B={p['t_B']:g}, K={p['K']:g})",
+                f"Set {index+1}: 厚胶模型 (z_h={p['z_h']:g}, T={p['T']:g}, t_B={p['t_B']:g}, t_exp={p['t_exp']:g})")
+    return (f"Set {index+1}: 薄胶模型 (I_avg={p['I_avg']:g}, V={p['V']:g}, K={p['K']:g}, t_exp={p['t_exp']:g})",
+            f"Set {index+1}: 薄胶模型 (I_avg={p['I_avg']:g}, V={p['V']:g}, K={p['K']:g}, C={p['C']:g})")
+
+
+def generate_comparison_plots_with_enhanced(x, results):
+    """
+    根据参数比较的计算结果绘制曝光剂量与厚度对比图
+
+    参数:
+        x: x坐标数组
+        results: compute_compare_sets 返回的各参数组结果
+    返回:
+        包含两张图与配色的字典
+    """
     colors = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf']
-    legend_labels = []
-    
-    # 初始化所有需要的模型实例
-    dill_model = None
-    enhanced_model = None
-    car_model = None
-    
-    # 第一个图：曝光剂量分布比较
-    for i, params in enumerate(parameter_sets):
-        if any(k in params for k in ['acid_gen_efficiency', 'diffusion_length', 'reaction_rate']):
-            if car_model is None:
-                from backend.models import CARModel
-                car_model = CARModel()
-            I_avg = float(params['I_avg'])
-            V = float(params['V'])
-            K = float(params.get('K', 2.0))
-            t_exp = float(params['t_exp'])
-            acid_gen_efficiency = float(params['acid_gen_efficiency'])
-            diffusion_length = float(params['diffusion_length'])
-            reaction_rate = float(params['reaction_rate'])
-            amplification = float(params['amplification'])
-            contrast = float(params['contrast'])
-            car_data = car_model.generate_data(I_avg, V, K, t_exp, acid_gen_efficiency, diffusion_length, reaction_rate, amplification, contrast)
-            exposure_dose = car_data['initial_acid']
-            label = f"Set {i+1}: CAR模型 (K={K}, t_exp={t_exp}, acid_eff={acid_gen_efficiency})"
-        elif any(k in params for k in ['z_h', 'I0', 'M0']):
-            if enhanced_model is None:
-                from backend.models import EnhancedDillModel
-                enhanced_model = EnhancedDillModel()
-            z_h = float(params['z_h'])
-            T = float(params['T'])
-            t_B = float(params['t_B'])
-            I0 = float(params.get('I0', 1.0))
-            M0 = float(params.get('M0', 1.0))
-            t_exp = float(params['t_exp'])
-            K = float(params.get('K_enhanced', 2.0))
-            V = float(params.get('V', 0.8))
-            
-            # 计算表面空间分布
-            exposure_dose_data = []
-            
-            for pos in x:
-                local_I0 = I0 * (1 + V * np.cos(K * pos))
-                enhanced_data = enhanced_model.generate_data(z_h, T, t_B, local_I0, M0, t_exp)
-                
-                # 取表面曝光剂量
-                if isinstance(enhanced_data['I'], (list, np.ndarray)) and len(enhanced_data['I']) > 0:
-                    surface_I = enhanced_data['I'][0] if hasattr(enhanced_data['I'], '__getitem__') else enhanced_data['I']
-                    exposure_dose_data.append(float(surface_I) * t_exp)
-                else:
-                    exposure_dose_data.append(float(enhanced_data['I']) * t_exp)
-            
-            exposure_dose = exposure_dose_data
-            label = f"Set {i+1}: 厚胶模型 (z_h={z_h}, T={T}, t_B={t_B}, K={K})"
-        else:
-            # Dill模型 - 修正：添加模型初始化
-            if dill_model is None:
-                from backend.models import DillModel
-                dill_model = DillModel()
-                
-            I_avg = float(params['I_avg'])
-            V = float(params['V'])
-            K = float(params['K'])
-            t_exp = float(params['t_exp'])
-            intensity = dill_model.calculate_intensity_distribution(x, I_avg, V, K)
-            exposure_dose = intensity * t_exp
-            label = f"Set {i+1}: 薄胶模型 (I_avg={I_avg}, V={V}, K={K}, t_exp={t_exp})"
-        color = colors[i % len(colors)]
-        plt.plot(x, exposure_dose, color=color, linewidth=2)
-        legend_labels.append(label)
-    plt.title('Exposure Dose Distribution Comparison', fontsize=16)
-    plt.xlabel('Position (μm)', fontsize=14)
-    plt.ylabel('Exposure Dose (mJ/cm²)', fontsize=14)
-    plt.grid(True, alpha=0.3)
-    plt.legend(legend_labels, loc='best', fontsize=10)
-    plt.tight_layout()
-    buffer1 = BytesIO()
-    fig1.savefig(buffer1, format='png', dpi=100)
-    buffer1.seek(0)
-    exposure_comparison_plot = base64.b64encode(buffer1.getvalue()).decode()
-    plt.close(fig1)
+    exposure_series, thickness_series = [], []
+    exposure_labels, thickness_labels = [], []
+    for i, result in enumerate(results):
+        style = {'color': colors[i % len(colors)], 'linewidth': 2}
+        exposure_label, thickness_label = _compare_labels(i, result)
+        exposure_series.append((x, result['exposure_dose'], '-', style))
+        thickness_series.append((x, result['thickness'], '-', style))
+        exposure_labels.append(exposure_label)
+        thickness_labels.append(thickness_label)
+    exposure_spec = line_spec(exposure_series, 'Exposure Dose Distribution Comparison', 'Position (μm)',
+                              'Exposure Dose (mJ/cm²)', figsize=(12, 7), legend_labels=exposure_labels)
+    thickness_spec = line_spec(thickness_series, 'Photoresist Thickness Distribution Comparison', 'Position (μm)',
+                               'Relative Thickness', figsize=(12, 7), legend_labels=thickness_labels)
+    plots = render_plots({'exposure_comparison_plot': exposure_spec, 'thickness_comparison_plot': thickness_spec})
+    plots['colors'] = colors
+    return plots
+
+@api_bp.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """
+    取消计算任务（job_id 即计算请求的 calc_id，见响应头 X-Calc-Id）
     
-    # 第二个图：厚度分布比较
-    fig2 = plt.figure(figsize=(12, 7))
-    legend_labels = []
-    for i, params in enumerate(parameter_sets):
-        if any(k in params for k in ['acid_gen_efficiency', 'diffusion_length', 'reaction_rate']):
-            if car_model is None:
-                from backend.models import CARModel
-                car_model = CARModel()
-            I_avg = float(params['I_avg'])
-            V = float(params['V'])
-            K = float(params.get('K', 2.0))
-            t_exp = float(params['t_exp'])
-            acid_gen_efficiency = float(params['acid_gen_efficiency'])
-            diffusion_length = float(params['diffusion_length'])
-            reaction_rate = float(params['reaction_rate'])
-            amplification = float(params['amplification'])
-            contrast = float(params['contrast'])
-            car_data = car_model.generate_data(I_avg, V, K, t_exp, acid_gen_efficiency, diffusion_length, reaction_rate, amplification, contrast)
-            thickness = car_data['thickness']
-            label = f"Set {i+1}: CAR模型 (K={K}, diffusion={diffusion_length}, contrast={contrast})"
-        elif any(k in params for k in ['z_h', 'I0', 'M0']):
-            if enhanced_model is None:
-                from backend.models import EnhancedDillModel
-                enhanced_model = EnhancedDillModel()
-            z_h = float(params['z_h'])
-            T = float(params['T'])
-            t_B = float(params['t_B'])
-            I0 = float(params.get('I0', 1.0))
-            M0 = float(params.get('M0', 1.0))
-            t_exp = float(params['t_exp'])
-            K = float(params.get('K_enhanced', 2.0))
-            V = float(params.get('V', 0.8))
-            
-            # 计算表面空间分布
-            thickness_data = []
-            
-            for pos in x:
-                local_I0 = I0 * (1 + V * np.cos(K * pos))
-                enhanced_data = enhanced_model.generate_data(z_h, T, t_B, local_I0, M0, t_exp)
-                
-                # 取表面厚度
-                if isinstance(enhanced_data['M'], (list, np.ndarray)) and len(enhanced_data['M']) > 0:
-                    surface_M = enhanced_data['M'][0] if hasattr(enhanced_data['M'], '__getitem__') else enhanced_data['M']
-                    thickness_data.append(float(surface_M))
-                else:
-                    thickness_data.append(float(enhanced_data['M']))
-            
-            thickness = thickness_data
-            label = f"Set {i+1}: 厚胶模型 (z_h={z_h}, T={T}, t_B={t_B}, t_exp={t_exp})"
-        else:
-            # Dill模型 - 修正：添加模型初始化
-            if dill_model is None:
-                from backend.models import DillModel
-                dill_model = DillModel()
-                
-            I_avg = float(params['I_avg'])
-            V = float(params['V'])
-            K = float(params['K'])
-            t_exp = float(params['t_exp'])
-            C = float(params['C'])
-            intensity = dill_model.calculate_intensity_distribution(x, I_avg, V, K)
-            exposure_dose = intensity * t_exp
-            thickness = np.exp(-C * exposure_dose)
-            label = f"Set {i+1}: 薄胶模型 (I_avg={I_avg}, V={V}, K={K}, C={C})"
-        color = colors[i % len(colors)]
-        plt.plot(x, thickness, color=color, linewidth=2)
-        legend_labels.append(label)
-    plt.title('Photoresist Thickness Distribution Comparison', fontsize=16)
-    plt.xlabel('Position (μm)', fontsize=14)
-    plt.ylabel('Relative Thickness', fontsize=14)
-    plt.grid(True, alpha=0.3)
-    plt.legend(legend_labels, loc='best', fontsize=10)
-    plt.tight_layout()
-    buffer2 = BytesIO()
-    fig2.savefig(buffer2, format='png', dpi=100)
-    buffer2.seek(0)
-    thickness_comparison_plot = base64.b64encode(buffer2.getvalue()).decode()
-    plt.close(fig2)
-    return {'exposure_comparison_plot': exposure_comparison_plot, 'thickness_comparison_plot': thickness_comparison_plot, 'colors': colors}
+    本worker上运行的任务立即标记取消；取消请求同时写入共享日志库，
+    其它worker上的任务会在下一个检查点终止。只有服务端生成的计算ID可以取消，
+    客户端自选ID的任务不受影响（自选ID可能被他人猜到）。
+    """
+    cancelled = current_app.extensions['job_registry'].cancel(job_id, by_id=True)
+    shared_store = current_app.extensions.get('shared_log_store')
+    if shared_store is not None:
+        try:
+            shared_store.request_cancel(job_id)
+        except sqlite3.Error as e:
+            print(f"⚠️ 写入取消请求失败: {e}")
+    add_log_entry('warning', 'system', f"⏹️ 收到取消请求: {job_id}（本worker运行中{cancelled}个）", calc_id=job_id)
+    return jsonify(format_response(True, data={'job_id': job_id, 'cancelled_local': cancelled},
+                                   message="取消请求已提交")), 202
 
 @api_bp.route('/health', methods=['GET'])
 def health_check():
@@ -1713,6 +1454,17 @@ def health_check():
     """
     return jsonify({"status": "healthy"}), 200 
 
+@api_bp.route('/models/stats', methods=['GET'])
+def model_stats():
+    """
+    模型注册表统计：各模型的构建次数、复用次数、ABC表大小，相位表达式编译缓存与比较结果缓存
+    """
+    data = current_app.extensions['model_registry'].stats()
+    compare_cache = current_app.extensions.get('compare_cache')
+    if compare_cache is not None:
+        data['compare_cache'] = compare_cache.stats()
+    return jsonify(format_response(True, data=data)), 200
+
 @api_bp.route('/logs', methods=['GET'])
 def get_logs():
     """获取系统化计算日志"""
@@ -1729,71 +1481,44 @@ def get_logs():
         except:
             limit = 100
             
-        # 过滤日志
-        filtered_logs = calculation_logs
-        
-        # 按模型类型过滤
-        if model_type:
-            filtered_logs = [log for log in filtered_logs if log.get('model') == model_type]
+        try:
+            since = int(request.args['since']) if request.args.get('since') else None
+        except ValueError:
+            since = None
         
-        # 按页面类型过滤
-        if page == 'compare':
-            # 比较页面显示所有模型的日志
-            pass
+        calc_id = request.args.get('calc_id')
+        if calc_id:
+            # 指定计算ID时从共享日志库查询，结果与落在哪个worker无关
+            limit = min(limit, current_app.config['LOG_MAX_QUERY']) if limit > 0 else current_app.config['LOG_MAX_QUERY']
+            records, stats = current_app.extensions['shared_log_store'].query(
+                calc_id, log_type=log_type or None, since=since, limit=limit)
         else:
-            # 单一计算页面，根据category过滤
-            if category and category in ['1d', '2d', '3d']:
-                # 根据消息内容推断维度
-                dimension_keywords = {
-                    '1d': ['1d', '一维', '1D'],
-                    '2d': ['2d', '二维', '2D'],
-                    '3d': ['3d', '三维', '3D']
-                }
-                if category in dimension_keywords:
-                    keywords = dimension_keywords[category]
-                    filtered_logs = [
-                        log for log in filtered_logs 
-                        if any(keyword in log.get('message', '').lower() for keyword in [k.lower() for k in keywords])
-                    ]
-        
-        # 按日志类型过滤
-        if log_type:
-            filtered_logs = [log for log in filtered_logs if log.get('type') == log_type]
-        
-        # 为每个日志添加ID和增强信息
-        enhanced_logs = []
-        for i, log in enumerate(filtered_logs):
-            enhanced_log = {
-                'id': f"{log.get('timestamp', '')}-{i}",
-                'timestamp': log.get('timestamp'),
-                'type': log.get('type', 'info'),
-                'message': log.get('message', ''),
-                'model': log.get('model', 'unknown'),
-                'details': '',
-                'category': detect_log_category(log, page),
-                'subcategory': detect_log_subcategory(log, page),
-                'dimension': detect_log_dimension(log)
-            }
-            enhanced_logs.append(enhanced_log)
+            # 比较页面显示所有模型的日志；单一计算页面根据category按维度过滤
+            dimension = category if page != 'compare' and category in ['1d', '2d', '3d'] else None
+            records, stats = log_store.query(model_type=model_type, dimension=dimension,
+                                             log_type=log_type or None, since=since, limit=limit)
         
-        # 返回最近的N条日志（倒序）
-        recent_logs = enhanced_logs[-limit:] if limit > 0 else enhanced_logs
-        recent_logs.reverse()  # 最新的在前面
+        # 维度与子分类已在插入时推断，这里只做字段组装（最新的在前面）
+        recent_logs = [{
+            'id': record['id'],
+            'timestamp': record['timestamp'],
+            'type': record['type'] or 'info',
+            'message': record['message'] or '',
+            'model': record['model'] or 'unknown',
+            'details': '',
+            'category': detect_log_category(record, page),
+            'subcategory': detect_log_subcategory(record, page),
+            'dimension': detect_log_dimension(record)
+        } for record in records]
         
-        # 统计信息
-        stats = {
-            'total_logs': len(calculation_logs),
-            'filtered_logs': len(filtered_logs),
-            'error_count': len([log for log in filtered_logs if log.get('type') == 'error']),
-            'warning_count': len([log for log in filtered_logs if log.get('type') == 'warning']),
-            'progress': '等待计算...'
-        }
+        stats['progress'] = '等待计算...'
         
         return jsonify(format_response(True, data={
             'logs': recent_logs,
             'stats': stats,
-            'total_count': len(calculation_logs),
-            'filtered_count': len(filtered_logs)
+            'total_count': stats['total_logs'],
+            'filtered_count': stats['filtered_logs'],
+            'last_id': stats['last_id']
         }))
         
     except Exception as e:
@@ -1808,37 +1533,14 @@ def detect_log_category(log, page):
     return 'single'
 
 def detect_log_subcategory(log, page):
-    """检测日志子分类"""
-    message = log.get('message', '').lower()
-    model = log.get('model', '').lower()
-    
+    """检测日志子分类（使用插入时预先推断的结果）"""
     if page == 'compare':
-        if 'dill' in model and 'enhanced' not in model:
-            return 'dill'
-        elif 'enhanced' in model or '厚胶' in message:
-            return 'enhanced_dill'
-        elif 'car' in model:
-            return 'car'
-    else:
-        if any(keyword in message for keyword in ['1d', '一维']):
-            return '1d'
-        elif any(keyword in message for keyword in ['2d', '二维']):
-            return '2d'
-        elif any(keyword in message for keyword in ['3d', '三维']):
-            return '3d'
-    
-    return 'unknown'
+        return log['_compare_subcategory']
+    return log['_detected_dimension']
 
 def detect_log_dimension(log):
-    """检测日志维度"""
-    message = log.get('message', '').lower()
-    if '1d' in message or '一维' in message:
-        return '1d'
-    elif '2d' in message or '二维' in message:
-        return '2d'
-    elif '3d' in message or '三维' in message:
-        return '3d'
-    return 'unknown'
+    """检测日志维度（使用插入时预先推断的结果）"""
+    return log['_detected_dimension']
 
 @api_bp.route('/logs/clear', methods=['POST'])
 def clear_calculation_logs():
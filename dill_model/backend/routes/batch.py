@@ -0,0 +1,119 @@
+"""
+多组参数批量计算接口
+
+    POST /api/batch    {"parameter_sets": [{"model_type": "dill", "I_avg": 10, ...}, ...],
+                        "x_min": 0, "x_max": 10, "x_points": 1000, "fields": ["thickness"]}
+
+同一模型、同一x网格的参数组合并为一次 (N, X) 向量化计算（见 models/vectorized.py），
+目前支持 Dill 与 CAR 的一维计算。参数组未给出的参数取 /api/compare_data 的默认值，
+x网格可在请求顶层统一指定，也可在参数组中单独覆盖。
+
+返回按分组的列式结果：每组一个x数组、参数列以及每个字段一个 N×X 的二维数组，
+index 为组内各行在 parameter_sets 中的原始下标。
+"""
+
+import time
+
+from flask import request, jsonify
+
+from .api import api_bp, add_log_entry
+from ..models.vectorized import BATCH_PARAMETERS, BATCH_FIELDS, DEFAULT_GRID, evaluate_batch
+from ..utils import validate_input, validate_car_input, format_response
+from ..utils import admission_controlled, cancellable, profilable
+
+MAX_BATCH_SETS = 10000        # 单次请求的参数组上限
+MAX_BATCH_POINTS = 100000     # 每组x网格点数上限
+
+_VALIDATORS = {'dill': validate_input, 'car': validate_car_input}
+
+
+def _grid(source, fallback):
+    """读取x网格参数，返回 (x_min, x_max, x_points)"""
+    x_min = float(source.get('x_min', fallback[0]))
+    x_max = float(source.get('x_max', fallback[1]))
+    x_points = int(source.get('x_points', fallback[2]))
+    if not x_max > x_min:
+        raise ValueError("x_max必须大于x_min")
+    if not 2 <= x_points <= MAX_BATCH_POINTS:
+        raise ValueError(f"x_points必须在2到{MAX_BATCH_POINTS}之间")
+    return x_min, x_max, x_points
+
+
+def _prepare(index, params, default_grid):
+    """
+    补全默认值并校验单个参数组
+
+    返回:
+        补全后的参数组
+    异常:
+        ValueError: 参数不合法
+    """
+    if not isinstance(params, dict):
+        raise ValueError(f"参数组{index + 1}必须是JSON对象")
+    model_type = params.get('model_type', 'dill')
+    if model_type not in BATCH_PARAMETERS:
+        raise ValueError(f"参数组{index + 1}: 批量计算仅支持 {', '.join(BATCH_PARAMETERS)} 模型")
+    prepared = {name: params.get(name, default) for name, default in BATCH_PARAMETERS[model_type].items()}
+    prepared['sine_type'] = '1d'
+    is_valid, message = _VALIDATORS[model_type](prepared)
+    if not is_valid:
+        raise ValueError(f"参数组{index + 1}: {message}")
+    try:
+        prepared['x_min'], prepared['x_max'], prepared['x_points'] = _grid(params, default_grid)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"参数组{index + 1}: {e}")
+    prepared['model_type'] = model_type
+    prepared['setId'] = params.get('setId', str(index + 1))
+    prepared['customName'] = params.get('customName', f"参数组 {prepared['setId']}")
+    return prepared
+
+
+@api_bp.route('/batch', methods=['POST'])
+@admission_controlled('batch')
+@cancellable
+@profilable
+def batch():
+    """
+    批量计算多组参数，返回按模型与网格分组的列式结果
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify(format_response(False, message="请求体必须是JSON对象")), 400
+    parameter_sets = data.get('parameter_sets')
+    if not isinstance(parameter_sets, list) or not parameter_sets:
+        return jsonify(format_response(False, message="缺少parameter_sets数组")), 400
+    if len(parameter_sets) > MAX_BATCH_SETS:
+        return jsonify(format_response(False, message=f"参数组数量不能超过{MAX_BATCH_SETS}")), 400
+    fields = data.get('fields')
+    if fields is not None:
+        known = {f for names in BATCH_FIELDS.values() for f in names}
+        if not isinstance(fields, list) or not fields or not set(fields) <= known:
+            return jsonify(format_response(False, message=f"fields必须是以下字段的列表: {', '.join(sorted(known))}")), 400
+
+    try:
+        default_grid = _grid(data, DEFAULT_GRID)
+        prepared = [_prepare(i, params, default_grid) for i, params in enumerate(parameter_sets)]
+    except (TypeError, ValueError) as e:
+        return jsonify(format_response(False, message=str(e))), 400
+
+    start = time.time()
+    groups = evaluate_batch(prepared, fields)
+    compute_time = time.time() - start
+
+    result_groups = []
+    for group in groups:
+        indices = group['indices']
+        result_groups.append({
+            'model_type': group['model_type'],
+            'grid': group['grid'],
+            'x': group['x'],
+            'index': indices,
+            'set_ids': [prepared[i]['setId'] for i in indices],
+            'names': [prepared[i]['customName'] for i in indices],
+            'parameters': group['parameters'],
+            'shape': [len(indices), group['grid']['x_points']],
+            **group['fields'],
+        })
+    add_log_entry('info', 'system', f"批量计算 {len(prepared)} 组参数，{len(groups)} 个分组，用时{compute_time:.3f}s")
+    return jsonify(format_response(True, data={'count': len(prepared), 'groups': result_groups,
+                                               'compute_time': round(compute_time, 4)})), 200
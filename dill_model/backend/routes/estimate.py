@@ -0,0 +1,148 @@
+"""
+计算代价预估接口
+
+    POST /api/estimate                   请求体与 /api/calculate_data 相同，返回预计耗时、
+                                         内存峰值与响应大小（不执行计算）
+    POST /api/estimate?endpoint=compare  按其他接口的计算路径预估（见 cost_model.ENDPOINTS）
+
+预估结果来自代价模型，并按基准测试结果与运行期实测耗时校准；超过单次计算上限或
+响应过大时给出更粗的参数建议。
+"""
+
+import logging
+
+from flask import request, jsonify, current_app
+
+from .api import api_bp
+from ..utils import format_response
+from ..utils.cost_model import ENDPOINTS
+
+logger = logging.getLogger(__name__)
+
+# 粗化建议的目标响应大小（字节）
+SUGGEST_RESPONSE_BYTES = 50 * 1024 * 1024
+
+
+def _time_limit():
+    """单次计算允许的预计秒数：MAX_CALCULATION_TIME 与准入上限中较小者"""
+    limits = [current_app.config.get('MAX_CALCULATION_TIME') or 0]
+    admission = current_app.extensions.get('admission')
+    if admission is not None and admission.max_cost is not None:
+        limits.append(admission.max_cost)
+    limits = [x for x in limits if x > 0]
+    return min(limits) if limits else float('inf')
+
+
+def _admission_state(estimate):
+    """在途预算与本请求的预计排队情况"""
+    controller = current_app.extensions.get('admission')
+    if controller is None or not current_app.config.get('ADMISSION_ENABLED'):
+        return None
+    state = {
+        'free': estimate['seconds'] < controller.free_cost,
+        'within_limit': controller.max_cost is None or estimate['seconds'] <= controller.max_cost,
+        'max_cost': controller.max_cost,
+        'budget': controller.budget,
+    }
+    try:
+        state['in_flight_requests'], state['in_flight_seconds'] = controller.in_flight()
+    except Exception as e:
+        logger.warning(f"⚠️ 读取计算预算失败: {e}")
+        return state
+    state['would_queue'] = (not state['free'] and state['in_flight_requests'] > 0 and
+                            state['in_flight_seconds'] + estimate['seconds'] > controller.budget)
+    return state
+
+
+def _coarser_variants(data, endpoint):
+    """依次尝试的粗化参数（每项只改动一个维度，逐级减半）"""
+    variants = []
+    time_steps = data.get('time_steps')
+    if isinstance(time_steps, int) and time_steps > 2:
+        steps = time_steps
+        while steps > 2:
+            steps = max(2, steps // 2)
+            variants.append({'time_steps': steps})
+    y_points = data.get('y_points')
+    if isinstance(y_points, int) and y_points > 10 and data.get('sine_type') == 'multi':
+        points = y_points
+        while points > 10:
+            points = max(10, points // 2)
+            variants.append({'y_points': points})
+    if data.get('enable_4d_animation') and endpoint == 'calculate_data':
+        variants.append({'enable_4d_animation': False})
+    return variants
+
+
+def _suggestions(cost_model, data, endpoint, estimate):
+    """
+    预计超出限制时给出的粗化建议
+
+    返回:
+        建议列表，每项包含改动的参数与改动后的预估
+    """
+    limit = _time_limit()
+    if estimate['seconds'] <= limit and estimate['response_bytes'] <= SUGGEST_RESPONSE_BYTES:
+        return []
+
+    suggestions = []
+    seen = set()
+    for changes in _coarser_variants(data, endpoint):
+        key = next(iter(changes))
+        if key in seen:
+            continue
+        variant = cost_model.estimate(dict(data, **changes), endpoint)
+        if variant['seconds'] <= limit and variant['response_bytes'] <= SUGGEST_RESPONSE_BYTES:
+            seen.add(key)
+            suggestions.append({'changes': changes, 'endpoint': endpoint, 'seconds': round(variant['seconds'], 3),
+                                'response_bytes': variant['response_bytes']})
+    # 动画结果过大时建议改用逐帧接口（内存只保留一帧）
+    if endpoint == 'calculate_data' and estimate['profile']['animated']:
+        for alternative in ('stream', 'results'):
+            variant = cost_model.estimate(data, alternative)
+            suggestions.append({'changes': {}, 'endpoint': alternative, 'seconds': round(variant['seconds'], 3),
+                                'peak_memory_bytes': variant['peak_memory_bytes']})
+    return suggestions
+
+
+@api_bp.route('/estimate', methods=['POST'])
+def estimate():
+    """
+    预估一次计算的耗时、内存峰值与响应大小
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify(format_response(False, message="请求体必须是JSON对象")), 400
+    endpoint = request.args.get('endpoint') or data.get('endpoint') or 'calculate_data'
+    if endpoint not in ENDPOINTS:
+        return jsonify(format_response(False, message=f"未知接口: {endpoint}，可选: {', '.join(ENDPOINTS)}")), 400
+    if endpoint not in ('compare', 'compare_data', 'batch') and data.get('model_type', 'dill') not in ('dill', 'enhanced_dill', 'car'):
+        return jsonify(format_response(False, message="未知模型类型")), 400
+
+    cost_model = current_app.extensions['cost_model']
+    result = cost_model.estimate(data, endpoint)
+    accepts_gzip = 'gzip' in request.headers.get('Accept-Encoding', '')
+    response = {
+        'endpoint': endpoint,
+        'profile_key': result['profile_key'],
+        'seconds': round(result['seconds'], 3),
+        'raw_seconds': round(result['raw_seconds'], 3),
+        'peak_memory_bytes': result['peak_memory_bytes'],
+        'response_bytes': result['response_bytes'],
+        'transfer_bytes': result['compressed_response_bytes'] if accepts_gzip else result['response_bytes'],
+        'calibration': result['calibration'],
+        'profile': result['profile'],
+        'admission': _admission_state(result),
+        'suggestions': _suggestions(cost_model, data, endpoint, result),
+    }
+    return jsonify(format_response(True, data=response)), 200
+
+
+@api_bp.route('/estimate/calibration', methods=['GET'])
+def estimate_calibration():
+    """
+    查看各计算路径当前的校准系数（基准 / 运行期EWMA）
+    """
+    cost_model = current_app.extensions['cost_model']
+    return jsonify(format_response(True, data={'coefficients': cost_model.coefficients,
+                                               'calibration': cost_model.calibration()})), 200
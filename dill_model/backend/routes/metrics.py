@@ -0,0 +1,18 @@
+"""
+运行指标接口
+
+    GET /api/metrics    Prometheus 文本格式，汇总本机全部 worker（见 utils/metrics.py）
+"""
+
+from flask import Response, current_app
+
+from .api import api_bp
+from ..utils.metrics import CONTENT_TYPE, collect_all
+
+
+@api_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    导出请求耗时/响应大小直方图、求解步数、缓存命中率、准入队列与worker内存
+    """
+    return Response(collect_all(current_app), mimetype=None, content_type=CONTENT_TYPE)
@@ -0,0 +1,202 @@
+"""
+4D动画结果的按需取帧接口
+
+    POST   /api/results                       提交4D动画计算，帧写入内存映射帧存储
+                                              （可用 POST /api/jobs/<calc_id>/cancel 取消）
+    GET    /api/results/<id>                  查询结果元数据与进度
+    GET    /api/results/<id>/frames/<k>       读取单帧
+    GET    /api/results/<id>/frames?start=&stop=   读取帧区间
+    DELETE /api/results/<id>                  删除结果
+
+取帧接口支持 ?fields=exposure_dose,thickness 选择字段，
+?format=binary 时返回小端序原始数组字节（形状见 X-Frame-Shape 响应头）。
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from flask import request, jsonify, current_app, Response, g
+
+from .api import api_bp, build_animation_stream, add_log_entry, add_error_log, add_success_log, add_warning_log
+from ..models import get_model_by_name
+from ..utils import validate_input, validate_enhanced_input, validate_car_input, format_response, current_calc_id
+from ..utils import create_job_token, release_job_token, CalculationCancelled
+from ..utils import admission_controlled, take_admission_slot
+from ..utils.frame_store import FrameStoreError
+
+# 后台计算线程池：提交请求立即返回，帧在后台逐帧落盘
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='frame-writer')
+# 本进程内运行中任务的取消令牌（result_id -> CancelToken），删除结果前先取消
+_running_tokens = {}
+
+_VALIDATORS = {'dill': validate_input, 'enhanced_dill': validate_enhanced_input, 'car': validate_car_input}
+
+
+def _frame_store():
+    return current_app.extensions['frame_store']
+
+
+def _write_frames(app, writer, frames, model_type, calc_id, token, admission, estimate=None):
+    start = time.time()
+    # 后台线程没有请求上下文，日志显式带上提交请求的计算ID
+    with app.app_context():
+        try:
+            for frame in frames:
+                writer.write_frame(frame)
+            writer.finish()
+            if estimate is not None:
+                app.extensions['cost_model'].observe(estimate, time.time() - start)
+            add_success_log(model_type, f"4D动画结果{writer.result_id[:8]}写入完成，共{writer.meta['frames_written']}帧，用时{time.time() - start:.3f}s",
+                            dimension='4d', calc_id=calc_id)
+        except (CalculationCancelled, FrameStoreError) as e:
+            # 被取消、超时、结果已被删除或超出帧存储空间
+            writer.fail(str(e))
+            add_warning_log(model_type, f"4D动画结果{writer.result_id[:8]}已终止: {str(e)}", dimension='4d', calc_id=calc_id)
+        except Exception as e:
+            writer.fail(str(e))
+            add_error_log(model_type, f"4D动画结果{writer.result_id[:8]}计算失败: {str(e)}", dimension='4d', calc_id=calc_id)
+        finally:
+            frames.close()
+            _running_tokens.pop(writer.result_id, None)
+            release_job_token(app, token)
+            # 计算额度在后台写帧结束后才归还
+            controller, slot = admission
+            controller.release(slot)
+
+
+def _public_meta(meta):
+    return {key: value for key, value in meta.items() if key != 'frame_times'}
+
+
+@api_bp.route('/results', methods=['POST'])
+@admission_controlled('results')
+def create_result():
+    """
+    提交4D动画计算，返回结果ID；帧在后台写入帧存储后即可按需读取
+    """
+    data = request.get_json(silent=True) or {}
+    model_type = data.get('model_type', 'dill')
+    sine_type = data.get('sine_type', '1d')
+    if model_type not in _VALIDATORS:
+        return jsonify(format_response(False, message="未知模型类型")), 400
+
+    is_valid, message = _VALIDATORS[model_type](data)
+    if not is_valid:
+        add_error_log(model_type, f"参数校验失败: {message}", dimension=sine_type)
+        return jsonify(format_response(False, message=message)), 400
+
+    max_steps = current_app.config['RESULTS_MAX_TIME_STEPS']
+    token = None
+    try:
+        if int(data.get('time_steps', 20)) > max_steps:
+            return jsonify(format_response(False, message=f"时间步数不能超过{max_steps}")), 400
+        model = get_model_by_name(model_type)
+        token = create_job_token(watch_client=False)
+        meta, frames = build_animation_stream(model, model_type, data, cancel_token=token)
+    except (ValueError, TypeError, KeyError) as e:
+        if token is not None:
+            release_job_token(current_app._get_current_object(), token)
+        add_error_log(model_type, f"4D动画结果参数错误: {str(e)}", dimension='4d')
+        return jsonify(format_response(False, message=str(e))), 400
+
+    meta['model_type'] = model_type
+    meta['calc_id'] = current_calc_id()
+    writer = _frame_store().create(meta)
+    _running_tokens[writer.result_id] = token
+    _executor.submit(_write_frames, current_app._get_current_object(), writer, frames, model_type, meta['calc_id'],
+                     token, take_admission_slot(), g.get('cost_estimate'))
+    add_log_entry('info', model_type, f"🗂️ 已创建4D动画结果{writer.result_id[:8]}，共{meta['time_steps']}帧", dimension='4d')
+    return jsonify(format_response(True, data=_public_meta(writer.meta), message="计算已提交")), 202
+
+
+@api_bp.route('/results/<result_id>', methods=['GET'])
+def get_result(result_id):
+    """
+    查询结果元数据与写入进度
+    """
+    try:
+        meta = _frame_store().read_meta(result_id)
+    except FrameStoreError as e:
+        return jsonify(format_response(False, message=str(e))), 404
+    return jsonify(format_response(True, data=_public_meta(meta))), 200
+
+
+@api_bp.route('/results/<result_id>', methods=['DELETE'])
+def delete_result(result_id):
+    """
+    删除结果及其帧文件
+
+    本进程内运行中的任务先取消再删除；其它worker上的任务在写入下一帧的进度时发现目录已删除而终止
+    """
+    token = _running_tokens.get(result_id)
+    if token is not None:
+        token.cancel()
+    try:
+        _frame_store().delete(result_id)
+    except FrameStoreError as e:
+        return jsonify(format_response(False, message=str(e))), 404
+    return jsonify(format_response(True, message="结果已删除")), 200
+
+
+def _frames_response(result_id, start, stop):
+    fields = request.args.get('fields')
+    fields = [f.strip() for f in fields.split(',') if f.strip()] if fields else None
+    try:
+        meta, arrays = _frame_store().read_frames(result_id, start, stop, fields)
+    except FrameStoreError as e:
+        status = 409 if '尚未就绪' in str(e) else 404
+        return jsonify(format_response(False, message=str(e))), status
+
+    if request.args.get('format') == 'binary':
+        if len(arrays) != 1:
+            return jsonify(format_response(False, message="二进制格式一次只能请求一个字段")), 400
+        field, array = next(iter(arrays.items()))
+        if stop is None:
+            array = array[0]
+        response = Response(np.ascontiguousarray(array, dtype='<' + array.dtype.str[1:]).tobytes(),
+                            mimetype='application/octet-stream')
+        response.headers['X-Frame-Field'] = field
+        response.headers['X-Frame-Shape'] = ','.join(str(n) for n in array.shape)
+        response.headers['X-Frame-Dtype'] = array.dtype.name
+        return response
+
+    # 运行中的任务只在结束时写入 frame_times，此前按模型给出的时间轴取值
+    times = meta.get('frame_times') or []
+    time_array = meta.get('time_array') or []
+    stop_index = start + 1 if stop is None else stop
+    frames = []
+    for offset, k in enumerate(range(start, stop_index)):
+        t = times[k] if k < len(times) else None
+        if t is None and k < len(time_array):
+            t = time_array[k]
+        frame = {'index': k, 't': t}
+        for field, array in arrays.items():
+            frame[field] = np.asarray(array[offset])
+        frames.append(frame)
+    payload = frames[0] if stop is None else {'start': start, 'stop': stop, 'frames': frames}
+    return jsonify(format_response(True, data=payload)), 200
+
+
+@api_bp.route('/results/<result_id>/frames/<int:k>', methods=['GET'])
+def get_result_frame(result_id, k):
+    """
+    读取第k帧
+    """
+    return _frames_response(result_id, k, None)
+
+
+@api_bp.route('/results/<result_id>/frames', methods=['GET'])
+def get_result_frames(result_id):
+    """
+    读取帧区间 [start, stop)
+    """
+    try:
+        start = int(request.args.get('start', 0))
+        stop = int(request.args.get('stop', start + 1))
+    except ValueError:
+        return jsonify(format_response(False, message="start/stop必须是整数")), 400
+    max_range = current_app.config['RESULTS_MAX_RANGE']
+    if stop - start > max_range:
+        return jsonify(format_response(False, message=f"单次最多请求{max_range}帧")), 400
+    return _frames_response(result_id, start, stop)
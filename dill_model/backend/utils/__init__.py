@@ -1,3 +1,43 @@
 from .helpers import validate_input, validate_enhanced_input, validate_car_input, format_response, NumpyEncoder
+from .compression import init_compression, available_encodings
+from .frame_store import init_frame_store, FrameStore, FrameStoreError
+from .downsample import parse_lod_options, apply_lod
+from .log_store import LogStore, SharedLogStore, init_log_store, current_calc_id
+from .cancellation import (init_cancellation, CancelToken, CalculationCancelled, cancellable,
+                           check_cancelled, resolve_token, create_job_token, release_job_token,
+                           cancellation_response)
+from .cost_model import CostModel, init_cost_model
+from .admission import (init_admission, AdmissionController, AdmissionRejected, admission_controlled,
+                        take_admission_slot)
+from .rendering import (init_rendering, render_plot, render_plots, line_spec, heatmap_spec, slices_spec,
+                        renders_plots, plot_mime)
+from .compute_pool import ComputePool, init_compute_pool
+from .render_pool import RenderPool
+from .result_cache import ResultCache, init_result_cache
+from .lazy_import import lazy_import, LazyModule, record_startup, startup_report
+from .admin import init_admin, admin_required, is_admin_request
+from .json_provider import NumpyJSONProvider, init_json, round_significant
+from .metrics import init_metrics, MetricsRegistry, record_solver_work
+from .timing import init_timing, stage, current_timings, StageTimings
+from .profiling import init_profiling, profilable, SamplingProfiler, ProfileStore
+from .error_log import init_error_log, log_request_error
+from .slow_requests import init_slow_requests, SlowRequestStore, SlowRequestMonitor, canonical_params
 
-__all__ = ['validate_input', 'validate_enhanced_input', 'validate_car_input', 'format_response', 'NumpyEncoder'] 
\ No newline at end of file
+__all__ = ['validate_input', 'validate_enhanced_input', 'validate_car_input', 'format_response', 'NumpyEncoder',
+           'init_compression', 'available_encodings', 'init_frame_store', 'FrameStore', 'FrameStoreError',
+           'parse_lod_options', 'apply_lod', 'LogStore',
+           'SharedLogStore', 'init_log_store', 'current_calc_id',
+           'init_cancellation', 'CancelToken', 'CalculationCancelled', 'cancellable', 'check_cancelled',
+           'resolve_token', 'create_job_token', 'release_job_token', 'cancellation_response',
+           'CostModel', 'init_cost_model', 'init_admission', 'AdmissionController', 'AdmissionRejected', 'admission_controlled',
+           'take_admission_slot', 'init_rendering', 'render_plot', 'render_plots', 'line_spec', 'heatmap_spec',
+           'slices_spec', 'renders_plots', 'plot_mime', 'RenderPool',
+           'ComputePool', 'init_compute_pool', 'ResultCache', 'init_result_cache',
+           'lazy_import', 'LazyModule', 'record_startup', 'startup_report',
+           'init_admin', 'admin_required', 'is_admin_request',
+           'NumpyJSONProvider', 'init_json', 'round_significant',
+           'init_metrics', 'MetricsRegistry', 'record_solver_work',
+           'init_timing', 'stage', 'current_timings', 'StageTimings',
+           'init_profiling', 'profilable', 'SamplingProfiler', 'ProfileStore',
+           'init_error_log', 'log_request_error',
+           'init_slow_requests', 'SlowRequestStore', 'SlowRequestMonitor', 'canonical_params']
\ No newline at end of file
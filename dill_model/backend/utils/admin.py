@@ -0,0 +1,53 @@
+"""
+管理接口的访问控制
+
+/api/admin/* 接口暴露进程内部状态，需通过 X-Admin-Token 请求头（或 ?admin_token=）
+提供与 app.config['ADMIN_TOKEN']（环境变量 DILL_ADMIN_TOKEN）一致的令牌；
+未配置令牌时只允许本机访问。
+"""
+
+import hmac
+import functools
+
+from flask import current_app, jsonify, request
+
+ADMIN_DEFAULTS = {
+    'ADMIN_TOKEN': None,      # 管理接口令牌，None 表示仅允许本机访问
+}
+
+ADMIN_TOKEN_HEADER = 'X-Admin-Token'
+
+_LOCAL_ADDRESSES = ('127.0.0.1', '::1', 'localhost')
+
+
+def is_admin_request():
+    """当前请求是否有权访问管理接口"""
+    expected = current_app.config.get('ADMIN_TOKEN')
+    if expected:
+        supplied = request.headers.get(ADMIN_TOKEN_HEADER) or request.args.get('admin_token') or ''
+        return hmac.compare_digest(str(supplied), str(expected))
+    return request.remote_addr in _LOCAL_ADDRESSES
+
+
+def admin_required(view):
+    """
+    管理接口装饰器：无权访问时返回403
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not is_admin_request():
+            from .helpers import format_response
+            return jsonify(format_response(False, message="无权访问管理接口")), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def init_admin(app):
+    """
+    为应用设置管理接口的默认配置
+
+    参数:
+        app: Flask应用实例
+    """
+    for key, value in ADMIN_DEFAULTS.items():
+        app.config.setdefault(key, value)
@@ -0,0 +1,296 @@
+"""
+基于代价模型的准入控制
+
+每个计算请求先用代价模型估算耗时（预计秒数），再向本机的计算预算申请额度：
+    - 预计耗时低于 ADMISSION_FREE_COST 的交互式请求（如一维计算）直接放行，
+      不会被正在运行的4D重任务挡住
+    - 其余请求在本机全部 worker 正在运行的预计耗时之和不超过 ADMISSION_BUDGET
+      时放行，否则排队等待，最长 ADMISSION_QUEUE_TIMEOUT 秒，超时返回429和Retry-After
+    - 单个请求的预计耗时超过 ADMISSION_MAX_COST 时直接返回413
+
+在途额度记录在本机共享的 SQLite 文件中，同一主机上的 gunicorn worker
+共用一个预算；异常退出的 worker 留下的记录按进程号清理。容器重启后进程号可能被复用，
+因此在途时间超过 ADMISSION_STALE_AFTER 秒的记录也视为失效（计算本身受 MAX_CALCULATION_TIME 限制）。
+"""
+
+import os
+import math
+import time
+import sqlite3
+import logging
+import tempfile
+import threading
+import functools
+
+from flask import current_app, g, jsonify, request, Response
+
+from .shared_sqlite import SharedSQLite
+from .compute_pool import available_cpus
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_DEFAULTS = {
+    'ADMISSION_ENABLED': True,
+    'ADMISSION_DB_PATH': os.path.join(tempfile.gettempdir(), 'dill_admission.sqlite3'),
+    'ADMISSION_BUDGET': None,          # 在途预计秒数上限，默认 可用CPU数 × MAX_CALCULATION_TIME
+    'ADMISSION_FREE_COST': 0.25,       # 低于该预计秒数的请求不占用预算
+    'ADMISSION_MAX_COST': None,        # 单个请求的预计秒数上限，默认 2 × MAX_CALCULATION_TIME
+    'ADMISSION_QUEUE_TIMEOUT': 10,     # 排队等待的最长秒数
+    'ADMISSION_POLL_INTERVAL': 0.1,    # 排队时检查预算的间隔（秒）
+    'ADMISSION_STALE_AFTER': None,     # 在途记录的最长保留秒数，默认 2 × MAX_CALCULATION_TIME（不限时为1小时）
+}
+
+
+class AdmissionRejected(Exception):
+    """请求未获准入"""
+
+    def __init__(self, message, status=429, retry_after=None):
+        self.status = status
+        self.retry_after = retry_after
+        super().__init__(message)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class AdmissionController:
+    """
+    本机共享的计算预算
+
+    参数:
+        path: 共享SQLite文件路径
+        budget: 在途预计秒数上限
+        free_cost: 免排队的预计秒数阈值
+        max_cost: 单个请求的预计秒数上限，None 表示不限
+        queue_timeout: 排队等待的最长秒数
+        poll_interval: 排队时检查预算的间隔（秒）
+        stale_after: 在途记录超过该秒数即删除，None 表示只按进程号清理
+    """
+
+    _SCHEMA = (
+        """CREATE TABLE IF NOT EXISTS admissions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            pid INTEGER NOT NULL,
+            endpoint TEXT,
+            cost REAL NOT NULL,
+            started REAL NOT NULL
+        )""",
+    )
+
+    def __init__(self, path, budget, free_cost=0.25, max_cost=None, queue_timeout=10, poll_interval=0.1,
+                 stale_after=None):
+        self.budget = budget
+        self.stale_after = stale_after
+        self.free_cost = free_cost
+        self.max_cost = max_cost
+        self.queue_timeout = queue_timeout
+        self.poll_interval = poll_interval
+        self._db = SharedSQLite(path, self._SCHEMA)
+        # 本worker中正在排队的请求数
+        self.waiting = 0
+        self._waiting_lock = threading.Lock()
+
+    def _purge_dead(self, conn, now):
+        if self.stale_after is not None:
+            conn.execute("DELETE FROM admissions WHERE started < ?", (now - self.stale_after,))
+        pids = [row['pid'] for row in conn.execute("SELECT DISTINCT pid FROM admissions")]
+        for pid in pids:
+            if pid != os.getpid() and not _pid_alive(pid):
+                conn.execute("DELETE FROM admissions WHERE pid = ?", (pid,))
+
+    def _retry_after(self, rows, cost, now):
+        # 按预计结束时间依次释放在途额度，直到放得下本请求
+        in_flight = sum(row['cost'] for row in rows)
+        for row in sorted(rows, key=lambda r: r['started'] + r['cost']):
+            in_flight -= row['cost']
+            if in_flight + cost <= self.budget:
+                return max(1, math.ceil(row['started'] + row['cost'] - now))
+        return max(1, math.ceil(cost))
+
+    def in_flight(self):
+        """
+        返回 (在途请求数, 在途预计秒数之和)
+        """
+        row = self._db.connection().execute("SELECT COUNT(*), COALESCE(SUM(cost), 0) FROM admissions").fetchone()
+        return row[0], row[1]
+
+    def acquire(self, cost, endpoint=''):
+        """
+        申请额度，必要时排队等待
+
+        参数:
+            cost: 预计秒数
+            endpoint: 接口名称
+        返回:
+            额度ID；免排队的请求返回None
+        异常:
+            AdmissionRejected: 单请求代价过高（413）或排队超时（429）
+        """
+        if self.max_cost is not None and cost > self.max_cost:
+            raise AdmissionRejected(
+                f"请求预计耗时{cost:.1f}秒，超过单次计算上限{self.max_cost:.0f}秒，请减少时间步数、网格点数或参数组数",
+                status=413)
+        if cost < self.free_cost:
+            return None
+
+        give_up = time.monotonic() + self.queue_timeout
+        delay = self.poll_interval
+        queued = False
+        try:
+            while True:
+                now = time.time()
+                with self._db.transaction() as conn:
+                    self._purge_dead(conn, now)
+                    rows = conn.execute("SELECT cost, started FROM admissions").fetchall()
+                    in_flight = sum(row['cost'] for row in rows)
+                    # 预算空闲时总是放行，避免代价略高于预算的请求永远排不上
+                    if not rows or in_flight + cost <= self.budget:
+                        cursor = conn.execute(
+                            "INSERT INTO admissions (pid, endpoint, cost, started) VALUES (?, ?, ?, ?)",
+                            (os.getpid(), endpoint, cost, now))
+                        return cursor.lastrowid
+                    retry_after = self._retry_after(rows, cost, now)
+                remaining = give_up - time.monotonic()
+                if remaining <= 0:
+                    raise AdmissionRejected(
+                        f"计算资源繁忙（在途预计{in_flight:.1f}秒/预算{self.budget:.0f}秒），请稍后重试",
+                        status=429, retry_after=retry_after)
+                if not queued:
+                    queued = True
+                    self._count_waiting(1)
+                time.sleep(min(delay, remaining))
+                delay = min(delay * 2, 1.0)
+        finally:
+            if queued:
+                self._count_waiting(-1)
+
+    def _count_waiting(self, delta):
+        with self._waiting_lock:
+            self.waiting += delta
+
+    def release(self, slot_id):
+        """归还额度"""
+        if slot_id is None:
+            return
+        try:
+            self._db.connection().execute("DELETE FROM admissions WHERE id = ?", (slot_id,))
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ 归还计算额度失败: {e}")
+
+
+def take_admission_slot():
+    """
+    把当前请求的额度转交给调用方（用于把计算移交给后台线程的接口），
+    调用方在计算结束后负责 release
+
+    返回:
+        (AdmissionController, 额度ID) 元组
+    """
+    slot = g.pop('admission_slot', None)
+    return current_app.extensions['admission'], slot
+
+
+def admission_response(exc, estimate=None):
+    """
+    把 AdmissionRejected 转换为JSON错误响应
+    """
+    from .helpers import format_response
+    data = {'estimated_seconds': round(estimate['seconds'], 3)} if estimate else {}
+    if exc.retry_after is not None:
+        data['retry_after'] = exc.retry_after
+    response = jsonify(format_response(False, data=data, message=str(exc)))
+    response.status_code = exc.status
+    if exc.retry_after is not None:
+        response.headers['Retry-After'] = str(exc.retry_after)
+    return response
+
+
+def admission_controlled(endpoint):
+    """
+    路由装饰器：按代价模型估算请求耗时并申请计算额度
+
+    参数:
+        endpoint: 代价模型中的接口名称，见 cost_model.ENDPOINTS
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not current_app.config['ADMISSION_ENABLED']:
+                return view(*args, **kwargs)
+            controller = current_app.extensions['admission']
+            estimate = current_app.extensions['cost_model'].estimate(request.get_json(silent=True), endpoint)
+            g.cost_estimate = estimate
+            try:
+                g.admission_slot = controller.acquire(estimate['seconds'], endpoint)
+            except AdmissionRejected as e:
+                logger.warning(f"🚦 {endpoint} 未获准入: {e}")
+                return admission_response(e, estimate)
+            except sqlite3.Error as e:
+                # 共享预算不可用时不阻断计算
+                logger.warning(f"⚠️ 计算预算不可用，直接放行: {e}")
+                g.admission_slot = None
+
+            cost_model = current_app.extensions['cost_model']
+            started = time.perf_counter()
+            streamed = False
+            try:
+                rv = view(*args, **kwargs)
+                response = rv[0] if isinstance(rv, tuple) else rv
+                status = rv[1] if isinstance(rv, tuple) and len(rv) > 1 else getattr(response, 'status_code', 200)
+                if isinstance(response, Response) and response.is_streamed:
+                    # 流式响应在发送完毕（或客户端断开）后归还额度并记录耗时
+                    slot = g.pop('admission_slot', None)
+
+                    def on_close():
+                        controller.release(slot)
+                        if status == 200:
+                            cost_model.observe(estimate, time.perf_counter() - started)
+                    response.call_on_close(on_close)
+                    streamed = True
+                elif status == 200 and 'admission_slot' in g:
+                    # 只用本请求内完成的计算校准（后台任务不计入）
+                    cost_model.observe(estimate, time.perf_counter() - started)
+                return rv
+            finally:
+                if not streamed:
+                    controller.release(g.pop('admission_slot', None))
+        return wrapper
+    return decorator
+
+
+def init_admission(app):
+    """
+    为应用创建准入控制，保存在 app.extensions['admission']（需先调用 init_cost_model）
+
+    参数:
+        app: Flask应用实例
+    """
+    for key, value in ADMISSION_DEFAULTS.items():
+        app.config.setdefault(key, value)
+    max_time = app.config.get('MAX_CALCULATION_TIME', 30) or 0
+    budget = app.config['ADMISSION_BUDGET']
+    if budget is None:
+        budget = available_cpus() * (max_time or 30)
+    max_cost = app.config['ADMISSION_MAX_COST']
+    if max_cost is None and max_time > 0:
+        max_cost = 2 * max_time
+    stale_after = app.config['ADMISSION_STALE_AFTER']
+    if stale_after is None:
+        stale_after = 2 * max_time if max_time > 0 else 3600
+
+    controller = AdmissionController(app.config['ADMISSION_DB_PATH'], budget,
+                                     free_cost=app.config['ADMISSION_FREE_COST'],
+                                     max_cost=max_cost,
+                                     queue_timeout=app.config['ADMISSION_QUEUE_TIMEOUT'],
+                                     poll_interval=app.config['ADMISSION_POLL_INTERVAL'],
+                                     stale_after=stale_after)
+    app.extensions['admission'] = controller
+    logger.info(f"🚦 计算预算: {budget:.0f}s（单请求上限: {max_cost if max_cost is not None else '不限'}）")
+    return controller
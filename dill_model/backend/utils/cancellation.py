@@ -0,0 +1,317 @@
+"""
+计算任务的协作式取消与截止时间
+
+每个计算请求创建一个 CancelToken：
+    - 截止时间取自 app.config['MAX_CALCULATION_TIME']（秒）
+    - POST /api/jobs/<calc_id>/cancel 可主动取消（跨worker时经共享日志库传递）
+    - 客户端断开时自动取消：流式响应由生成器关闭触发，普通请求在检查点
+      对 gunicorn.socket / werkzeug.socket 做非阻塞 MSG_PEEK 探测
+
+模型在帧、时间列、网格行等粒度调用 token.check()，被取消时抛出
+CalculationCancelled。它继承 BaseException（与 asyncio.CancelledError 相同），
+因此不会被模型和路由中大量的 `except Exception` 回退分支吞掉。
+"""
+
+import time
+import socket
+import logging
+import functools
+import threading
+import contextvars
+
+from flask import current_app, g, jsonify, request, has_request_context
+
+logger = logging.getLogger(__name__)
+
+CANCELLATION_DEFAULTS = {
+    'MAX_CALCULATION_TIME': 30,       # 单次计算的最长时间（秒），<=0 表示不限
+    'CANCEL_ON_DISCONNECT': True,     # 客户端断开时取消计算
+    'CANCEL_PEEK_INTERVAL': 0.25,     # 两次套接字探测之间的最小间隔（秒）
+    'CANCEL_REMOTE_INTERVAL': 1.0,    # 两次查询跨worker取消请求之间的最小间隔（秒）
+}
+
+# 取消原因与响应状态码
+CANCEL_STATUS = {
+    'timeout': 504,
+    'cancelled': 499,
+    'disconnected': 499,
+}
+
+_current_token = contextvars.ContextVar('dill_cancel_token', default=None)
+
+
+class CalculationCancelled(BaseException):
+    """计算被取消或超过截止时间"""
+
+    def __init__(self, reason='cancelled', message=None):
+        self.reason = reason
+        super().__init__(message or reason)
+
+
+class CancelToken:
+    """
+    取消令牌
+
+    参数:
+        job_id: 任务ID（即请求的 calc_id）
+        timeout: 距离截止时间的秒数，None 或 <=0 表示不限
+        sock: 客户端套接字，用于探测断开
+        remote_check: 以令牌创建时间戳为参数、返回是否存在此后的跨worker取消请求的可调用对象
+        cancellable_by_id: 是否允许通过 /api/jobs/<calc_id>/cancel 按ID取消（仅服务端生成的ID）
+        peek_interval: 套接字探测间隔（秒）
+        remote_interval: 跨worker查询间隔（秒）
+    """
+
+    def __init__(self, job_id=None, timeout=None, sock=None, remote_check=None, cancellable_by_id=True,
+                 peek_interval=0.25, remote_interval=1.0):
+        self.job_id = job_id
+        self.cancellable_by_id = cancellable_by_id
+        self.started = time.monotonic()
+        self.created = time.time()
+        self.deadline = self.started + timeout if timeout and timeout > 0 else None
+        self.timeout = timeout
+        self.reason = None
+        self._sock = sock
+        self._remote_check = remote_check
+        self._peek_interval = peek_interval
+        self._remote_interval = remote_interval
+        self._next_peek = 0.0
+        self._next_remote = self.started + remote_interval
+
+    def cancel(self, reason='cancelled'):
+        """标记取消（可从任意线程调用）"""
+        if self.reason is None:
+            self.reason = reason
+
+    @property
+    def cancelled(self):
+        return self.reason is not None
+
+    def remaining(self):
+        """距离截止时间的剩余秒数，不限时返回None"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def _client_gone(self):
+        try:
+            data = self._sock.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT)
+        except BlockingIOError:
+            return False
+        except (OSError, ValueError):
+            # 已关闭的文件描述符视为断开；TLS套接字等不支持探测的情况不再探测
+            if getattr(self._sock, 'fileno', lambda: -1)() == -1:
+                return True
+            self._sock = None
+            return False
+        # 对端关闭时 recv 返回空字节
+        return data == b''
+
+    def check(self):
+        """
+        检查点：已取消、已超时或客户端已断开时抛出 CalculationCancelled
+        """
+        now = time.monotonic()
+        if self.reason is None and self.deadline is not None and now > self.deadline:
+            self.reason = 'timeout'
+        if self.reason is None and self._sock is not None and now >= self._next_peek:
+            self._next_peek = now + self._peek_interval
+            if self._client_gone():
+                self.reason = 'disconnected'
+        if self.reason is None and self._remote_check is not None and now >= self._next_remote:
+            self._next_remote = now + self._remote_interval
+            try:
+                if self._remote_check(self.created):
+                    self.reason = 'cancelled'
+            except Exception as e:
+                logger.warning(f"⚠️ 查询跨worker取消请求失败: {e}")
+                self._remote_check = None
+        if self.reason is not None:
+            raise CalculationCancelled(self.reason, self.describe())
+
+    def describe(self):
+        if self.reason == 'timeout':
+            return f"计算超过最长时间限制（{self.timeout}秒），已终止"
+        if self.reason == 'disconnected':
+            return "客户端已断开，计算已终止"
+        return "计算已被取消"
+
+
+class _NullToken:
+    """不限时、不可取消的空令牌"""
+
+    job_id = None
+    reason = None
+    cancelled = False
+
+    def check(self):
+        pass
+
+    def cancel(self, reason='cancelled'):
+        pass
+
+    def remaining(self):
+        return None
+
+
+NULL_TOKEN = _NullToken()
+
+
+def resolve_token(cancel_token=None):
+    """
+    返回显式传入的令牌；未传入时取当前上下文中的令牌，都没有时返回空令牌
+
+    参数:
+        cancel_token: CancelToken 或 None
+    返回:
+        可调用 check() 的令牌对象
+    """
+    if cancel_token is not None:
+        return cancel_token
+    return _current_token.get() or NULL_TOKEN
+
+
+def check_cancelled(cancel_token=None):
+    """在检查点调用：当前令牌已取消时抛出 CalculationCancelled"""
+    resolve_token(cancel_token).check()
+
+
+class JobRegistry:
+    """
+    进程内运行中任务的登记表（job_id -> CancelToken）
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens = {}
+
+    def register(self, token):
+        if token.job_id:
+            with self._lock:
+                self._tokens.setdefault(token.job_id, []).append(token)
+
+    def unregister(self, token):
+        with self._lock:
+            tokens = self._tokens.get(token.job_id)
+            if tokens and token in tokens:
+                tokens.remove(token)
+                if not tokens:
+                    del self._tokens[token.job_id]
+
+    def cancel(self, job_id, reason='cancelled', by_id=False):
+        """
+        取消本进程内该ID的全部任务
+
+        参数:
+            job_id: 任务ID
+            reason: 取消原因
+            by_id: 是否为客户端按ID发起的取消（只作用于 cancellable_by_id 的任务）
+        返回:
+            被取消的任务数
+        """
+        with self._lock:
+            tokens = [token for token in self._tokens.get(job_id, ())
+                      if not by_id or token.cancellable_by_id]
+        for token in tokens:
+            token.cancel(reason)
+        return len(tokens)
+
+    def running(self):
+        with self._lock:
+            return {job_id: len(tokens) for job_id, tokens in self._tokens.items()}
+
+
+def create_job_token(job_id=None, timeout=None, watch_client=True):
+    """
+    为当前请求创建并登记取消令牌（需要应用上下文）
+
+    参数:
+        job_id: 任务ID，默认取请求的 calc_id
+        timeout: 截止秒数，默认取 MAX_CALCULATION_TIME
+        watch_client: 是否探测客户端断开
+    返回:
+        CancelToken，用完后需调用 release_job_token
+    """
+    config = current_app.config
+    if job_id is None and has_request_context():
+        job_id = getattr(g, 'calc_id', None)
+    # 客户端自选的计算ID可能被他人猜到，这类任务不接受按ID取消
+    cancellable_by_id = has_request_context() and g.get('calc_id_generated', False)
+    sock = None
+    if watch_client and has_request_context() and config['CANCEL_ON_DISCONNECT']:
+        sock = request.environ.get('gunicorn.socket') or request.environ.get('werkzeug.socket')
+        if not hasattr(socket, 'MSG_DONTWAIT'):
+            sock = None
+    shared_store = current_app.extensions.get('shared_log_store')
+    remote_check = functools.partial(shared_store.cancel_requested, job_id) \
+        if shared_store is not None and job_id and cancellable_by_id else None
+    token = CancelToken(job_id=job_id,
+                        timeout=config['MAX_CALCULATION_TIME'] if timeout is None else timeout,
+                        sock=sock, remote_check=remote_check, cancellable_by_id=cancellable_by_id,
+                        peek_interval=config['CANCEL_PEEK_INTERVAL'],
+                        remote_interval=config['CANCEL_REMOTE_INTERVAL'])
+    current_app.extensions['job_registry'].register(token)
+    return token
+
+
+def release_job_token(app, token):
+    """注销令牌，并删除发给该任务的跨worker取消请求"""
+    app.extensions['job_registry'].unregister(token)
+    shared_store = app.extensions.get('shared_log_store')
+    if shared_store is not None and token.job_id:
+        try:
+            shared_store.clear_cancel(token.job_id, token.created)
+        except Exception as e:
+            logger.warning(f"⚠️ 删除跨worker取消请求失败: {e}")
+
+
+def cancellation_response(exc):
+    """
+    把 CalculationCancelled 转换为JSON错误响应
+
+    参数:
+        exc: CalculationCancelled 实例
+    返回:
+        (响应, 状态码) 元组
+    """
+    from .helpers import format_response
+    return jsonify(format_response(False, data={'reason': exc.reason}, message=str(exc))), CANCEL_STATUS.get(exc.reason, 499)
+
+
+def cancellable(view):
+    """
+    路由装饰器：为请求创建取消令牌并放入上下文，模型在检查点自动读取；
+    计算被取消或超时时返回 499/504 错误响应
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        app = current_app._get_current_object()
+        token = create_job_token()
+        reset = _current_token.set(token)
+        try:
+            return view(*args, **kwargs)
+        except CalculationCancelled as e:
+            logger.warning(f"⏹️ 任务 {token.job_id} 已终止: {e} (用时{token.elapsed():.2f}s)")
+            return cancellation_response(e)
+        finally:
+            _current_token.reset(reset)
+            release_job_token(app, token)
+    return wrapper
+
+
+def init_cancellation(app):
+    """
+    为应用注册任务登记表，保存在 app.extensions['job_registry']
+
+    参数:
+        app: Flask应用实例
+    """
+    for key, value in CANCELLATION_DEFAULTS.items():
+        app.config.setdefault(key, value)
+    registry = JobRegistry()
+    app.extensions['job_registry'] = registry
+    logger.info(f"⏱️ 计算时间上限: {app.config['MAX_CALCULATION_TIME']}s")
+    return registry
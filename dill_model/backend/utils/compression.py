@@ -0,0 +1,244 @@
+"""
+HTTP响应压缩中间件
+
+针对 /api/calculate_data、/api/compare_data 等返回的大体积数值JSON以及
+/api/calculate 的base64图片做流式压缩：按块喂给压缩器并逐块输出，
+不会在内存中再拼出一份完整的压缩后响应体。
+
+支持的编码（按服务端优先级）：
+    br    - 需要安装 brotli（或 brotlicffi）
+    zstd  - 需要安装 zstandard
+    gzip  - 标准库 zlib，始终可用
+"""
+
+import zlib
+import logging
+
+from flask import request, current_app
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - 可选依赖
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - 可选依赖
+    zstandard = None
+
+
+# 值得压缩的响应类型（图片等已压缩格式不在其中）
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/x-ndjson',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml',
+    'text/html',
+    'text/css',
+    'text/plain',
+    'text/csv',
+    'text/javascript',
+}
+
+# 默认配置：级别取CPU与压缩比的折中点，数值JSON在这些级别下通常已有3-5倍压缩比
+COMPRESSION_DEFAULTS = {
+    'COMPRESS_ENABLED': True,
+    'COMPRESS_MIN_SIZE': 1024,             # 小于该字节数的响应不压缩
+    'COMPRESS_ALGORITHMS': ['br', 'zstd', 'gzip'],
+    'COMPRESS_GZIP_LEVEL': 6,              # 1-9
+    'COMPRESS_BR_LEVEL': 4,                # 0-11，>5 后CPU开销陡增
+    'COMPRESS_ZSTD_LEVEL': 3,              # 1-22
+    'COMPRESS_CHUNK_SIZE': 64 * 1024,      # 每次送入压缩器的字节数
+}
+
+
+class _GzipStream:
+    """gzip流式压缩器"""
+
+    def __init__(self, level):
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        return self._obj.compress(data)
+
+    def flush(self):
+        return self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._obj.flush(zlib.Z_FINISH)
+
+
+class _BrotliStream:
+    """brotli流式压缩器"""
+
+    def __init__(self, level):
+        self._obj = brotli.Compressor(quality=level)
+        # brotli 与 brotlicffi 的方法名不同
+        self._process = getattr(self._obj, 'process', None) or self._obj.compress
+
+    def compress(self, data):
+        return self._process(data)
+
+    def flush(self):
+        return self._obj.flush()
+
+    def finish(self):
+        return self._obj.finish()
+
+
+class _ZstdStream:
+    """zstd流式压缩器"""
+
+    def __init__(self, level):
+        self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self._obj.compress(data)
+
+    def flush(self):
+        return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._obj.flush()
+
+
+def available_encodings():
+    """
+    返回当前环境可用的压缩编码列表
+
+    返回:
+        编码名称列表，例如 ['br', 'gzip']
+    """
+    encodings = []
+    if brotli is not None:
+        encodings.append('br')
+    if zstandard is not None:
+        encodings.append('zstd')
+    encodings.append('gzip')
+    return encodings
+
+
+def _make_compressor(encoding, config):
+    if encoding == 'br':
+        return _BrotliStream(config['COMPRESS_BR_LEVEL'])
+    if encoding == 'zstd':
+        return _ZstdStream(config['COMPRESS_ZSTD_LEVEL'])
+    return _GzipStream(config['COMPRESS_GZIP_LEVEL'])
+
+
+def _iter_buffer(data, chunk_size):
+    view = memoryview(data)
+    for start in range(0, len(view), chunk_size):
+        yield view[start:start + chunk_size]
+
+
+def _iter_compressed(chunks, compressor, flush_each_chunk):
+    """
+    逐块压缩并输出
+
+    参数:
+        chunks: 原始响应体的可迭代对象
+        compressor: 流式压缩器
+        flush_each_chunk: 是否每块后同步刷新（流式响应需要，保证客户端及时收到每一帧）
+    """
+    try:
+        for chunk in chunks:
+            if not chunk:
+                continue
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            out = compressor.compress(chunk)
+            if flush_each_chunk:
+                out += compressor.flush()
+            if out:
+                yield out
+        tail = compressor.finish()
+        if tail:
+            yield tail
+    finally:
+        # 客户端断开时把关闭信号传递给内层生成器
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+def _should_compress(response, config):
+    if request.method == 'HEAD':
+        return False
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return False
+    if response.direct_passthrough:
+        # send_file 的文件包装器，保持零拷贝发送
+        return False
+    if 'Content-Encoding' in response.headers:
+        return False
+    if 'no-transform' in response.headers.get('Cache-Control', ''):
+        return False
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return False
+    if not response.is_streamed:
+        length = response.content_length
+        if length is None:
+            length = len(response.get_data())
+        if length < config['COMPRESS_MIN_SIZE']:
+            return False
+    return True
+
+
+def compress_response(response):
+    """
+    after_request钩子：按Accept-Encoding协商并流式压缩响应
+
+    参数:
+        response: Flask响应对象
+    返回:
+        原响应或压缩后的响应
+    """
+    config = current_app.config
+    if not config['COMPRESS_ENABLED']:
+        return response
+    if response.mimetype in COMPRESSIBLE_MIMETYPES:
+        response.vary.add('Accept-Encoding')
+    if not _should_compress(response, config):
+        return response
+
+    supported = [enc for enc in config['COMPRESS_ALGORITHMS'] if enc in available_encodings()]
+    encoding = request.accept_encodings.best_match(supported)
+    if not encoding:
+        return response
+
+    compressor = _make_compressor(encoding, config)
+    if response.is_streamed:
+        body = _iter_compressed(response.response, compressor, flush_each_chunk=True)
+    else:
+        data = response.get_data()
+        body = _iter_compressed(_iter_buffer(data, config['COMPRESS_CHUNK_SIZE']),
+                                compressor, flush_each_chunk=False)
+
+    response.response = body
+    response.headers['Content-Encoding'] = encoding
+    response.headers.pop('Content-Length', None)
+    if response.headers.get('ETag'):
+        # 压缩后的表示与原表示不同，降级为弱ETag
+        etag, _ = response.get_etag()
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_compression(app):
+    """
+    为应用注册响应压缩
+
+    参数:
+        app: Flask应用实例
+    """
+    for key, value in COMPRESSION_DEFAULTS.items():
+        app.config.setdefault(key, value)
+    app.after_request(compress_response)
+    logger.info(f"🗜️ 响应压缩已启用，可用编码: {', '.join(available_encodings())}")
@@ -0,0 +1,233 @@
+"""
+计算进程池
+
+Enhanced Dill 的PDE求解等纯Python/NumPy小数组计算在执行期间持有GIL，
+同一进程内的线程无法并行。计算进程池把相互独立的任务（如 /api/compare_data
+中的各参数组）分发到多个进程并行执行：
+    - 结果按提交顺序返回
+    - 等待期间请求线程不持有GIL，并在检查点响应取消/超时
+    - 进程使用 spawn 启动（不继承父进程的线程与锁），create_app 时即开始启动，
+      首个请求不必等待；gunicorn fork 出的 worker 在 fork 后重新启动自己的进程池
+    - 进程池损坏或无法启动时在 _RETRY_INTERVAL 秒内回退为在当前线程执行，之后重试
+"""
+
+import os
+import time
+import atexit
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_EXCEPTION
+from concurrent.futures.process import BrokenProcessPool
+
+from .cancellation import check_cancelled
+
+logger = logging.getLogger(__name__)
+
+
+def available_cpus():
+    """
+    当前进程实际可用的CPU数（考虑CPU亲和性与cgroup配额，而不是主机的全部核数）
+
+    返回:
+        可用CPU数（至少为1）
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        cpus = os.cpu_count() or 1
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()[:2]
+        if quota != 'max':
+            cpus = min(cpus, -(-int(quota) // int(period)))
+    except (OSError, ValueError):
+        pass
+    return max(1, cpus)
+
+
+def cpus_per_worker():
+    """
+    每个服务进程可用的CPU数：可用CPU数除以服务进程数（WEB_CONCURRENCY，gunicorn -w 的默认值）
+
+    返回:
+        每个服务进程分得的CPU数（至少为1）
+    """
+    try:
+        workers = max(1, int(os.environ.get('WEB_CONCURRENCY', 1)))
+    except ValueError:
+        workers = 1
+    return max(1, available_cpus() // workers)
+
+
+COMPUTE_POOL_DEFAULTS = {
+    'COMPUTE_PROCESSES': cpus_per_worker(),    # 计算进程数（默认可用CPU数/服务进程数），0 表示在请求线程中计算
+}
+
+# 等待任务结果时检查取消的间隔（秒）
+_WAIT_INTERVAL = 0.1
+# 进程池无法启动后，改为在当前线程执行的时长（秒），之后重新尝试启动
+_RETRY_INTERVAL = 60
+
+
+def _ready():
+    """空任务：提交后促使进程池启动进程并执行 initializer"""
+    return os.getpid()
+
+
+def _preload():
+    """计算进程启动时预先导入模型模块（NumPy/SciPy 与待执行的任务函数）"""
+    from ..models import comparison  # noqa: F401
+
+
+class ComputePool:
+    """
+    spawn 进程池（start() 提前启动进程，否则在首次使用时启动）
+
+    参数:
+        processes: 进程数，0 表示不启用（在当前线程执行）
+        timeout: 单次 map 等待的最长秒数，None 表示只受请求截止时间限制
+        initializer: 进程启动时调用的函数
+        name: 日志中的进程池名称
+    """
+
+    def __init__(self, processes, timeout=None, initializer=None, name='计算'):
+        self.processes = int(processes or 0)
+        self.timeout = timeout
+        self.initializer = initializer
+        self.name = name
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._retry_at = 0.0
+        self._registered = False
+        self._fork_hook = False
+        # 已提交、尚未完成的任务数（所有 map 调用合计）
+        self.pending = 0
+
+    @property
+    def enabled(self):
+        return self.processes > 0 and time.monotonic() >= self._retry_at
+
+    def _unavailable(self, error, executor=None):
+        # 暂时回退为在当前线程执行，_RETRY_INTERVAL 秒后重建进程池
+        logger.warning(f"⚠️ {self.name}进程池不可用，{_RETRY_INTERVAL}秒内改为在当前线程执行: {error}")
+        self._retry_at = time.monotonic() + _RETRY_INTERVAL
+        if executor is not None:
+            self._discard(executor)
+
+    def start(self):
+        """
+        立即启动全部进程（各进程执行 initializer），不等待进程就绪；
+        在进程池的子进程中调用时不做任何事
+        """
+        if not self.enabled or multiprocessing.parent_process() is not None:
+            return
+        if not self._fork_hook and hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+            self._fork_hook = True
+        executor = None
+        try:
+            executor = self._get_executor()
+            for _ in range(self.processes):
+                executor.submit(_ready)
+        except (OSError, RuntimeError) as e:
+            self._unavailable(e, executor)
+
+    def _after_fork(self):
+        # fork 出的子进程（如 gunicorn --preload 的 worker）不能使用父进程的进程池与锁
+        self._lock = threading.Lock()
+        self._executor = None
+        self.pending = 0
+        self.start()
+
+    def _get_executor(self):
+        with self._lock:
+            # gunicorn fork 出的 worker 不能复用父进程的进程池
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self.processes,
+                                                     mp_context=multiprocessing.get_context('spawn'),
+                                                     initializer=self.initializer)
+                self._pid = os.getpid()
+                if not self._registered:
+                    atexit.register(self.shutdown)
+                    self._registered = True
+                logger.info(f"⚙️ 已启动 {self.processes} 个{self.name}进程")
+            return self._executor
+
+    def _discard(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def map(self, fn, arguments):
+        """
+        并行执行一组任务
+
+        参数:
+            fn: 模块级函数（需可被pickle）
+            arguments: 参数元组列表，每项对应一次 fn(*args)
+        返回:
+            与 arguments 顺序一致的结果列表
+        异常:
+            CalculationCancelled: 等待期间请求被取消或超时
+            TimeoutError: 超过 timeout 秒仍未完成
+        """
+        arguments = list(arguments)
+        if not self.enabled:
+            return [fn(*args) for args in arguments]
+        executor = None
+        try:
+            executor = self._get_executor()
+            futures = [executor.submit(fn, *args) for args in arguments]
+        except (OSError, RuntimeError) as e:
+            self._unavailable(e, executor)
+            return [fn(*args) for args in arguments]
+
+        deadline = time.monotonic() + self.timeout if self.timeout else None
+        self._count_pending(len(futures))
+        try:
+            pending = set(futures)
+            while pending:
+                check_cancelled()
+                if deadline is not None and time.monotonic() > deadline:
+                    raise TimeoutError(f"{self.name}任务超过{self.timeout}秒")
+                _, pending = wait(pending, timeout=_WAIT_INTERVAL, return_when=FIRST_EXCEPTION)
+            return [future.result() for future in futures]
+        except BrokenProcessPool as e:
+            logger.warning(f"⚠️ {self.name}进程异常退出，重建进程池并在当前线程重新执行: {e}")
+            self._discard(executor)
+            return [fn(*args) for args in arguments]
+        except BaseException:
+            # 已在运行的任务无法中断，只取消尚未开始的任务
+            for future in futures:
+                future.cancel()
+            raise
+        finally:
+            self._count_pending(-len(futures))
+
+    def _count_pending(self, delta):
+        with self._lock:
+            self.pending += delta
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None and self._pid == os.getpid():
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def init_compute_pool(app):
+    """
+    为应用创建并启动计算进程池，保存在 app.extensions['compute_pool']
+
+    参数:
+        app: Flask应用实例
+    """
+    for key, value in COMPUTE_POOL_DEFAULTS.items():
+        app.config.setdefault(key, value)
+    pool = ComputePool(app.config['COMPUTE_PROCESSES'], initializer=_preload)
+    pool.start()
+    app.extensions['compute_pool'] = pool
+    return pool
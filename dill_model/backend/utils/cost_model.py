@@ -0,0 +1,428 @@
+"""
+计算请求的代价模型
+
+在真正运行之前，根据请求参数推算各接口实际会走的计算路径：
+    - 输出网格点数 × 帧数 × 字段数（决定序列化耗时、响应体积和内存峰值）
+    - 模型求解工作量：Enhanced Dill 的PDE网格单元数、纯Python逐点循环的单元数、
+      CAR 的高斯滤波点数、matplotlib 绘图张数
+再乘以各自的单位耗时系数得到预计秒数。各路径的网格尺寸与 routes/api.py、
+models/*.py 中的实现保持一致（例如Dill三维固定50³网格、Enhanced Dill 2D
+动画参数不生效等）。
+
+预计秒数再乘以按路径（接口:模型:维度:是否动画）的校准系数：
+    - 基准测试结果（benchmarks/baseline.json）中实测耗时与模型预测之比
+    - 运行期每个成功请求的实测耗时，以指数加权移动平均（EWMA）持续修正
+"""
+
+import os
+import copy
+import json
+import math
+import logging
+import threading
+
+from .json_provider import parse_precision
+
+logger = logging.getLogger(__name__)
+
+# 输出数组的序列化代价随JSON提供器不同（见 json_provider.py）：每个输出浮点数的
+# 耗时（秒，含数组计算与序列化）与内存峰值（字节，ndarray + JSON文本 + 响应体）
+SERIALIZER_COSTS = {
+    'orjson': {'output_float': 7.0e-8, 'memory_per_float': 40},
+    'json': {'output_float': 1.1e-6, 'memory_per_float': 80},
+}
+
+# 单位耗时系数（秒），在单核上对各路径实测得到
+COST_COEFFICIENTS = {
+    'overhead': 0.005,           # 每个请求的固定开销
+    'output_float': SERIALIZER_COSTS['orjson']['output_float'],   # 每个输出浮点数，按JSON提供器选取
+    'pde_cell': 8.5e-6,          # Enhanced Dill PDE 求解每个 z×t 网格单元
+    'batch_pde_cell': 1.0e-7,    # 多个x位置一起求解时每个 x×z×t 网格单元
+    'loop_cell': 2.0e-6,         # 纯Python逐点循环的每个单元
+    'filter_point': 2.0e-7,      # CAR 高斯滤波的每个网格点
+    'plot': 0.12,                # 每张 matplotlib 图（复用Figure渲染）
+}
+
+BYTES_PER_FLOAT = 19             # JSON中每个浮点数的平均字节数（含分隔符）
+BASE_MEMORY = 2 * 1024 * 1024    # 每个请求的基础内存
+PNG_BYTES = 110 * 1024           # 每张base64编码PNG图的平均字节数
+ADAPTIVE_PDE_CELLS = 8500        # 自适应PDE求解器每个x位置的平均网格单元数
+
+COMPARE_POSITIONS = 1000         # 参数比较接口的x采样点数
+DILL_3D_POINTS = 50              # Dill三维网格每轴点数
+ENHANCED_3D_GRID = 20 * 20 * 10  # Enhanced Dill 三维网格
+CAR_3D_GRID = 50 * 50            # CAR 三维网格（x×y）
+
+# 各接口计入的绘图张数
+PLOTS_PER_ENDPOINT = {'calculate': 2, 'compare': 2}
+
+ENDPOINTS = ('calculate', 'calculate_data', 'stream', 'results', 'compare', 'compare_data', 'batch')
+
+# 批量接口各模型默认返回的字段数（见 models/vectorized.BATCH_FIELDS）
+BATCH_FIELD_COUNTS = {'dill': 2, 'car': 5}
+
+# 数值JSON在gzip下的典型压缩比
+COMPRESSION_RATIO = 0.42
+
+COST_MODEL_DEFAULTS = {
+    'COST_COEFFICIENTS': None,          # 覆盖默认单位耗时系数
+    'COST_BASELINE_PATH': os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                                       'benchmarks', 'baseline.json'),
+    'COST_EWMA_ALPHA': 0.2,             # 运行期校准的平滑系数
+    'COST_RATIO_BOUNDS': (0.05, 20.0),  # 单次观测的实测/预测比值截断范围
+}
+
+
+def _int(data, key, default):
+    try:
+        return int(data.get(key, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _detect_compare_model(params):
+    # 与 compare_data 的判断顺序一致
+    model_type = params.get('model_type', 'dill')
+    if model_type == 'enhanced_dill' or any(k in params for k in ['z_h', 'I0', 'M0']):
+        return 'enhanced_dill'
+    if model_type == 'car' or any(k in params for k in ['acid_gen_efficiency', 'diffusion_length', 'reaction_rate']):
+        return 'car'
+    return 'dill'
+
+
+def _empty_work():
+    return {'pde_cells': 0, 'batch_pde_cells': 0, 'loop_cells': 0, 'filter_points': 0, 'plots': 0}
+
+
+def _single_profile(data, endpoint):
+    """
+    单次计算（calculate / calculate_data / stream / results）的工作量
+    """
+    model_type = data.get('model_type', 'dill')
+    sine_type = data.get('sine_type', '1d')
+    if sine_type not in ('1d', 'multi', '3d'):
+        sine_type = '1d'
+    y_points = max(2, _int(data, 'y_points', 100))
+    streaming = endpoint in ('stream', 'results')
+
+    # 静态接口中哪些组合会真正生成动画帧
+    animated = streaming or (endpoint == 'calculate_data' and bool(data.get('enable_4d_animation')) and (
+        (model_type == 'dill' and sine_type in ('multi', '3d')) or
+        (model_type in ('enhanced_dill', 'car') and sine_type == '3d')))
+    frames = max(1, _int(data, 'time_steps', 20)) if animated else 1
+
+    work = _empty_work()
+    if model_type == 'enhanced_dill':
+        if animated:
+            grid, fields = {'1d': 100, 'multi': 1000 * y_points, '3d': ENHANCED_3D_GRID}[sine_type], 2
+        elif sine_type == 'multi':
+            # YZ平面每个y一次 30×200 的PDE求解，XY平面 50×y 个点各30步逐点积分
+            grid, fields = y_points * (30 * 4 + 50 * 2), 1
+            work['pde_cells'] = y_points * 30 * 200
+            work['loop_cells'] = y_points * 50 * 30
+        elif sine_type == '3d':
+            grid, fields = ENHANCED_3D_GRID, 2
+            work['loop_cells'] = ENHANCED_3D_GRID
+        else:
+            grid, fields = 1000, 3
+            work['pde_cells'] = 1000 * 200
+    elif model_type == 'car':
+        if sine_type == '3d':
+            grid, fields = CAR_3D_GRID, 4 if animated else 5
+            work['filter_points'] = CAR_3D_GRID * frames
+        elif sine_type == 'multi' and not streaming:
+            grid, fields = 1000 * y_points, 9
+            work['filter_points'] = 1000 * y_points
+        else:
+            grid, fields = 1000, 6
+            work['filter_points'] = 1000
+    else:
+        if sine_type == '3d':
+            grid, fields = DILL_3D_POINTS ** 3, 2
+        elif sine_type == 'multi':
+            grid, fields = 1000 * y_points, 2
+        else:
+            grid, fields = 1000, 2 if animated else 3
+
+    work['plots'] = PLOTS_PER_ENDPOINT.get(endpoint, 0)
+    return {
+        'model_type': model_type,
+        'sine_type': sine_type,
+        'animated': animated,
+        'frames': frames,
+        'grid_points': grid,
+        'fields': fields,
+        'output_floats': grid * fields * frames,
+        # 流式接口一次只在内存中保留一帧
+        'resident_floats': grid * fields if streaming else grid * fields * frames,
+        'work': work,
+    }
+
+
+def _compare_profile(data, endpoint):
+    """
+    参数比较（compare / compare_data）的工作量：各参数组之和
+    """
+    parameter_sets = data.get('parameter_sets') or []
+    if not isinstance(parameter_sets, list):
+        parameter_sets = []
+    work = _empty_work()
+    sets = []
+    seen = set()
+    for params in parameter_sets:
+        params = params if isinstance(params, dict) else {}
+        model_type = _detect_compare_model(params)
+        sets.append(model_type)
+        # 相同参数组只计算一次（两个接口共用计算路径与结果缓存）
+        key = json.dumps({k: v for k, v in params.items() if k not in ('setId', 'customName')},
+                         sort_keys=True, default=str)
+        if key in seen:
+            continue
+        seen.add(key)
+        if model_type == 'enhanced_dill':
+            # 全部x位置一起求解自适应PDE
+            work['batch_pde_cells'] += COMPARE_POSITIONS * ADAPTIVE_PDE_CELLS
+        elif model_type == 'car':
+            # Dill/CAR 走向量化计算，没有逐点循环
+            work['filter_points'] += COMPARE_POSITIONS
+    work['plots'] = PLOTS_PER_ENDPOINT.get(endpoint, 0)
+    floats = 2 * COMPARE_POSITIONS * len(sets) + COMPARE_POSITIONS
+    return {
+        'model_type': 'compare',
+        'sine_type': '1d',
+        'animated': False,
+        'frames': 1,
+        'grid_points': COMPARE_POSITIONS,
+        'fields': 2 * len(sets),
+        'output_floats': floats,
+        'resident_floats': floats,
+        'parameter_sets': sets,
+        'work': work,
+    }
+
+
+def _batch_profile(data):
+    """
+    批量计算（batch）的工作量：按 (模型, 网格) 分组向量化，没有逐点循环，
+    耗时主要在输出数组的序列化
+    """
+    parameter_sets = data.get('parameter_sets') or []
+    if not isinstance(parameter_sets, list):
+        parameter_sets = []
+    fields = data.get('fields')
+    default_points = max(2, _int(data, 'x_points', COMPARE_POSITIONS))
+    work = _empty_work()
+    grids = set()
+    floats = 0
+    sets = []
+    for params in parameter_sets:
+        params = params if isinstance(params, dict) else {}
+        model_type = params.get('model_type', 'dill')
+        model_type = model_type if model_type in BATCH_FIELD_COUNTS else 'dill'
+        points = max(2, _int(params, 'x_points', default_points))
+        count = len(fields) if isinstance(fields, list) and fields else BATCH_FIELD_COUNTS[model_type]
+        floats += count * points
+        if model_type == 'car':
+            work['filter_points'] += points
+        grids.add((model_type, params.get('x_min'), params.get('x_max'), points))
+        sets.append(model_type)
+    floats += sum(grid[3] for grid in grids)
+    return {
+        'model_type': 'batch',
+        'sine_type': '1d',
+        'animated': False,
+        'frames': 1,
+        'grid_points': default_points,
+        'fields': floats // default_points if default_points else 0,
+        'output_floats': floats,
+        'resident_floats': floats,
+        'parameter_sets': sets,
+        'groups': len(grids),
+        'work': work,
+    }
+
+
+def profile_key(endpoint, profile):
+    """
+    校准所用的路径键，例如 'calculate_data:dill:multi:anim'
+    """
+    return ':'.join([endpoint, profile['model_type'], profile['sine_type'],
+                     'anim' if profile['animated'] else 'static'])
+
+
+def _bytes_per_float(data):
+    """按请求的 precision 选项估算JSON中每个浮点数的字节数"""
+    try:
+        spec = parse_precision(data.get('precision')) if isinstance(data, dict) else None
+    except ValueError:
+        spec = None
+    if spec is None:
+        return BYTES_PER_FLOAT
+    kind, value = spec
+    # 容差模式：数值多为 O(1)~O(100)，有效数字约为小数位数加2
+    digits = value if kind == 'digits' else 2 - math.floor(math.log10(value))
+    return min(BYTES_PER_FLOAT, digits + 3)
+
+
+class CostModel:
+    """
+    请求代价估算
+
+    参数:
+        coefficients: 覆盖默认单位耗时系数的字典
+        ewma_alpha: 运行期校准的平滑系数
+        ratio_bounds: 单次观测比值的截断范围
+        serializer: 'orjson' 或 'json'，决定输出浮点数的耗时与内存系数
+    """
+
+    def __init__(self, coefficients=None, ewma_alpha=0.2, ratio_bounds=(0.05, 20.0), serializer='orjson'):
+        serializer_costs = SERIALIZER_COSTS.get(serializer, SERIALIZER_COSTS['orjson'])
+        self.coefficients = copy.deepcopy(COST_COEFFICIENTS)
+        self.coefficients['output_float'] = serializer_costs['output_float']
+        self.coefficients.update(coefficients or {})
+        self.memory_per_float = serializer_costs['memory_per_float']
+        self.ewma_alpha = ewma_alpha
+        self.ratio_bounds = tuple(ratio_bounds)
+        self._lock = threading.Lock()
+        # 路径键 -> {'ratio', 'source', 'samples'}
+        self._calibration = {}
+
+    def load_baseline(self, path):
+        """
+        从基准测试结果加载校准系数
+
+        基准文件格式（benchmarks/run.py 生成）:
+            {"coefficients": {...}, "cases": [{"profile_key": ..., "predicted_seconds": ...,
+                                               "median_seconds": ...}, ...]}
+        参数:
+            path: 基准文件路径
+        返回:
+            加载的路径数
+        """
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ 读取基准文件失败: {e}")
+            return 0
+        self.coefficients.update(baseline.get('coefficients') or {})
+        loaded = 0
+        with self._lock:
+            for case in baseline.get('cases', []):
+                key, predicted, measured = case.get('profile_key'), case.get('predicted_seconds'), case.get('median_seconds')
+                if not key or not predicted or measured is None:
+                    continue
+                self._calibration[key] = {'ratio': self._bound(measured / predicted), 'source': 'baseline', 'samples': 0}
+                loaded += 1
+        return loaded
+
+    def _bound(self, ratio):
+        low, high = self.ratio_bounds
+        return min(high, max(low, ratio))
+
+    def observe(self, estimate, elapsed):
+        """
+        用一次实测耗时更新该路径的校准系数（EWMA）
+
+        参数:
+            estimate: estimate() 的返回值
+            elapsed: 实测秒数
+        """
+        raw = estimate.get('raw_seconds')
+        if not raw or elapsed is None:
+            return
+        key = estimate['profile_key']
+        ratio = self._bound(elapsed / raw)
+        with self._lock:
+            entry = self._calibration.get(key)
+            if entry is None:
+                self._calibration[key] = {'ratio': ratio, 'source': 'live', 'samples': 1}
+            else:
+                entry['ratio'] += self.ewma_alpha * (ratio - entry['ratio'])
+                entry['source'] = 'live'
+                entry['samples'] += 1
+
+    def calibration(self):
+        """返回全部路径的校准系数副本"""
+        with self._lock:
+            return copy.deepcopy(self._calibration)
+
+    def profile(self, data, endpoint='calculate_data'):
+        """
+        推算请求会走的计算路径及其工作量
+
+        参数:
+            data: 请求JSON
+            endpoint: 接口名称，见 ENDPOINTS
+        返回:
+            工作量字典
+        """
+        data = data if isinstance(data, dict) else {}
+        if endpoint in ('compare', 'compare_data'):
+            return _compare_profile(data, endpoint)
+        if endpoint == 'batch':
+            return _batch_profile(data)
+        return _single_profile(data, endpoint)
+
+    def estimate(self, data, endpoint='calculate_data'):
+        """
+        估算请求的耗时、内存峰值与响应体积
+
+        参数:
+            data: 请求JSON
+            endpoint: 接口名称
+        返回:
+            估算结果字典（seconds / peak_memory_bytes / response_bytes / profile）
+        """
+        profile = self.profile(data, endpoint)
+        key = profile_key(endpoint, profile)
+        with self._lock:
+            calibration = dict(self._calibration.get(key) or {'ratio': 1.0, 'source': 'default', 'samples': 0})
+        c = self.coefficients
+        work = profile['work']
+        raw_seconds = (c['overhead']
+                   + c['output_float'] * profile['output_floats']
+                   + c['pde_cell'] * work['pde_cells']
+                   + c['batch_pde_cell'] * work['batch_pde_cells']
+                   + c['loop_cell'] * work['loop_cells']
+                   + c['filter_point'] * work['filter_points']
+                   + c['plot'] * work['plots'])
+        if work['plots']:
+            # 绘图接口返回图片而不是数值数组
+            response_bytes = work['plots'] * PNG_BYTES
+        else:
+            response_bytes = profile['output_floats'] * _bytes_per_float(data)
+        return {
+            'endpoint': endpoint,
+            'profile_key': key,
+            'seconds': raw_seconds * calibration['ratio'],
+            'raw_seconds': raw_seconds,
+            'peak_memory_bytes': BASE_MEMORY + profile['resident_floats'] * self.memory_per_float,
+            'response_bytes': response_bytes,
+            'compressed_response_bytes': int(response_bytes * COMPRESSION_RATIO) if not work['plots'] else response_bytes,
+            'calibration': calibration,
+            'profile': profile,
+        }
+
+
+def init_cost_model(app):
+    """
+    为应用创建代价模型并加载基准校准，保存在 app.extensions['cost_model']
+
+    参数:
+        app: Flask应用实例
+    """
+    for key, value in COST_MODEL_DEFAULTS.items():
+        app.config.setdefault(key, value)
+    # 需在 init_json 之后调用，按实际使用的JSON序列化器选取输出系数
+    serializer = 'orjson' if getattr(app.json, 'use_orjson', False) else 'json'
+    model = CostModel(app.config['COST_COEFFICIENTS'],
+                      ewma_alpha=app.config['COST_EWMA_ALPHA'],
+                      ratio_bounds=app.config['COST_RATIO_BOUNDS'],
+                      serializer=serializer)
+    loaded = model.load_baseline(app.config['COST_BASELINE_PATH'])
+    app.extensions['cost_model'] = model
+    logger.info(f"📐 代价模型已就绪（序列化: {serializer}），基准校准路径数: {loaded}")
+    return model
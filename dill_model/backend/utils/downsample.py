@@ -0,0 +1,311 @@
+"""
+服务端细节层次（LOD）降采样
+
+交互式预览只需要与屏幕像素相当的采样数。这里把 calculate_data 的结果
+按坐标轴分块降采样：
+
+    minmax  - 保峰值：一维数据每块保留最小值和最大值所在的两个采样点（按出现顺序，
+              坐标取极值实际所在位置，分块按 max_points // 2 划分，总点数不超过 max_points）；
+              同一坐标轴上的其它一维字段取相同采样点，使数值与坐标一一对应。
+              多维数据每块保留偏离全局均值最大的极值
+    mean    - 面积平均：每块取均值
+
+字段每一维对应的坐标轴由调用方显式给出（各模型的 LOD_AXES，如 {'exposure_dose': ['z_coords',
+'y_coords', 'x_coords']}），时间帧等不降采样的维记为None；不按长度推断，因此等长的坐标轴
+不会混淆。未声明或形状与坐标长度不符的字段原样返回，只有被字段引用的坐标轴参与裁剪和降采样。
+返回数据附带 lod 元数据，记录原始分辨率和按区域取全分辨率数据的方法。
+"""
+
+import math
+
+import numpy as np
+
+LOD_METHODS = ('minmax', 'mean')
+
+
+def _coordinate_array(plot_data, key):
+    value = plot_data.get(key)
+    if not isinstance(value, (list, tuple, np.ndarray)) or np.ndim(value) != 1 or len(value) < 2:
+        return None
+    return np.asarray(value, dtype=float)
+
+
+def _axis_letter(coord_key):
+    """x / x_coords -> 'x'，xy_y_coords -> 'y'"""
+    return coord_key[:-len('_coords')][-1] if coord_key.endswith('_coords') else coord_key[-1]
+
+
+def _as_float_array(value):
+    try:
+        array = np.asarray(value, dtype=float)
+    except (TypeError, ValueError):
+        return None
+    return array if array.ndim >= 1 and array.size > 1 else None
+
+
+def _field_layout(array, axes, coord_lengths):
+    """
+    按声明的坐标轴检查字段形状
+
+    参数:
+        array: 字段数组
+        axes: 各维的坐标键，None 表示该维不降采样
+        coord_lengths: {坐标键: 点数}
+    返回:
+        (array, flat_shape)：扁平字段（如CAR 2D的 y×x 行主序数组）还原为二维并返回原网格形状；
+        形状与坐标长度不符时返回 (None, None)
+    """
+    if any(a is not None and a not in coord_lengths for a in axes):
+        return None, None
+    expected = [coord_lengths[a] if a is not None else None for a in axes]
+    flat_shape = None
+    if array.ndim == 1 and len(axes) > 1 and None not in expected and array.size == math.prod(expected):
+        flat_shape = tuple(expected)
+        array = array.reshape(flat_shape)
+    if array.ndim != len(axes) or any(n is not None and n != m for n, m in zip(expected, array.shape)):
+        return None, None
+    return array, flat_shape
+
+
+def _block_edges(n, block):
+    return np.arange(0, n, block)
+
+
+def _reduce_blocks(array, axis, block, ufunc):
+    edges = _block_edges(array.shape[axis], block)
+    return ufunc.reduceat(array, edges, axis=axis)
+
+
+def _block_counts(n, block):
+    edges = _block_edges(n, block)
+    return np.diff(np.append(edges, n))
+
+
+def _mean_blocks(array, blocks):
+    result = array
+    for axis, block in enumerate(blocks):
+        if block <= 1:
+            continue
+        counts = _block_counts(result.shape[axis], block)
+        shape = [1] * result.ndim
+        shape[axis] = len(counts)
+        result = _reduce_blocks(result, axis, block, np.add) / counts.reshape(shape)
+    return result
+
+
+def _extremum_blocks(array, blocks):
+    high, low = array, array
+    for axis, block in enumerate(blocks):
+        if block <= 1:
+            continue
+        high = _reduce_blocks(high, axis, block, np.maximum)
+        low = _reduce_blocks(low, axis, block, np.minimum)
+    center = float(np.mean(array))
+    return np.where(high - center >= center - low, high, low)
+
+
+def _minmax_indices(array, dim, block):
+    """
+    一维保峰降采样的采样点：每块最小值与最大值所在的下标（按出现顺序，每块两个）
+
+    参数:
+        array: 字段数组，dim 为唯一的空间维；其它维（如时间帧）取逐点的上下包络
+        dim: 空间维
+        block: 分块大小
+    返回:
+        长度为 2 × 块数的下标数组
+    """
+    values = np.moveaxis(array, dim, -1).reshape(-1, array.shape[dim])
+    n = values.shape[-1]
+    nblocks = math.ceil(n / block)
+    pad = nblocks * block - n
+    low = np.pad(values.min(axis=0), (0, pad), mode='edge').reshape(nblocks, block)
+    high = np.pad(values.max(axis=0), (0, pad), mode='edge').reshape(nblocks, block)
+    edges = _block_edges(n, block)
+    # 末块补齐的点取自最后一个采样点，下标截断到 n-1
+    imin = np.minimum(edges + low.argmin(axis=1), n - 1)
+    imax = np.minimum(edges + high.argmax(axis=1), n - 1)
+    indices = np.empty(nblocks * 2, dtype=np.intp)
+    indices[0::2] = np.minimum(imin, imax)
+    indices[1::2] = np.maximum(imin, imax)
+    return indices
+
+
+def _coordinate_output(coords, block, method, indices=None):
+    n = len(coords)
+    if indices is not None:
+        # 一维保峰降采样：取极值实际所在的坐标
+        return coords[indices]
+    counts = _block_counts(n, block)
+    return np.add.reduceat(coords, _block_edges(n, block)) / counts
+
+
+def parse_lod_options(data):
+    """
+    从请求参数中解析LOD选项
+
+    参数:
+        data: 请求JSON
+    返回:
+        选项字典；未请求降采样且未指定区域时返回None
+    异常:
+        ValueError: 参数格式错误
+    """
+    max_points = data.get('max_points')
+    target_shape = data.get('target_shape')
+    region = data.get('region')
+    if max_points in (None, '') and not target_shape and not region:
+        return None
+    method = data.get('lod_method', 'minmax')
+    if method not in LOD_METHODS:
+        raise ValueError(f"lod_method 必须是 {', '.join(LOD_METHODS)} 之一")
+    if max_points not in (None, ''):
+        max_points = int(max_points)
+        if max_points < 2:
+            raise ValueError("max_points 必须不小于2")
+    else:
+        max_points = None
+    if target_shape is not None and not isinstance(target_shape, (dict, list)):
+        raise ValueError("target_shape 必须是对象或数组")
+    if region is not None and not isinstance(region, dict):
+        raise ValueError("region 必须是形如 {\"x\": [min, max]} 的对象")
+    return {'max_points': max_points, 'target_shape': target_shape, 'method': method, 'region': region}
+
+
+def apply_lod(plot_data, axes, max_points=None, target_shape=None, method='minmax', region=None):
+    """
+    对计算结果进行区域裁剪和降采样
+
+    参数:
+        plot_data: 模型 generate_data 的返回字典
+        axes: {字段键: 各维的坐标键列表}，不降采样的维（时间帧）记为None，见各模型的 LOD_AXES
+        max_points: 每个坐标轴保留的最大采样数
+        target_shape: 各坐标轴的目标采样数，{坐标键: 点数} 或按坐标键顺序给出的列表
+        method: 'minmax' 或 'mean'
+        region: 裁剪区域，{'x': [min, max], 'y': [...], 'z': [...]}，在降采样前应用
+    返回:
+        新的结果字典（附带 lod 元数据）
+    """
+    coords = {}
+    for field_axes in axes.values():
+        for key in field_axes:
+            if key is not None and key not in coords:
+                values = _coordinate_array(plot_data, key)
+                if values is not None:
+                    coords[key] = values
+    coord_lengths = {key: len(values) for key, values in coords.items()}
+
+    # 1. 字段按声明的坐标轴检查形状
+    fields = []
+    for key, field_axes in axes.items():
+        value = plot_data.get(key)
+        if not isinstance(value, (list, np.ndarray)):
+            continue
+        array = _as_float_array(value)
+        if array is None:
+            continue
+        array, flat_shape = _field_layout(array, list(field_axes), coord_lengths)
+        if array is not None:
+            fields.append((key, array, list(field_axes), flat_shape))
+
+    # 只有被字段引用的坐标轴参与裁剪和降采样（按结果中的键顺序，对应列表形式的 target_shape）
+    used = {a for _, _, field_axes, _ in fields for a in field_axes if a is not None}
+    coord_keys = [key for key in plot_data if key in used]
+    if not coord_keys:
+        return plot_data
+    result = dict(plot_data)
+    coords = {key: coords[key] for key in coord_keys}
+
+    # 2. 区域裁剪（按坐标值选取索引窗口）
+    windows = {}
+    for key, values in coords.items():
+        bounds = (region or {}).get(_axis_letter(key))
+        if bounds:
+            lo, hi = float(min(bounds)), float(max(bounds))
+            idx = np.nonzero((values >= lo) & (values <= hi))[0]
+            if len(idx) == 0:
+                raise ValueError(f"区域 {_axis_letter(key)}=[{lo}, {hi}] 内没有采样点")
+            windows[key] = slice(int(idx[0]), int(idx[-1]) + 1)
+        else:
+            windows[key] = slice(0, len(values))
+
+    matched = []
+    for key, array, field_axes, flat_shape in fields:
+        index = tuple(windows[a] if a is not None else slice(None) for a in field_axes)
+        matched.append((key, array[index], field_axes, flat_shape))
+
+    # 只有一个空间维的字段在 minmax 下每块输出两个点
+    minmax_1d_axes = set()
+    if method == 'minmax':
+        for key, array, field_axes, flat_shape in matched:
+            spatial = [a for a in field_axes if a is not None]
+            if len(spatial) == 1 and flat_shape is None:
+                minmax_1d_axes.add(spatial[0])
+
+    # 3. 各坐标轴的分块大小
+    if isinstance(target_shape, list):
+        target_shape = dict(zip(coord_keys, target_shape))
+    blocks = {}
+    for key in coord_keys:
+        n = windows[key].stop - windows[key].start
+        target = (target_shape or {}).get(key, max_points)
+        if not target or n <= int(target):
+            blocks[key] = 1
+            continue
+        if key in minmax_1d_axes:
+            target = max(1, int(target) // 2)
+        blocks[key] = max(1, math.ceil(n / int(target)))
+
+    # 4. 字段降采样
+    decimated_fields = []
+    minmax_indices = {}
+    for key, array, field_axes, flat_shape in matched:
+        field_blocks = [blocks[a] if a is not None else 1 for a in field_axes]
+        if any(b > 1 for b in field_blocks):
+            spatial_dims = [i for i, a in enumerate(field_axes) if a is not None]
+            if method == 'minmax' and len(spatial_dims) == 1 and flat_shape is None:
+                dim = spatial_dims[0]
+                # 同一坐标轴的采样点由第一个字段确定，其它字段取相同位置，数值与坐标保持对应
+                indices = minmax_indices.get(field_axes[dim])
+                if indices is None:
+                    indices = minmax_indices[field_axes[dim]] = _minmax_indices(array, dim, field_blocks[dim])
+                array = np.take(array, indices, axis=dim)
+            elif method == 'minmax':
+                array = _extremum_blocks(array, field_blocks)
+            else:
+                array = _mean_blocks(array, field_blocks)
+        if flat_shape is not None:
+            array = array.ravel()
+        result[key] = array
+        decimated_fields.append(key)
+
+    # 5. 坐标轴
+    axes_meta = {}
+    for key, values in coords.items():
+        window = values[windows[key]]
+        block = blocks[key]
+        out = window if block <= 1 else _coordinate_output(window, block, method, minmax_indices.get(key))
+        result[key] = out
+        axes_meta[key] = {
+            'original_points': int(len(values)),
+            'original_range': [float(values[0]), float(values[-1])],
+            'window': [windows[key].start, windows[key].stop],
+            'block': int(block),
+            'returned_points': int(len(out)),
+        }
+
+    region_hint = {_axis_letter(k): [m['original_range'][0], m['original_range'][1]] for k, m in axes_meta.items()}
+    result['lod'] = {
+        'method': method,
+        'max_points': max_points,
+        'target_shape': target_shape,
+        'region': region,
+        'axes': axes_meta,
+        'fields': decimated_fields,
+        'full_resolution': {
+            'endpoint': '/api/calculate_data',
+            'hint': "去掉 max_points/target_shape 并传入 region 即可获取指定区域的全分辨率数据",
+            'region_template': region_hint,
+        },
+    }
+    return result
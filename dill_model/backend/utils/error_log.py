@@ -0,0 +1,61 @@
+"""
+请求异常与慢请求的文件日志（dill_backend.log）
+
+原先各接口在异常分支中各自 open('dill_backend.log', 'a') 追加写入，多线程/多worker
+同时出错时记录会交错。现在统一写入 logging 的 'dill.requests' 日志器：
+FileHandler 在首次写入时才打开文件，每条记录一次写出（含时间、计算ID、请求参数与堆栈），
+慢请求（见 utils/slow_requests.py）也在这里留下一行摘要。
+"""
+
+import os
+import sys
+import logging
+
+from .log_store import current_calc_id
+
+ERROR_LOG_DEFAULTS = {
+    'ERROR_LOG_PATH': 'dill_backend.log',   # 请求异常日志文件，None 表示只交给上层日志器
+}
+
+request_logger = logging.getLogger('dill.requests')
+
+
+def log_request_error(data=None, message=None):
+    """
+    在 except 分支中记录当前异常（参数、异常类型与完整堆栈）
+
+    参数:
+        data: 请求参数，None 记为"无"
+        message: 附加说明
+    """
+    exc_type, exc, _ = sys.exc_info()
+    lines = [f"计算ID: {current_calc_id() or '无'}",
+             f"请求参数: {data if data is not None else '无'}"]
+    if exc_type is not None:
+        lines += [f"异常类型: {exc_type.__name__}", f"异常信息: {exc}"]
+    if message:
+        lines.append(message)
+    request_logger.error('\n'.join(lines), exc_info=exc_type is not None)
+
+
+def init_error_log(app):
+    """
+    为 'dill.requests' 日志器挂载写入 app.config['ERROR_LOG_PATH'] 的 FileHandler
+
+    参数:
+        app: Flask应用实例
+    """
+    for key, value in ERROR_LOG_DEFAULTS.items():
+        app.config.setdefault(key, value)
+    path = app.config['ERROR_LOG_PATH']
+    request_logger.setLevel(logging.INFO)
+    if not path:
+        return request_logger
+    target = os.path.abspath(path)
+    # 多次 create_app 时不重复挂载同一文件
+    if not any(isinstance(handler, logging.FileHandler) and handler.baseFilename == target
+               for handler in request_logger.handlers):
+        handler = logging.FileHandler(target, encoding='utf-8', delay=True)
+        handler.setFormatter(logging.Formatter('[%(asctime)s] %(levelname)s %(message)s'))
+        request_logger.addHandler(handler)
+    return request_logger
@@ -0,0 +1,305 @@
+"""
+4D动画结果的内存映射帧存储
+
+每个任务一个目录：
+    <RESULTS_DIR>/<result_id>/meta.json      元数据与状态（创建、首帧、结束时写入）
+    <RESULTS_DIR>/<result_id>/progress.json  已写入帧数与最近一次写入时间（每帧更新）
+    <RESULTS_DIR>/<result_id>/<field>.npy    形状为 (T, *frame_shape) 的 .npy 内存映射文件
+
+计算线程逐帧写入，客户端按需读取单帧或帧区间，任何时刻都不需要
+把全部帧加载进工作进程内存。目录放在本机磁盘上，同一主机的多个
+gunicorn worker 可以共享读取。全部结果合计占用的磁盘空间不超过
+RESULTS_MAX_BYTES，首帧到达、帧文件大小确定时预留空间（必要时删除最旧的结果）。
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import shutil
+import logging
+import tempfile
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FRAME_STORE_DEFAULTS = {
+    'RESULTS_DIR': os.path.join(tempfile.gettempdir(), 'dill_results'),
+    'RESULTS_MAX_AGE': 3600,          # 结果保留秒数
+    'RESULTS_MAX_JOBS': 20,           # 最多保留的结果数
+    'RESULTS_MAX_TIME_STEPS': 1000,   # 单个任务允许的最大帧数
+    'RESULTS_MAX_RANGE': 50,          # 单次区间请求最多返回的帧数
+    'RESULTS_MAX_BYTES': 2 * 1024 ** 3,   # 全部结果的帧文件合计字节数上限
+    'RESULTS_STALE_AFTER': None,      # 运行中的任务超过该秒数没有进度视为已中断，默认 2 × MAX_CALCULATION_TIME
+    'RESULTS_DTYPE': 'float64',
+}
+
+_RESULT_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+class FrameStoreError(Exception):
+    """帧存储访问错误（结果不存在、帧未就绪等）"""
+
+
+class FrameWriter:
+    """
+    单个任务的帧写入器
+
+    首帧到达时根据帧形状预留磁盘空间并创建各字段的内存映射文件，之后逐帧写入。
+    """
+
+    def __init__(self, store, result_id, meta, dtype):
+        self.store = store
+        self.result_id = result_id
+        self.meta = meta
+        self.dtype = np.dtype(dtype)
+        self._maps = {}
+
+    def write_frame(self, frame):
+        """
+        写入一帧
+
+        参数:
+            frame: 模型 animation_stream 产出的帧字典
+        """
+        index = frame['index']
+        if not self._maps:
+            self._allocate(frame)
+        for field, mm in self._maps.items():
+            mm[index] = frame[field]
+        self.meta['frame_times'][index] = frame.get('t')
+        if 'additionalInfo' in frame:
+            self.meta['additionalInfo'] = frame['additionalInfo']
+        self.meta['frames_written'] = index + 1
+        # 每帧只更新很小的进度文件，完整元数据在结束时写入
+        self.store.write_progress(self.result_id, index + 1)
+
+    def _allocate(self, frame):
+        time_steps = self.meta['time_steps']
+        shapes = {field: (time_steps,) + np.shape(frame[field]) for field in self.meta['frame_fields']}
+        self.meta['shapes'] = {field: list(shape) for field, shape in shapes.items()}
+        self.meta['bytes'] = sum(int(np.prod(shape)) for shape in shapes.values()) * self.dtype.itemsize
+        self.meta['frame_times'] = [None] * time_steps
+        if 'additionalInfo' in frame:
+            self.meta['additionalInfo'] = frame['additionalInfo']
+        # 超出 RESULTS_MAX_BYTES 时抛出 FrameStoreError，不创建帧文件
+        self.store.reserve(self.result_id, self.meta)
+        for field, shape in shapes.items():
+            path = self.store.field_path(self.result_id, field)
+            self._maps[field] = np.lib.format.open_memmap(path, mode='w+', dtype=self.dtype, shape=shape)
+
+    def finish(self):
+        for mm in self._maps.values():
+            mm.flush()
+        self._maps.clear()
+        self.meta['status'] = 'complete'
+        self.meta['finished_at'] = time.time()
+        self.store.write_meta(self.result_id, self.meta)
+
+    def fail(self, message):
+        self._maps.clear()
+        self.meta['status'] = 'failed'
+        self.meta['error'] = message
+        self.meta['finished_at'] = time.time()
+        try:
+            self.store.write_meta(self.result_id, self.meta)
+        except FileNotFoundError:
+            # 结果目录已被删除（DELETE /api/results/<id>）
+            pass
+
+
+class FrameStore:
+    """
+    基于目录和 .npy 内存映射文件的帧存储
+    """
+
+    def __init__(self, root, max_age=3600, max_jobs=20, max_bytes=2 * 1024 ** 3, stale_after=3600, dtype='float64'):
+        self.root = root
+        self.max_age = max_age
+        self.max_jobs = max_jobs
+        self.max_bytes = max_bytes
+        self.stale_after = stale_after
+        self.dtype = dtype
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    # ---- 路径 ----
+    def job_dir(self, result_id):
+        if not _RESULT_ID_PATTERN.match(result_id or ''):
+            raise FrameStoreError("无效的结果ID")
+        return os.path.join(self.root, result_id)
+
+    def field_path(self, result_id, field):
+        return os.path.join(self.job_dir(result_id), f'{field}.npy')
+
+    # ---- 元数据 ----
+    def write_meta(self, result_id, meta):
+        path = os.path.join(self.job_dir(result_id), 'meta.json')
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def write_progress(self, result_id, frames_written):
+        path = os.path.join(self.job_dir(result_id), 'progress.json')
+        tmp_path = f'{path}.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'frames_written': frames_written, 'updated_at': time.time()}, f)
+        except FileNotFoundError:
+            raise FrameStoreError("结果已被删除")
+        os.replace(tmp_path, path)
+
+    def read_meta(self, result_id):
+        path = os.path.join(self.job_dir(result_id), 'meta.json')
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            raise FrameStoreError("结果不存在或已过期")
+        if meta.get('status') == 'running':
+            try:
+                with open(os.path.join(self.job_dir(result_id), 'progress.json'), 'r', encoding='utf-8') as f:
+                    meta.update(json.load(f))
+            except (FileNotFoundError, ValueError):
+                pass
+        return meta
+
+    # ---- 创建与清理 ----
+    def create(self, meta):
+        """
+        创建新任务
+
+        参数:
+            meta: 模型 animation_stream 返回的元数据
+        返回:
+            FrameWriter 实例
+        """
+        with self._lock:
+            self._cleanup(slots=1)
+        result_id = uuid.uuid4().hex
+        os.makedirs(self.job_dir(result_id))
+        meta = dict(meta)
+        meta.update({
+            'result_id': result_id,
+            'status': 'running',
+            'frames_written': 0,
+            'created_at': time.time(),
+            'dtype': str(np.dtype(self.dtype)),
+        })
+        self.write_meta(result_id, meta)
+        return FrameWriter(self, result_id, meta, self.dtype)
+
+    def delete(self, result_id):
+        shutil.rmtree(self.job_dir(result_id), ignore_errors=True)
+
+    def reserve(self, result_id, meta):
+        """
+        为任务预留 meta['bytes'] 字节的帧文件空间（必要时从最旧的结果开始删除），并写入元数据
+
+        异常:
+            FrameStoreError: 删除全部可删除的结果后仍超出 max_bytes
+        """
+        with self._lock:
+            used = self._cleanup(reserve_bytes=meta['bytes'])
+            if used + meta['bytes'] > self.max_bytes:
+                raise FrameStoreError(f"结果需要{meta['bytes'] / 2 ** 20:.0f}MB磁盘空间，"
+                                      f"帧存储仅剩{max(0, self.max_bytes - used) / 2 ** 20:.0f}MB（RESULTS_MAX_BYTES）")
+            self.write_meta(result_id, meta)
+
+    def cleanup(self):
+        """
+        删除过期结果，并把结果数量控制在 max_jobs 以内、占用空间控制在 max_bytes 以内
+        （运行中的任务不删除，超过 stale_after 秒没有进度的视为已中断并删除）
+        """
+        with self._lock:
+            self._cleanup()
+
+    def _cleanup(self, slots=0, reserve_bytes=0):
+        # 返回清理后剩余结果的帧文件字节数；slots/reserve_bytes 为即将新增的结果数与字节数
+        now = time.time()
+        jobs = []
+        for name in os.listdir(self.root):
+            if not _RESULT_ID_PATTERN.match(name):
+                continue
+            try:
+                meta = self.read_meta(name)
+            except (FrameStoreError, ValueError):
+                # 元数据尚未写入或已损坏，按目录修改时间计算年龄
+                try:
+                    meta = {'created_at': os.path.getmtime(os.path.join(self.root, name))}
+                except OSError:
+                    continue
+            jobs.append((meta.get('created_at', 0), name, meta))
+        jobs.sort(key=lambda job: job[:2])
+        excess = len(jobs) - self.max_jobs + slots
+        used = sum(meta.get('bytes', 0) for _, _, meta in jobs)
+        for created_at, name, meta in jobs:
+            running = meta.get('status') == 'running'
+            stale = running and now - meta.get('updated_at', created_at) > self.stale_after
+            expired = now - created_at > self.max_age
+            over = excess > 0 or used + reserve_bytes > self.max_bytes
+            if stale or (not running and (expired or over)):
+                self.delete(name)
+                excess -= 1
+                used -= meta.get('bytes', 0)
+        return used
+
+    # ---- 读取 ----
+    def read_frames(self, result_id, start, stop=None, fields=None):
+        """
+        读取帧区间 [start, stop)
+
+        参数:
+            result_id: 结果ID
+            start: 起始帧
+            stop: 结束帧（不含），默认只读 start 一帧
+            fields: 需要的字段列表，默认全部
+        返回:
+            (meta, {field: ndarray}) 元组，数组形状为 (帧数, *frame_shape)
+        """
+        meta = self.read_meta(result_id)
+        stop = start + 1 if stop is None else stop
+        written = meta.get('frames_written', 0)
+        if start < 0 or start >= meta['time_steps'] or stop <= start:
+            raise FrameStoreError("帧索引超出范围")
+        if stop > written:
+            raise FrameStoreError(f"帧尚未就绪（已写入{written}帧）")
+        fields = fields or meta['frame_fields']
+        unknown = [f for f in fields if f not in meta['frame_fields']]
+        if unknown:
+            raise FrameStoreError(f"未知字段: {', '.join(unknown)}")
+        arrays = {}
+        for field in fields:
+            mm = np.load(self.field_path(result_id, field), mmap_mode='r')
+            # 只拷贝请求的帧，其余部分留在页缓存中
+            arrays[field] = np.array(mm[start:stop])
+            del mm
+        return meta, arrays
+
+
+def init_frame_store(app):
+    """
+    为应用创建帧存储，保存在 app.extensions['frame_store']
+
+    参数:
+        app: Flask应用实例
+    """
+    for key, value in FRAME_STORE_DEFAULTS.items():
+        app.config.setdefault(key, value)
+    stale_after = app.config['RESULTS_STALE_AFTER']
+    if stale_after is None:
+        max_time = app.config.get('MAX_CALCULATION_TIME', 30) or 0
+        stale_after = 2 * max_time if max_time > 0 else 3600
+    store = FrameStore(app.config['RESULTS_DIR'],
+                       max_age=app.config['RESULTS_MAX_AGE'],
+                       max_jobs=app.config['RESULTS_MAX_JOBS'],
+                       max_bytes=app.config['RESULTS_MAX_BYTES'],
+                       stale_after=stale_after,
+                       dtype=app.config['RESULTS_DTYPE'])
+    app.extensions['frame_store'] = store
+    logger.info(f"🗂️ 帧存储目录: {store.root}")
+    return store
@@ -1,6 +1,8 @@
 import json
 import numpy as np
 
+from .timing import current_timings
+
 def validate_input(data):
     """
     验证输入参数（Dill模型）
@@ -206,16 +208,20 @@ def format_response(success, data=None, message=""):
         message: 响应消息（可选）
         
     返回:
-        格式化的JSON响应
+        格式化的JSON响应（启用阶段计时时附带 timings 块）
     """
     # 优化：如果message是dict，自动转为字符串
     if isinstance(message, dict):
         message = json.dumps(message, ensure_ascii=False)
-    return {
+    response = {
         'success': success,
         'data': data,
         'message': message
     }
+    timings = current_timings()
+    if timings is not None and timings.seconds:
+        response['timings'] = timings.as_dict()
+    return response
 
 class NumpyEncoder(json.JSONEncoder):
     """处理NumPy数据类型的JSON编码器"""
@@ -0,0 +1,278 @@
+"""
+支持NumPy的Flask JSON提供器
+
+Flask 3 不再读取 app.json_encoder，JSON序列化由 app.json（JSONProvider）负责。
+本提供器直接序列化 NumPy 数组与标量，模型和接口可以把 ndarray 原样放进响应，
+不必先 .tolist() 复制成Python列表：
+    - 安装了 orjson 时，使用 OPT_SERIALIZE_NUMPY 从数组缓冲区一次原生序列化
+    - 否则回退到标准库 json，数组在编码到该字段时才逐个转换为列表
+      （不会同时持有整个响应的列表副本）
+
+浮点精度可按请求指定（查询参数 ?precision= 或请求体字段 "precision"），未指定时取
+app.config['JSON_FLOAT_PRECISION']：
+    - 整数 n 或 {"digits": n}: 保留 n 位有效数字
+    - 小于1的数 t 或 {"tolerance": t}: 绝对误差不超过 t（按 t 的数量级取小数位）
+舍入作用于 NumPy 浮点数组/标量以及浮点数列表（如动画帧），数组在编码前逐个向量化舍入，
+舍入后的浮点数以最短形式输出（0.36787944117144233 → 0.3679）。
+orjson 把 NaN/Inf 输出为 null，标准库输出 NaN/Infinity。
+"""
+
+import json
+import math
+import logging
+
+import numpy as np
+from flask import g, has_request_context, jsonify, request
+from flask.json.provider import DefaultJSONProvider
+
+from .timing import stage
+
+try:
+    import orjson
+except ImportError:  # 可选依赖，未安装时回退到标准库
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+JSON_DEFAULTS = {
+    'JSON_FLOAT_PRECISION': None,    # 默认浮点精度（格式同请求的 precision），None 表示完整精度
+}
+
+MAX_SIGNIFICANT_DIGITS = 17
+
+
+def round_significant(array, digits):
+    """
+    按有效数字位数舍入浮点数组
+
+    参数:
+        array: 浮点数组
+        digits: 有效数字位数
+    返回:
+        舍入后的新数组（非有限值保持不变）
+    """
+    array = np.asarray(array)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        magnitude = np.floor(np.log10(np.abs(array)))
+        magnitude = np.where(np.isfinite(magnitude), magnitude, 0)
+        exponent = digits - 1 - magnitude
+        # 按指数正负分别乘/除10的整数次幂，避免 1/scale 引入的尾数误差
+        up = np.power(10.0, np.maximum(exponent, 0))
+        down = np.power(10.0, np.maximum(-exponent, 0))
+        rounded = np.round(array * up / down) * down / up
+    return np.where(np.isfinite(rounded), rounded, array)
+
+
+def round_tolerance(array, tolerance):
+    """
+    按绝对容差舍入浮点数组（小数位数取 tolerance 的数量级，误差不超过 tolerance/2）
+
+    参数:
+        array: 浮点数组
+        tolerance: 绝对容差
+    返回:
+        舍入后的新数组
+    """
+    return np.round(array, -math.floor(math.log10(tolerance)))
+
+
+def parse_precision(value):
+    """
+    解析浮点精度选项
+
+    参数:
+        value: 有效数字位数（整数，如 4）、绝对容差（小于1的数，如 1e-4），
+               或 {"digits": 4} / {"tolerance": 1e-4}；None/空值表示完整精度
+    返回:
+        ('digits', n)、('tolerance', t) 或 None
+    异常:
+        ValueError: 取值不合法
+    """
+    if value is None or value == '' or value is False:
+        return None
+    if isinstance(value, dict):
+        if len(value) != 1 or next(iter(value)) not in ('digits', 'tolerance'):
+            raise ValueError("precision 对象只能包含 digits 或 tolerance 之一")
+        kind, number = next(iter(value.items()))
+    else:
+        kind, number = None, value
+    try:
+        number = float(number)
+    except (TypeError, ValueError):
+        raise ValueError(f"precision 必须是数字: {value!r}")
+    if kind is None:
+        kind = 'tolerance' if 0 < number < 1 else 'digits'
+    if kind == 'digits':
+        if not math.isfinite(number) or number != int(number) or not 1 <= number <= MAX_SIGNIFICANT_DIGITS:
+            raise ValueError(f"有效数字位数必须是1到{MAX_SIGNIFICANT_DIGITS}之间的整数")
+        return ('digits', int(number))
+    if not (number > 0 and math.isfinite(number)):
+        raise ValueError("绝对容差必须是正数")
+    return ('tolerance', number)
+
+
+def _round_array(array, spec):
+    kind, value = spec
+    return round_significant(array, value) if kind == 'digits' else round_tolerance(array, value)
+
+
+def _first_leaf(obj):
+    while isinstance(obj, (list, tuple)) and obj:
+        obj = obj[0]
+    return obj
+
+
+def _round_tree(obj, spec):
+    """把嵌套结构中的浮点数组、NumPy浮点标量与浮点数列表按精度舍入（返回新结构，不修改原对象）"""
+    if isinstance(obj, np.ndarray):
+        return _round_array(obj, spec) if obj.dtype.kind == 'f' else obj
+    if isinstance(obj, np.floating):
+        return float(_round_array(obj, spec))
+    if isinstance(obj, dict):
+        return {key: _round_tree(value, spec) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        if isinstance(_first_leaf(obj), float):
+            # 已 .tolist() 的数值数据：整体转为数组一次舍入（不规则或含非数值时逐项处理）
+            try:
+                array = np.asarray(obj)
+            except ValueError:
+                array = None
+            if array is not None and array.dtype.kind == 'f':
+                return _round_array(array, spec)
+        elif not isinstance(_first_leaf(obj), (np.ndarray, np.generic, dict)):
+            return obj
+        return [_round_tree(value, spec) for value in obj]
+    return obj
+
+
+def _default(obj):
+    """标准库路径：NumPy 对象在编码到该位置时才转换"""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return DefaultJSONProvider.default(obj)
+
+
+def _orjson_default(obj):
+    # orjson 只原生支持C连续的数值/布尔数组，其余情况交给这里
+    if isinstance(obj, np.ndarray):
+        if obj.dtype.kind in 'fiub' and not obj.flags.c_contiguous:
+            return np.ascontiguousarray(obj)
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return DefaultJSONProvider.default(obj)
+
+
+class NumpyJSONProvider(DefaultJSONProvider):
+    """
+    直接序列化NumPy数据的JSON提供器（可用时基于orjson）
+    """
+
+    sort_keys = False
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.use_orjson = orjson is not None
+
+    @property
+    def precision(self):
+        """当前生效的精度：请求指定的精度 > 应用默认精度"""
+        if has_request_context() and 'json_precision' in g:
+            return g.json_precision
+        return self._app.extensions.get('json_precision')
+
+    def _prepare(self, obj, precision=None):
+        spec = precision if precision is not None else self.precision
+        return _round_tree(obj, spec) if spec else obj
+
+    def _orjson_options(self, sort_keys=False, indent=None):
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps_bytes(self, obj, **kwargs):
+        """
+        序列化为UTF-8字节（orjson路径无需经过str）
+
+        参数:
+            obj: 要序列化的对象
+            precision: 可选，parse_precision 的返回值，覆盖当前请求的精度
+        """
+        obj = self._prepare(obj, kwargs.pop('precision', None))
+        if self.use_orjson and not kwargs.get('cls'):
+            try:
+                return orjson.dumps(obj, default=_orjson_default,
+                                    option=self._orjson_options(kwargs.get('sort_keys', self.sort_keys),
+                                                                kwargs.get('indent')))
+            except TypeError as e:
+                # orjson 不支持的类型（如超出64位的整数），回退到标准库
+                logger.debug(f"orjson序列化失败，回退到标准库: {e}")
+        kwargs.setdefault('default', _default)
+        kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        return json.dumps(obj, **kwargs).encode('utf-8')
+
+    def dumps(self, obj, **kwargs):
+        return self.dumps_bytes(obj, **kwargs).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if self.use_orjson and not kwargs:
+            try:
+                return orjson.loads(s)
+            except orjson.JSONDecodeError:
+                # orjson 不接受 NaN/Infinity 字面量，交给标准库
+                pass
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = None
+        if self.compact is False or (self.compact is None and self._app.debug):
+            indent = 2
+        with stage('serialization'):
+            if indent:
+                body = self.dumps_bytes(obj, indent=indent) + b'\n'
+            else:
+                body = self.dumps_bytes(obj, separators=(',', ':'))
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def init_json(app):
+    """
+    为应用安装支持NumPy的JSON提供器（app.json）
+
+    参数:
+        app: Flask应用实例
+    """
+    for key, value in JSON_DEFAULTS.items():
+        app.config.setdefault(key, value)
+    app.extensions['json_precision'] = parse_precision(app.config['JSON_FLOAT_PRECISION'])
+    app.json = NumpyJSONProvider(app)
+    # Flask 3 不再读取 JSON_SORT_KEYS 配置，由提供器属性控制
+    app.json.sort_keys = bool(app.config.get('JSON_SORT_KEYS', False))
+
+    @app.before_request
+    def resolve_json_precision():
+        # 请求级精度：查询参数优先于请求体字段
+        value = request.args.get('precision')
+        if value is None and request.is_json:
+            body = request.get_json(silent=True)
+            if isinstance(body, dict):
+                value = body.get('precision')
+        if value is None:
+            return None
+        try:
+            g.json_precision = parse_precision(value)
+        except ValueError as e:
+            from .helpers import format_response
+            return jsonify(format_response(False, message=str(e))), 400
+        return None
+
+    logger.info(f"🧾 JSON序列化: {'orjson' if app.json.use_orjson else '标准库json'}"
+                f"（浮点精度: {app.config['JSON_FLOAT_PRECISION'] or '完整'}）")
+    return app.json
@@ -0,0 +1,166 @@
+"""
+重量级依赖的延迟导入与启动耗时报告
+
+matplotlib（字体缓存、rcParams初始化）、Pillow 与 scipy 子模块只在第一次使用时导入：
+只提供数据接口（/api/calculate_data 等）的worker不再为绘图付出启动开销。
+
+    ndimage = lazy_import('scipy.ndimage')
+    ndimage.gaussian_filter(...)        # 第一次访问属性时才真正导入
+
+每个延迟模块记录导入耗时与触发时刻；startup_report() 汇总应用启动耗时、
+已加载/未加载的重量级模块，并可调用 `python -X importtime` 对启动导入链做逐模块分解。
+"""
+
+import os
+import sys
+import time
+import logging
+import importlib
+import threading
+import subprocess
+
+logger = logging.getLogger(__name__)
+
+# 报告中关注的重量级顶层包
+HEAVY_PACKAGES = ('matplotlib', 'scipy', 'PIL')
+
+_modules = {}
+_lock = threading.Lock()
+_startup = {}
+_importtime_cache = {}
+
+
+class LazyModule:
+    """
+    模块代理，第一次访问属性时导入目标模块
+
+    参数:
+        name: 模块全名，如 'scipy.ndimage'
+        on_load: 导入后调用一次的回调 on_load(module)，用于设置全局配置
+    """
+
+    def __init__(self, name, on_load=None):
+        self._name = name
+        self._on_load = on_load
+        self._module = None
+        self.load_seconds = None
+        self.loaded_at = None
+
+    def _load(self):
+        with _lock:
+            if self._module is None:
+                already = self._name in sys.modules
+                start = time.perf_counter()
+                module = importlib.import_module(self._name)
+                if self._on_load is not None:
+                    self._on_load(module)
+                self.load_seconds = time.perf_counter() - start
+                self.loaded_at = time.time()
+                self._module = module
+                if not already:
+                    logger.info(f"📦 延迟导入 {self._name}，耗时 {self.load_seconds * 1000:.1f}ms")
+        return self._module
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+    def __getattr__(self, attr):
+        return getattr(self._module or self._load(), attr)
+
+    def __repr__(self):
+        state = 'loaded' if self.loaded else 'deferred'
+        return f"<LazyModule {self._name} ({state})>"
+
+
+def lazy_import(name, on_load=None):
+    """
+    返回模块的延迟代理（同名模块共用一个代理）
+
+    参数:
+        name: 模块全名
+        on_load: 导入后的回调（只在首次创建代理时生效）
+    返回:
+        LazyModule实例
+    """
+    with _lock:
+        module = _modules.get(name)
+        if module is None:
+            module = _modules[name] = LazyModule(name, on_load)
+    return module
+
+
+def optional_import(name):
+    """
+    导入可选依赖，未安装时返回None（首次调用时导入，结果由 sys.modules 缓存）
+    """
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
+
+
+def record_startup(stage, seconds):
+    """记录启动阶段耗时（秒），如 create_app"""
+    _startup[stage] = seconds
+
+
+def run_importtime(target='backend.app', timeout=60):
+    """
+    在子进程中以 `python -X importtime -c "import <target>"` 导入目标模块，解析逐模块耗时
+
+    参数:
+        target: 要导入的模块
+        timeout: 子进程超时（秒）
+    返回:
+        字典，包含 total_ms 与按累计耗时排序的 modules 列表
+        [{'module', 'self_ms', 'cumulative_ms', 'depth'}, ...]
+    """
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [root, os.environ.get('PYTHONPATH')])))
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {target}'],
+                               cwd=root, env=env, capture_output=True, text=True, timeout=timeout)
+    modules = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        except ValueError:
+            continue
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        modules.append({'module': name.strip(), 'self_ms': int(self_us) / 1000.0,
+                        'cumulative_ms': int(cumulative_us) / 1000.0, 'depth': depth})
+    top_level = [m for m in modules if m['depth'] == 0]
+    return {'target': target, 'returncode': completed.returncode,
+            'total_ms': sum(m['cumulative_ms'] for m in top_level),
+            'modules': sorted(modules, key=lambda m: m['cumulative_ms'], reverse=True)}
+
+
+def startup_report(importtime=False, limit=30, refresh=False):
+    """
+    启动耗时报告
+
+    参数:
+        importtime: 是否附带 -X importtime 分解（子进程执行，结果在进程内缓存）
+        limit: importtime 分解返回的模块数
+        refresh: 忽略缓存重新执行 importtime
+    返回:
+        字典：startup（各启动阶段耗时）、deferred（延迟模块的加载状态）、
+        heavy_loaded（已在本进程加载的重量级包）、importtime（可选）
+    """
+    deferred = {name: {'loaded': module.loaded, 'load_seconds': module.load_seconds, 'loaded_at': module.loaded_at}
+                for name, module in sorted(_modules.items())}
+    report = {
+        'pid': os.getpid(),
+        'startup': dict(_startup),
+        'deferred': deferred,
+        'heavy_loaded': {name: name in sys.modules for name in HEAVY_PACKAGES},
+        'module_count': len(sys.modules),
+    }
+    if importtime:
+        if refresh or 'result' not in _importtime_cache:
+            _importtime_cache['result'] = run_importtime()
+        result = _importtime_cache['result']
+        report['importtime'] = dict(result, modules=result['modules'][:limit])
+    return report
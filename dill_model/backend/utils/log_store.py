@@ -0,0 +1,410 @@
+"""
+计算日志的环形缓冲存储
+
+日志按插入顺序分配递增的序号（id），写满后自动淘汰最旧的条目。
+维度和子分类在插入时一次性推断，并按模型、日志类型、维度维护索引，
+/api/logs 轮询时只需遍历候选索引，不再对全部日志做小写化和关键字扫描；
+客户端带上 since=<上次的 last_id> 即可只取新增日志。
+
+环形缓冲只在单个进程内可见。每条日志同时带上计算ID（calc_id）写入
+本机共享的 SQLite（WAL模式）日志库，多个 gunicorn worker 写同一个文件，
+/api/logs?calc_id=<id> 无论落在哪个 worker 都能取回该次计算的完整日志。
+"""
+
+import os
+import re
+import time
+import uuid
+import logging
+import tempfile
+import threading
+from collections import deque
+
+from flask import g, request, has_request_context
+
+from .shared_sqlite import SharedSQLite
+
+logger = logging.getLogger(__name__)
+
+LOG_STORE_DEFAULTS = {
+    'LOG_DB_PATH': os.path.join(tempfile.gettempdir(), 'dill_logs.sqlite3'),
+    'LOG_RETENTION': 6 * 3600,        # 共享日志保留秒数
+    'LOG_PURGE_INTERVAL': 60,         # 两次过期清理之间的最小间隔（秒）
+    'LOG_MAX_QUERY': 1000,            # 单次按 calc_id 查询最多返回的条数
+}
+
+CALC_ID_HEADER = 'X-Calc-Id'
+
+_CALC_ID_PATTERN = re.compile(r'^[A-Za-z0-9_.:-]{1,64}$')
+
+# 与 /api/logs 原有的关键字匹配规则保持一致（消息小写后匹配）
+DIMENSION_KEYWORDS = {
+    '1d': ('1d', '一维'),
+    '2d': ('2d', '二维'),
+    '3d': ('3d', '三维'),
+}
+
+
+def _detect_dimensions(message):
+    """返回消息中出现的全部维度关键字集合"""
+    return frozenset(dim for dim, keywords in DIMENSION_KEYWORDS.items()
+                     if any(keyword in message for keyword in keywords))
+
+
+def _first_dimension(dims):
+    for dim in DIMENSION_KEYWORDS:
+        if dim in dims:
+            return dim
+    return 'unknown'
+
+
+def _compare_subcategory(model, message):
+    model = (model or '').lower()
+    if 'dill' in model and 'enhanced' not in model:
+        return 'dill'
+    if 'enhanced' in model or '厚胶' in message:
+        return 'enhanced_dill'
+    if 'car' in model:
+        return 'car'
+    return 'unknown'
+
+
+def classify_log(model_type, message):
+    """
+    推断日志的维度与比较页面子分类
+
+    参数:
+        model_type: 模型类型
+        message: 日志消息
+    返回:
+        (消息中出现的维度集合, 主维度, 比较页面子分类) 元组
+    """
+    lowered = (message or '').lower()
+    dims = _detect_dimensions(lowered)
+    return dims, _first_dimension(dims), _compare_subcategory(model_type, lowered)
+
+
+class LogStore:
+    """
+    线程安全的环形缓冲日志存储
+
+    参数:
+        maxlen: 最多保留的日志条数
+    """
+
+    def __init__(self, maxlen=1000):
+        self.maxlen = maxlen
+        self._lock = threading.Lock()
+        self._entries = deque()
+        self._indexes = {}
+        self._seq = 0
+
+    def _index_keys(self, record):
+        keys = [('model', record['model']), ('type', record['type'])]
+        keys.extend(('dim', dim) for dim in record['_dims'])
+        return keys
+
+    def append(self, log_type, model_type, message, timestamp, dimension=None, details=''):
+        """
+        追加一条日志
+
+        参数:
+            log_type: 'info', 'progress', 'success', 'warning', 'error'
+            model_type: 'dill', 'enhanced_dill', 'car', 'system'
+            message: 日志消息
+            timestamp: 时间字符串
+            dimension: 调用方给出的维度（原样保留）
+            details: 详细信息
+        返回:
+            日志序号
+        """
+        dims, detected_dimension, compare_subcategory = classify_log(model_type, message)
+        with self._lock:
+            self._seq += 1
+            record = {
+                'id': self._seq,
+                'timestamp': timestamp,
+                'type': log_type,
+                'model': model_type,
+                'message': message,
+                'dimension': dimension,
+                'details': details,
+                '_dims': dims,
+                '_detected_dimension': detected_dimension,
+                '_compare_subcategory': compare_subcategory,
+            }
+            self._entries.append(record)
+            for key in self._index_keys(record):
+                self._indexes.setdefault(key, deque()).append(record)
+            if len(self._entries) > self.maxlen:
+                self._evict()
+            return record['id']
+
+    def _evict(self):
+        oldest = self._entries.popleft()
+        for key in self._index_keys(oldest):
+            index = self._indexes[key]
+            # 索引按插入顺序排列，被淘汰的条目一定在队首
+            if index and index[0] is oldest:
+                index.popleft()
+            if not index:
+                del self._indexes[key]
+
+    def clear(self):
+        """清空日志（序号继续递增，已有的 since 游标仍然有效）"""
+        with self._lock:
+            self._entries.clear()
+            self._indexes.clear()
+
+    @property
+    def last_id(self):
+        return self._seq
+
+    def __len__(self):
+        return len(self._entries)
+
+    def query(self, model_type=None, dimension=None, log_type=None, since=None, limit=100):
+        """
+        按条件查询日志
+
+        参数:
+            model_type: 模型类型过滤
+            dimension: '1d'/'2d'/'3d' 维度过滤
+            log_type: 日志类型过滤
+            since: 只返回序号大于该值的日志
+            limit: 最多返回条数（<=0 表示不限）
+        返回:
+            (最新在前的日志列表, 统计字典)
+        """
+        keys = []
+        if model_type:
+            keys.append(('model', model_type))
+        if dimension:
+            keys.append(('dim', dimension))
+        if log_type:
+            keys.append(('type', log_type))
+
+        with self._lock:
+            if keys:
+                candidates = min((self._indexes.get(key, ()) for key in keys), key=len)
+            else:
+                candidates = self._entries
+
+            def matches(record):
+                return ((not model_type or record['model'] == model_type)
+                        and (not dimension or dimension in record['_dims'])
+                        and (not log_type or record['type'] == log_type))
+
+            stats = {'filtered_logs': 0, 'error_count': 0, 'warning_count': 0}
+            for record in candidates:
+                if matches(record):
+                    stats['filtered_logs'] += 1
+                    if record['type'] == 'error':
+                        stats['error_count'] += 1
+                    elif record['type'] == 'warning':
+                        stats['warning_count'] += 1
+
+            selected = []
+            # 从最新的条目向前遍历，遇到 since 游标即停止
+            for record in reversed(candidates):
+                if since is not None and record['id'] <= since:
+                    break
+                if matches(record):
+                    selected.append(record)
+                    if 0 < limit <= len(selected):
+                        break
+            stats['total_logs'] = len(self._entries)
+            stats['last_id'] = self._seq
+        return selected, stats
+
+
+class SharedLogStore:
+    """
+    多进程共享的 SQLite 日志库（按 calc_id 查询），同时记录跨worker的取消请求
+
+    参数:
+        path: 数据库文件路径
+        retention: 日志保留秒数
+        purge_interval: 过期清理的最小间隔（秒）
+    """
+
+    _SCHEMA = (
+        """CREATE TABLE IF NOT EXISTS logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            calc_id TEXT NOT NULL,
+            created REAL NOT NULL,
+            timestamp TEXT,
+            type TEXT,
+            model TEXT,
+            message TEXT,
+            dimension TEXT,
+            details TEXT,
+            detected_dimension TEXT,
+            compare_subcategory TEXT
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_logs_calc ON logs (calc_id, created)",
+        "CREATE INDEX IF NOT EXISTS idx_logs_created ON logs (created)",
+        # 跨worker的取消请求（/api/jobs/<calc_id>/cancel）
+        "CREATE TABLE IF NOT EXISTS cancellations (calc_id TEXT PRIMARY KEY, created REAL NOT NULL)",
+    )
+
+    def __init__(self, path, retention=6 * 3600, purge_interval=60):
+        self.path = path
+        self.retention = retention
+        self.purge_interval = purge_interval
+        self._last_purge = 0.0
+        self._db = SharedSQLite(path, self._SCHEMA)
+
+    def _connection(self):
+        return self._db.connection()
+
+    def append(self, calc_id, log_type, model_type, message, timestamp, dimension=None, details=''):
+        """
+        写入一条日志
+
+        参数:
+            calc_id: 计算ID
+            其余参数同 LogStore.append
+        返回:
+            日志在共享库中的ID
+        """
+        _, detected_dimension, compare_subcategory = classify_log(model_type, message)
+        now = time.time()
+        conn = self._connection()
+        cursor = conn.execute(
+            "INSERT INTO logs (calc_id, created, timestamp, type, model, message, dimension, details,"
+            " detected_dimension, compare_subcategory) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (calc_id, now, timestamp, log_type, model_type, message, dimension, details,
+             detected_dimension, compare_subcategory))
+        if now - self._last_purge > self.purge_interval:
+            self.purge(now)
+        return cursor.lastrowid
+
+    def purge(self, now=None):
+        """删除超过保留时间的日志"""
+        now = time.time() if now is None else now
+        self._last_purge = now
+        conn = self._connection()
+        conn.execute("DELETE FROM logs WHERE created < ?", (now - self.retention,))
+        conn.execute("DELETE FROM cancellations WHERE created < ?", (now - self.retention,))
+
+    def request_cancel(self, calc_id):
+        """记录取消请求，运行该计算的worker会在下一个检查点看到"""
+        self._connection().execute(
+            "INSERT OR REPLACE INTO cancellations (calc_id, created) VALUES (?, ?)", (calc_id, time.time()))
+
+    def cancel_requested(self, calc_id, since):
+        """
+        是否存在该计算在 since（时间戳）之后发出的取消请求
+
+        calc_id 可由客户端指定并被复用，早于本次计算开始的取消请求不计入
+        """
+        row = self._connection().execute(
+            "SELECT 1 FROM cancellations WHERE calc_id = ? AND created >= ?", (calc_id, since)).fetchone()
+        return row is not None
+
+    def clear_cancel(self, calc_id, since):
+        """删除该计算在 since 之后发出的取消请求（任务结束时调用）"""
+        self._connection().execute(
+            "DELETE FROM cancellations WHERE calc_id = ? AND created >= ?", (calc_id, since))
+
+    def query(self, calc_id, log_type=None, since=None, limit=100):
+        """
+        查询某次计算的日志
+
+        参数:
+            calc_id: 计算ID
+            log_type: 日志类型过滤
+            since: 只返回ID大于该值的日志
+            limit: 最多返回条数
+        返回:
+            (最新在前的日志列表, 统计字典)，日志字段与 LogStore.query 一致
+        """
+        conditions, params = ["calc_id = ?"], [calc_id]
+        if log_type:
+            conditions.append("type = ?")
+            params.append(log_type)
+        where = ' AND '.join(conditions)
+        conn = self._connection()
+        rows = conn.execute(
+            f"SELECT * FROM logs WHERE {where} AND id > ? ORDER BY id DESC LIMIT ?",
+            params + [since or 0, limit]).fetchall()
+        counts = conn.execute(
+            f"SELECT COUNT(*), SUM(type = 'error'), SUM(type = 'warning'), MAX(id) FROM logs WHERE {where}",
+            params).fetchone()
+        total = conn.execute("SELECT COUNT(*) FROM logs WHERE calc_id = ?", (calc_id,)).fetchone()[0]
+        records = [{
+            'id': row['id'],
+            'timestamp': row['timestamp'],
+            'type': row['type'],
+            'model': row['model'],
+            'message': row['message'],
+            'dimension': row['dimension'],
+            'details': row['details'],
+            '_detected_dimension': row['detected_dimension'],
+            '_compare_subcategory': row['compare_subcategory'],
+        } for row in rows]
+        stats = {
+            'filtered_logs': counts[0],
+            'error_count': counts[1] or 0,
+            'warning_count': counts[2] or 0,
+            'total_logs': total,
+            'last_id': max([counts[3] or 0] + [since or 0]),
+            'calc_id': calc_id,
+        }
+        return records, stats
+
+
+def current_calc_id():
+    """
+    返回当前请求的计算ID，不在请求上下文中时返回None
+    """
+    if has_request_context():
+        return getattr(g, 'calc_id', None)
+    return None
+
+
+def _assign_calc_id():
+    # 优先使用客户端给出的ID（请求头或请求体），否则生成新ID
+    calc_id = request.headers.get(CALC_ID_HEADER)
+    if not calc_id and request.method == 'POST' and request.is_json:
+        body = request.get_json(silent=True)
+        if isinstance(body, dict):
+            calc_id = body.get('calc_id')
+    # 只有服务端生成的ID不可猜测，可用于 /api/jobs/<calc_id>/cancel
+    g.calc_id_generated = not isinstance(calc_id, str) or not _CALC_ID_PATTERN.match(calc_id)
+    if g.calc_id_generated:
+        calc_id = uuid.uuid4().hex
+    g.calc_id = calc_id
+
+
+def _expose_calc_id(response):
+    calc_id = getattr(g, 'calc_id', None)
+    if calc_id:
+        response.headers[CALC_ID_HEADER] = calc_id
+    return response
+
+
+def init_log_store(app):
+    """
+    为应用创建共享日志库，保存在 app.extensions['shared_log_store']，
+    并为每个API请求分配计算ID（g.calc_id，响应头 X-Calc-Id）
+
+    参数:
+        app: Flask应用实例
+    """
+    for key, value in LOG_STORE_DEFAULTS.items():
+        app.config.setdefault(key, value)
+    store = SharedLogStore(app.config['LOG_DB_PATH'],
+                           retention=app.config['LOG_RETENTION'],
+                           purge_interval=app.config['LOG_PURGE_INTERVAL'])
+    app.extensions['shared_log_store'] = store
+
+    @app.before_request
+    def assign_calc_id():
+        if request.path.startswith('/api/'):
+            _assign_calc_id()
+
+    app.after_request(_expose_calc_id)
+    logger.info(f"📝 共享日志库: {store.path}")
+    return store
@@ -0,0 +1,474 @@
+"""
+Prometheus 文本格式的运行指标
+
+    GET /api/metrics    汇总本机全部 worker 的指标（Prometheus exposition format 0.0.4）
+
+请求路径上只做两次直方图记录（耗时、响应体大小），标签取自请求JSON中的 model_type、
+sine_type 与 enable_4d_animation；缓存命中、准入队列、进程内存等状态在导出时才读取。
+
+gunicorn 的每个 worker 各自计数，并每隔 METRICS_FLUSH_INTERVAL 秒把快照写入
+METRICS_DIR/<pid>.json；导出时合并所有存活 worker 的快照：计数器与直方图求和，
+按进程区分的量（内存、排队数）带 pid 标签。退出的 worker 的快照在导出时删除，
+其计数随之消失，Prometheus 的 rate() 会把这种下降当作计数器重置处理。
+"""
+
+import os
+import json
+import time
+import bisect
+import logging
+import tempfile
+import threading
+
+from flask import g, request
+
+logger = logging.getLogger(__name__)
+
+METRICS_DEFAULTS = {
+    'METRICS_ENABLED': True,
+    'METRICS_DIR': os.path.join(tempfile.gettempdir(), 'dill_metrics'),   # worker快照目录，None 表示只导出本进程
+    'METRICS_FLUSH_INTERVAL': 1.0,        # worker快照的最短写入间隔（秒）
+}
+
+# 请求耗时分桶（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+# 响应体大小分桶（字节）
+SIZE_BUCKETS = (1e3, 1e4, 1e5, 3e5, 1e6, 3e6, 1e7, 3e7, 1e8)
+
+# 标签取值限定在已知集合内，避免任意请求参数撑大时间序列数
+_MODEL_TYPES = ('dill', 'enhanced_dill', 'car')
+_SINE_TYPES = ('1d', 'multi', '2d', '3d')
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), merge='sum'):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # 多进程合并方式：sum 求和；pid 按进程分别导出（加 pid 标签）；local 只取导出进程的值
+        self.merge = merge
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def samples(self):
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+    def describe(self):
+        return {'kind': self.kind, 'help': self.documentation, 'labelnames': list(self.labelnames),
+                'merge': self.merge}
+
+
+class Counter(_Metric):
+    """单调递增计数器"""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set_total(self, value, **labels):
+        """同步由其他对象维护的累计值（如缓存的命中数）"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Gauge(_Metric):
+    """可增可减的瞬时值"""
+
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """分桶直方图（桶内计数非累计存储，导出时累计）"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(float(b) for b in buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self):
+        with self._lock:
+            return [[list(key), [list(counts), total, count]] for key, (counts, total, count) in self._values.items()]
+
+    def describe(self):
+        return dict(super().describe(), buckets=list(self.buckets))
+
+
+class MetricsRegistry:
+    """
+    进程内的指标集合
+
+    collectors 中的函数在生成快照前调用，用于读取缓存、队列等状态。
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+        self._last_flush = 0.0
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, documentation, labelnames=(), merge='sum'):
+        return self._register(Counter(name, documentation, labelnames, merge))
+
+    def gauge(self, name, documentation, labelnames=(), merge='pid'):
+        return self._register(Gauge(name, documentation, labelnames, merge))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector):
+        self._collectors.append(collector)
+
+    def snapshot(self, collect=True):
+        """
+        当前进程的指标快照（可JSON序列化）
+        """
+        if collect:
+            for collector in self._collectors:
+                try:
+                    collector()
+                except Exception as e:
+                    logger.debug(f"指标采集失败: {e}")
+        return {'pid': os.getpid(), 'time': time.time(),
+                'metrics': {name: dict(metric.describe(), samples=metric.samples())
+                            for name, metric in list(self._metrics.items())}}
+
+    def flush(self, directory, interval=0.0, collect=True):
+        """
+        把快照写入 directory/<pid>.json（距上次写入不足 interval 秒时跳过）
+        """
+        now = time.monotonic()
+        if not directory or now - self._last_flush < interval:
+            return False
+        self._last_flush = now
+        snapshot = self.snapshot(collect)
+        path = os.path.join(directory, f"{os.getpid()}.json")
+        temp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(directory, exist_ok=True)
+            with open(temp, 'w') as f:
+                json.dump(snapshot, f)
+            os.replace(temp, path)
+        except OSError as e:
+            logger.debug(f"写入指标快照失败: {e}")
+            return False
+        return True
+
+
+# 进程级指标集合，模型等无应用上下文的代码也可直接记录
+registry = MetricsRegistry()
+
+REQUEST_LATENCY = registry.histogram(
+    'dill_request_duration_seconds', '请求耗时（流式响应计到发送结束）',
+    ('endpoint', 'model_type', 'sine_type', 'animation'), LATENCY_BUCKETS)
+RESPONSE_SIZE = registry.histogram(
+    'dill_response_size_bytes', '响应体大小（压缩前，不含流式响应）',
+    ('endpoint', 'model_type', 'sine_type', 'animation'), SIZE_BUCKETS)
+REQUESTS = registry.counter('dill_requests_total', '请求数', ('endpoint', 'method', 'status'))
+SOLVER_STEPS = registry.counter('dill_solver_steps_total', 'PDE求解推进的时间步数', ('model_type', 'solver'))
+SOLVER_CELLS = registry.counter('dill_solver_cells_total', 'PDE求解计算的网格单元数（z×t×位置）', ('model_type', 'solver'))
+CACHE_HITS = registry.counter('dill_cache_hits_total', '缓存命中次数', ('cache',))
+CACHE_MISSES = registry.counter('dill_cache_misses_total', '缓存未命中次数', ('cache',))
+RESIDENT_MEMORY = registry.gauge('dill_process_resident_memory_bytes', 'worker常驻内存（RSS）')
+ADMISSION_WAITING = registry.gauge('dill_admission_waiting', '正在排队等待计算额度的请求数')
+POOL_PENDING = registry.gauge('dill_compute_pool_pending_tasks', '计算进程池中未完成的任务数', ('pool',))
+ADMISSION_IN_FLIGHT = registry.gauge('dill_admission_in_flight', '本机在途的计算请求数（全部worker）', merge='local')
+ADMISSION_IN_FLIGHT_COST = registry.gauge('dill_admission_in_flight_seconds', '本机在途请求的预计秒数之和',
+                                          merge='local')
+
+
+def record_solver_work(model_type, solver, steps, cells):
+    """
+    记录一次PDE求解的时间步数与网格单元数（热路径：两次计数器加法）
+    """
+    SOLVER_STEPS.inc(steps, model_type=model_type, solver=solver)
+    SOLVER_CELLS.inc(cells, model_type=model_type, solver=solver)
+
+
+def solver_work_totals():
+    """返回本进程累计的求解步数/单元数 {(model_type, solver): [steps, cells]}（供计算进程回传）"""
+    totals = {}
+    for key, value in SOLVER_STEPS.samples():
+        totals.setdefault(tuple(key), [0, 0])[0] = value
+    for key, value in SOLVER_CELLS.samples():
+        totals.setdefault(tuple(key), [0, 0])[1] = value
+    return totals
+
+
+def merge_solver_work(before, after):
+    """把计算进程中新增的求解步数/单元数记入本进程"""
+    for key, (steps, cells) in after.items():
+        base = before.get(key, (0, 0))
+        if steps - base[0] or cells - base[1]:
+            record_solver_work(key[0], key[1], steps - base[0], cells - base[1])
+
+
+def _resident_memory():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        import resource
+        # 非Linux平台只能取峰值RSS（macOS单位为字节，其他为KB）
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == 'Darwin' else peak * 1024
+
+
+def _pid_alive(pid):
+    from .admission import _pid_alive as alive
+    return alive(pid)
+
+
+def _request_labels():
+    data = request.get_json(silent=True) if request.is_json else None
+    data = data if isinstance(data, dict) else {}
+    model_type = data.get('model_type')
+    sine_type = data.get('sine_type')
+    animation = data.get('enable_4d_animation')
+    return {
+        'endpoint': (request.endpoint or 'other').replace('api.', ''),
+        'model_type': model_type if model_type in _MODEL_TYPES else ('none' if model_type is None else 'other'),
+        'sine_type': sine_type if sine_type in _SINE_TYPES else ('none' if sine_type is None else 'other'),
+        'animation': 'true' if animation in (True, 'true', 1) else 'false',
+    }
+
+
+# ---------------------------------------------------------------- 导出
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in list(zip(names, values)) + list(extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def merge_snapshots(snapshots, local_pid=None):
+    """
+    合并多个进程的快照
+
+    参数:
+        snapshots: 快照列表
+        local_pid: 导出进程的pid（merge='local' 的指标只取该进程的值）
+    返回:
+        {name: {'kind', 'help', 'labelnames', 'buckets', 'values': {labels: value}}}
+    """
+    merged = {}
+    for snapshot in snapshots:
+        pid = snapshot['pid']
+        for name, metric in snapshot['metrics'].items():
+            if metric['merge'] == 'local' and pid != local_pid:
+                continue
+            target = merged.setdefault(name, {
+                'kind': metric['kind'], 'help': metric['help'], 'buckets': metric.get('buckets'),
+                'labelnames': metric['labelnames'] + (['pid'] if metric['merge'] == 'pid' else []),
+                'values': {}})
+            for labels, value in metric['samples']:
+                key = tuple(labels) + ((str(pid),) if metric['merge'] == 'pid' else ())
+                if metric['kind'] == 'histogram':
+                    current = target['values'].get(key)
+                    if current is None:
+                        target['values'][key] = [list(value[0]), value[1], value[2]]
+                    else:
+                        current[0] = [a + b for a, b in zip(current[0], value[0])]
+                        current[1] += value[1]
+                        current[2] += value[2]
+                elif metric['merge'] == 'sum':
+                    target['values'][key] = target['values'].get(key, 0) + value
+                else:
+                    target['values'][key] = value
+    return merged
+
+
+def render_text(merged):
+    """
+    按 Prometheus 文本格式输出合并后的指标；附带由命中/未命中计数导出的 dill_cache_hit_ratio
+    """
+    hits = merged.get('dill_cache_hits_total', {}).get('values', {})
+    misses = merged.get('dill_cache_misses_total', {}).get('values', {})
+    ratios = {}
+    for key in set(hits) | set(misses):
+        total = hits.get(key, 0) + misses.get(key, 0)
+        if total:
+            ratios[key] = hits.get(key, 0) / total
+    if ratios:
+        merged = dict(merged, dill_cache_hit_ratio={'kind': 'gauge', 'help': '缓存命中率（命中/(命中+未命中)）',
+                                                    'labelnames': ['cache'], 'buckets': None, 'values': ratios})
+
+    lines = []
+    for name in sorted(merged):
+        metric = merged[name]
+        if not metric['values']:
+            continue
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['kind']}")
+        names = metric['labelnames']
+        for key in sorted(metric['values']):
+            value = metric['values'][key]
+            if metric['kind'] == 'histogram':
+                counts, total, count = value
+                cumulative = 0
+                for bound, bucket_count in zip(list(metric['buckets']) + [float('inf')], counts):
+                    cumulative += bucket_count
+                    lines.append(f"{name}_bucket{_labels(names, key, [('le', _format_value(float(bound)))])} {cumulative}")
+                lines.append(f"{name}_sum{_labels(names, key)} {_format_value(float(total))}")
+                lines.append(f"{name}_count{_labels(names, key)} {count}")
+            else:
+                lines.append(f"{name}{_labels(names, key)} {_format_value(value)}")
+    return '\n'.join(lines) + '\n'
+
+
+def collect_all(app):
+    """
+    合并本机全部 worker 的指标（先写入本进程的最新快照）
+
+    参数:
+        app: Flask应用实例
+    返回:
+        Prometheus 文本
+    """
+    directory = app.config['METRICS_DIR']
+    local = registry.snapshot()
+    snapshots = [local]
+    if directory:
+        registry.flush(directory, collect=False)
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            names = []
+        for filename in names:
+            if not filename.endswith('.json'):
+                continue
+            try:
+                pid = int(filename[:-5])
+            except ValueError:
+                continue
+            if pid == local['pid']:
+                continue
+            path = os.path.join(directory, filename)
+            if not _pid_alive(pid):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+    return render_text(merge_snapshots(snapshots, local_pid=local['pid']))
+
+
+def _collector(app):
+    """导出时读取各子系统的状态"""
+    def collect():
+        RESIDENT_MEMORY.set(_resident_memory())
+        cache = app.extensions.get('compare_cache')
+        if cache is not None:
+            stats = cache.stats()
+            CACHE_HITS.set_total(stats['hits'], cache='compare')
+            CACHE_MISSES.set_total(stats['misses'], cache='compare')
+        model_registry = app.extensions.get('model_registry')
+        if model_registry is not None:
+            stats = model_registry.stats()
+            CACHE_HITS.set_total(stats['phase_cache']['hits'], cache='phase_expression')
+            CACHE_MISSES.set_total(stats['phase_cache']['misses'], cache='phase_expression')
+            models = stats['models'].values()
+            CACHE_HITS.set_total(sum(m['hits'] for m in models), cache='model_instance')
+            CACHE_MISSES.set_total(sum(m['builds'] for m in models), cache='model_instance')
+        admission = app.extensions.get('admission')
+        if admission is not None:
+            ADMISSION_WAITING.set(admission.waiting)
+            if app.config.get('ADMISSION_ENABLED'):
+                count, cost = admission.in_flight()
+                ADMISSION_IN_FLIGHT.set(count)
+                ADMISSION_IN_FLIGHT_COST.set(cost)
+        for pool_name in ('compute_pool', 'render_pool'):
+            pool = app.extensions.get(pool_name)
+            if pool is not None:
+                POOL_PENDING.set(pool.pending, pool=pool_name.replace('_pool', ''))
+    return collect
+
+
+def init_metrics(app):
+    """
+    为应用注册指标采集钩子
+
+    参数:
+        app: Flask应用实例
+    """
+    for key, value in METRICS_DEFAULTS.items():
+        app.config.setdefault(key, value)
+    app.extensions['metrics'] = registry
+    if not app.config['METRICS_ENABLED']:
+        return registry
+    registry.add_collector(_collector(app))
+    directory = app.config['METRICS_DIR']
+    interval = app.config['METRICS_FLUSH_INTERVAL']
+
+    @app.before_request
+    def start_metrics_timer():
+        if request.path.startswith('/api/'):
+            g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def observe_request(response):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return response
+        labels = _request_labels()
+        REQUESTS.inc(endpoint=labels['endpoint'], method=request.method, status=response.status_code)
+        if response.is_streamed:
+            def on_close():
+                REQUEST_LATENCY.observe(time.perf_counter() - started, **labels)
+            response.call_on_close(on_close)
+        else:
+            REQUEST_LATENCY.observe(time.perf_counter() - started, **labels)
+            RESPONSE_SIZE.observe(response.calculate_content_length() or 0, **labels)
+        registry.flush(directory, interval)
+        return response
+
+    logger.info(f"📈 运行指标: /api/metrics（worker快照目录: {directory or '不共享'}）")
+    return registry
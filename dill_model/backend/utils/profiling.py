@@ -0,0 +1,309 @@
+"""
+按需剖析单个计算请求
+
+计算接口带 `?profile=cprofile` 或 `?profile=sampling` 时（需管理权限，见 utils/admin.py），
+本次请求在剖析器下执行：
+    - cprofile: cProfile 记录全部函数调用，返回按累计耗时排序的前N个函数，
+      完整统计可下载为 .pstats（snakeviz / pstats 可直接打开）
+    - sampling: 后台线程按固定间隔对请求线程采样调用栈，开销低、不改变计时，
+      返回采样最多的前N个函数，并生成折叠栈文本（flamegraph.pl / speedscope 可直接打开）
+剖析结果存入进程内有界存储（GET /api/admin/profiles），摘要附在JSON响应的 "profile" 字段中。
+未带 profile 参数的请求只多一次查询参数读取。
+"""
+
+import sys
+import time
+import uuid
+import marshal
+import cProfile
+import logging
+import functools
+import threading
+from collections import Counter, OrderedDict
+
+from flask import current_app, jsonify, request
+
+logger = logging.getLogger(__name__)
+
+PROFILING_DEFAULTS = {
+    'PROFILE_TOP_N': 30,                # 响应中返回的热点函数个数（?profile_top= 可覆盖）
+    'PROFILE_SAMPLE_INTERVAL': 0.002,   # 采样剖析的采样间隔（秒）
+    'PROFILE_STORE_SIZE': 20,           # 进程内保留的剖析结果个数
+}
+
+PROFILE_MODES = ('cprofile', 'sampling')
+
+# cProfile 同一时刻只能剖析一个请求（Python 3.12 起全局只允许一个剖析工具）
+_cprofile_lock = threading.Lock()
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    module = frame.f_globals.get('__name__', '?')
+    return f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+class SamplingProfiler:
+    """
+    栈采样剖析器：后台线程周期性读取目标线程的当前调用栈
+
+    参数:
+        interval: 采样间隔（秒）
+        thread_id: 目标线程ID，默认为创建剖析器的线程
+        root: 采样时截止的栈帧（不含），默认为调用 start() 的栈帧，
+              使折叠栈从被剖析的函数开始而不是从WSGI服务器开始
+    """
+
+    def __init__(self, interval=0.002, thread_id=None, root=None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.root = root
+        self.stacks = Counter()
+        self.samples = 0
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+        self._started = None
+
+    def start(self):
+        if self.root is None:
+            self.root = sys._getframe(1)
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='dill-sampling-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self._started
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = sample_stack(frame, self.root)
+            if stack:
+                self.stacks[stack] += 1
+                self.samples += 1
+
+    def collapsed(self):
+        """
+        返回折叠栈文本，每行 "根;...;叶 采样数"
+        """
+        return collapsed_stacks(self.stacks)
+
+    def top(self, limit=30):
+        """
+        返回采样最多的函数，见 top_functions()
+        """
+        return top_functions(self.stacks, self.samples, limit)
+
+
+def sample_stack(frame, root=None):
+    """
+    读取一个调用栈
+
+    参数:
+        frame: 栈顶帧（sys._current_frames() 中的值），None 时返回空元组
+        root: 截止的栈帧（不含），None 表示读到线程的最外层
+    返回:
+        从根到叶的函数标签元组
+    """
+    stack = []
+    while frame is not None and frame is not root:
+        stack.append(_frame_label(frame))
+        frame = frame.f_back
+    return tuple(reversed(stack))
+
+
+def collapsed_stacks(stacks):
+    """
+    把 {栈: 采样数} 转为折叠栈文本，每行 "根;...;叶 采样数"
+    """
+    return '\n'.join(f"{';'.join(stack)} {count}" for stack, count in stacks.most_common()) + '\n'
+
+
+def top_functions(stacks, samples, limit=30):
+    """
+    返回采样最多的函数
+
+    参数:
+        stacks: {栈: 采样数} 的 Counter
+        samples: 采样总数
+        limit: 返回的函数个数
+    返回:
+        [{'function', 'self_samples', 'total_samples', 'self_percent', 'total_percent'}, ...]，
+        按 total_samples 降序；self 为位于栈顶的采样数，total 为出现在栈中的采样数
+    """
+    own, total = Counter(), Counter()
+    for stack, count in stacks.items():
+        own[stack[-1]] += count
+        for label in set(stack):
+            total[label] += count
+    samples = max(samples, 1)
+    return [{'function': label, 'self_samples': own[label], 'total_samples': count,
+             'self_percent': round(own[label] * 100.0 / samples, 2),
+             'total_percent': round(count * 100.0 / samples, 2)}
+            for label, count in total.most_common(limit)]
+
+
+def cprofile_top(stats, limit=30):
+    """
+    返回 cProfile 统计中累计耗时最多的函数
+
+    参数:
+        stats: cProfile.Profile.create_stats() 之后的 profiler.stats
+        limit: 返回的函数个数
+    返回:
+        [{'function', 'calls', 'primitive_calls', 'tottime', 'cumtime'}, ...]
+    """
+    rows = []
+    for (filename, line, name), (primitive, calls, tottime, cumtime, _) in stats.items():
+        rows.append({'function': f"{filename}:{line}({name})", 'calls': calls, 'primitive_calls': primitive,
+                     'tottime': round(tottime, 6), 'cumtime': round(cumtime, 6)})
+    rows.sort(key=lambda row: row['cumtime'], reverse=True)
+    return rows[:limit]
+
+
+class ProfileStore:
+    """
+    进程内有界的剖析结果存储（超出容量时淘汰最早的结果）
+
+    参数:
+        maxsize: 最多保留的结果个数
+    """
+
+    def __init__(self, maxsize=20):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._profiles = OrderedDict()
+
+    def put(self, profile):
+        with self._lock:
+            self._profiles[profile['id']] = profile
+            while len(self._profiles) > self.maxsize:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id):
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def list(self):
+        """返回各结果的摘要（不含热点列表与原始数据），最新的在前"""
+        with self._lock:
+            profiles = list(self._profiles.values())
+        return [{key: value for key, value in profile.items() if key not in ('top', 'artifact')}
+                for profile in reversed(profiles)]
+
+
+def _run_profiled(mode, view, args, kwargs, interval, limit):
+    """在剖析器下执行视图，返回 (视图返回值, 剖析结果)"""
+    start = time.perf_counter()
+    if mode == 'cprofile':
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            rv = view(*args, **kwargs)
+        finally:
+            profiler.disable()
+        duration = time.perf_counter() - start
+        profiler.create_stats()
+        top = cprofile_top(profiler.stats, limit)
+        # 与 Profile.dump_stats 写出的格式相同
+        artifact = marshal.dumps(profiler.stats)
+        extra = {'functions': len(profiler.stats)}
+    else:
+        profiler = SamplingProfiler(interval=interval, root=sys._getframe()).start()
+        try:
+            rv = view(*args, **kwargs)
+        finally:
+            profiler.stop()
+        duration = profiler.duration
+        top = profiler.top(limit)
+        artifact = profiler.collapsed().encode('utf-8')
+        extra = {'samples': profiler.samples, 'interval': interval}
+    profile = {
+        'id': uuid.uuid4().hex[:12],
+        'mode': mode,
+        'endpoint': request.endpoint,
+        'path': request.path,
+        'created_at': time.time(),
+        'duration': round(duration, 6),
+        'top': top,
+        'artifact': artifact,
+        **extra,
+    }
+    return rv, profile
+
+
+def _profile_summary(profile):
+    suffix = 'pstats' if profile['mode'] == 'cprofile' else 'collapsed'
+    summary = {key: value for key, value in profile.items() if key != 'artifact'}
+    summary['download'] = f"/api/admin/profiles/{profile['id']}/{suffix}"
+    return summary
+
+
+def profilable(view):
+    """
+    计算接口装饰器：带 ?profile=cprofile|sampling 时在剖析器下执行本次请求
+
+    需要管理权限（否则403）；剖析模式不合法时返回400，已有请求在进行cProfile剖析时返回409。
+    剖析结果存入 app.extensions['profile_store']，JSON响应附带 "profile" 摘要，
+    响应头 X-Profile-Id 给出结果ID。
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        mode = request.args.get('profile')
+        if not mode:
+            return view(*args, **kwargs)
+
+        from .admin import is_admin_request
+        from .helpers import format_response
+        if not is_admin_request():
+            return jsonify(format_response(False, message="剖析请求需要管理权限")), 403
+        mode = mode.lower()
+        if mode not in PROFILE_MODES:
+            return jsonify(format_response(False, message=f"profile 只能是 {' / '.join(PROFILE_MODES)}")), 400
+        config = current_app.config
+        try:
+            limit = max(1, int(request.args.get('profile_top', config['PROFILE_TOP_N'])))
+        except ValueError:
+            return jsonify(format_response(False, message="profile_top必须是正整数")), 400
+
+        if mode == 'cprofile' and not _cprofile_lock.acquire(blocking=False):
+            return jsonify(format_response(False, message="已有请求正在进行cProfile剖析，请稍后重试")), 409
+        try:
+            rv, profile = _run_profiled(mode, view, args, kwargs, config['PROFILE_SAMPLE_INTERVAL'], limit)
+        finally:
+            if mode == 'cprofile':
+                _cprofile_lock.release()
+
+        app = current_app._get_current_object()
+        app.extensions['profile_store'].put(profile)
+        logger.info(f"🔬 {mode} 剖析 {request.path}: {profile['duration']:.3f}s，结果ID {profile['id']}")
+
+        response = app.make_response(rv)
+        response.headers['X-Profile-Id'] = profile['id']
+        if response.is_json and not response.is_streamed:
+            body = app.json.loads(response.get_data())
+            if isinstance(body, dict):
+                body['profile'] = _profile_summary(profile)
+                response.set_data(app.json.dumps_bytes(body, separators=(',', ':')))
+        return response
+    return wrapper
+
+
+def init_profiling(app):
+    """
+    为应用创建剖析结果存储，保存在 app.extensions['profile_store']
+
+    参数:
+        app: Flask应用实例
+    """
+    for key, value in PROFILING_DEFAULTS.items():
+        app.config.setdefault(key, value)
+    store = ProfileStore(app.config['PROFILE_STORE_SIZE'])
+    app.extensions['profile_store'] = store
+    return store
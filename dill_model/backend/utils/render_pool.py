@@ -0,0 +1,67 @@
+"""
+图像渲染进程池
+
+matplotlib 光栅化与PNG编码在绘制期间一直持有GIL，run.py 的 threaded=True
+服务器中所有请求的绘图因此串行执行，也会拖慢同一进程中不绘图的请求。
+渲染进程池把绘图描述（spec，数组压缩为float32）交给独立的渲染进程，返回编码后的图像字节：
+    - 同一请求的多张图在不同渲染进程中并行绘制
+    - 等待期间请求线程不持有GIL，并在检查点响应取消/超时
+    - 渲染进程使用 spawn 启动（不继承父进程的线程与锁），create_app 时即开始启动并预热；
+      进程池损坏或无法启动时暂时回退为在当前线程绘制，之后重试
+"""
+
+import numpy as np
+
+from .compute_pool import ComputePool, cpus_per_worker
+from .rendering import render_encoded, line_spec
+
+RENDER_POOL_DEFAULTS = {
+    'PLOT_RENDER_PROCESSES': min(4, cpus_per_worker()),     # 渲染进程数，0 表示在请求线程中绘制
+    'PLOT_RENDER_TIMEOUT': 30,                              # 单个请求等待绘图的最长秒数
+}
+
+
+def _compact(value):
+    # 浮点数组转为连续的float32，减少进程间传输量（绘图精度足够）
+    if isinstance(value, np.ndarray) and value.dtype.kind == 'f':
+        return np.ascontiguousarray(value, dtype=np.float32)
+    if isinstance(value, dict):
+        return {key: _compact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(_compact(item) for item in value)
+    return value
+
+
+def _warm_up():
+    """渲染进程启动时预先加载字体并完成一次绘制"""
+    x = np.linspace(0, 1, 10)
+    render_encoded(line_spec([(x, x, 'b-', {})], 'warm-up', 'x', 'y'), 'png', 50,
+                   {'PLOT_PNG_COMPRESS_LEVEL': 1, 'PLOT_WEBP_QUALITY': 85, 'PLOT_WEBP_METHOD': 0})
+
+
+class RenderPool(ComputePool):
+    """
+    渲染进程池
+
+    参数:
+        processes: 渲染进程数，0 表示不启用
+        timeout: 单次 render 等待的最长秒数
+    """
+
+    def __init__(self, processes, timeout=30):
+        super().__init__(processes, timeout=timeout, initializer=_warm_up, name='渲染')
+
+    def render(self, specs, fmt, dpi, options):
+        """
+        并行绘制一组图
+
+        参数:
+            specs: 绘图描述列表
+            fmt/dpi/options: 输出格式、分辨率与编码参数
+        返回:
+            与 specs 顺序一致的图像字节列表
+        异常:
+            CalculationCancelled: 等待期间请求被取消或超时
+            TimeoutError: 超过 timeout 秒仍未绘制完成
+        """
+        return self.map(render_encoded, [(_compact(spec), fmt, dpi, options) for spec in specs])
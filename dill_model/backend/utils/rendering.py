@@ -0,0 +1,397 @@
+"""
+图像渲染子系统
+
+/api/calculate 与 /api/compare 的图像不再经由 pyplot 全局状态逐张新建：
+    - 每个线程按版式（图类型、切片数、尺寸、dpi）复用预先创建的 Figure /
+      FigureCanvasAgg 及其中的坐标轴、图像和色条，绘制时只替换数据，
+      全程使用面向对象接口，线程之间互不干扰
+    - 图像由可序列化的绘图描述（spec）生成：折线图、热图、多切片热图，
+      三维结果用 imshow 切片热图代替逐层叠加的三维表面
+    - 固定边距代替 tight_layout，光栅化后由 Pillow 编码为
+      png / png8（调色板PNG） / webp，未安装 Pillow 时回退为 matplotlib 的PNG输出
+    - matplotlib 与 Pillow 在首次绘图时才导入（见 lazy_import.py），只提供数据接口的进程不加载
+
+输出格式按 请求参数 plot_format > app.config['PLOT_FORMAT'] 的顺序确定。
+"""
+
+import io
+import base64
+import logging
+import functools
+import threading
+import contextvars
+import importlib.util
+
+import numpy as np
+from flask import current_app, has_app_context, jsonify, request
+
+from .lazy_import import lazy_import
+from .timing import stage
+
+logger = logging.getLogger(__name__)
+
+
+def _configure_matplotlib(_module):
+    import matplotlib
+    matplotlib.rcParams['font.sans-serif'] = ['Arial', 'DejaVu Sans', 'Liberation Sans', 'SimHei', 'Microsoft YaHei']
+    matplotlib.rcParams['axes.unicode_minus'] = False  # 解决负号显示为方块的问题
+
+
+# 首次新建 Figure 时导入并配置 matplotlib
+_figure = lazy_import('matplotlib.figure', on_load=_configure_matplotlib)
+_ticker = lazy_import('matplotlib.ticker')
+_backend_agg = lazy_import('matplotlib.backends.backend_agg')
+
+# Pillow 是 matplotlib 的依赖，通常已安装；只检查是否可用，首次编码时才导入
+Image = lazy_import('PIL.Image') if importlib.util.find_spec('PIL') is not None else None
+
+RENDER_DEFAULTS = {
+    'PLOT_FORMAT': 'png',          # png / png8 / webp
+    'PLOT_DPI': 100,
+    'PLOT_PNG_COMPRESS_LEVEL': 3,  # zlib压缩级别，matplotlib默认6
+    'PLOT_WEBP_QUALITY': 85,
+    'PLOT_WEBP_METHOD': 0,         # 0最快，6压缩率最高
+}
+
+# 输出格式 -> MIME类型
+PLOT_FORMATS = {
+    'png': 'image/png',
+    'png8': 'image/png',
+    'webp': 'image/webp',
+}
+
+# 无边框调整的固定边距（相当于 tight_layout 的典型结果）
+_MARGINS = {'left': 0.10, 'right': 0.96, 'bottom': 0.11, 'top': 0.91}
+_COLORBAR_MARGINS = {'left': 0.10, 'right': 0.98, 'bottom': 0.11, 'top': 0.91}
+
+_plot_format = contextvars.ContextVar('dill_plot_format', default=None)
+_local = threading.local()
+
+
+def _config(key):
+    if has_app_context():
+        return current_app.config.get(key, RENDER_DEFAULTS[key])
+    return RENDER_DEFAULTS[key]
+
+
+def resolve_plot_format(fmt=None):
+    """
+    返回实际使用的输出格式：显式参数 > 当前请求设置 > 应用配置
+
+    异常:
+        ValueError: 不支持的格式
+    """
+    fmt = fmt or _plot_format.get() or _config('PLOT_FORMAT')
+    if fmt not in PLOT_FORMATS:
+        raise ValueError(f"不支持的图像格式: {fmt}，可选: {', '.join(PLOT_FORMATS)}")
+    if fmt != 'png' and Image is None:
+        return 'png'
+    return fmt
+
+
+def set_plot_format(fmt):
+    """
+    为当前请求设置输出格式（None 表示使用应用配置）
+
+    返回:
+        (格式, contextvars令牌) 元组，令牌用于 reset_plot_format
+    """
+    fmt = resolve_plot_format(fmt)
+    return fmt, _plot_format.set(fmt)
+
+
+def reset_plot_format(token):
+    _plot_format.reset(token)
+
+
+def plot_mime(fmt=None):
+    """输出格式对应的MIME类型"""
+    return PLOT_FORMATS[resolve_plot_format(fmt)]
+
+
+# ---------------------------------------------------------------- 绘图描述
+
+def line_spec(series, title, xlabel, ylabel, figsize=(10, 6), legend=False, legend_labels=None):
+    """
+    折线图描述
+
+    参数:
+        series: [(x, y, fmt, kwargs), ...]，fmt 为 matplotlib 线型字符串
+        title/xlabel/ylabel: 标题与坐标轴标签
+        figsize: 图像尺寸（英寸）
+        legend: 是否显示图例（取各线的 label）
+        legend_labels: 显式图例文字
+    """
+    return {'kind': 'line', 'series': [(np.asarray(x), np.asarray(y), fmt, dict(kwargs or {}))
+                                       for x, y, fmt, kwargs in series],
+            'title': title, 'xlabel': xlabel, 'ylabel': ylabel, 'figsize': tuple(figsize),
+            'legend': legend, 'legend_labels': legend_labels}
+
+
+def heatmap_spec(values, extent, title, xlabel, ylabel, cmap='viridis', colorbar_label=None, figsize=(8, 6)):
+    """
+    热图描述
+
+    参数:
+        values: 二维数组，行对应y、列对应x
+        extent: [x_min, x_max, y_min, y_max]
+        cmap: 颜色映射
+        colorbar_label: 色条标签
+    """
+    return {'kind': 'heatmap', 'values': np.asarray(values), 'extent': [float(v) for v in extent],
+            'title': title, 'xlabel': xlabel, 'ylabel': ylabel, 'cmap': cmap,
+            'colorbar_label': colorbar_label, 'figsize': tuple(figsize)}
+
+
+def slices_spec(slices, labels, extent, title, xlabel, ylabel, cmap='viridis', colorbar_label=None, figsize=(10, 8)):
+    """
+    多切片热图描述（三维结果按z层切片，共用同一色标）
+
+    参数:
+        slices: 二维数组列表
+        labels: 每个切片的小标题
+    """
+    return {'kind': 'slices', 'slices': [np.asarray(s) for s in slices], 'labels': list(labels),
+            'extent': [float(v) for v in extent], 'title': title, 'xlabel': xlabel, 'ylabel': ylabel,
+            'cmap': cmap, 'colorbar_label': colorbar_label, 'figsize': tuple(figsize)}
+
+
+# ---------------------------------------------------------------- 绘制
+#
+# 坐标轴、刻度、色条的创建占绘制耗时的大头，因此每种版式只创建一次：
+# 面板对象持有 Figure 及其中的坐标轴/图像/色条，每次绘制只替换数据、范围和文字。
+
+class _LinePanel:
+    """单坐标轴折线图"""
+
+    def __init__(self, fig):
+        self.fig = fig
+        self.ax = fig.add_subplot(111)
+        fig.subplots_adjust(**_MARGINS)
+
+    def update(self, spec):
+        ax = self.ax
+        for line in list(ax.lines):
+            line.remove()
+        if ax.get_legend() is not None:
+            ax.get_legend().remove()
+        ax.set_prop_cycle(None)
+        for x, y, fmt, kwargs in spec['series']:
+            ax.plot(x, y, fmt, **kwargs)
+        ax.relim()
+        ax.autoscale_view()
+        ax.set_title(spec['title'], fontsize=16)
+        ax.set_xlabel(spec['xlabel'], fontsize=14)
+        ax.set_ylabel(spec['ylabel'], fontsize=14)
+        ax.grid(True, alpha=0.3)
+        if spec['legend_labels']:
+            ax.legend(spec['legend_labels'], loc='best', fontsize=10)
+        elif spec['legend']:
+            ax.legend()
+
+
+def _set_image(image, values, extent, cmap, vmin, vmax):
+    image.set_data(values)
+    image.set_extent(extent)
+    image.set_cmap(cmap)
+    image.set_clim(vmin, vmax)
+
+
+class _HeatmapPanel:
+    """单坐标轴热图 + 色条"""
+
+    def __init__(self, fig):
+        self.fig = fig
+        self.ax = fig.add_subplot(111)
+        self.image = self.ax.imshow(np.zeros((2, 2)), aspect='auto', origin='lower', interpolation='nearest')
+        self.colorbar = fig.colorbar(self.image, ax=self.ax)
+        fig.subplots_adjust(**_COLORBAR_MARGINS)
+
+    def update(self, spec):
+        values = spec['values']
+        _set_image(self.image, values, spec['extent'], spec['cmap'], float(np.min(values)), float(np.max(values)))
+        self.colorbar.update_normal(self.image)
+        self.colorbar.set_label(spec['colorbar_label'] or '')
+        self.ax.set_title(spec['title'], fontsize=14)
+        self.ax.set_xlabel(spec['xlabel'], fontsize=12)
+        self.ax.set_ylabel(spec['ylabel'], fontsize=12)
+
+
+class _SlicesPanel:
+    """多切片热图（共用色标）"""
+
+    def __init__(self, fig, count):
+        self.fig = fig
+        self.cols = min(3, count)
+        self.rows = -(-count // self.cols)
+        # 共享坐标轴，内层子图不绘制刻度标签（文字排版是绘制的主要开销）
+        self.axes = list(fig.subplots(self.rows, self.cols, squeeze=False, sharex=True, sharey=True).flat)
+        self.images = []
+        for idx, ax in enumerate(self.axes):
+            if idx >= count:
+                ax.set_visible(False)
+                continue
+            ax.xaxis.set_major_locator(_ticker.MaxNLocator(4))
+            ax.yaxis.set_major_locator(_ticker.MaxNLocator(4))
+            if idx + self.cols < count:
+                ax.tick_params(labelbottom=False)
+            self.images.append(ax.imshow(np.zeros((2, 2)), aspect='auto', origin='lower', interpolation='nearest'))
+        fig.subplots_adjust(left=0.08, right=0.86, bottom=0.08, top=0.90, wspace=0.25, hspace=0.35)
+        self.colorbar = fig.colorbar(self.images[0], cax=fig.add_axes([0.89, 0.15, 0.025, 0.7]))
+        self.suptitle = fig.suptitle('', fontsize=16)
+
+    def update(self, spec):
+        slices = spec['slices']
+        vmin = min(float(np.min(s)) for s in slices)
+        vmax = max(float(np.max(s)) for s in slices)
+        for idx, (image, values) in enumerate(zip(self.images, slices)):
+            _set_image(image, values, spec['extent'], spec['cmap'], vmin, vmax)
+            ax = self.axes[idx]
+            ax.set_title(spec['labels'][idx], fontsize=11)
+            if idx % self.cols == 0:
+                ax.set_ylabel(spec['ylabel'], fontsize=11)
+            if idx // self.cols == self.rows - 1 or idx + self.cols >= len(slices):
+                ax.set_xlabel(spec['xlabel'], fontsize=11)
+        self.colorbar.update_normal(self.images[0])
+        self.colorbar.set_label(spec['colorbar_label'] or '')
+        self.suptitle.set_text(spec['title'])
+
+
+def _panel(spec, dpi):
+    """取当前线程中与该描述版式相同的面板，没有则新建"""
+    panels = getattr(_local, 'panels', None)
+    if panels is None:
+        panels = _local.panels = {}
+    count = len(spec['slices']) if spec['kind'] == 'slices' else 0
+    key = (spec['kind'], count, spec['figsize'], dpi)
+    panel = panels.get(key)
+    if panel is None:
+        fig = _figure.Figure(figsize=spec['figsize'], dpi=dpi)
+        _backend_agg.FigureCanvasAgg(fig)
+        if spec['kind'] == 'line':
+            panel = _LinePanel(fig)
+        elif spec['kind'] == 'heatmap':
+            panel = _HeatmapPanel(fig)
+        else:
+            panel = _SlicesPanel(fig, count)
+        panels[key] = panel
+    return panel
+
+
+def encode_options():
+    """当前应用的编码参数（渲染进程没有应用上下文，需显式传入）"""
+    return {key: _config(key) for key in ('PLOT_PNG_COMPRESS_LEVEL', 'PLOT_WEBP_QUALITY', 'PLOT_WEBP_METHOD')}
+
+
+def _encode(fig, fmt, dpi, options=None):
+    options = options or encode_options()
+    buffer = io.BytesIO()
+    if Image is None:
+        fig.savefig(buffer, format='png', dpi=dpi)
+        return buffer.getvalue()
+
+    canvas = fig.canvas
+    canvas.draw()
+    width, height = canvas.get_width_height()
+    image = Image.frombuffer('RGBA', (width, height), canvas.buffer_rgba(), 'raw', 'RGBA', 0, 1).convert('RGB')
+    if fmt == 'webp':
+        image.save(buffer, format='WEBP', quality=options['PLOT_WEBP_QUALITY'], method=options['PLOT_WEBP_METHOD'])
+    elif fmt == 'png8':
+        image.quantize(colors=256, method=Image.Quantize.FASTOCTREE).save(
+            buffer, format='PNG', compress_level=options['PLOT_PNG_COMPRESS_LEVEL'])
+    else:
+        image.save(buffer, format='PNG', compress_level=options['PLOT_PNG_COMPRESS_LEVEL'])
+    return buffer.getvalue()
+
+
+def render_encoded(spec, fmt, dpi, options=None):
+    """
+    绘制一张图并返回编码后的图像字节（渲染进程的入口，不依赖应用上下文）
+    """
+    panel = _panel(spec, dpi)
+    panel.update(spec)
+    return _encode(panel.fig, fmt, dpi, options)
+
+
+@stage('plotting')
+def render_plot(spec, fmt=None, dpi=None):
+    """
+    在当前线程绘制一张图
+
+    参数:
+        spec: line_spec / heatmap_spec / slices_spec 的返回值
+        fmt: 输出格式，默认按 resolve_plot_format
+        dpi: 分辨率，默认 app.config['PLOT_DPI']
+    返回:
+        Base64编码的图像字符串
+    """
+    fmt = resolve_plot_format(fmt)
+    dpi = dpi or _config('PLOT_DPI')
+    return base64.b64encode(render_encoded(spec, fmt, dpi, encode_options())).decode()
+
+
+@stage('plotting')
+def render_plots(specs, fmt=None, dpi=None):
+    """
+    绘制一组图；应用启用了渲染进程池时并行交给渲染进程，否则在当前线程依次绘制
+
+    参数:
+        specs: {图像键: spec}；多个键指向同一个 spec 对象时只绘制一次
+    返回:
+        {图像键: Base64编码的图像字符串}
+    """
+    fmt = resolve_plot_format(fmt)
+    dpi = dpi or _config('PLOT_DPI')
+    unique = {}
+    for spec in specs.values():
+        unique.setdefault(id(spec), spec)
+
+    pool = current_app.extensions.get('render_pool') if has_app_context() else None
+    if pool is not None and pool.enabled:
+        images = pool.render(list(unique.values()), fmt, dpi, encode_options())
+    else:
+        images = [render_encoded(spec, fmt, dpi, encode_options()) for spec in unique.values()]
+    encoded = {spec_id: base64.b64encode(image).decode() for spec_id, image in zip(unique, images)}
+    return {key: encoded[id(spec)] for key, spec in specs.items()}
+
+
+def renders_plots(view):
+    """
+    路由装饰器：按请求体中的 plot_format 设置本次请求的图像输出格式，
+    不支持的格式返回400
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        data = request.get_json(silent=True)
+        requested = data.get('plot_format') if isinstance(data, dict) else None
+        try:
+            _, token = set_plot_format(requested)
+        except ValueError as e:
+            from .helpers import format_response
+            return jsonify(format_response(False, message=str(e))), 400
+        try:
+            return view(*args, **kwargs)
+        finally:
+            reset_plot_format(token)
+    return wrapper
+
+
+def init_rendering(app):
+    """
+    为应用设置渲染默认配置并创建、启动渲染进程池（app.extensions['render_pool']）
+
+    参数:
+        app: Flask应用实例
+    """
+    from .render_pool import RENDER_POOL_DEFAULTS, RenderPool
+    for key, value in list(RENDER_DEFAULTS.items()) + list(RENDER_POOL_DEFAULTS.items()):
+        app.config.setdefault(key, value)
+    app.extensions['render_pool'] = RenderPool(app.config['PLOT_RENDER_PROCESSES'],
+                                               timeout=app.config['PLOT_RENDER_TIMEOUT'])
+    app.extensions['render_pool'].start()
+    if app.config['PLOT_FORMAT'] not in PLOT_FORMATS:
+        raise ValueError(f"不支持的图像格式: {app.config['PLOT_FORMAT']}")
+    if Image is None and app.config['PLOT_FORMAT'] != 'png':
+        logger.warning("⚠️ 未安装Pillow，图像输出回退为PNG")
+    logger.info(f"🖼️ 图像输出格式: {app.config['PLOT_FORMAT']} (dpi={app.config['PLOT_DPI']}，"
+                f"渲染进程: {app.config['PLOT_RENDER_PROCESSES'] or '不启用'})")
@@ -0,0 +1,77 @@
+"""
+参数比较结果的LRU缓存
+
+/api/compare（图像）与 /api/compare_data（数据）共用同一计算路径，
+按规范化后的参数组缓存每组的计算结果：同一组参数在两个接口之间切换、
+或在多次比较中重复出现时只计算一次。缓存在进程内，每个worker各自一份。
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+RESULT_CACHE_DEFAULTS = {
+    'COMPARE_CACHE_SIZE': 256,     # 缓存的参数组数，0 表示不缓存
+}
+
+
+class ResultCache:
+    """
+    线程安全的LRU缓存
+
+    参数:
+        maxsize: 最多缓存的条目数
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = int(maxsize or 0)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """返回缓存值，未命中时返回None"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """写入缓存，超出容量时淘汰最久未使用的条目"""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """返回缓存大小与命中统计"""
+        with self._lock:
+            return {'size': len(self._entries), 'maxsize': self.maxsize, 'hits': self.hits, 'misses': self.misses}
+
+
+def init_result_cache(app):
+    """
+    为应用创建参数比较结果缓存，保存在 app.extensions['compare_cache']
+
+    参数:
+        app: Flask应用实例
+    """
+    for key, value in RESULT_CACHE_DEFAULTS.items():
+        app.config.setdefault(key, value)
+    cache = ResultCache(app.config['COMPARE_CACHE_SIZE'])
+    app.extensions['compare_cache'] = cache
+    return cache
@@ -0,0 +1,57 @@
+"""
+同一主机多个 gunicorn worker 共享的 SQLite 文件
+
+每个线程一个连接，WAL 模式下读写互不阻塞；fork 出的 worker
+进程会重新建立连接，不复用父进程的连接。
+"""
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+class SharedSQLite:
+    """
+    线程本地连接的 SQLite 数据库
+
+    参数:
+        path: 数据库文件路径
+        schema: 初始化时执行的建表语句序列
+        timeout: 等待写锁的秒数
+    """
+
+    def __init__(self, path, schema=(), timeout=5.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self.connection()
+        for statement in schema:
+            conn.execute(statement)
+
+    def connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """
+        写事务（BEGIN IMMEDIATE），保证“读取-判断-写入”在多进程间原子执行
+        """
+        conn = self.connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        else:
+            conn.execute('COMMIT')
@@ -0,0 +1,394 @@
+"""
+慢请求自动捕获
+
+耗时超过 app.config['SLOW_REQUEST_THRESHOLD'] 秒的API请求会自动留下一条记录：
+    - 规范化后的请求参数（键排序、数字字符串转为数值、长数组折叠为长度与取值范围）及其指纹，
+      同一组参数反复变慢时指纹相同
+    - 各计算阶段耗时（utils/timing.py 的 StageTimings）
+    - 网格规模：代价模型推算的计算路径、网格点数、帧数与工作量（utils/cost_model.py）
+    - 内存：请求开始/结束时的RSS、请求期间采样到的RSS峰值、进程历史峰值
+    - 采样调用栈：热点函数与折叠栈文本（火焰图输入）
+
+事先不知道哪个请求会变慢，因此由一个共享的后台线程对"已经运行超过
+SLOW_REQUEST_SAMPLE_AFTER 秒"的在途请求做低频栈采样（复用 utils/profiling.py 的采样函数）；
+快请求只多一次在途登记与一次RSS读取，没有在途请求时采样线程休眠。
+记录写入本机共享的 SQLite 文件（多个 worker 共用，只保留最新的 SLOW_REQUEST_STORE_SIZE 条），
+通过 GET /api/admin/slow 查看，同时在 dill_backend.log 中写一行摘要。
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import uuid
+import hashlib
+import logging
+import sqlite3
+import tempfile
+import threading
+from collections import Counter
+
+from flask import g, request
+
+from .shared_sqlite import SharedSQLite
+from .profiling import sample_stack, collapsed_stacks, top_functions
+from .metrics import _resident_memory
+from .timing import current_timings
+from .log_store import current_calc_id
+from .error_log import request_logger
+
+logger = logging.getLogger(__name__)
+
+SLOW_REQUEST_DEFAULTS = {
+    'SLOW_REQUEST_THRESHOLD': 5.0,          # 记录为慢请求的耗时阈值（秒），None/0 表示关闭
+    'SLOW_REQUEST_SAMPLE_AFTER': 0.5,       # 在途请求运行超过该秒数后开始栈采样
+    'SLOW_REQUEST_SAMPLE_INTERVAL': 0.01,   # 栈采样间隔（秒）
+    'SLOW_REQUEST_STORE_SIZE': 200,         # 保留的慢请求记录条数
+    'SLOW_REQUEST_DB_PATH': os.path.join(tempfile.gettempdir(), 'dill_slow_requests.sqlite3'),
+    'SLOW_REQUEST_TOP_N': 20,               # 记录中保留的热点函数个数
+}
+
+# 不参与捕获的接口前缀（管理与监控接口自身）
+_EXCLUDED_PREFIXES = ('/api/admin/', '/api/metrics')
+
+# 参数规范化：每次请求都不同、与计算无关的字段
+_IGNORED_PARAMS = ('calc_id',)
+
+# 长于该长度的数组在记录中折叠为摘要
+_MAX_LIST = 16
+
+_PACKAGE = __name__.split('.')[0]
+
+
+def _number(value):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        try:
+            value = float(value)
+        except ValueError:
+            return value
+    if isinstance(value, float) and math.isfinite(value) and value.is_integer():
+        return int(value)
+    return value
+
+
+def canonical_params(value, ignored=_IGNORED_PARAMS):
+    """
+    规范化请求参数，使等价的请求得到相同的表示
+
+    参数:
+        value: 请求JSON（或其中的字段）
+        ignored: 顶层忽略的字段
+    返回:
+        键排序、数字字符串转为数值（整数值统一为int）、长数组折叠为
+        {'length', 'min', 'max'} 的新结构
+    """
+    if isinstance(value, dict):
+        return {str(key): canonical_params(value[key], ()) for key in sorted(value, key=str)
+                if key not in ignored}
+    if isinstance(value, (list, tuple)):
+        if len(value) > _MAX_LIST:
+            numbers = [item for item in (_number(item) for item in value)
+                       if isinstance(item, (int, float)) and not isinstance(item, bool)]
+            if len(numbers) == len(value):
+                return {'length': len(value), 'min': min(numbers), 'max': max(numbers)}
+            return {'length': len(value), 'head': [canonical_params(item, ()) for item in value[:_MAX_LIST]]}
+        return [canonical_params(item, ()) for item in value]
+    return _number(value)
+
+
+def params_fingerprint(params):
+    """规范化参数的指纹（12位十六进制）"""
+    text = json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:12]
+
+
+def _peak_memory():
+    import resource
+    # Linux 单位为KB，macOS 为字节
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _trim_stack(stack):
+    """去掉WSGI服务器与Flask的外层栈帧，从本项目的第一个函数开始"""
+    for index, label in enumerate(stack):
+        if label.startswith(_PACKAGE + '.'):
+            return stack[index:]
+    return stack
+
+
+class _Watch:
+    """一个在途请求的采样状态"""
+
+    __slots__ = ('thread_id', 'started', 'stacks', 'samples', 'rss_start', 'peak_rss')
+
+    def __init__(self, started=None):
+        self.thread_id = threading.get_ident()
+        self.started = started or time.perf_counter()
+        self.stacks = Counter()
+        self.samples = 0
+        self.rss_start = _resident_memory()
+        self.peak_rss = self.rss_start
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+class SlowRequestMonitor:
+    """
+    在途请求登记与共享的栈采样线程
+
+    参数:
+        sample_after: 请求运行超过该秒数后开始采样
+        interval: 采样间隔（秒）
+    """
+
+    def __init__(self, sample_after=0.5, interval=0.01):
+        self.sample_after = sample_after
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._watches = set()
+        self._pid = None
+
+    def begin(self, started=None):
+        """
+        登记当前线程上的请求，返回其采样状态
+
+        参数:
+            started: 请求开始的 perf_counter 时刻，默认为现在
+        """
+        watch = _Watch(started)
+        with self._lock:
+            self._watches.add(watch)
+            # 采样线程不会随 fork 复制到 worker 进程中
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                threading.Thread(target=self._run, name='dill-slow-request-sampler', daemon=True).start()
+        self._wakeup.set()
+        return watch
+
+    def end(self, watch):
+        """注销请求，之后不再采样"""
+        with self._lock:
+            self._watches.discard(watch)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                watches = list(self._watches)
+            if not watches:
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            time.sleep(self.interval)
+            now = time.perf_counter()
+            frames = rss = None
+            for watch in watches:
+                if now - watch.started < self.sample_after:
+                    continue
+                if frames is None:
+                    frames = sys._current_frames()
+                    rss = _resident_memory()
+                stack = sample_stack(frames.get(watch.thread_id))
+                if stack:
+                    watch.stacks[stack] += 1
+                    watch.samples += 1
+                watch.peak_rss = max(watch.peak_rss, rss)
+            del frames
+
+
+class SlowRequestStore:
+    """
+    本机共享的慢请求记录（SQLite，只保留最新的 maxsize 条）
+
+    参数:
+        path: 数据库文件路径
+        maxsize: 最多保留的记录条数
+    """
+
+    _SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS slow_requests ("
+        " id TEXT PRIMARY KEY, created REAL NOT NULL, endpoint TEXT, duration REAL,"
+        " summary TEXT NOT NULL, record TEXT NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS slow_requests_created ON slow_requests (created)",
+    )
+
+    # 列表中只返回的字段（不含参数、阶段耗时与采样栈）
+    SUMMARY_FIELDS = ('id', 'created_at', 'endpoint', 'method', 'path', 'status', 'duration',
+                      'calc_id', 'params_key', 'pid')
+
+    def __init__(self, path, maxsize=200):
+        self.path = path
+        self.maxsize = maxsize
+        self._db = SharedSQLite(path, self._SCHEMA)
+
+    def put(self, record):
+        summary = {key: record.get(key) for key in self.SUMMARY_FIELDS}
+        summary['grid_points'] = (record.get('grid') or {}).get('grid_points')
+        summary['peak_rss'] = record['memory']['peak_rss']
+        with self._db.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO slow_requests (id, created, endpoint, duration, summary, record)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (record['id'], record['created_at'], record['endpoint'], record['duration'],
+                 json.dumps(summary, ensure_ascii=False), json.dumps(record, ensure_ascii=False, default=str)))
+            conn.execute(
+                "DELETE FROM slow_requests WHERE id NOT IN"
+                " (SELECT id FROM slow_requests ORDER BY created DESC LIMIT ?)", (self.maxsize,))
+
+    def get(self, record_id):
+        row = self._db.connection().execute(
+            "SELECT record FROM slow_requests WHERE id = ?", (record_id,)).fetchone()
+        return json.loads(row['record']) if row else None
+
+    def list(self, endpoint=None, limit=50):
+        """
+        返回慢请求摘要，最新的在前
+
+        参数:
+            endpoint: 只返回该接口的记录
+            limit: 最多返回条数
+        """
+        if endpoint:
+            rows = self._db.connection().execute(
+                "SELECT summary FROM slow_requests WHERE endpoint = ? ORDER BY created DESC LIMIT ?",
+                (endpoint, limit)).fetchall()
+        else:
+            rows = self._db.connection().execute(
+                "SELECT summary FROM slow_requests ORDER BY created DESC LIMIT ?", (limit,)).fetchall()
+        return [json.loads(row['summary']) for row in rows]
+
+
+def _grid_sizes(app, endpoint, data):
+    """代价模型推算的计算路径与网格规模，非计算接口返回None"""
+    from .cost_model import ENDPOINTS
+    model = app.extensions.get('cost_model')
+    if model is None or endpoint not in ENDPOINTS:
+        return None
+    try:
+        return model.profile(data, endpoint)
+    except (TypeError, ValueError, KeyError, AttributeError):
+        # 参数本身不合法（请求也会因此失败），不影响记录
+        return None
+
+
+def _build_record(app, context, watch, duration, status, timings):
+    """组装慢请求记录"""
+    data, endpoint = context['data'], context['endpoint']
+    params = canonical_params(data if isinstance(data, dict) else {})
+    rss_end = _resident_memory()
+    stacks = Counter()
+    for stack, count in watch.stacks.items():
+        stacks[_trim_stack(stack)] += count
+    return {
+        'id': uuid.uuid4().hex[:12],
+        'created_at': time.time(),
+        'endpoint': endpoint,
+        'method': context['method'],
+        'path': context['path'],
+        'query': context['query'],
+        'status': status,
+        'duration': round(duration, 6),
+        'threshold': app.config['SLOW_REQUEST_THRESHOLD'],
+        'calc_id': context['calc_id'],
+        'pid': os.getpid(),
+        'params_key': params_fingerprint(params),
+        'params': params,
+        'grid': _grid_sizes(app, endpoint, data),
+        'timings': timings,
+        'memory': {
+            'rss_start': watch.rss_start,
+            'rss_end': rss_end,
+            'peak_rss': max(watch.peak_rss, rss_end),
+            'process_peak_rss': _peak_memory(),
+        },
+        'profile': {
+            'samples': watch.samples,
+            'interval': app.config['SLOW_REQUEST_SAMPLE_INTERVAL'],
+            'sampled_after': app.config['SLOW_REQUEST_SAMPLE_AFTER'],
+            'top': top_functions(stacks, watch.samples, app.config['SLOW_REQUEST_TOP_N']),
+            'collapsed': collapsed_stacks(stacks) if stacks else '',
+        },
+    }
+
+
+def _capture(app, context, watch, status, timings):
+    """请求结束：注销采样，超过阈值时保存记录"""
+    app.extensions['slow_request_monitor'].end(watch)
+    duration = watch.elapsed()
+    if duration < app.config['SLOW_REQUEST_THRESHOLD']:
+        return None
+    record = _build_record(app, context, watch, duration, status, timings)
+    try:
+        app.extensions['slow_request_store'].put(record)
+    except sqlite3.Error as e:
+        logger.warning(f"⚠️ 写入慢请求记录失败: {e}")
+        return None
+    grid = record['grid'] or {}
+    request_logger.warning(
+        f"🐢 慢请求 {record['method']} {record['path']} 耗时 {duration:.3f}s（阈值 {record['threshold']}s），"
+        f"状态 {status}，网格点数 {grid.get('grid_points', '-')}，参数指纹 {record['params_key']}，"
+        f"记录ID {record['id']}（/api/admin/slow/{record['id']}）")
+    return record
+
+
+def init_slow_requests(app):
+    """
+    为应用注册慢请求捕获，记录库保存在 app.extensions['slow_request_store']
+
+    参数:
+        app: Flask应用实例
+    """
+    for key, value in SLOW_REQUEST_DEFAULTS.items():
+        app.config.setdefault(key, value)
+    store = SlowRequestStore(app.config['SLOW_REQUEST_DB_PATH'], app.config['SLOW_REQUEST_STORE_SIZE'])
+    app.extensions['slow_request_store'] = store
+    threshold = app.config['SLOW_REQUEST_THRESHOLD']
+    if not threshold:
+        return store
+    monitor = SlowRequestMonitor(app.config['SLOW_REQUEST_SAMPLE_AFTER'], app.config['SLOW_REQUEST_SAMPLE_INTERVAL'])
+    app.extensions['slow_request_monitor'] = monitor
+
+    @app.before_request
+    def watch_slow_request():
+        if request.path.startswith('/api/') and not request.path.startswith(_EXCLUDED_PREFIXES):
+            # 与 Server-Timing 的 total 使用同一起点
+            timings = current_timings()
+            g.slow_request_watch = monitor.begin(timings.started if timings else None)
+
+    @app.after_request
+    def capture_slow_request(response):
+        watch = g.pop('slow_request_watch', None)
+        if watch is None:
+            return response
+        timings = current_timings()
+        context = {
+            'endpoint': (request.endpoint or '').replace('api.', ''),
+            'method': request.method,
+            'path': request.path,
+            'query': {key: value for key, value in request.args.items() if key != 'admin_token'},
+            'calc_id': current_calc_id(),
+            'data': request.get_json(silent=True) if request.is_json else None,
+        }
+        status = response.status_code
+        if response.is_streamed:
+            # 流式响应的帧在此之后生成，连接关闭时才结束计时
+            response.call_on_close(lambda: _capture(app, context, watch, status,
+                                                    timings.as_dict() if timings else None))
+        else:
+            _capture(app, context, watch, status, timings.as_dict() if timings else None)
+        return response
+
+    @app.teardown_request
+    def release_slow_request_watch(exc=None):
+        # 未处理的异常不经过 after_request
+        watch = g.pop('slow_request_watch', None)
+        if watch is not None:
+            monitor.end(watch)
+
+    logger.info(f"🐢 慢请求捕获: 阈值 {threshold}s，记录库 {store.path}")
+    return store
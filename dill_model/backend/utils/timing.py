@@ -0,0 +1,190 @@
+"""
+请求内各计算阶段的耗时统计（Server-Timing）
+
+模型与路由用轻量的上下文管理器标记计算阶段：
+
+    with stage('acid_diffusion'):
+        diffused = ndimage.gaussian_filter(acid, sigma)
+
+    @stage('pde_solve')              # 也可以装饰整个方法
+    def solve_enhanced_dill_pde(...): ...
+
+每个请求在 before_request 中创建一个 StageTimings 放入 contextvar，阶段计时写入其中；
+不在请求中（或未启用）时 stage() 只做一次 contextvar 读取。
+阶段可以嵌套，外层阶段只计自身耗时（扣除内层阶段），各阶段之和不会重复计算。
+
+结果以两种形式返回：
+    - 响应体：format_response 在信封中附带 "timings" 块（截至响应构造时的各阶段耗时）
+    - 响应头：Server-Timing（含序列化与总耗时），浏览器开发者工具的 Timing 面板直接显示
+流式响应的响应头在首帧前发出，只包含帧生成之前的阶段。
+"""
+
+import time
+import functools
+import contextvars
+
+from flask import g
+
+TIMING_DEFAULTS = {
+    'STAGE_TIMING': True,             # 记录阶段耗时并返回 Server-Timing 响应头
+    'TIMING_ALLOW_ORIGIN': '*',       # Timing-Allow-Origin，允许跨域页面读取 Server-Timing；None 表示不发送
+}
+
+# 阶段名称与说明（Server-Timing 的 desc 只能是ASCII）
+STAGES = {
+    'intensity': 'Intensity field',
+    'pde_solve': 'PDE solve',
+    'acid_diffusion': 'Acid diffusion',
+    'deprotection': 'Deprotection',
+    'dissolution': 'Dissolution',
+    'statistics': 'Statistics',
+    'serialization': 'Serialization',
+    'plotting': 'Plotting',
+}
+
+_current_timings = contextvars.ContextVar('dill_stage_timings', default=None)
+
+
+class StageTimings:
+    """
+    一个请求内各阶段的累计耗时（秒）与进入次数
+    """
+
+    __slots__ = ('started', 'seconds', 'counts', '_stack')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.seconds = {}
+        self.counts = {}
+        self._stack = []
+
+    def add(self, name, seconds):
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def as_dict(self):
+        """
+        返回响应体中的 timings 块
+
+        返回:
+            {'unit': 'ms', 'stages': {阶段: 毫秒}, 'counts': {阶段: 次数}, 'total': 毫秒}
+        """
+        return {
+            'unit': 'ms',
+            'stages': {name: round(seconds * 1000, 3) for name, seconds in self.seconds.items()},
+            'counts': dict(self.counts),
+            'total': round(self.elapsed() * 1000, 3),
+        }
+
+    def server_timing(self):
+        """返回 Server-Timing 响应头的值（各阶段 + total）"""
+        entries = []
+        for name, seconds in self.seconds.items():
+            desc = STAGES.get(name)
+            entry = f'{name};dur={seconds * 1000:.3f}'
+            entries.append(f'{entry};desc="{desc}"' if desc else entry)
+        entries.append(f'total;dur={self.elapsed() * 1000:.3f}')
+        return ', '.join(entries)
+
+
+class Stage:
+    """
+    阶段计时器：作为上下文管理器或方法装饰器使用（通过 stage() 创建）
+
+    参数:
+        name: 阶段名称，见 STAGES
+    """
+
+    __slots__ = ('name', '_timings', '_start', '_inner')
+
+    def __init__(self, name):
+        self.name = name
+        self._timings = None
+
+    def __enter__(self):
+        timings = _current_timings.get()
+        if timings is not None:
+            self._timings = timings
+            self._inner = 0.0
+            timings._stack.append(self)
+            self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        timings = self._timings
+        if timings is None:
+            return False
+        elapsed = time.perf_counter() - self._start
+        self._timings = None
+        stack = timings._stack
+        if stack and stack[-1] is self:
+            stack.pop()
+        if stack:
+            stack[-1]._inner += elapsed
+        timings.add(self.name, elapsed - self._inner)
+        return False
+
+    def __call__(self, func):
+        name = self.name
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # 每次调用使用新的计时器，装饰器可以重入和跨线程使用
+            with Stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+def stage(name):
+    """
+    创建阶段计时器
+
+    参数:
+        name: 阶段名称，见 STAGES
+    返回:
+        Stage实例，用于 with 语句或装饰方法
+    """
+    return Stage(name)
+
+
+def current_timings():
+    """返回当前请求的 StageTimings，未启用时返回None"""
+    return _current_timings.get()
+
+
+def init_timing(app):
+    """
+    为应用注册阶段计时：每个请求创建 StageTimings，响应附带 Server-Timing 头
+
+    参数:
+        app: Flask应用实例
+    """
+    for key, value in TIMING_DEFAULTS.items():
+        app.config.setdefault(key, value)
+    if not app.config['STAGE_TIMING']:
+        return
+
+    allow_origin = app.config['TIMING_ALLOW_ORIGIN']
+
+    @app.before_request
+    def start_stage_timing():
+        g.stage_timings = StageTimings()
+        _current_timings.set(g.stage_timings)
+
+    @app.after_request
+    def add_server_timing(response):
+        timings = g.pop('stage_timings', None)
+        if timings is not None:
+            response.headers['Server-Timing'] = timings.server_timing()
+            if allow_origin:
+                response.headers['Timing-Allow-Origin'] = allow_origin
+        # 流式响应的帧在此之后生成，不再计入
+        _current_timings.set(None)
+        return response
+
+    @app.teardown_request
+    def stop_stage_timing(exc=None):
+        _current_timings.set(None)
@@ -0,0 +1,12 @@
+"""
+性能基准测试
+
+    python -m benchmarks.run                  # 运行全部用例并与 benchmarks/baseline.json 比较
+    python -m benchmarks.run --update         # 运行并写入新的基准
+    python -m benchmarks.run -k enhanced      # 只运行名称包含 enhanced 的用例
+    python -m benchmarks.run --accuracy       # 同时检查数值精度（benchmarks/accuracy.py）
+    python -m benchmarks.accuracy --generate  # 用当前代码重新生成精度参考输出 benchmarks/golden/*.npz
+    python -m benchmarks.replay traffic.jsonl # 回放请求日志，对本机启动的 wsgi:app 做负载测试
+
+用例见 benchmarks/cases.py，全部离线运行，不需要事先启动服务器（replay 会自行在本机启动 wsgi:app）。
+"""
@@ -0,0 +1,490 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+数值精度回归检查
+
+    python -m benchmarks.accuracy                 # 与 benchmarks/golden/*.npz 比较
+    python -m benchmarks.accuracy --generate      # 用当前代码重新生成参考输出
+    python -m benchmarks.run --accuracy           # 与性能基准一起运行，耗时与精度一并报告
+
+三类检查:
+    - 参考输出：三个模型代表性参数组的输出（压缩 .npz，由当前代码生成），逐字段计算
+      最大绝对误差与RMS误差，超出 atol + rtol × max|参考值| 即失败。
+      同一结果的其他计算引擎（向量化批量计算、Enhanced Dill 批量PDE求解）也与同一参考比较
+    - 高分辨率参考解：Enhanced Dill PDE求解器的参考文件另存一份 z、t 方向各加密4倍的解，
+      记录生成时当前代码相对它的离散误差；新的求解器误差不得超过该值的 (1 + REFERENCE_SLACK) 倍
+    - 收敛阶：Enhanced Dill 积分器在网格逐级加密（z、t 步长同时减半）时，相邻两级差值之比
+      给出的观测收敛阶不得低于 EXPECTED_ORDERS - ORDER_TOLERANCE
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import logging
+import argparse
+import contextlib
+
+import numpy as np
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+# 添加项目根目录到Python路径（直接运行 python benchmarks/accuracy.py 时）
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+
+from backend.models.registry import get_model
+from backend.models.vectorized import dill_batch, car_batch, batch_grid
+from benchmarks.cases import (DILL_PARAMS, ENHANCED_PARAMS, CAR_PARAMS, WAVE_2D, WAVE_3D, ANIMATION, _axis)
+
+GOLDEN_DIR = os.path.join(BENCHMARK_DIR, 'golden')
+
+# 参考输出的默认容差：要求与当前代码的结果一致（只容许浮点运算顺序带来的差异）
+DEFAULT_RTOL = 1e-9
+DEFAULT_ATOL = 1e-12
+
+# 高分辨率参考解：相对用例网格的加密倍数，以及允许的离散误差增幅
+REFERENCE_REFINEMENT = 4
+REFERENCE_SLACK = 0.1
+
+# Enhanced Dill 积分器的理论收敛阶：I 沿z按中点吸收系数做指数推进（二阶），
+# M 的半隐式时间步用 I^n 代替 I^{n+1}（一阶），曝光剂量为梯形积分（二阶）
+EXPECTED_ORDERS = {'I_final': 2.0, 'M_final': 1.0, 'exposure_dose': 2.0}
+ORDER_TOLERANCE = 0.25
+CONVERGENCE_BASE_GRID = (11, 21)     # 最粗一级的 (z点数, t点数)
+CONVERGENCE_LEVELS = 5
+
+# 低于该规模的参考值按绝对误差判断（避免全零字段的相对误差无意义）
+_SCALE_FLOOR = 1e-300
+
+PDE_FIELDS = ('z', 'I_final', 'M_final', 'exposure_dose')
+
+# 动画参考输出只取少量帧，控制参考文件体积
+GOLDEN_ANIMATION = dict(ANIMATION, time_steps=5)
+
+
+class AccuracyCase:
+    """
+    一个精度检查用例
+
+    参数:
+        name: 用例名称（参考文件为 golden/<name>.npz）
+        compute: 无参数的可调用对象，返回 {字段: 数组}
+        engines: {引擎名: 可调用对象}，其他计算引擎，返回参考字段的子集
+        reference: 生成高分辨率参考解的可调用对象，返回 {字段: 数组}（含 'z'），可选
+    """
+
+    def __init__(self, name, compute, engines=None, reference=None):
+        self.name = name
+        self.compute = compute
+        self.engines = engines or {}
+        self.reference = reference
+
+
+def numeric_fields(result, prefix=''):
+    """
+    提取结果中的数值数组字段（嵌套字典展开为 "外层.内层"，标量、字符串与布尔值跳过）
+    """
+    fields = {}
+    for key, value in result.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            fields.update(numeric_fields(value, prefix=f"{name}."))
+            continue
+        if value is None or isinstance(value, (bool, str)):
+            continue
+        try:
+            array = np.asarray(value, dtype=float)
+        except (TypeError, ValueError):
+            continue
+        if array.ndim >= 1 and array.size > 1:
+            fields[name] = array
+    return fields
+
+
+def _quiet(func):
+    """运行模型计算，丢弃 print 输出"""
+    def wrapper():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return func()
+    return wrapper
+
+
+# ---------------------------------------------------------------- 用例
+
+def _dill_cases():
+    model = get_model('dill')
+    cases = []
+    for suffix, params in (('', DILL_PARAMS), ('.high_dose', dict(DILL_PARAMS, V=0.5, C=0.04, t_exp=8.0))):
+        p = dict(params)
+
+        def static(p=p):
+            return numeric_fields(model.generate_data(p['I_avg'], p['V'], p['K'], p['t_exp'], p['C']))
+
+        def vectorized(p=p):
+            fields = dill_batch(batch_grid(0, 10, 1000), {name: [value] for name, value in p.items()})
+            return {name: values[0] for name, values in fields.items()}
+
+        cases.append(AccuracyCase(f'dill.1d.static{suffix}', static, engines={'vectorized': vectorized}))
+    p = DILL_PARAMS
+    cases.append(AccuracyCase('dill.2d.static', lambda: numeric_fields(model.generate_data(
+        p['I_avg'], p['V'], None, p['t_exp'], p['C'], sine_type='multi', y_range=_axis(10), **WAVE_2D))))
+    cases.append(AccuracyCase('dill.3d.static', lambda: numeric_fields(model.generate_data(
+        p['I_avg'], p['V'], None, p['t_exp'], p['C'], sine_type='3d', y_range=_axis(20), z_range=_axis(20),
+        **WAVE_3D))))
+    cases.append(AccuracyCase('dill.1d.4d', lambda: numeric_fields(model.generate_data(
+        p['I_avg'], p['V'], p['K'], p['t_exp'], p['C'], enable_4d_animation=True, **GOLDEN_ANIMATION))))
+    return cases
+
+
+def _enhanced_cases():
+    model = get_model('enhanced_dill')
+    cases = []
+    for suffix, params in (('', ENHANCED_PARAMS), ('.thin', dict(ENHANCED_PARAMS, z_h=5.0, t_exp=8.0))):
+        p = dict(params)
+        cases.append(AccuracyCase(f'enhanced_dill.1d.static{suffix}', lambda p=p: numeric_fields(model.generate_data(
+            p['z_h'], p['T'], p['t_B'], p['I0'], p['M0'], p['t_exp'], K=2.0, V=0.8, num_points=1000))))
+    p = ENHANCED_PARAMS
+    # 二维路径的XY平面取第25个y点作为中心点，y方向至少需要26个点
+    cases.append(AccuracyCase('enhanced_dill.2d.static', lambda: numeric_fields(model.generate_data(
+        p['z_h'], p['T'], p['t_B'], p['I0'], p['M0'], p['t_exp'], sine_type='multi', V=0.8,
+        y_range=_axis(30), **WAVE_2D))))
+    cases.append(AccuracyCase('enhanced_dill.3d.static', lambda: numeric_fields(model.generate_data(
+        p['z_h'], p['T'], p['t_B'], p['I0'], p['M0'], p['t_exp'], sine_type='3d', V=0.8, **WAVE_3D))))
+    cases.append(AccuracyCase('enhanced_dill.1d.4d', lambda: numeric_fields(model.generate_data(
+        p['z_h'], p['T'], p['t_B'], p['I0'], p['M0'], p['t_exp'], K=2.0, V=0.8,
+        enable_4d_animation=True, **GOLDEN_ANIMATION))))
+    return cases
+
+
+def _solve(num_z_points=100, num_t_points=200):
+    p = ENHANCED_PARAMS
+    z, I_final, M_final, exposure = get_model('enhanced_dill').solve_enhanced_dill_pde(
+        p['z_h'], p['T'], p['t_B'], p['I0'], p['M0'], p['t_exp'], num_z_points=num_z_points,
+        num_t_points=num_t_points, x_position=5.0, K=2.0, V=0.8)
+    return dict(zip(PDE_FIELDS, (z, I_final, M_final, exposure)))
+
+
+def _refined(points):
+    """嵌套加密后的点数（原网格节点全部保留）"""
+    return REFERENCE_REFINEMENT * (points - 1) + 1
+
+
+def _solver_cases():
+    model = get_model('enhanced_dill')
+    p = ENHANCED_PARAMS
+
+    def batch():
+        # 批量求解器的表面光强不随时间变化，对应 phi_expr=None 的单点求解
+        surface = p['I0'] * (1 + 0.8 * np.cos(2.0 * 5.0))
+        z, I_final, M_final, surface_exposure = model.solve_enhanced_dill_pde_batch(
+            p['z_h'], p['T'], p['t_B'], [surface], p['M0'], p['t_exp'], num_z_points=100, num_t_points=200)
+        return {'z': z, 'I_final': I_final[0], 'M_final': M_final[0]}
+
+    def adaptive():
+        z, I_final, M_final, exposure, _ = model.adaptive_solve_enhanced_dill_pde(
+            p['z_h'], p['T'], p['t_B'], p['I0'], p['M0'], p['t_exp'], x_position=5.0, K=2.0, V=0.8)
+        return dict(zip(PDE_FIELDS, (z, I_final, M_final, exposure)))
+
+    return [
+        AccuracyCase('enhanced_dill.pde.fixed', _solve, engines={'batch': batch},
+                     reference=lambda: _solve(_refined(100), _refined(200))),
+        # 自适应网格最多200×200点，参考解取其上限网格的4倍加密
+        AccuracyCase('enhanced_dill.pde.adaptive', adaptive,
+                     reference=lambda: _solve(_refined(200), _refined(200))),
+    ]
+
+
+def _car_cases():
+    model = get_model('car')
+    cases = []
+    for suffix, params in (('', CAR_PARAMS), ('.short_diffusion', dict(CAR_PARAMS, diffusion_length=1.5))):
+        p = dict(params)
+
+        def static(p=p):
+            return numeric_fields(model.generate_data(
+                p['I_avg'], p['V'], p['K'], p['t_exp'], p['acid_gen_efficiency'], p['diffusion_length'],
+                p['reaction_rate'], p['amplification'], p['contrast']))
+
+        def vectorized(p=p):
+            fields = car_batch(batch_grid(0, 10, 1000), {name: [value] for name, value in p.items()})
+            # 一维 generate_data 的 exposure_dose 字段返回的是归一化初始酸浓度，不与批量结果比较
+            return {name: values[0] for name, values in fields.items() if name != 'exposure_dose'}
+
+        cases.append(AccuracyCase(f'car.1d.static{suffix}', static, engines={'vectorized': vectorized}))
+    p = CAR_PARAMS
+    args = (p['I_avg'], p['V'], None, p['t_exp'], p['acid_gen_efficiency'], p['diffusion_length'],
+            p['reaction_rate'], p['amplification'], p['contrast'])
+    cases.append(AccuracyCase('car.2d.static', lambda: numeric_fields(model.generate_data(
+        *args, sine_type='multi', y_range=_axis(10), **WAVE_2D))))
+    cases.append(AccuracyCase('car.3d.static', lambda: numeric_fields(model.generate_data(
+        *args, sine_type='3d', y_range=_axis(50), z_range=_axis(50), **WAVE_3D))))
+    cases.append(AccuracyCase('car.3d.4d', lambda: numeric_fields(model.generate_data(
+        *args, sine_type='3d', y_range=_axis(50), z_range=_axis(50), enable_4d_animation=True,
+        **dict(GOLDEN_ANIMATION, time_steps=3), **WAVE_3D))))
+    return cases
+
+
+def build_accuracy_cases():
+    """构造全部精度检查用例"""
+    return _dill_cases() + _enhanced_cases() + _solver_cases() + _car_cases()
+
+
+# ---------------------------------------------------------------- 误差
+
+def field_errors(expected, actual):
+    """
+    返回 {'max_abs', 'rms', 'scale'}；scale 为参考值的最大绝对值
+    """
+    diff = np.asarray(actual, dtype=float) - np.asarray(expected, dtype=float)
+    return {
+        'max_abs': float(np.max(np.abs(diff))),
+        'rms': float(np.sqrt(np.mean(diff * diff))),
+        'scale': float(np.max(np.abs(expected))),
+    }
+
+
+def compare_fields(golden, actual, rtol=DEFAULT_RTOL, atol=DEFAULT_ATOL):
+    """
+    逐字段比较
+
+    参数:
+        golden: 参考字段
+        actual: 本次结果（只比较其中出现的字段，缺失参考中的字段记为失败）
+    返回:
+        {字段: {'max_abs', 'rms', 'scale', 'passed'} 或 {'passed': False, 'error': 原因}}
+    """
+    report = {}
+    for name, value in actual.items():
+        expected = golden.get(name)
+        if expected is None:
+            report[name] = {'passed': False, 'error': '参考输出中没有该字段'}
+            continue
+        value = np.asarray(value, dtype=float)
+        if value.shape != expected.shape:
+            report[name] = {'passed': False, 'error': f'形状 {value.shape} 与参考 {expected.shape} 不一致'}
+            continue
+        errors = field_errors(expected, value)
+        errors['passed'] = bool(np.all(np.isfinite(value))) and \
+            errors['max_abs'] <= atol + rtol * max(errors['scale'], _SCALE_FLOOR)
+        report[name] = errors
+    return report
+
+
+def reference_errors(reference, actual):
+    """本次解相对高分辨率参考解的误差（参考解按z插值到本次网格）"""
+    errors = {}
+    for name in PDE_FIELDS[1:]:
+        expected = np.interp(actual['z'], reference['z'], reference[name])
+        errors[name] = field_errors(expected, actual[name])
+    return errors
+
+
+def convergence_orders(base=CONVERGENCE_BASE_GRID, levels=CONVERGENCE_LEVELS):
+    """
+    Enhanced Dill 积分器的观测收敛阶
+
+    z、t 网格逐级嵌套加密（步长减半），相邻两级的解在粗网格节点上的最大差值 d_k，
+    观测阶 p_k = log2(d_k / d_{k+1})。
+    返回:
+        {'grids': [(z点数, t点数), ...], 'fields': {字段: {'differences', 'orders', 'expected', 'passed'}}}
+    """
+    grids, solutions = [], []
+    nz, nt = base
+    for _ in range(levels):
+        grids.append((nz, nt))
+        solutions.append(_quiet(lambda nz=nz, nt=nt: _solve(nz, nt))())
+        nz, nt = 2 * (nz - 1) + 1, 2 * (nt - 1) + 1
+    fields = {}
+    for name, expected in EXPECTED_ORDERS.items():
+        differences = [float(np.max(np.abs(fine[name][::2] - coarse[name])))
+                       for coarse, fine in zip(solutions, solutions[1:])]
+        orders = [float(np.log2(a / b)) if a > 0 and b > 0 else None
+                  for a, b in zip(differences, differences[1:])]
+        finest = orders[-1] if orders else None
+        fields[name] = {
+            'differences': differences,
+            'orders': [round(order, 3) if order is not None else None for order in orders],
+            'expected': expected,
+            'passed': finest is not None and finest >= expected - ORDER_TOLERANCE,
+        }
+    return {'grids': grids, 'fields': fields}
+
+
+# ---------------------------------------------------------------- 参考文件
+
+def golden_path(name, directory=GOLDEN_DIR):
+    return os.path.join(directory, f'{name}.npz')
+
+
+def save_golden(path, fields, meta, reference=None):
+    arrays = dict(fields)
+    for name, value in (reference or {}).items():
+        arrays[f'reference.{name}'] = value
+    arrays['__meta__'] = np.array(json.dumps(meta, ensure_ascii=False))
+    np.savez_compressed(path, **arrays)
+
+
+def load_golden(path):
+    """
+    读取参考文件
+
+    返回:
+        (字段, 高分辨率参考解或None, 元数据)
+    """
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(str(data['__meta__']))
+        fields, reference = {}, {}
+        for key in data.files:
+            if key == '__meta__':
+                continue
+            if key.startswith('reference.'):
+                reference[key[len('reference.'):]] = data[key]
+            else:
+                fields[key] = data[key]
+    return fields, reference or None, meta
+
+
+def generate(cases, directory=GOLDEN_DIR):
+    """用当前代码生成参考文件（含高分辨率参考解与生成时的离散误差）"""
+    os.makedirs(directory, exist_ok=True)
+    for case in cases:
+        start = time.perf_counter()
+        fields = _quiet(case.compute)()
+        meta = {'case': case.name, 'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'numpy': np.__version__}
+        reference = None
+        if case.reference is not None:
+            reference = _quiet(case.reference)()
+            meta['reference_grid'] = [len(reference['z'])]
+            meta['reference_error'] = reference_errors(reference, fields)
+        save_golden(golden_path(case.name, directory), fields, meta, reference)
+        size = os.path.getsize(golden_path(case.name, directory))
+        print(f"💾 {case.name:<36} {len(fields)} 个字段，{size / 1024:.1f}KB，用时 {time.perf_counter() - start:.2f}s")
+
+
+def check(cases, directory=GOLDEN_DIR, rtol=DEFAULT_RTOL, atol=DEFAULT_ATOL):
+    """
+    与参考文件比较
+
+    返回:
+        [{'name', 'engine', 'passed', 'fields' | 'error', 'max_abs', 'rms'}, ...]；
+        每个用例一条当前实现的记录、每个其他引擎一条记录，有高分辨率参考解时另加一条 'reference' 记录
+    """
+    results = []
+    for case in cases:
+        path = golden_path(case.name, directory)
+        if not os.path.exists(path):
+            results.append({'name': case.name, 'engine': 'default', 'passed': False,
+                            'error': f'缺少参考文件 {os.path.relpath(path)}（先运行 --generate）'})
+            continue
+        golden, reference, meta = load_golden(path)
+        outputs = {'default': case.compute}
+        outputs.update(case.engines)
+        default_fields = None
+        for engine, compute in outputs.items():
+            fields = _quiet(compute)()
+            if engine == 'default':
+                default_fields = fields
+                missing = sorted(set(golden) - set(fields))
+                report = compare_fields(golden, fields, rtol, atol)
+                for name in missing:
+                    report[name] = {'passed': False, 'error': '本次输出中缺少该字段'}
+            else:
+                report = compare_fields(golden, fields, rtol, atol)
+            results.append(_summarize(case.name, engine, report))
+        if reference is not None:
+            errors = reference_errors(reference, default_fields)
+            recorded = meta.get('reference_error', {})
+            report = {}
+            for name, error in errors.items():
+                limit = recorded.get(name, {}).get('max_abs', 0.0) * (1 + REFERENCE_SLACK) + atol
+                report[name] = dict(error, limit=limit, passed=error['max_abs'] <= limit)
+            results.append(_summarize(case.name, 'reference', report))
+    return results
+
+
+def _summarize(name, engine, report):
+    measured = [field for field in report.values() if 'max_abs' in field]
+    return {
+        'name': name,
+        'engine': engine,
+        'passed': all(field['passed'] for field in report.values()),
+        'max_abs': max((field['max_abs'] for field in measured), default=None),
+        'rms': max((field['rms'] for field in measured), default=None),
+        'fields': report,
+    }
+
+
+def print_results(results, convergence=None):
+    """打印精度检查结果，返回是否全部通过"""
+    print(f"   {'精度用例':<36} {'引擎':<11} {'最大误差':>11} {'RMS误差':>11}")
+    passed = True
+    for result in results:
+        passed = passed and result['passed']
+        flag = '  ' if result['passed'] else '❌'
+        if 'error' in result:
+            print(f"{flag} {result['name']:<36} {result['engine']:<11} {result['error']}")
+            continue
+        max_abs = f"{result['max_abs']:.3e}" if result['max_abs'] is not None else '-'
+        rms = f"{result['rms']:.3e}" if result['rms'] is not None else '-'
+        print(f"{flag} {result['name']:<36} {result['engine']:<11} {max_abs:>11} {rms:>11}")
+        for field, report in result['fields'].items():
+            if not report['passed']:
+                detail = report.get('error') or f"最大误差 {report['max_abs']:.3e}（参考量级 {report['scale']:.3e}）"
+                print(f"     - {field}: {detail}")
+    if convergence is not None:
+        grids = ' → '.join(f"{nz}×{nt}" for nz, nt in convergence['grids'])
+        print(f"   Enhanced Dill 收敛阶（网格 {grids}）")
+        for name, field in convergence['fields'].items():
+            passed = passed and field['passed']
+            flag = '  ' if field['passed'] else '❌'
+            orders = ', '.join('-' if order is None else f'{order:.2f}' for order in field['orders'])
+            print(f"{flag}   {name:<16} 观测阶 {orders}（理论 {field['expected']:.0f}）")
+    return passed
+
+
+def run_accuracy(filters=(), rtol=DEFAULT_RTOL, atol=DEFAULT_ATOL, directory=GOLDEN_DIR):
+    """
+    运行精度检查（供 benchmarks.run --accuracy 调用）
+
+    返回:
+        (是否全部通过, {'cases': check() 结果, 'convergence': convergence_orders() 结果})
+    """
+    cases = [case for case in build_accuracy_cases()
+             if not filters or any(pattern in case.name for pattern in filters)]
+    results = check(cases, directory, rtol, atol)
+    convergence = convergence_orders() if not filters or any('enhanced' in p or 'pde' in p for p in filters) else None
+    passed = print_results(results, convergence)
+    return passed, {'cases': results, 'convergence': convergence}
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="Dill模型数值精度回归检查")
+    parser.add_argument('-k', '--filter', action='append', default=[],
+                        help='只检查名称包含该字符串的用例（可重复）')
+    parser.add_argument('--generate', action='store_true', help='用当前代码重新生成参考文件')
+    parser.add_argument('--rtol', type=float, default=DEFAULT_RTOL,
+                        help=f'相对容差，相对参考值的最大绝对值（默认: {DEFAULT_RTOL}）')
+    parser.add_argument('--atol', type=float, default=DEFAULT_ATOL, help=f'绝对容差（默认: {DEFAULT_ATOL}）')
+    parser.add_argument('--golden', default=GOLDEN_DIR, help='参考文件目录')
+    parser.add_argument('--output', help='把检查结果写入该JSON文件')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_arguments(argv)
+    logging.getLogger('backend').setLevel(logging.ERROR)
+    if args.generate:
+        cases = [case for case in build_accuracy_cases()
+                 if not args.filter or any(pattern in case.name for pattern in args.filter)]
+        generate(cases, args.golden)
+        return 0
+    passed, report = run_accuracy(args.filter, args.rtol, args.atol, args.golden)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    print("✅ 精度检查全部通过" if passed else "❌ 精度检查未通过")
+    return 0 if passed else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,184 @@
+"""
+基准测试用例
+
+每个用例使用固定的代表性参数（与前端默认值及 /api/calculate_data 的网格一致），
+覆盖三个模型的 generate_data（1D / 2D / 3D，静态与4D动画）、Enhanced Dill 的
+PDE求解器、/api/compare_data 混合参数组与 generate_plots。
+
+用例的 request 字段是等价的 /api/calculate_data 请求体，runner 用它向代价模型
+（utils/cost_model.py）查询路径键与预测耗时，写入基准文件后用于启动时的校准。
+"""
+
+import numpy as np
+
+from backend.models.registry import get_model
+
+# 代表性参数（与 models/vectorized.BATCH_PARAMETERS、models/comparison 的默认值一致）
+DILL_PARAMS = {'I_avg': 10.0, 'V': 0.8, 'K': 2.0, 't_exp': 5.0, 'C': 0.02}
+ENHANCED_PARAMS = {'z_h': 10.0, 'T': 100.0, 't_B': 10.0, 'I0': 1.0, 'M0': 1.0, 't_exp': 5.0}
+CAR_PARAMS = {'I_avg': 10.0, 'V': 0.8, 'K': 2.0, 't_exp': 5.0, 'acid_gen_efficiency': 0.5,
+              'diffusion_length': 3.0, 'reaction_rate': 0.3, 'amplification': 10.0, 'contrast': 3.0}
+
+# 2D / 3D 的空间频率与网格（/api/calculate_data 的默认点数）
+WAVE_2D = {'Kx': 2.0, 'Ky': 1.0, 'phi_expr': '0'}
+WAVE_3D = {'Kx': 2.0, 'Ky': 1.0, 'Kz': 0.5, 'phi_expr': '0'}
+Y_POINTS_2D = 100
+POINTS_3D = 50
+
+# 4D动画的时间轴（前端默认值）
+ANIMATION = {'t_start': 0.0, 't_end': 5.0, 'time_steps': 20}
+
+# 有4D动画路径的 (模型, 维度)：CAR 只有三维动画
+ANIMATED_PATHS = {('dill', '1d'), ('dill', 'multi'), ('dill', '3d'),
+                  ('enhanced_dill', '1d'), ('enhanced_dill', 'multi'), ('enhanced_dill', '3d'),
+                  ('car', '3d')}
+
+
+def _axis(points):
+    return np.linspace(0.0, 10.0, points).tolist()
+
+
+class Case:
+    """
+    一个基准测试用例
+
+    参数:
+        name: 用例名称（唯一，用于 -k 过滤与基准比较）
+        group: 分组（generate_data / solver / api / plots）
+        run: 无参数的可调用对象，返回本次计算的结果
+        request: 等价的API请求体（用于代价模型），没有时为None
+        endpoint: request 对应的接口
+        setup: 每次运行前调用（清空缓存等），可选
+    """
+
+    def __init__(self, name, group, run, request=None, endpoint='calculate_data', setup=None):
+        self.name = name
+        self.group = group
+        self.run = run
+        self.request = request
+        self.endpoint = endpoint
+        self.setup = setup
+
+
+def _generate_data_case(model_type, sine_type, animated):
+    """构造 generate_data 用例：参数与 /api/calculate_data 对相应路径的调用一致"""
+    model = get_model(model_type)
+    params = {'dill': DILL_PARAMS, 'enhanced_dill': ENHANCED_PARAMS, 'car': CAR_PARAMS}[model_type]
+    kwargs = {'sine_type': sine_type}
+    request = dict(params, model_type=model_type, sine_type=sine_type)
+    if sine_type == 'multi':
+        kwargs.update(WAVE_2D, y_range=_axis(Y_POINTS_2D))
+        request.update(WAVE_2D, y_points=Y_POINTS_2D)
+    elif sine_type == '3d':
+        kwargs.update(WAVE_3D, y_range=_axis(POINTS_3D), z_range=_axis(POINTS_3D))
+        request.update(WAVE_3D)
+    if animated:
+        kwargs.update(ANIMATION, enable_4d_animation=True)
+        request.update(ANIMATION, enable_4d_animation=True)
+
+    if model_type == 'dill':
+        def run():
+            return model.generate_data(params['I_avg'], params['V'], params['K'] if sine_type == '1d' else None,
+                                       params['t_exp'], params['C'], **kwargs)
+    elif model_type == 'car':
+        def run():
+            return model.generate_data(params['I_avg'], params['V'], params['K'] if sine_type == '1d' else None,
+                                       params['t_exp'], params['acid_gen_efficiency'], params['diffusion_length'],
+                                       params['reaction_rate'], params['amplification'], params['contrast'], **kwargs)
+    else:
+        wave = {'V': 0.8}
+        if sine_type == '1d':
+            # 一维静态计算沿深度1000点求解（与 /api/calculate_data 一致）
+            wave['K'] = 2.0
+            if not animated:
+                wave['num_points'] = 1000
+            request.update(K=2.0, V=0.8)
+
+        def run():
+            return model.generate_data(params['z_h'], params['T'], params['t_B'], params['I0'], params['M0'],
+                                       params['t_exp'], **wave, **kwargs)
+
+    dimension = {'1d': '1d', 'multi': '2d', '3d': '3d'}[sine_type]
+    name = f"{model_type}.{dimension}.{'4d' if animated else 'static'}"
+    return Case(name, 'generate_data', run, request=request)
+
+
+def _solver_cases():
+    model = get_model('enhanced_dill')
+    p = ENHANCED_PARAMS
+
+    def solve():
+        return model.solve_enhanced_dill_pde(p['z_h'], p['T'], p['t_B'], p['I0'], p['M0'], p['t_exp'],
+                                             num_z_points=100, num_t_points=200, x_position=5.0, K=2.0, V=0.8)
+
+    def adaptive():
+        return model.adaptive_solve_enhanced_dill_pde(p['z_h'], p['T'], p['t_B'], p['I0'], p['M0'], p['t_exp'],
+                                                      x_position=5.0, K=2.0, V=0.8)
+
+    return [Case('enhanced_dill.pde.fixed', 'solver', solve),
+            Case('enhanced_dill.pde.adaptive', 'solver', adaptive)]
+
+
+# /api/compare_data 的混合参数组：三个模型各两组
+COMPARE_SETS = [
+    dict(DILL_PARAMS, setId='1'),
+    dict(DILL_PARAMS, C=0.04, setId='2'),
+    dict(ENHANCED_PARAMS, K=2.0, V=0.8, setId='3'),
+    dict(ENHANCED_PARAMS, K=2.0, V=0.6, t_exp=8.0, setId='4'),
+    dict(CAR_PARAMS, setId='5'),
+    dict(CAR_PARAMS, diffusion_length=1.5, setId='6'),
+]
+
+
+def _compare_case(app):
+    client = app.test_client()
+    request = {'parameter_sets': COMPARE_SETS}
+    cache = app.extensions.get('compare_cache')
+
+    def run():
+        response = client.post('/api/compare_data', json=request)
+        if response.status_code != 200:
+            raise RuntimeError(f"/api/compare_data 返回 {response.status_code}: {response.get_data(as_text=True)[:200]}")
+        return response
+
+    # 每次运行前清空结果缓存，计时的是完整计算而不是缓存命中
+    return Case('api.compare_data.mixed', 'api', run, request=request, endpoint='compare_data',
+                setup=cache.clear if cache is not None else None)
+
+
+def _plot_cases():
+    cases = []
+    dill, enhanced, car = get_model('dill'), get_model('enhanced_dill'), get_model('car')
+    d, e, c = DILL_PARAMS, ENHANCED_PARAMS, CAR_PARAMS
+    cases.append(Case('dill.plots.1d', 'plots', lambda: dill.generate_plots(
+        d['I_avg'], d['V'], d['K'], d['t_exp'], d['C'], sine_type='1d')))
+    cases.append(Case('dill.plots.2d', 'plots', lambda: dill.generate_plots(
+        d['I_avg'], d['V'], None, d['t_exp'], d['C'], sine_type='multi', y_range=_axis(Y_POINTS_2D), **WAVE_2D)))
+    cases.append(Case('enhanced_dill.plots.1d', 'plots', lambda: enhanced.generate_plots(
+        e['z_h'], e['T'], e['t_B'], e['I0'], e['M0'], e['t_exp'], sine_type='1d', K=2.0, V=0.8)))
+    cases.append(Case('car.plots.1d', 'plots', lambda: car.generate_plots(
+        c['I_avg'], c['V'], c['K'], c['t_exp'], c['acid_gen_efficiency'], c['diffusion_length'],
+        c['reaction_rate'], c['amplification'], c['contrast'], sine_type='1d')))
+    return cases
+
+
+def build_cases(app):
+    """
+    构造全部用例
+
+    参数:
+        app: Flask应用实例（/api/compare_data 用例通过测试客户端调用）
+    返回:
+        Case 列表
+    """
+    cases = []
+    for model_type in ('dill', 'enhanced_dill', 'car'):
+        for sine_type in ('1d', 'multi', '3d'):
+            for animated in (False, True):
+                if animated and (model_type, sine_type) not in ANIMATED_PATHS:
+                    continue
+                cases.append(_generate_data_case(model_type, sine_type, animated))
+    cases.extend(_solver_cases())
+    cases.append(_compare_case(app))
+    cases.extend(_plot_cases())
+    return cases
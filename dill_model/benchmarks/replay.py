@@ -0,0 +1,612 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+回放请求日志，对本机启动的 wsgi:app 做负载测试
+
+    python -m benchmarks.replay traffic.jsonl                          # 按日志顺序、4个并发连接回放
+    python -m benchmarks.replay traffic.jsonl --rate 5 --duration 60   # 泊松到达，平均每秒5个请求
+    python -m benchmarks.replay traffic.jsonl --rate recorded --speed 2  # 按日志时间戳的2倍速回放
+    python -m benchmarks.replay traffic.jsonl --server gunicorn --workers 4 --env DILL_ADMISSION_ENABLED=false
+    python -m benchmarks.replay --write-sample traffic.jsonl           # 由基准用例生成一份混合请求日志
+
+请求日志每行一个JSON对象:
+    {"path": "/api/calculate_data", "body": {...}, "t": 12.5}
+    {"path": "/api/compare_data", "body": {"parameter_sets": [...]}}
+    {"path": "/api/logs", "method": "GET", "query": {"page": "index", "category": "1d"}}
+path 也可写作 "endpoint": "calculate_data"；method 缺省时有 body 为 POST、否则为 GET；
+t 为相对采集开始的秒数，只在 --rate recorded 时使用。
+
+服务端默认用 gunicorn 启动（未安装时用 werkzeug 多线程服务器），监听随机本地端口；
+--url 指向已启动的本地服务时不启动服务端，配合 --pid 采样其内存。
+不加 --rate 时为闭环：--concurrency 个连接各自发完一个请求再发下一个；加 --rate 时为开环：
+请求按到达时间进入队列，由 --concurrency 个连接发送，延迟从到达时间算起（包括在客户端排队的时间，
+服务端饱和时不会因为客户端放慢而低估延迟）。
+服务端进程树（gunicorn master、worker 及其计算进程池）的RSS每隔 --memory-interval 秒采样一次。
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import random
+import signal
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+import importlib.util
+from urllib.parse import urlencode, urlsplit
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(BENCHMARK_DIR)
+# 添加项目根目录到Python路径（直接运行 python benchmarks/replay.py 时）
+sys.path.insert(0, PROJECT_DIR)
+
+PERCENTILES = (50, 90, 95, 99)
+
+# 没有 path 时 endpoint 简写对应的路径
+ENDPOINTS = {
+    'calculate_data': '/api/calculate_data',
+    'compare_data': '/api/compare_data',
+    'logs': '/api/logs',
+}
+
+_WERKZEUG_SERVER = (
+    "import sys; sys.path.insert(0, {root!r}); "
+    "from werkzeug.serving import run_simple; from wsgi import app; "
+    "run_simple({host!r}, {port}, app, threaded=True, use_reloader=False)"
+)
+
+
+def load_log(path):
+    """
+    读取请求日志
+
+    返回:
+        [{'method', 'path', 'query', 'body', 't'}, ...]
+    """
+    entries = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{number} 不是有效的JSON: {e}") from e
+            request_path = item.get('path') or ENDPOINTS.get(item.get('endpoint'))
+            if not request_path:
+                raise ValueError(f"{path}:{number} 缺少 path（或未知的 endpoint {item.get('endpoint')!r}）")
+            body = item.get('body')
+            entries.append({
+                'method': (item.get('method') or ('POST' if body is not None else 'GET')).upper(),
+                'path': request_path,
+                'query': item.get('query') or {},
+                'body': body,
+                't': float(item.get('t', 0) or 0),
+            })
+    return entries
+
+
+def sample_log(path, repeat=1):
+    """
+    由基准用例的请求体生成一份混合请求日志（三个模型的 1D/2D/3D 静态计算、混合参数组比较、日志轮询）
+    """
+    from benchmarks.cases import _generate_data_case, COMPARE_SETS
+    calculations = [_generate_data_case(model_type, sine_type, False).request
+                    for model_type in ('dill', 'enhanced_dill', 'car') for sine_type in ('1d', 'multi', '3d')]
+    lines = []
+    for _ in range(repeat):
+        for body in calculations:
+            lines.append({'path': ENDPOINTS['calculate_data'], 'body': body})
+            # 前端计算期间轮询日志
+            lines.append({'path': ENDPOINTS['logs'], 'method': 'GET',
+                          'query': {'page': 'index', 'model_type': body['model_type'], 'limit': 100}})
+        lines.append({'path': ENDPOINTS['compare_data'], 'body': {'parameter_sets': COMPARE_SETS}})
+        lines.append({'path': ENDPOINTS['logs'], 'method': 'GET', 'query': {'page': 'compare', 'limit': 100}})
+    with open(path, 'w', encoding='utf-8') as f:
+        for index, line in enumerate(lines):
+            line['t'] = round(index * 0.5, 3)
+            f.write(json.dumps(line, ensure_ascii=False) + '\n')
+    return len(lines)
+
+
+# ---------------------------------------------------------------- 服务端
+
+def _free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def default_server():
+    return 'gunicorn' if importlib.util.find_spec('gunicorn') is not None else 'werkzeug'
+
+
+def start_server(kind, workers=2, threads=4, env=None, extra_args=(), log_path=None):
+    """
+    在随机本地端口启动 wsgi:app
+
+    返回:
+        (subprocess.Popen, 基础URL, 服务端输出文件路径)
+    """
+    port = _free_port()
+    if kind == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn', 'wsgi:app', '--bind', f'127.0.0.1:{port}',
+                   '--workers', str(workers), '--threads', str(threads), *extra_args]
+    else:
+        command = [sys.executable, '-c', _WERKZEUG_SERVER.format(root=PROJECT_DIR, host='127.0.0.1', port=port)]
+    server_env = dict(os.environ)
+    server_env.update(env or {})
+    if log_path is None:
+        log_path = os.path.join(tempfile.gettempdir(), f'dill_replay_server_{port}.log')
+    with open(log_path, 'wb') as log:
+        process = subprocess.Popen(command, cwd=PROJECT_DIR, env=server_env, stdout=log,
+                                   stderr=subprocess.STDOUT, start_new_session=True)
+    return process, f'http://127.0.0.1:{port}', log_path
+
+
+def wait_until_ready(base_url, process=None, timeout=120):
+    """轮询 /api/health 直到服务端就绪"""
+    parts = urlsplit(base_url)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            return False
+        connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=2)
+        try:
+            connection.request('GET', '/api/health')
+            if connection.getresponse().status == 200:
+                return True
+        except OSError:
+            pass
+        finally:
+            connection.close()
+        time.sleep(0.2)
+    return False
+
+
+def stop_server(process, timeout=15):
+    if process.poll() is not None:
+        return
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+    except ProcessLookupError:
+        pass
+
+
+# ---------------------------------------------------------------- 内存采样
+
+def process_tree(pid):
+    """pid 及其全部子孙进程，返回 {pid: 父pid}"""
+    tree, pending = {pid: None}, [pid]
+    while pending:
+        parent = pending.pop()
+        try:
+            tasks = os.listdir(f'/proc/{parent}/task')
+        except OSError:
+            continue
+        for task in tasks:
+            try:
+                with open(f'/proc/{parent}/task/{task}/children') as f:
+                    children = [int(child) for child in f.read().split()]
+            except OSError:
+                continue
+            for child in children:
+                if child not in tree:
+                    tree[child] = parent
+                    pending.append(child)
+    return tree
+
+
+def _rss(pid):
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _command(pid):
+    try:
+        with open(f'/proc/{pid}/cmdline', 'rb') as f:
+            return f.read().replace(b'\0', b' ').decode('utf-8', 'replace').strip()
+    except OSError:
+        return ''
+
+
+class MemorySampler:
+    """
+    后台线程定时采样服务端进程树的RSS
+
+    参数:
+        pid: 服务端主进程
+        interval: 采样间隔（秒）
+    """
+
+    def __init__(self, pid, interval=0.5):
+        self.pid = pid
+        self.interval = interval
+        self.processes = {}      # pid -> {'parent', 'command', 'first', 'peak', 'last'}
+        self.peak_total = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='replay-memory', daemon=True)
+
+    def start(self):
+        self.sample()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.sample()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        total = 0
+        for pid, parent in process_tree(self.pid).items():
+            rss = _rss(pid)
+            if rss is None:
+                continue
+            total += rss
+            record = self.processes.get(pid)
+            if record is None:
+                record = self.processes[pid] = {'parent': parent, 'command': _command(pid),
+                                                'first': rss, 'peak': rss, 'last': rss}
+            record['peak'] = max(record['peak'], rss)
+            record['last'] = rss
+        self.peak_total = max(self.peak_total, total)
+
+    def report(self):
+        return {
+            'peak_total_bytes': self.peak_total,
+            'processes': [dict(pid=pid, **record) for pid, record in sorted(self.processes.items())],
+        }
+
+
+# ---------------------------------------------------------------- 回放
+
+def arrival_schedule(entries, count, rate=None, arrival='poisson', speed=1.0, seed=0):
+    """
+    生成 (到达时刻, 请求) 序列，到达时刻相对开始的秒数；闭环模式下为None
+
+    参数:
+        entries: load_log() 结果，按顺序循环使用
+        count: 请求总数
+        rate: None 为闭环；'recorded' 按日志中的 t；数值为平均每秒请求数
+        arrival: 'poisson'（指数分布间隔）或 'uniform'（固定间隔）
+        speed: recorded 模式的回放倍速
+    """
+    generator = random.Random(seed)
+    clock = 0.0
+    first = min(entry['t'] for entry in entries)
+    cycle = max(entry['t'] for entry in entries) - first
+    for index in range(count):
+        entry = entries[index % len(entries)]
+        if rate is None:
+            yield None, entry
+        elif rate == 'recorded':
+            # 循环回放时每一轮接在上一轮之后
+            loop = index // len(entries)
+            gap = cycle / max(len(entries) - 1, 1)
+            yield (loop * (cycle + gap) + entry['t'] - first) / speed, entry
+        else:
+            yield clock, entry
+            clock += generator.expovariate(rate) if arrival == 'poisson' else 1.0 / rate
+
+
+class _Client:
+    """一个保持连接的HTTP客户端（每个并发槽位一个）"""
+
+    def __init__(self, base_url, timeout):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.timeout = timeout
+        self.connection = None
+
+    def send(self, entry):
+        """返回 (状态码, 响应体字节数)"""
+        target = entry['path']
+        if entry['query']:
+            target = f"{target}?{urlencode(entry['query'], doseq=True)}"
+        body, headers = None, {'Accept-Encoding': 'identity'}
+        if entry['body'] is not None:
+            body = json.dumps(entry['body']).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        for attempt in (0, 1):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self.connection.request(entry['method'], target, body=body, headers=headers)
+                response = self.connection.getresponse()
+                payload = response.read()
+                if response.will_close:
+                    self.close()
+                return response.status, len(payload)
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # 服务端关闭了空闲的保持连接，重连后重发一次
+                self.close()
+                if attempt:
+                    raise
+            except Exception:
+                self.close()
+                raise
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def replay(base_url, schedule, concurrency=4, timeout=300, duration=None, progress=None):
+    """
+    回放请求
+
+    参数:
+        base_url: 服务端地址
+        schedule: arrival_schedule() 结果
+        concurrency: 并发连接数
+        timeout: 单个请求超时（秒）
+        duration: 超过该秒数后不再发出新请求（已发出的请求等待完成），None 表示发完为止
+        progress: 每完成一个请求调用一次，参数为结果记录
+    返回:
+        (结果记录列表, 回放总秒数)；记录为 {'path', 'status', 'latency', 'bytes', 'error'}
+    """
+    jobs = queue.Queue(maxsize=concurrency * 2)
+    results = []
+    lock = threading.Lock()
+    started = time.perf_counter()
+
+    def worker():
+        client = _Client(base_url, timeout)
+        while True:
+            job = jobs.get()
+            if job is None:
+                break
+            arrival, entry = job
+            begin = time.perf_counter()
+            status, size, error = None, 0, None
+            try:
+                status, size = client.send(entry)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            finished = time.perf_counter()
+            record = {
+                'path': entry['path'],
+                'status': status,
+                'latency': finished - (started + arrival if arrival is not None else begin),
+                'bytes': size,
+                'error': error,
+            }
+            with lock:
+                results.append(record)
+            if progress is not None:
+                progress(record)
+        client.close()
+
+    threads = [threading.Thread(target=worker, name=f'replay-{i}', daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    try:
+        for arrival, entry in schedule:
+            now = time.perf_counter() - started
+            if duration is not None and now >= duration:
+                break
+            if arrival is not None:
+                if duration is not None and arrival >= duration:
+                    break
+                if arrival > now:
+                    time.sleep(arrival - now)
+            jobs.put((arrival, entry))
+    except KeyboardInterrupt:
+        print("⏹️ 已中断，等待在途请求完成")
+    for _ in threads:
+        jobs.put(None)
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - started
+
+
+def percentile(ordered, q):
+    """最近秩百分位数（ordered 已排序）"""
+    if not ordered:
+        return None
+    index = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(records, elapsed):
+    """
+    汇总结果
+
+    返回:
+        {'all': {...}, 'endpoints': {路径: {...}}}，每项含 requests、errors、error_rate、throughput、
+        latency（p50/p90/p95/p99/max/mean，秒）、statuses、bytes
+    """
+    def stats(items):
+        latencies = sorted(item['latency'] for item in items)
+        errors = sum(1 for item in items if item['error'] or (item['status'] or 0) >= 400)
+        statuses = {}
+        for item in items:
+            key = str(item['status']) if item['status'] is not None else 'error'
+            statuses[key] = statuses.get(key, 0) + 1
+        latency = {f'p{q}': percentile(latencies, q) for q in PERCENTILES}
+        latency['max'] = latencies[-1] if latencies else None
+        latency['mean'] = sum(latencies) / len(latencies) if latencies else None
+        return {
+            'requests': len(items),
+            'errors': errors,
+            'error_rate': errors / len(items) if items else 0.0,
+            'throughput': len(items) / elapsed if elapsed > 0 else None,
+            'latency': latency,
+            'statuses': statuses,
+            'bytes': sum(item['bytes'] for item in items),
+        }
+
+    by_path = {}
+    for record in records:
+        by_path.setdefault(record['path'], []).append(record)
+    return {
+        'all': stats(records),
+        'endpoints': {path: stats(items) for path, items in sorted(by_path.items())},
+    }
+
+
+def _format_bytes(value):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(value) < 1024 or unit == 'GB':
+            return f"{value:.0f}{unit}" if unit == 'B' else f"{value:.1f}{unit}"
+        value /= 1024
+
+
+def _ms(value):
+    return f"{value * 1000:.1f}" if value is not None else '-'
+
+
+def print_report(summary, elapsed, memory=None):
+    print(f"   {'接口':<24} {'请求':>6} {'吞吐(/s)':>9} {'错误率':>7} "
+          + ' '.join(f"{f'p{q}(ms)':>9}" for q in PERCENTILES) + f" {'max(ms)':>9}")
+    rows = list(summary['endpoints'].items()) + [('合计', summary['all'])]
+    for name, stats in rows:
+        latency = stats['latency']
+        print(f"   {name:<24} {stats['requests']:>6} {stats['throughput'] or 0:>9.2f} "
+              f"{stats['error_rate'] * 100:>6.1f}% "
+              + ' '.join(f"{_ms(latency[f'p{q}']):>9}" for q in PERCENTILES) + f" {_ms(latency['max']):>9}")
+    statuses = ', '.join(f"{status}×{count}" for status, count in sorted(summary['all']['statuses'].items()))
+    print(f"   用时 {elapsed:.1f}s，状态码 {statuses}")
+    if memory is not None:
+        print(f"   服务端内存峰值（进程树合计）{_format_bytes(memory['peak_total_bytes'])}")
+        for process in memory['processes']:
+            print(f"     pid {process['pid']:<7} 峰值 {_format_bytes(process['peak']):>9}  "
+                  f"起始 {_format_bytes(process['first']):>9}  结束 {_format_bytes(process['last']):>9}  "
+                  f"{process['command'][:60]}")
+
+
+def _parse_rate(value):
+    if value == 'recorded':
+        return value
+    rate = float(value)
+    if rate <= 0:
+        raise argparse.ArgumentTypeError('--rate 必须为正数或 recorded')
+    return rate
+
+
+def _parse_env(value):
+    if '=' not in value:
+        raise argparse.ArgumentTypeError('--env 的格式为 KEY=VALUE')
+    return tuple(value.split('=', 1))
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="回放请求日志，对本机启动的 wsgi:app 做负载测试")
+    parser.add_argument('log', nargs='?', help='请求日志（JSON Lines）')
+    parser.add_argument('--write-sample', metavar='PATH', help='由基准用例生成一份混合请求日志后退出')
+    parser.add_argument('--sample-repeat', type=int, default=1, help='生成样例日志时的重复轮数（默认: 1）')
+    parser.add_argument('-c', '--concurrency', type=int, default=4, help='并发连接数（默认: 4）')
+    parser.add_argument('--rate', type=_parse_rate,
+                        help='到达率（每秒请求数），或 recorded 按日志时间戳回放；缺省为闭环')
+    parser.add_argument('--arrival', choices=('poisson', 'uniform'), default='poisson',
+                        help='--rate 为数值时的到达间隔分布（默认: poisson）')
+    parser.add_argument('--speed', type=float, default=1.0, help='recorded 模式的回放倍速（默认: 1）')
+    parser.add_argument('-n', '--requests', type=int, help='请求总数，超过日志条数时循环回放（默认: 日志条数）')
+    parser.add_argument('--duration', type=float, help='超过该秒数后不再发出新请求')
+    parser.add_argument('--shuffle', action='store_true', help='打乱日志顺序')
+    parser.add_argument('--seed', type=int, default=0, help='打乱顺序与泊松到达的随机种子（默认: 0）')
+    parser.add_argument('--timeout', type=float, default=300, help='单个请求超时秒数（默认: 300）')
+    parser.add_argument('--server', choices=('gunicorn', 'werkzeug'), help='服务端（默认: 已安装时用 gunicorn）')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn worker 数（默认: 2）')
+    parser.add_argument('--threads', type=int, default=4, help='gunicorn 每个 worker 的线程数（默认: 4）')
+    parser.add_argument('--server-arg', action='append', default=[], help='追加给 gunicorn 的参数（可重复）')
+    parser.add_argument('--env', action='append', type=_parse_env, default=[],
+                        help='服务端环境变量 KEY=VALUE（可重复），如 DILL_ADMISSION_ENABLED=false')
+    parser.add_argument('--url', help='回放到已启动的本地服务，不启动服务端')
+    parser.add_argument('--pid', type=int, help='与 --url 一起使用时采样该进程树的内存')
+    parser.add_argument('--memory-interval', type=float, default=0.5, help='内存采样间隔秒数（默认: 0.5）')
+    parser.add_argument('--max-error-rate', type=float,
+                        help='错误率超过该值（0~1）时以状态码1退出')
+    parser.add_argument('--output', help='把结果写入该JSON文件')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_arguments(argv)
+    if args.write_sample:
+        count = sample_log(args.write_sample, args.sample_repeat)
+        print(f"💾 已写入 {count} 条请求到 {args.write_sample}")
+        return 0
+    if not args.log:
+        print("❌ 需要指定请求日志（或使用 --write-sample 生成）")
+        return 2
+
+    entries = load_log(args.log)
+    if not entries:
+        print(f"❌ {args.log} 中没有请求")
+        return 2
+    if args.shuffle:
+        random.Random(args.seed).shuffle(entries)
+    count = args.requests or len(entries)
+
+    process, log_path = None, None
+    if args.url:
+        base_url, memory_pid = args.url.rstrip('/'), args.pid
+        if not wait_until_ready(base_url, timeout=10):
+            print(f"❌ {base_url}/api/health 无响应")
+            return 2
+    else:
+        kind = args.server or default_server()
+        process, base_url, log_path = start_server(kind, args.workers, args.threads, dict(args.env),
+                                                   args.server_arg)
+        memory_pid = process.pid
+        print(f"🚀 启动 {kind} 服务端 {base_url}（输出: {log_path}）")
+        if not wait_until_ready(base_url, process):
+            stop_server(process)
+            print(f"❌ 服务端未能启动，见 {log_path}")
+            return 2
+
+    sampler = MemorySampler(memory_pid, args.memory_interval).start() if memory_pid else None
+    mode = '闭环' if args.rate is None else (f"按日志时间戳 ×{args.speed}" if args.rate == 'recorded'
+                                             else f"{args.arrival} 到达 {args.rate}/s")
+    print(f"📼 回放 {count} 个请求（{len(entries)} 条日志，{mode}，{args.concurrency} 个并发连接）")
+    try:
+        schedule = arrival_schedule(entries, count, args.rate, args.arrival, args.speed, args.seed)
+        records, elapsed = replay(base_url, schedule, args.concurrency, args.timeout, args.duration)
+    finally:
+        if sampler is not None:
+            sampler.stop()
+        if process is not None:
+            stop_server(process)
+
+    summary = summarize(records, elapsed)
+    memory = sampler.report() if sampler is not None else None
+    print_report(summary, elapsed, memory)
+    errors = [record for record in records if record['error']]
+    for record in errors[:5]:
+        print(f"   ❌ {record['path']}: {record['error']}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'log': args.log, 'mode': mode, 'concurrency': args.concurrency, 'elapsed_seconds': elapsed,
+                       'summary': summary, 'memory': memory}, f, ensure_ascii=False, indent=2)
+    if args.max_error_rate is not None and summary['all']['error_rate'] > args.max_error_rate:
+        print(f"❌ 错误率 {summary['all']['error_rate'] * 100:.1f}% 超过 {args.max_error_rate * 100:.1f}%")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,311 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+运行基准测试并与基准文件比较
+
+每个用例先预热，再计时 --repeat 次（取中位数）。内存峰值取各次运行中进程RSS高水位
+（/proc/self/status 的 VmHWM，运行前通过 /proc/self/clear_refs 复位）相对运行前RSS的增量，
+不包括计算进程池中子进程的内存；无法复位高水位的平台不记录该项。tracemalloc 对模型中
+大量小对象分配的开销可达数十倍，不适合这里。响应体字节数按应用的JSON提供器序列化结果得到。
+与基准相比任一指标超出 --threshold 时标记为回退，进程以状态码1退出。
+加 --accuracy 时在耗时表之后运行数值精度检查（benchmarks/accuracy.py），精度未通过同样以状态码1退出。
+
+基准文件格式（utils/cost_model.CostModel.load_baseline 读取其中的路径键与耗时）:
+    {"created_at": ..., "environment": {...}, "repeat": 5,
+     "cases": [{"name", "group", "median_seconds", "min_seconds", "peak_memory_bytes",
+                "payload_bytes", "profile_key", "predicted_seconds"}, ...]}
+"""
+
+import os
+import io
+import gc
+import ctypes
+import sys
+import json
+import time
+import logging
+import platform
+import argparse
+import statistics
+import contextlib
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+# 添加项目根目录到Python路径（直接运行 python benchmarks/run.py 时）
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, 'baseline.json')
+
+# 参与回退判断的指标，及判定回退时还需超过的绝对增量（避免毫秒级耗时与页级内存的噪声被当作回退）
+METRICS = {
+    'median_seconds': 0.005,
+    'peak_memory_bytes': 1024 * 1024,
+    'payload_bytes': 0,
+}
+
+
+def create_benchmark_app():
+    """
+    创建用于基准测试的应用：关闭慢请求捕获与准入控制，后端日志只输出错误
+    """
+    os.environ.setdefault('DILL_SLOW_REQUEST_THRESHOLD', '0')
+    os.environ.setdefault('DILL_ADMISSION_ENABLED', 'false')
+    for name in ('backend', 'werkzeug'):
+        logging.getLogger(name).setLevel(logging.ERROR)
+    from backend.app import create_app
+    with contextlib.redirect_stdout(io.StringIO()):
+        app = create_app()
+    return app
+
+
+def _payload_bytes(app, result):
+    if hasattr(result, 'get_data'):
+        return len(result.get_data())
+    return len(app.json.dumps_bytes(result, separators=(',', ':')))
+
+
+def _memory_status():
+    """返回 (当前RSS, RSS高水位)，单位字节"""
+    values = {}
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(('VmRSS:', 'VmHWM:')):
+                key, value = line.split(':', 1)
+                values[key] = int(value.split()[0]) * 1024
+    return values['VmRSS'], values['VmHWM']
+
+
+try:
+    _libc = ctypes.CDLL('libc.so.6')
+except OSError:
+    _libc = None
+
+
+def _reset_peak_memory():
+    """
+    归还空闲堆内存并复位RSS高水位，返回复位后的当前RSS；平台不支持时返回None
+
+    先 malloc_trim(0)，否则前一个用例释放后仍驻留的内存会被本用例复用，增量显示为0
+    """
+    if _libc is not None:
+        _libc.malloc_trim(0)
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return _memory_status()[0]
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _invoke(case):
+    if case.setup is not None:
+        case.setup()
+    # 模型在计算过程中大量 print，计时时丢弃
+    with contextlib.redirect_stdout(io.StringIO()):
+        return case.run()
+
+
+def measure(app, case, repeat=5, warmup=1):
+    """
+    测量单个用例
+
+    返回:
+        {'name', 'group', 'median_seconds', 'min_seconds', 'max_seconds', 'repeat',
+         'peak_memory_bytes', 'payload_bytes', 'profile_key', 'predicted_seconds'}
+    """
+    for _ in range(warmup):
+        _invoke(case)
+    seconds = []
+    peak = None
+    result = None
+    for _ in range(repeat):
+        result = None
+        gc.collect()
+        rss_before = _reset_peak_memory()
+        start = time.perf_counter()
+        result = _invoke(case)
+        seconds.append(time.perf_counter() - start)
+        if rss_before is not None:
+            peak = max(peak or 0, _memory_status()[1] - rss_before)
+    payload = _payload_bytes(app, result)
+
+    record = {
+        'name': case.name,
+        'group': case.group,
+        'median_seconds': round(statistics.median(seconds), 6),
+        'min_seconds': round(min(seconds), 6),
+        'max_seconds': round(max(seconds), 6),
+        'repeat': repeat,
+        'peak_memory_bytes': peak,
+        'payload_bytes': payload,
+    }
+    model = app.extensions.get('cost_model')
+    if case.request is not None and model is not None:
+        estimate = model.estimate(case.request, case.endpoint)
+        record['profile_key'] = estimate['profile_key']
+        record['predicted_seconds'] = round(estimate['raw_seconds'], 6)
+    return record
+
+
+def compare(results, baseline, threshold):
+    """
+    与基准比较
+
+    参数:
+        results: measure() 结果列表
+        baseline: 基准文件内容，None 表示没有基准
+        threshold: 允许的相对增幅（0.25 表示 +25%）
+    返回:
+        {用例名: [(指标, 基准值, 当前值, 相对变化), ...]}，只含回退的指标
+    """
+    regressions = {}
+    previous = {case['name']: case for case in (baseline or {}).get('cases', [])}
+    for record in results:
+        base = previous.get(record['name'])
+        if base is None:
+            continue
+        for metric, min_delta in METRICS.items():
+            old, new = base.get(metric), record.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if change <= threshold or new - old <= min_delta:
+                continue
+            regressions.setdefault(record['name'], []).append((metric, old, new, change))
+    return regressions
+
+
+def environment():
+    """记录运行环境，比较不同机器上的基准时参考"""
+    import numpy
+    import scipy
+    return {
+        'python': platform.python_version(),
+        'numpy': numpy.__version__,
+        'scipy': scipy.__version__,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def _format_bytes(value):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(value) < 1024 or unit == 'GB':
+            return f"{value:.0f}{unit}" if unit == 'B' else f"{value:.1f}{unit}"
+        value /= 1024
+
+
+def _print_row(record, base, regressed):
+    change = ''
+    if base and base.get('median_seconds'):
+        change = f"{(record['median_seconds'] - base['median_seconds']) / base['median_seconds'] * 100:+.1f}%"
+    flag = '❌' if regressed else '  '
+    peak = record['peak_memory_bytes']
+    print(f"{flag} {record['name']:<32} {record['median_seconds'] * 1000:>10.2f}ms {change:>8} "
+          f"{_format_bytes(peak) if peak is not None else '-':>10} {_format_bytes(record['payload_bytes']):>10}")
+
+
+def load_baseline(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def write_baseline(path, results, repeat):
+    baseline = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': environment(),
+        'repeat': repeat,
+        'cases': results,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, ensure_ascii=False, indent=2)
+        f.write('\n')
+    return baseline
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="Dill模型性能基准测试")
+    parser.add_argument('-k', '--filter', action='append', default=[],
+                        help='只运行名称包含该字符串的用例（可重复）')
+    parser.add_argument('--list', action='store_true', help='只列出用例')
+    parser.add_argument('--repeat', type=int, default=5, help='每个用例计时次数（默认: 5）')
+    parser.add_argument('--warmup', type=int, default=1, help='每个用例预热次数（默认: 1）')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='判定回退的相对增幅（默认: 0.25，即 +25%%）')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='基准文件路径')
+    parser.add_argument('--update', action='store_true', help='用本次结果覆盖基准文件')
+    parser.add_argument('--output', help='把本次结果写入该JSON文件')
+    parser.add_argument('--accuracy', action='store_true',
+                        help='同时与 benchmarks/golden 中的参考输出比较数值精度')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_arguments(argv)
+    app = create_benchmark_app()
+    from benchmarks.cases import build_cases
+    with app.app_context():
+        cases = [case for case in build_cases(app)
+                 if not args.filter or any(pattern in case.name for pattern in args.filter)]
+        if args.list:
+            for case in cases:
+                print(f"{case.group:<14} {case.name}")
+            return 0
+        if not cases:
+            print("❌ 没有匹配的用例")
+            return 2
+
+        baseline = load_baseline(args.baseline)
+        previous = {case['name']: case for case in (baseline or {}).get('cases', [])}
+        print(f"📏 {len(cases)} 个用例，每个计时 {args.repeat} 次（基准: "
+              f"{args.baseline if baseline else '无'}，回退阈值 +{args.threshold * 100:.0f}%）")
+        print(f"   {'用例':<32} {'中位耗时':>12} {'变化':>8} {'内存峰值':>10} {'响应体':>10}")
+        results = []
+        for case in cases:
+            record = measure(app, case, repeat=args.repeat, warmup=args.warmup)
+            results.append(record)
+            regressed = bool(compare([record], baseline, args.threshold))
+            _print_row(record, previous.get(case.name), regressed)
+
+        accuracy_passed, accuracy = True, None
+        if args.accuracy:
+            from benchmarks.accuracy import run_accuracy
+            print()
+            accuracy_passed, accuracy = run_accuracy(args.filter)
+
+    regressions = compare(results, baseline, args.threshold)
+    if args.output:
+        report = {'environment': environment(), 'cases': results,
+                  'regressions': {name: [list(item) for item in items] for name, items in regressions.items()}}
+        if accuracy is not None:
+            report['accuracy'] = accuracy
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.update:
+        if args.filter and baseline:
+            # 只运行了部分用例时保留其余用例的基准
+            merged = {case['name']: case for case in baseline.get('cases', [])}
+            merged.update({record['name']: record for record in results})
+            results = list(merged.values())
+        write_baseline(args.baseline, results, args.repeat)
+        print(f"💾 基准已写入 {args.baseline}")
+        return 0 if accuracy_passed else 1
+    if not accuracy_passed:
+        print("❌ 数值精度检查未通过")
+    if regressions:
+        print(f"❌ {len(regressions)} 个用例回退:")
+        for name, items in regressions.items():
+            for metric, old, new, change in items:
+                print(f"   {name}: {metric} {old} → {new}（{change * 100:+.1f}%）")
+        return 1
+    if not accuracy_passed:
+        return 1
+    print("✅ 没有超出阈值的回退")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
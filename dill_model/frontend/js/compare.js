@@ -764,9 +764,10 @@ function displayComparisonResults(data) {
         const exposureComparisonPlot = document.getElementById('exposure-comparison-plot');
         const thicknessComparisonPlot = document.getElementById('thickness-comparison-plot');
         
-        // 设置图像源（Base64数据）
-        exposureComparisonPlot.src = `data:image/png;base64,${data.exposure_comparison_plot}`;
-        thicknessComparisonPlot.src = `data:image/png;base64,${data.thickness_comparison_plot}`;
+        // 设置图像源（Base64数据，格式由后端 plot_mime 给出）
+        const plotMime = data.plot_mime || 'image/png';
+        exposureComparisonPlot.src = `data:${plotMime};base64,${data.exposure_comparison_plot}`;
+        thicknessComparisonPlot.src = `data:${plotMime};base64,${data.thickness_comparison_plot}`;
         
         // 显示静态图像
         exposureComparisonPlot.style.display = 'block';
@@ -1133,9 +1133,10 @@ function displayResults(data) {
     const exposurePlot = document.getElementById('exposure-plot');
     const thicknessPlot = document.getElementById('thickness-plot');
     
-    // 设置图像源（Base64数据）
-    exposurePlot.src = `data:image/png;base64,${data.exposure_plot}`;
-    thicknessPlot.src = `data:image/png;base64,${data.thickness_plot}`;
+    // 设置图像源（Base64数据，格式由后端 plot_mime 给出）
+    const plotMime = data.plot_mime || 'image/png';
+    exposurePlot.src = `data:${plotMime};base64,${data.exposure_plot}`;
+    thicknessPlot.src = `data:${plotMime};base64,${data.thickness_plot}`;
     
     // 显示图像
     exposurePlot.style.display = 'block';
@@ -0,0 +1,78 @@
+"""
+apply_lod 按模型声明的坐标轴降采样（坐标轴等长时不能混淆）
+"""
+
+import numpy as np
+
+from backend.models.car_model import CARModel
+from backend.models.dill_model import DillModel
+from backend.models.enhanced_dill_model import EnhancedDillModel
+from backend.utils.downsample import apply_lod
+
+
+def _enhanced_3d():
+    # Enhanced Dill 3D 为 [z][y][x]，x 与 y 同为20点；字段值等于该点的x坐标
+    x = np.linspace(0, 10, 20)
+    y = np.linspace(0, 5, 20)
+    z = np.linspace(0, 4, 10)
+    field = np.broadcast_to(x, (len(z), len(y), len(x))).copy()
+    return {'x_coords': x.tolist(), 'y_coords': y.tolist(), 'z_coords': z.tolist(),
+            'exposure_dose': field, 'thickness': field.copy()}
+
+
+def test_region_crops_declared_axis_when_lengths_are_equal():
+    plot_data = _enhanced_3d()
+    result = apply_lod(plot_data, EnhancedDillModel.LOD_AXES['3d'], region={'x': [0, 2]})
+
+    x_out = np.asarray(result['x_coords'])
+    assert len(x_out) == 4
+    assert len(result['y_coords']) == 20
+    assert result['exposure_dose'].shape == (10, 20, 4)
+    assert np.all(result['exposure_dose'] == x_out)
+
+
+def test_time_frames_keep_declared_axes():
+    plot_data = _enhanced_3d()
+    plot_data['exposure_dose_frames'] = [plot_data['exposure_dose']] * 3
+    result = apply_lod(plot_data, EnhancedDillModel.LOD_AXES['3d'], target_shape={'x_coords': 5})
+
+    assert result['exposure_dose_frames'].shape == (3, 10, 20, 5)
+    assert len(result['x_coords']) == 5
+    assert len(result['y_coords']) == 20
+
+
+def test_dill_2d_with_as_many_y_points_as_x_points():
+    # Dill 2D 为 [y][x]；y_points 与 x 的1000点相同时按声明区分两轴
+    x = np.linspace(0, 10, 1000)
+    y = np.linspace(0, 5, 1000)
+    field = np.broadcast_to(y[:, None], (1000, 1000))
+    plot_data = {'x_coords': x, 'y_coords': y, 'z_exposure_dose': field, 'z_thickness': field}
+    result = apply_lod(plot_data, DillModel.LOD_AXES['multi'], region={'y': [0, 1]}, max_points=100,
+                       method='mean')
+
+    y_out = np.asarray(result['y_coords'])
+    assert result['z_exposure_dose'].shape == (len(y_out), len(result['x_coords']))
+    assert np.allclose(result['z_exposure_dose'][:, 0], y_out)
+    assert y_out.max() <= 1
+
+
+def test_car_2d_flat_fields_follow_y_by_x_layout():
+    x = np.linspace(0, 10, 40)
+    y = np.linspace(0, 5, 40)
+    grid = np.broadcast_to(x, (40, 40))
+    plot_data = {'x_coords': x, 'y_coords': y, 'z_thickness': grid, 'thickness': grid.ravel()}
+    result = apply_lod(plot_data, CARModel.LOD_AXES['multi'], region={'x': [0, 5]})
+
+    nx = len(result['x_coords'])
+    assert result['thickness'].shape == (40 * nx,)
+    assert np.array_equal(result['thickness'].reshape(40, nx), result['z_thickness'])
+
+
+def test_undeclared_fields_and_axes_are_left_unchanged():
+    plot_data = _enhanced_3d()
+    plot_data['time_array'] = list(range(20))
+    result = apply_lod(plot_data, {'exposure_dose': ['z_coords', 'y_coords', 'x_coords']}, max_points=5)
+
+    assert result['time_array'] == list(range(20))
+    assert result['thickness'] is plot_data['thickness']
+    assert result['exposure_dose'].shape == (5, 5, 5)
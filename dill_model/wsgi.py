@@ -17,8 +17,9 @@ except ImportError as e:
     print(f"❌ 导入错误: {e}")
     sys.exit(1)
 
-# 创建应用实例
-app = create_app()
+# 创建应用实例（计算/渲染进程以 spawn 启动时会把本文件作为 __mp_main__ 重新导入，此时不创建应用）
+if __name__ != '__mp_main__':
+    app = create_app()
 
 if __name__ == "__main__":
     port = int(os.environ.get('PORT', 5000))